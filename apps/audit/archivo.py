@@ -0,0 +1,257 @@
+import gzip
+import heapq
+import json
+import os
+from itertools import chain, groupby, islice
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from apps.core.tipos_contenido import tipos_contenido
+
+from .models import AuditEvent, ArchivoAuditoria
+
+CAMPOS_ARCHIVO = ('id', 'user_id', 'event_type', 'timestamp', 'ip_address', 'details', 'content_type_id', 'object_id')
+
+
+def directorio_archivo():
+    return Path(getattr(settings, 'AUDITORIA_DIR_ARCHIVO', settings.BASE_DIR / 'archivo_auditoria'))
+
+
+def sumar_meses(fecha, meses):
+    anio, mes = divmod(fecha.year * 12 + fecha.month - 1 + meses, 12)
+    return fecha.replace(year=anio, month=mes + 1)
+
+
+def inicio_de_mes(fecha):
+    return fecha.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def limite_retencion(meses, ahora=None):
+    """Primer instante que se conserva en la tabla: inicio del mes actual menos `meses` meses."""
+    ahora = timezone.localtime(ahora or timezone.now())
+    return sumar_meses(inicio_de_mes(ahora), -meses)
+
+
+def archivar_eventos(limite, tamano_lote=2000):
+    """
+    Mueve a archivos JSONL comprimidos todos los eventos anteriores a `limite`, un archivo por
+    mes y content_type (del más reciente al más antiguo), registra cada archivo en
+    ArchivoAuditoria y borra de la tabla las filas escritas.
+    Devuelve la lista de ArchivoAuditoria creados.
+    """
+    primero = AuditEvent.objects.filter(timestamp__lt=limite).order_by('timestamp').first()
+    if primero is None:
+        return []
+
+    directorio = directorio_archivo()
+    directorio.mkdir(parents=True, exist_ok=True)
+    creados = []
+    mes = inicio_de_mes(timezone.localtime(primero.timestamp))
+    while mes < limite:
+        fin = min(sumar_meses(mes, 1), limite)
+        del_mes = AuditEvent.objects.filter(timestamp__gte=mes, timestamp__lt=fin)
+        content_types = del_mes.order_by().values_list('content_type_id', flat=True).distinct()
+        for content_type_id in sorted(content_types):
+            archivo = _archivar_grupo(del_mes.filter(content_type_id=content_type_id),
+                                      directorio, mes.strftime('%Y-%m'), content_type_id, tamano_lote)
+            if archivo is not None:
+                creados.append(archivo)
+        mes = sumar_meses(mes, 1)
+    return creados
+
+
+def _archivar_grupo(eventos, directorio, periodo, content_type_id, tamano_lote):
+    marca = timezone.now().strftime('%Y%m%d%H%M%S%f')
+    nombre = f'auditoria-{periodo}-ct{content_type_id}-{marca}.jsonl.gz'
+    temporal = directorio / (nombre + '.tmp')
+
+    registros, id_max = 0, 0
+    desde = hasta = object_id_min = object_id_max = None
+    # En el orden del listado, para que la lectura pueda mezclar archivos sin cargarlos
+    filas = eventos.order_by('-timestamp', '-id').values(*CAMPOS_ARCHIVO)
+    with gzip.open(temporal, 'wt', encoding='utf-8') as salida:
+        for fila in filas.iterator(chunk_size=tamano_lote):
+            registros += 1
+            id_max = max(id_max, fila['id'])
+            desde = fila['timestamp'] if desde is None else min(desde, fila['timestamp'])
+            hasta = fila['timestamp'] if hasta is None else max(hasta, fila['timestamp'])
+            object_id_min = fila['object_id'] if object_id_min is None else min(object_id_min, fila['object_id'])
+            object_id_max = fila['object_id'] if object_id_max is None else max(object_id_max, fila['object_id'])
+            # DjangoJSONEncoder recorta a milisegundos; la fecha se escribe completa
+            fila['timestamp'] = fila['timestamp'].isoformat()
+            salida.write(json.dumps(fila, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n')
+    if not registros:
+        temporal.unlink()
+        return None
+    os.replace(temporal, directorio / nombre)
+
+    with transaction.atomic():
+        archivo = ArchivoAuditoria.objects.create(
+            periodo=periodo, content_type_id=content_type_id, ruta=nombre, registros=registros,
+            desde=desde, hasta=hasta, object_id_min=object_id_min, object_id_max=object_id_max,
+        )
+        # Solo se borran filas ya escritas: las que lleguen después tienen un id mayor
+        pendientes = eventos.filter(id__lte=id_max)
+        while True:
+            lote = list(pendientes.values_list('id', flat=True)[:tamano_lote])
+            if not lote:
+                break
+            AuditEvent.objects.filter(id__in=lote).delete()
+    return archivo
+
+
+def leer_archivo(archivo):
+    with gzip.open(directorio_archivo() / archivo.ruta, 'rt', encoding='utf-8') as entrada:
+        for linea in entrada:
+            yield json.loads(linea)
+
+
+def _clave_orden(fila):
+    return fila['timestamp'], fila['id']
+
+
+class EventosArchivados:
+    """
+    Eventos de los archivos fríos que cumplen los filtros de AuditEventViewSet, del más reciente
+    al más antiguo, leídos bajo demanda.
+
+    Los archivos se descartan por content_type, rango de object_id y rango de fechas antes de
+    abrirlos. El total sale de ArchivoAuditoria.registros; solo se leen para contar los archivos
+    que el filtro cubre en parte (bordes del rango de fechas, object_id o event_type). Una página
+    abre únicamente los meses que le tocan, y dentro de cada mes mezcla sus archivos (ya
+    ordenados) con heapq.merge, sin armar listas.
+    """
+    def __init__(self, content_type=None, object_id=None, event_type=None, desde=None, hasta=None):
+        self.object_id, self.event_type, self.desde, self.hasta = object_id, event_type, desde, hasta
+        archivos = ArchivoAuditoria.objects.all()
+        if content_type is not None:
+            archivos = archivos.filter(content_type=content_type)
+        if object_id is not None:
+            archivos = archivos.filter(object_id_min__lte=object_id, object_id_max__gte=object_id)
+        if desde is not None:
+            archivos = archivos.filter(hasta__gte=desde)
+        if hasta is not None:
+            archivos = archivos.filter(desde__lte=hasta)
+        # Los meses no se solapan entre sí: el orden global es mes a mes, del más reciente al más antiguo
+        self.meses = [list(grupo) for _, grupo in groupby(archivos.order_by('-periodo', 'pk'), key=lambda a: a.periodo)]
+        self._cantidades = {}
+
+    def _completo(self, archivo):
+        """Si todas las filas del archivo cumplen los filtros (se cuenta sin abrirlo)."""
+        return (self.object_id is None and not self.event_type
+                and (self.desde is None or archivo.desde >= self.desde)
+                and (self.hasta is None or archivo.hasta <= self.hasta))
+
+    def _filas(self, archivo):
+        for fila in leer_archivo(archivo):
+            if self.object_id is not None and fila['object_id'] != self.object_id:
+                continue
+            if self.event_type and fila['event_type'] != self.event_type:
+                continue
+            fila['timestamp'] = parse_datetime(fila['timestamp'])
+            if self.desde is not None and fila['timestamp'] < self.desde:
+                continue
+            if self.hasta is not None and fila['timestamp'] > self.hasta:
+                continue
+            yield fila
+
+    def _cantidad(self, indice):
+        if indice not in self._cantidades:
+            self._cantidades[indice] = sum(
+                archivo.registros if self._completo(archivo) else sum(1 for _ in self._filas(archivo))
+                for archivo in self.meses[indice]
+            )
+        return self._cantidades[indice]
+
+    def _del_mes(self, indice):
+        return heapq.merge(*[self._filas(archivo) for archivo in self.meses[indice]], key=_clave_orden, reverse=True)
+
+    def count(self):
+        return sum(self._cantidad(indice) for indice in range(len(self.meses)))
+
+    def __len__(self):
+        return self.count()
+
+    def __iter__(self):
+        filas = chain.from_iterable(self._del_mes(indice) for indice in range(len(self.meses)))
+        while True:
+            lote = list(islice(filas, 500))
+            if not lote:
+                return
+            yield from _instancias(lote)
+
+    def __getitem__(self, indice):
+        if not isinstance(indice, slice):
+            return self[indice:indice + 1][0]
+        inicio, fin = indice.start or 0, indice.stop
+        filas = []
+        for mes in range(len(self.meses)):
+            if fin is not None and fin <= 0:
+                break
+            cantidad = self._cantidad(mes)
+            if inicio >= cantidad:
+                # El mes entero queda antes de la página: no se abre
+                inicio -= cantidad
+                fin = None if fin is None else fin - cantidad
+                continue
+            hasta = None if fin is None else min(fin, cantidad)
+            filas.extend(islice(self._del_mes(mes), inicio, hasta))
+            inicio = 0
+            fin = None if fin is None else fin - cantidad
+        return _instancias(filas)
+
+
+def _instancias(filas):
+    """AuditEvent sin guardar, con usuario y content_type resueltos para un lote de filas."""
+    eventos = [AuditEvent(**fila) for fila in filas]
+    usuarios = get_user_model().objects.in_bulk({evento.user_id for evento in eventos if evento.user_id})
+    for evento in eventos:
+        # Si el usuario ya no existe queda en None, igual que el SET_NULL de la tabla
+        evento.user = usuarios.get(evento.user_id)
+        evento.content_type = tipos_contenido.por_id(evento.content_type_id)
+    return eventos
+
+
+class EventosCombinados:
+    """
+    Secuencia perezosa para paginar juntos los eventos en caliente y los archivados.
+    Todos los archivados son anteriores al límite de retención, así que el orden por
+    -timestamp es el queryset primero y los archivados después; cada página solo consulta
+    en la base la porción que le corresponde y solo abre archivos si pasa del último evento
+    en caliente.
+    """
+    def __init__(self, queryset, archivados):
+        self.queryset = queryset
+        self.archivados = archivados
+        self._total_caliente = None
+
+    def total_caliente(self):
+        if self._total_caliente is None:
+            self._total_caliente = self.queryset.count()
+        return self._total_caliente
+
+    def count(self):
+        return self.total_caliente() + self.archivados.count()
+
+    def __len__(self):
+        return self.count()
+
+    def __iter__(self):
+        yield from self.queryset
+        yield from self.archivados
+
+    def __getitem__(self, indice):
+        if not isinstance(indice, slice):
+            return self[indice:indice + 1][0]
+        inicio = indice.start or 0
+        caliente = self.total_caliente()
+        fin = indice.stop
+        resultado = list(self.queryset[inicio:fin if fin is None else min(fin, caliente)]) if inicio < caliente else []
+        if fin is None or fin > caliente:
+            resultado.extend(self.archivados[max(inicio - caliente, 0):None if fin is None else fin - caliente])
+        return resultado
@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from apps.audit.models import AuditEvent
+from apps.audit.archivo import archivar_eventos, limite_retencion
+
+
+class Command(BaseCommand):
+    help = 'Mueve los eventos de auditoría fuera del periodo de retención a archivos JSONL comprimidos por mes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--meses', type=int, default=getattr(settings, 'AUDITORIA_MESES_RETENCION', 12),
+                            help='Meses completos (además del actual) que se conservan en la tabla.')
+        parser.add_argument('--batch-size', type=int, default=2000,
+                            help='Tamaño de lote para leer y borrar eventos.')
+        parser.add_argument('--simular', action='store_true',
+                            help='Solo informa cuántos eventos se archivarían.')
+
+    def handle(self, *args, **options):
+        limite = limite_retencion(options['meses'])
+        if options['simular']:
+            total = AuditEvent.objects.filter(timestamp__lt=limite).count()
+            self.stdout.write(self.style.WARNING(f'Se archivarían {total} eventos anteriores a {limite:%Y-%m-%d}.'))
+            return
+
+        archivos = archivar_eventos(limite, tamano_lote=options['batch_size'])
+        for archivo in archivos:
+            self.stdout.write(f'{archivo.ruta}: {archivo.registros} eventos')
+        total = sum(archivo.registros for archivo in archivos)
+        self.stdout.write(self.style.SUCCESS(
+            f'Se archivaron {total} eventos anteriores a {limite:%Y-%m-%d} en {len(archivos)} archivos.'
+        ))
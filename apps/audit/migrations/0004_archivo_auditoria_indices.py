@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0003_alter_auditevent_timestamp'),
+        ('contenttypes', '0002_remove_content_type_name'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivoAuditoria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periodo', models.CharField(max_length=7, verbose_name='Periodo (AAAA-MM)')),
+                ('ruta', models.CharField(max_length=500, unique=True, verbose_name='Ruta del archivo')),
+                ('registros', models.PositiveIntegerField()),
+                ('desde', models.DateTimeField()),
+                ('hasta', models.DateTimeField()),
+                ('object_id_min', models.PositiveIntegerField()),
+                ('object_id_max', models.PositiveIntegerField()),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Archivo de Auditoría',
+                'verbose_name_plural': 'Archivos de Auditoría',
+                'ordering': ['-periodo'],
+            },
+        ),
+        migrations.AlterModelOptions(
+            name='auditevent',
+            options={'ordering': ['-timestamp'], 'verbose_name': 'Evento de Auditoría', 'verbose_name_plural': 'Eventos de Auditoría'},
+        ),
+        migrations.AddIndex(
+            model_name='auditevent',
+            index=models.Index(fields=['content_type', 'object_id', '-timestamp'], name='audit_objeto_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditevent',
+            index=models.Index(fields=['event_type', '-timestamp'], name='audit_tipo_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditevent',
+            index=models.Index(fields=['timestamp'], name='audit_fecha_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivoauditoria',
+            name='content_type',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='contenttypes.contenttype'),
+        ),
+        migrations.AddIndex(
+            model_name='archivoauditoria',
+            index=models.Index(fields=['content_type', 'periodo'], name='archivo_objeto_periodo_idx'),
+        ),
+    ]
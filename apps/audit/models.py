@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 
@@ -16,8 +17,10 @@ class AuditEvent(models.Model):
         max_length=100,
         verbose_name="Tipo de Evento"
     )
+    # default (no auto_now_add) para conservar la hora del evento aunque se escriba en lote más tarde
     timestamp = models.DateTimeField(
-        auto_now_add=True,
+        default=timezone.now,
+        editable=False,
         verbose_name="Fecha y Hora"
     )
     ip_address = models.GenericIPAddressField(
@@ -34,8 +37,41 @@ class AuditEvent(models.Model):
 
     class Meta:
         verbose_name = "Evento de Auditoría"
-    verbose_name_plural = "Eventos de Auditoría"
-    ordering = ['-timestamp']
+        verbose_name_plural = "Eventos de Auditoría"
+        ordering = ['-timestamp']
+        # Índices alineados con los filtros de AuditEventViewSet y con el archivado por mes
+        indexes = [
+            models.Index(fields=['content_type', 'object_id', '-timestamp'], name='audit_objeto_fecha_idx'),
+            models.Index(fields=['event_type', '-timestamp'], name='audit_tipo_fecha_idx'),
+            models.Index(fields=['timestamp'], name='audit_fecha_idx'),
+        ]
 
     def __str__(self):
-        return f'{self.event_type} por {self.user} en {self.timestamp.strftime("%Y-%m-%d %H:%M")}'
\ No newline at end of file
+        return f'{self.event_type} por {self.user} en {self.timestamp.strftime("%Y-%m-%d %H:%M")}'
+
+class ArchivoAuditoria(models.Model):
+    """
+    Índice de los archivos fríos de auditoría: cada fila describe un JSONL comprimido con los
+    eventos de un mes y un content_type que se retiraron de AuditEvent (comando archivar_auditoria).
+    Los rangos de fecha y de object_id permiten descartar archivos sin abrirlos.
+    """
+    periodo = models.CharField(max_length=7, verbose_name="Periodo (AAAA-MM)")
+    content_type = models.ForeignKey(ContentType, on_delete=models.PROTECT)
+    ruta = models.CharField(max_length=500, unique=True, verbose_name="Ruta del archivo")
+    registros = models.PositiveIntegerField()
+    desde = models.DateTimeField()
+    hasta = models.DateTimeField()
+    object_id_min = models.PositiveIntegerField()
+    object_id_max = models.PositiveIntegerField()
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Archivo de Auditoría"
+        verbose_name_plural = "Archivos de Auditoría"
+        ordering = ['-periodo']
+        indexes = [
+            models.Index(fields=['content_type', 'periodo'], name='archivo_objeto_periodo_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.periodo} - {self.content_type} ({self.registros} eventos)'
@@ -0,0 +1,123 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+
+class ColaAuditoria:
+    """
+    Cola en memoria para los registros de auditoría (AuditEvent y RegistroAuditoria).
+
+    Las vistas solo encolan la instancia sin guardar; un hilo de fondo las escribe con
+    bulk_create cuando se juntan AUDITORIA_TAMANO_LOTE registros o pasan
+    AUDITORIA_INTERVALO_SEGUNDOS desde el primero pendiente. Al terminar el proceso se
+    vacía lo que quede. Con AUDITORIA_ASINCRONA = False (pruebas) se guarda en el momento.
+    """
+    def __init__(self):
+        self._cola = queue.Queue()
+        self._hilo = None
+        self._candado = threading.Lock()
+
+    @property
+    def asincrona(self):
+        return getattr(settings, 'AUDITORIA_ASINCRONA', True)
+
+    @property
+    def tamano_lote(self):
+        return getattr(settings, 'AUDITORIA_TAMANO_LOTE', 200)
+
+    @property
+    def intervalo(self):
+        return getattr(settings, 'AUDITORIA_INTERVALO_SEGUNDOS', 2.0)
+
+    def encolar(self, registro, sincrono=False):
+        if sincrono or not self.asincrona:
+            registro.save()
+            return
+        self._iniciar_hilo()
+        self._cola.put(registro)
+
+    def pendientes(self):
+        return self._cola.qsize()
+
+    def vaciar(self):
+        """Escribe de inmediato, en el hilo que llama, todo lo que esté en la cola."""
+        lote = []
+        while True:
+            try:
+                lote.append(self._cola.get_nowait())
+            except queue.Empty:
+                break
+            if len(lote) >= self.tamano_lote:
+                self.escribir(lote)
+                lote = []
+        if lote:
+            self.escribir(lote)
+
+    def escribir(self, lote):
+        """Guarda un lote con un bulk_create por modelo; si falla, reintenta registro por registro."""
+        por_modelo = {}
+        for registro in lote:
+            por_modelo.setdefault(type(registro), []).append(registro)
+        for modelo, registros in por_modelo.items():
+            try:
+                with transaction.atomic():
+                    modelo.objects.bulk_create(registros)
+            except Exception:
+                logger.exception('Error al escribir %s registros de %s; se reintenta uno a uno.',
+                                  len(registros), modelo.__name__)
+                for registro in registros:
+                    try:
+                        with transaction.atomic():
+                            registro.save()
+                    except Exception:
+                        logger.exception('Se descartó un registro de auditoría de %s.', modelo.__name__)
+
+    def _iniciar_hilo(self):
+        if self._hilo is not None and self._hilo.is_alive():
+            return
+        with self._candado:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._trabajar, name='cola-auditoria', daemon=True)
+                self._hilo.start()
+
+    def _trabajar(self):
+        while True:
+            lote = [self._cola.get()]
+            limite = time.monotonic() + self.intervalo
+            while len(lote) < self.tamano_lote:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    lote.append(self._cola.get(timeout=restante))
+                except queue.Empty:
+                    break
+            # El hilo mantiene su propia conexión: se descartan las caducadas antes y después
+            close_old_connections()
+            try:
+                self.escribir(lote)
+            finally:
+                close_old_connections()
+
+
+cola_auditoria = ColaAuditoria()
+atexit.register(cola_auditoria.vaciar)
+
+
+def registrar_auditoria(modelo, sincrono=False, **campos):
+    """
+    Punto único de escritura de auditoría para todas las apps.
+    - modelo: AuditEvent o RegistroAuditoria.
+    - sincrono: fuerza la escritura inmediata (p. ej. si el usuario referenciado va a eliminarse).
+    - campos: valores del registro.
+    """
+    registro = modelo(**campos)
+    cola_auditoria.encolar(registro, sincrono=sincrono)
+    return registro
@@ -1,7 +1,8 @@
 from rest_framework import serializers
 from .models import AuditEvent
+from apps.core.serializers import CamposDinamicosMixin
 
-class AuditEventSerializer(serializers.ModelSerializer):
+class AuditEventSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     # username
     user = serializers.StringRelatedField()
     # modelo
@@ -1,3 +1,140 @@
-from django.test import TestCase
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from apps.authentication.models import Usuario, RegistroAuditoria
+from .models import AuditEvent, ArchivoAuditoria
+from .archivo import leer_archivo
+from .pipeline import ColaAuditoria, registrar_auditoria, cola_auditoria
+
+
+class ColaAuditoriaTests(TestCase):
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user(nombre_usuario="auditor", password="Clave123!")
+        self.ct = ContentType.objects.get_for_model(Usuario)
+
+    def evento(self, i):
+        return AuditEvent(user=self.usuario, event_type=f'EVENTO_{i}', details={'i': i},
+                          content_type=self.ct, object_id=self.usuario.pk)
+
+    def test_modo_sincrono_escribe_de_inmediato(self):
+        registrar_auditoria(RegistroAuditoria, usuario=self.usuario, accion='Crear')
+        self.assertEqual(cola_auditoria.pendientes(), 0)
+        self.assertTrue(RegistroAuditoria.objects.filter(accion='Crear').exists())
+
+    def test_vaciar_escribe_en_lote_por_modelo(self):
+        cola = ColaAuditoria()
+        for i in range(5):
+            cola._cola.put(self.evento(i))
+        cola._cola.put(RegistroAuditoria(usuario=self.usuario, accion='Activación'))
+
+        with CaptureQueriesContext(connection) as consultas:
+            cola.vaciar()
+        inserciones = [q for q in consultas.captured_queries if q['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserciones), 2)
+
+        self.assertEqual(cola.pendientes(), 0)
+        self.assertEqual(AuditEvent.objects.count(), 5)
+        self.assertEqual(RegistroAuditoria.objects.count(), 1)
+
+    def test_conserva_la_hora_del_evento(self):
+        cola = ColaAuditoria()
+        evento = self.evento(1)
+        hora = evento.timestamp
+        cola._cola.put(evento)
+        cola.vaciar()
+        self.assertEqual(AuditEvent.objects.get().timestamp, hora)
+
+    def test_un_registro_invalido_no_descarta_el_lote(self):
+        cola = ColaAuditoria()
+        cola._cola.put(self.evento(1))
+        cola._cola.put(AuditEvent(user=self.usuario, event_type='INVALIDO', details=None, content_type=self.ct, object_id=1))
+        cola._cola.put(self.evento(2))
+        with self.assertLogs('apps.audit.pipeline', level='ERROR'):
+            cola.vaciar()
+        self.assertCountEqual(
+            AuditEvent.objects.values_list('event_type', flat=True), ['EVENTO_1', 'EVENTO_2']
+        )
+
+    @override_settings(AUDITORIA_ASINCRONA=True)
+    def test_modo_asincrono_encola(self):
+        cola = ColaAuditoria()
+        cola._iniciar_hilo = lambda: None
+        cola.encolar(self.evento(1))
+        self.assertEqual(cola.pendientes(), 1)
+        self.assertFalse(AuditEvent.objects.exists())
+        cola.vaciar()
+        self.assertEqual(AuditEvent.objects.count(), 1)
+
+
+class ArchivoAuditoriaTests(APITestCase):
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ajustes = override_settings(AUDITORIA_DIR_ARCHIVO=directorio.name)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        self.usuario = Usuario.objects.create_user(nombre_usuario="auditor", password="Clave123!")
+        self.client.force_authenticate(user=self.usuario)
+        self.ct = ContentType.objects.get_for_model(Usuario)
+        ahora = timezone.now()
+        for i, dias in enumerate([800, 700, 600, 10, 5]):
+            AuditEvent.objects.create(
+                user=self.usuario, event_type='ANTIGUO' if dias > 365 else 'RECIENTE', details={'i': i},
+                content_type=self.ct, object_id=1 + i % 2, timestamp=ahora - timedelta(days=dias)
+            )
+
+    def archivar(self):
+        call_command('archivar_auditoria', '--meses', '12', stdout=StringIO())
+
+    def test_archiva_meses_antiguos_y_los_borra_de_la_tabla(self):
+        self.archivar()
+        self.assertEqual(AuditEvent.objects.count(), 2)
+        archivos = ArchivoAuditoria.objects.all()
+        self.assertEqual(sum(archivo.registros for archivo in archivos), 3)
+        eventos = [fila for archivo in archivos for fila in leer_archivo(archivo)]
+        self.assertEqual({fila['event_type'] for fila in eventos}, {'ANTIGUO'})
+
+        # Volver a ejecutarlo no duplica nada
+        self.archivar()
+        self.assertEqual(ArchivoAuditoria.objects.count(), archivos.count())
+
+    def test_listado_incluye_eventos_archivados(self):
+        antes = self.client.get(reverse('auditevent-list')).data
+        self.archivar()
+        despues = self.client.get(reverse('auditevent-list')).data
+        self.assertEqual(despues, antes)
+
+    def test_filtros_y_paginacion_sobre_archivo(self):
+        self.archivar()
+        url = reverse('auditevent-list')
+        response = self.client.get(url, {'content_type': self.ct.pk, 'object_id': 1})
+        self.assertEqual([e['details']['i'] for e in response.data], [4, 2, 0])
+
+        response = self.client.get(url, {'event_type': 'ANTIGUO', 'page_size': 2, 'page': 2})
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual([e['details']['i'] for e in response.data['results']], [0])
+
+    def test_paginas_en_caliente_no_abren_archivos(self):
+        self.archivar()
+        url = reverse('auditevent-list')
+        with mock.patch('apps.audit.archivo.leer_archivo', wraps=leer_archivo) as lectura:
+            response = self.client.get(url, {'page_size': 2, 'page': 1})
+            self.assertEqual(response.data['count'], 5)
+            self.assertEqual([e['details']['i'] for e in response.data['results']], [4, 3])
+            lectura.assert_not_called()
+
+            response = self.client.get(url, {'page_size': 2, 'page': 2})
+            self.assertEqual([e['details']['i'] for e in response.data['results']], [2, 1])
+            self.assertTrue(lectura.called)
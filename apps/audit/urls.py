@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import AuditEventViewSet, ContentTypeView
+from .views import AuditEventViewSet, ContentTypeView, ContentTypeListView
 
 router = DefaultRouter()
 router.register(r'events', AuditEventViewSet, basename='auditevent')
@@ -8,4 +8,5 @@ router.register(r'events', AuditEventViewSet, basename='auditevent')
 urlpatterns = [
     path('', include(router.urls)),
     path('content-type/', ContentTypeView.as_view(), name='content-type'),
+    path('content-types/', ContentTypeListView.as_view(), name='content-type-list'),
 ]
\ No newline at end of file
@@ -1,5 +1,6 @@
-from django.contrib.contenttypes.models import ContentType
+from apps.core.tipos_contenido import tipos_contenido
 from .models import AuditEvent
+from .pipeline import registrar_auditoria
 
 def log_event(user, request, event_type, instance, details):
     """
@@ -13,11 +14,12 @@ def log_event(user, request, event_type, instance, details):
     # Obtener la IP del request
     ip_address = request.META.get('REMOTE_ADDR')
 
-    AuditEvent.objects.create(
+    registrar_auditoria(
+        AuditEvent,
         user=user,
         event_type=event_type,
         ip_address=ip_address,
-        content_type=ContentType.objects.get_for_model(instance),
+        content_type=tipos_contenido.tipo(instance),
         object_id=instance.pk,
         details=details
     )
\ No newline at end of file
@@ -1,27 +1,65 @@
 from django.shortcuts import render
 from rest_framework import viewsets
-from .models import AuditEvent
+from .models import AuditEvent, ArchivoAuditoria
 from .serializers import AuditEventSerializer
+from .archivo import EventosArchivados, EventosCombinados
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import views, response, status
-from django.contrib.contenttypes.models import ContentType
+from apps.core.tipos_contenido import tipos_contenido, serializar_tipo
+from apps.core.etag import respuesta_con_etag
+from apps.core.metricas import MedicionSerializacionMixin
+from apps.core.serializers import ConsultaCamposDinamicosMixin
 
 # Create your views here.
-class AuditEventViewSet(viewsets.ReadOnlyModelViewSet):
+class AuditEventViewSet(ConsultaCamposDinamicosMixin, MedicionSerializacionMixin, viewsets.ReadOnlyModelViewSet):
     """
     API endpoint para consultar los eventos de auditoría.
-    Permite filtrar por content_type y object_id.
-    Ejemplo: /api/v1/audit/events/?content_type=10&object_id=1
+    Permite filtrar por content_type, object_id, event_type y rango de fechas.
+    Ejemplo: /api/v1/audit/events/?content_type=10&object_id=1&timestamp__gte=2025-01-01T00:00:00Z
+    El listado incluye también los eventos archivados (comando archivar_auditoria), salvo
+    en la paginación por cursor, que recorre solo la tabla.
     """
-    queryset = AuditEvent.objects.all()
+    queryset = AuditEvent.objects.select_related('user', 'content_type')
     serializer_class = AuditEventSerializer
+    cursor_ordering = '-timestamp'
     filter_backends = [DjangoFilterBackend]
-    filterset_fields = ['content_type', 'object_id']
+    filterset_fields = {
+        'content_type': ['exact'],
+        'object_id': ['exact'],
+        'event_type': ['exact'],
+        'timestamp': ['gte', 'lte'],
+    }
+
+    def list(self, request, *args, **kwargs):
+        if 'cursor' in request.query_params or not ArchivoAuditoria.objects.exists():
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        # filter_queryset ya validó los parámetros; se reutilizan limpios para buscar en el archivo
+        filterset = DjangoFilterBackend().get_filterset(request, self.get_queryset(), self)
+        filterset.is_valid()
+        filtros = filterset.form.cleaned_data
+        archivados = EventosArchivados(
+            content_type=filtros.get('content_type'),
+            object_id=filtros.get('object_id'),
+            event_type=filtros.get('event_type') or None,
+            desde=filtros.get('timestamp__gte'),
+            hasta=filtros.get('timestamp__lte'),
+        )
+        eventos = EventosCombinados(queryset, archivados)
+
+        page = self.paginate_queryset(eventos)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(eventos, many=True)
+        return response.Response(serializer.data)
 
 class ContentTypeView(views.APIView):
     """
     Devuelve el ID de un ContentType a partir del nombre del modelo.
     Ej: /api/v1/audit/content-type/?model=proyecto_inversion
+    Responde con ETag; el cliente puede revalidar con If-None-Match y recibir 304.
     """
     def get(self, request, *args, **kwargs):
         model_name = request.query_params.get('model')
@@ -30,11 +68,28 @@ class ContentTypeView(views.APIView):
                 {"error": "El parámetro 'model' es requerido."},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        try:
-            content_type = ContentType.objects.get(model=model_name)
-            return response.Response({"id": content_type.id, "model": model_name})
-        except ContentType.DoesNotExist:
+        content_type = tipos_contenido.por_nombre(model_name)
+        if content_type is None:
             return response.Response(
                 {"error": f"El modelo '{model_name}' no fue encontrado."},
                 status=status.HTTP_404_NOT_FOUND
-            )
\ No newline at end of file
+            )
+        return respuesta_con_etag(request, tipos_contenido.etag(),
+                                  lambda: {"id": content_type.id, "model": model_name})
+
+
+class ContentTypeListView(views.APIView):
+    """
+    Todos los tipos de contenido en una sola respuesta (o solo ?models=objetivopnd,componente),
+    para que el frontend resuelva nombre -> id sin una petición por modelo. Responde con ETag.
+    """
+    def get(self, request, *args, **kwargs):
+        nombres = [n.strip() for n in request.query_params.get('models', '').split(',') if n.strip()]
+
+        def datos():
+            if not nombres:
+                return [serializar_tipo(ct) for ct in tipos_contenido.todos()]
+            tipos = (tipos_contenido.por_nombre(nombre) for nombre in nombres)
+            return [serializar_tipo(ct) for ct in tipos if ct is not None]
+
+        return respuesta_con_etag(request, tipos_contenido.etag(), datos)
@@ -0,0 +1,203 @@
+import atexit
+import copy
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db import close_old_connections
+from django.utils import timezone
+from rest_framework.authentication import TokenAuthentication
+
+logger = logging.getLogger(__name__)
+
+
+class CacheTokens:
+    """
+    Caché LRU con expiración, en memoria del proceso, de token -> (usuario, token).
+
+    Guarda una instancia "plantilla" del usuario y entrega una copia en cada petición, para que
+    lo que se cuelgue de request.user (p. ej. los roles cargados por roles.permisos_de) no pase
+    de una petición a otra. Se invalida por token al cerrar sesión (borrado del Token) y por
+    usuario al guardarlo (desactivación, cambio de clave); ver receptores en models.py.
+
+    Cada entrada recuerda la versión de revocación de su usuario, que vive en la caché de Django
+    y se renueva en cada invalidación; un acierto con otra versión se descarta. Así, con un
+    backend compartido, un token revocado en un worker deja de aceptarse en todos los demás en
+    la siguiente petición (con LocMemCache solo en el proceso que lo revocó).
+    """
+    def __init__(self):
+        self._entradas = OrderedDict()
+        self._por_usuario = {}
+        self._candado = threading.Lock()
+
+    @property
+    def segundos(self):
+        return getattr(settings, 'TOKEN_CACHE_SEGUNDOS', 300)
+
+    @property
+    def maximo(self):
+        return getattr(settings, 'TOKEN_CACHE_MAXIMO', 10000)
+
+    @staticmethod
+    def _clave_version(usuario_id):
+        return f'tokens:revocacion:{usuario_id}'
+
+    def version(self, usuario_id):
+        """Versión de revocación vigente del usuario; se crea si no existe (o la caché la perdió)."""
+        clave = self._clave_version(usuario_id)
+        version = cache.get(clave)
+        if version is None:
+            cache.add(clave, uuid.uuid4().hex, None)
+            version = cache.get(clave)
+        return version
+
+    def revocar(self, usuario_id):
+        """Renueva la versión del usuario (ya y al confirmar la transacción en curso, si la hay)."""
+        clave = self._clave_version(usuario_id)
+        cache.set(clave, uuid.uuid4().hex, None)
+        transaction.on_commit(lambda: cache.set(clave, uuid.uuid4().hex, None))
+
+    def obtener(self, clave):
+        with self._candado:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                return None
+            usuario, token, expira, version = entrada
+            if expira <= time.monotonic():
+                self._quitar(clave)
+                return None
+            self._entradas.move_to_end(clave)
+        if cache.get(self._clave_version(usuario.pk)) != version:
+            self.invalidar_token(clave)
+            return None
+        return copy.copy(usuario), token
+
+    def guardar(self, clave, usuario, token):
+        if not self.segundos:
+            return
+        version = self.version(usuario.pk)
+        with self._candado:
+            self._quitar(clave)
+            self._entradas[clave] = (copy.copy(usuario), token, time.monotonic() + self.segundos, version)
+            self._por_usuario.setdefault(usuario.pk, set()).add(clave)
+            while len(self._entradas) > self.maximo:
+                self._quitar(next(iter(self._entradas)))
+
+    def invalidar_token(self, clave, usuario_id=None):
+        with self._candado:
+            self._quitar(clave)
+        if usuario_id is not None:
+            self.revocar(usuario_id)
+
+    def invalidar_usuario(self, usuario_id):
+        with self._candado:
+            for clave in list(self._por_usuario.get(usuario_id, ())):
+                self._quitar(clave)
+        self.revocar(usuario_id)
+
+    def limpiar(self):
+        with self._candado:
+            self._entradas.clear()
+            self._por_usuario.clear()
+
+    def _quitar(self, clave):
+        entrada = self._entradas.pop(clave, None)
+        if entrada is None:
+            return
+        claves = self._por_usuario.get(entrada[0].pk)
+        if claves is not None:
+            claves.discard(clave)
+            if not claves:
+                del self._por_usuario[entrada[0].pk]
+
+
+cache_tokens = CacheTokens()
+
+
+class RegistroAccesos:
+    """
+    Acumula el último acceso de cada usuario y lo escribe en lote (un bulk_update de
+    ultimo_acceso) cada ACCESOS_INTERVALO_SEGUNDOS desde un hilo de fondo. Varias peticiones
+    del mismo usuario en el intervalo se funden en una sola escritura. Con
+    ACCESOS_ASINCRONOS = False (pruebas) se escribe en el momento.
+    """
+    def __init__(self):
+        self._pendientes = {}
+        self._candado = threading.Lock()
+        self._hilo = None
+        self._despertar = threading.Event()
+
+    @property
+    def asincrono(self):
+        return getattr(settings, 'ACCESOS_ASINCRONOS', True)
+
+    @property
+    def intervalo(self):
+        return getattr(settings, 'ACCESOS_INTERVALO_SEGUNDOS', 30.0)
+
+    def registrar(self, usuario_id, momento=None):
+        momento = momento or timezone.now()
+        if not self.asincrono:
+            self.escribir({usuario_id: momento})
+            return
+        with self._candado:
+            self._pendientes[usuario_id] = max(momento, self._pendientes.get(usuario_id, momento))
+        self._iniciar_hilo()
+
+    def vaciar(self):
+        with self._candado:
+            pendientes, self._pendientes = self._pendientes, {}
+        if pendientes:
+            self.escribir(pendientes)
+
+    @staticmethod
+    def escribir(pendientes):
+        Usuario = get_user_model()
+        usuarios = [Usuario(pk=usuario_id, ultimo_acceso=momento) for usuario_id, momento in pendientes.items()]
+        try:
+            # bulk_update no emite post_save: no invalida la caché de tokens
+            Usuario.objects.bulk_update(usuarios, ['ultimo_acceso'], batch_size=500)
+        except Exception:
+            logger.exception('No se pudo registrar el último acceso de %s usuarios.', len(usuarios))
+
+    def _iniciar_hilo(self):
+        if self._hilo is not None and self._hilo.is_alive():
+            return
+        with self._candado:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._trabajar, name='registro-accesos', daemon=True)
+                self._hilo.start()
+
+    def _trabajar(self):
+        while True:
+            self._despertar.wait(self.intervalo)
+            close_old_connections()
+            try:
+                self.vaciar()
+            finally:
+                close_old_connections()
+
+
+registro_accesos = RegistroAccesos()
+atexit.register(registro_accesos.vaciar)
+
+
+class AutenticacionTokenCache(TokenAuthentication):
+    """
+    TokenAuthentication de DRF con la consulta Token + Usuario guardada en cache_tokens, de
+    modo que una petición autenticada no consulta la base. El último acceso del usuario se
+    anota en registro_accesos y se escribe en lote.
+    """
+    def authenticate_credentials(self, key):
+        en_cache = cache_tokens.obtener(key)
+        if en_cache is None:
+            en_cache = super().authenticate_credentials(key)
+            cache_tokens.guardar(key, *en_cache)
+        registro_accesos.registrar(en_cache[0].pk)
+        return en_cache
@@ -1,12 +1,15 @@
 from django.db import models
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
 from django.utils import timezone
 from django.utils import timezone
 from django.conf import settings
-from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
+from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin, Group
 from django.dispatch import receiver
 from rest_framework.authtoken.models import Token
 
+from .roles import invalidar_permisos
+from .autenticacion import cache_tokens
+
 # ROLES
 class Rol(models.Model):
     nombre = models.CharField(max_length=100, unique=True)
@@ -38,6 +41,7 @@ class Usuario(AbstractBaseUser, PermissionsMixin):
     roles = models.ManyToManyField(Rol, blank=True, related_name="usuarios")
     datos_basicos = models.JSONField(null=True, blank=True)
     fecha_creacion = models.DateTimeField(default=timezone.now)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
     ultimo_acceso = models.DateTimeField(null=True, blank=True)
     intentos_fallidos = models.IntegerField(default=0)
     esta_bloqueado = models.BooleanField(default=False)
@@ -62,7 +66,7 @@ def create_auth_token(sender, instance=None, created=False, **kwargs):
 
 class RegistroAuditoria(models.Model):
     registro_id = models.AutoField(primary_key=True, unique=True)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
     usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True)
     modulo = models.CharField(max_length=100, default='Planificacion')
     funcionalidad = models.CharField(max_length=100, default='General')
@@ -72,4 +76,50 @@ class RegistroAuditoria(models.Model):
     detalles = models.TextField(null=True, blank=True)
 
     class Meta:
-        db_table = 'registro_auditoria'
\ No newline at end of file
+        db_table = 'registro_auditoria'
+
+
+# Invalidación de la caché de roles/grupos usada por los permisos (ver roles.py)
+def _usuarios_afectados(instance, reverse, pk_set, relacion):
+    if not reverse:
+        return [instance.pk]
+    if pk_set is not None:
+        return list(pk_set)
+    # clear() desde el lado del rol/grupo: se invalidan todos sus usuarios
+    return list(getattr(instance, relacion).values_list('pk', flat=True))
+
+
+@receiver(m2m_changed, sender=Usuario.roles.through)
+def invalidar_permisos_por_roles(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ('post_add', 'post_remove', 'pre_clear', 'post_clear'):
+        invalidar_permisos(_usuarios_afectados(instance, reverse, pk_set, 'usuarios'))
+
+
+@receiver(m2m_changed, sender=Usuario.groups.through)
+def invalidar_permisos_por_grupos(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ('post_add', 'post_remove', 'pre_clear', 'post_clear'):
+        invalidar_permisos(_usuarios_afectados(instance, reverse, pk_set, 'user_set'))
+
+
+@receiver(post_save, sender=Rol)
+@receiver(pre_delete, sender=Rol)
+def invalidar_permisos_por_rol(sender, instance, **kwargs):
+    invalidar_permisos(instance.usuarios.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def invalidar_permisos_por_grupo(sender, instance, **kwargs):
+    invalidar_permisos(instance.user_set.values_list('pk', flat=True))
+
+
+# Invalidación de la caché de tokens (ver autenticacion.py): cierre de sesión, desactivación, cambio de clave
+@receiver(post_delete, sender=Token)
+def invalidar_token_en_cache(sender, instance, **kwargs):
+    cache_tokens.invalidar_token(instance.key, instance.user_id)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidar_tokens_de_usuario(sender, instance, **kwargs):
+    cache_tokens.invalidar_usuario(instance.pk)
@@ -1,5 +1,7 @@
 from rest_framework.permissions import BasePermission, SAFE_METHODS
 
+from .roles import tiene_rol
+
 # --- Permisos Basados en Roles ---
 
 class IsAdmin(BasePermission):
@@ -12,7 +14,7 @@ class IsAdmin(BasePermission):
 
         # Verificamos si el usuario tiene alguno de los roles de administrador
         roles_admin = ["Administrador (Admin)", "Super Administrador"]
-        return request.user.roles.filter(nombre__in=roles_admin).exists()
+        return tiene_rol(request.user, *roles_admin)
 
 class IsAuditor(BasePermission):
     """
@@ -23,7 +25,7 @@ class IsAuditor(BasePermission):
             return False
 
         # El usuario debe tener el rol de Auditor
-        is_auditor = request.user.roles.filter(nombre="Auditor").exists()
+        is_auditor = tiene_rol(request.user, "Auditor")
 
         # Y el método de la petición debe ser seguro (GET, HEAD, OPTIONS)
         return is_auditor and request.method in SAFE_METHODS
@@ -45,7 +47,7 @@ class IsEditor(BasePermission):
             "Usuario Externo (Entidad Pública)",
             "Consultor/Formulador de Proyectos"
         ]
-        return request.user.roles.filter(nombre__in=roles_editor).exists()
+        return tiene_rol(request.user, *roles_editor)
 
 # --- Permiso a Nivel de Objeto ---
 
@@ -60,5 +62,5 @@ class IsOwnerOfPlan(BasePermission):
         # El creador del objeto puede editarlo
         is_owner = obj.creador == request.user
         # Un admin también puede editarlo
-        is_admin = request.user.roles.filter(nombre="Administrador (Admin)").exists()
+        is_admin = tiene_rol(request.user, "Administrador (Admin)")
         return is_owner or is_admin
\ No newline at end of file
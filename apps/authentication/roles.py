@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.core.cache import cache
+
+ATRIBUTO_PETICION = '_permisos_sipeip'
+
+
+def clave_cache(usuario_id):
+    return f'permisos:usuario:{usuario_id}'
+
+
+def permisos_de(usuario):
+    """
+    Nombres de roles y de grupos del usuario: {'roles': frozenset, 'grupos': frozenset}.
+
+    Se cargan una vez por petición (quedan guardados en la instancia de request.user) y, si
+    PERMISOS_CACHE_SEGUNDOS > 0, también en la caché compartida por unos segundos. La caché se
+    invalida al cambiar Usuario.roles, Usuario.groups, o al renombrar/borrar un Rol o Group
+    (ver receptores en authentication/models.py), así que las comprobaciones de permisos
+    compuestos (IsAdmin | IsEditor | IsAuditor) no consultan la base en el camino habitual.
+    """
+    if usuario is None or not usuario.is_authenticated:
+        return {'roles': frozenset(), 'grupos': frozenset()}
+    permisos = getattr(usuario, ATRIBUTO_PETICION, None)
+    if permisos is not None:
+        return permisos
+
+    segundos = getattr(settings, 'PERMISOS_CACHE_SEGUNDOS', 60)
+    permisos = cache.get(clave_cache(usuario.pk)) if segundos else None
+    if permisos is None:
+        permisos = {
+            'roles': frozenset(usuario.roles.values_list('nombre', flat=True)),
+            'grupos': frozenset(usuario.groups.values_list('name', flat=True)),
+        }
+        if segundos:
+            cache.set(clave_cache(usuario.pk), permisos, segundos)
+    setattr(usuario, ATRIBUTO_PETICION, permisos)
+    return permisos
+
+
+def tiene_rol(usuario, *nombres):
+    return not permisos_de(usuario)['roles'].isdisjoint(nombres)
+
+
+def en_grupo(usuario, *nombres):
+    return not permisos_de(usuario)['grupos'].isdisjoint(nombres)
+
+
+def invalidar_permisos(usuario_ids):
+    cache.delete_many([clave_cache(usuario_id) for usuario_id in usuario_ids])
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from .models import Usuario, RegistroAuditoria, Rol
 import re
+from apps.core.serializers import CamposDinamicosMixin
 
 class RolSerializer(serializers.ModelSerializer):
     usuarios_count = serializers.SerializerMethodField()
@@ -54,7 +55,7 @@ class UsuarioSerializer(serializers.ModelSerializer):
             instance.roles.set(roles_data)
         return instance
 
-class RegistroAuditoriaSerializer(serializers.ModelSerializer):
+class RegistroAuditoriaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = RegistroAuditoria
         fields = '__all__'
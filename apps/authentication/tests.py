@@ -1,5 +1,14 @@
-from django.test import TestCase
-from apps.authentication.models import RegistroAuditoria, Usuario
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.test import TestCase, RequestFactory
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+from apps.authentication.autenticacion import cache_tokens, AutenticacionTokenCache, CacheTokens
+from apps.authentication.models import RegistroAuditoria, Usuario, Rol
+from apps.authentication.permissions import IsAdmin, IsEditor, IsAuditor
+from apps.tracking.permissions import IsAuditorOrPlanning
 
 
 class AuditoriaTests(TestCase):
@@ -19,3 +28,96 @@ class AuditoriaTests(TestCase):
         self.assertEqual(registro.usuario, self.usuario)
         self.assertEqual(registro.funcionalidad, "Gestión de Usuarios")
         self.assertEqual(registro.accion, "Crear")
+
+
+class CachePermisosTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.usuario = Usuario.objects.create_user(nombre_usuario="auditor", password="testpassword")
+        self.auditor = Rol.objects.create(nombre="Auditor")
+        self.admin = Rol.objects.create(nombre="Administrador (Admin)")
+        self.usuario.roles.add(self.auditor)
+        self.grupo = Group.objects.create(name="Auditoría")
+        self.permiso = (IsAdmin | IsEditor | IsAuditor)()
+
+    def peticion(self, usuario=None):
+        request = RequestFactory().get('/')
+        # Cada petición autenticada trae una instancia nueva del usuario
+        request.user = usuario or Usuario.objects.get(pk=self.usuario.pk)
+        return request
+
+    def test_permisos_compuestos_consultan_una_sola_vez(self):
+        cache.clear()
+        request = self.peticion()
+        with self.assertNumQueries(2):
+            self.assertTrue(self.permiso.has_permission(request, None))
+            self.assertFalse(IsAuditorOrPlanning().has_permission(request, None))
+        # La siguiente petición usa la caché compartida
+        request = self.peticion()
+        with self.assertNumQueries(0):
+            self.assertTrue(self.permiso.has_permission(request, None))
+
+    def test_cambios_de_roles_invalidan_la_cache(self):
+        self.assertFalse(IsAdmin().has_permission(self.peticion(), None))
+        self.usuario.roles.add(self.admin)
+        self.assertTrue(IsAdmin().has_permission(self.peticion(), None))
+        self.admin.usuarios.remove(self.usuario)
+        self.assertFalse(IsAdmin().has_permission(self.peticion(), None))
+        self.usuario.roles.clear()
+        self.assertFalse(self.permiso.has_permission(self.peticion(), None))
+
+    def test_cambios_de_grupos_invalidan_la_cache(self):
+        self.assertFalse(IsAuditorOrPlanning().has_permission(self.peticion(), None))
+        self.grupo.user_set.add(self.usuario)
+        self.assertTrue(IsAuditorOrPlanning().has_permission(self.peticion(), None))
+        self.grupo.name = "Otro"
+        self.grupo.save()
+        self.assertFalse(IsAuditorOrPlanning().has_permission(self.peticion(), None))
+
+
+class AutenticacionTokenCacheTests(APITestCase):
+    def setUp(self):
+        cache_tokens.limpiar()
+        self.usuario = Usuario.objects.create_user(nombre_usuario="sesion", password="Clave123!")
+        self.token = Token.objects.get(user=self.usuario)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.url = reverse('rol-list')
+
+    def autenticar(self):
+        request = RequestFactory().get('/', HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        return AutenticacionTokenCache().authenticate(request)[0]
+
+    def test_token_en_cache_solo_escribe_el_ultimo_acceso(self):
+        self.autenticar()
+        # En pruebas el último acceso se escribe de inmediato: es la única consulta
+        with self.assertNumQueries(1):
+            usuario = self.autenticar()
+        self.assertEqual(usuario, self.usuario)
+        self.assertIsNotNone(Usuario.objects.get(pk=self.usuario.pk).ultimo_acceso)
+
+    def test_cada_peticion_recibe_su_propia_copia_del_usuario(self):
+        primero = self.autenticar()
+        primero.marca = True
+        self.assertFalse(hasattr(self.autenticar(), 'marca'))
+
+    def test_logout_invalida_el_token(self):
+        self.client.get(self.url)
+        response = self.client.post(reverse('logout'))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertIsNone(cache_tokens.obtener(self.token.key))
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_desactivar_usuario_invalida_el_token(self):
+        self.client.get(self.url)
+        self.usuario.is_active = False
+        self.usuario.save()
+        self.assertIsNone(cache_tokens.obtener(self.token.key))
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_la_revocacion_llega_a_la_cache_de_otros_procesos(self):
+        otro_proceso = CacheTokens()
+        otro_proceso.guardar(self.token.key, self.usuario, self.token)
+        self.assertIsNotNone(otro_proceso.obtener(self.token.key))
+        self.usuario.set_password("Otra123!")
+        self.usuario.save()
+        self.assertIsNone(otro_proceso.obtener(self.token.key))
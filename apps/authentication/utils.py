@@ -1,7 +1,9 @@
 from apps.authentication.models import RegistroAuditoria
+from apps.audit.pipeline import registrar_auditoria
 
 def registrar_evento(usuario, funcionalidad, accion, detalles=None, modulo='Autenticacion', entidad_tipo=None, entidad_id=None):
-    RegistroAuditoria.objects.create(
+    registrar_auditoria(
+        RegistroAuditoria,
         usuario=usuario,
         funcionalidad=funcionalidad,
         accion=accion,
@@ -12,8 +12,11 @@ from datetime import timedelta
 from . import serializers
 from .models import Usuario, RegistroAuditoria, Rol
 from .serializers import UsuarioSerializer, RegistroAuditoriaSerializer, RolSerializer
+from apps.audit.pipeline import registrar_auditoria
+from .autenticacion import registro_accesos
+from apps.core.metricas import MedicionSerializacionMixin
 
-class RolViewSet(viewsets.ModelViewSet):
+class RolViewSet(MedicionSerializacionMixin, viewsets.ModelViewSet):
     """
     API endpoint para gestionar Roles.
     """
@@ -21,7 +24,7 @@ class RolViewSet(viewsets.ModelViewSet):
     serializer_class = RolSerializer
     permission_classes = [AllowAny] # Cambiar a [IsAuthenticated, IsAdminUser] en producción
 
-class UsuarioViewSet(viewsets.ModelViewSet):
+class UsuarioViewSet(MedicionSerializacionMixin, viewsets.ModelViewSet):
     """
     API endpoint para la gestión completa de Usuarios.
     """
@@ -36,7 +39,7 @@ class UsuarioViewSet(viewsets.ModelViewSet):
             return Response({"mensaje": "El usuario ya está desactivado."}, status=status.HTTP_400_BAD_REQUEST)
         usuario.is_active = False
         usuario.save()
-        RegistroAuditoria.objects.create(usuario=usuario, accion='Desactivación', funcionalidad='Gestión de Usuarios')
+        registrar_auditoria(RegistroAuditoria, usuario=usuario, accion='Desactivación', funcionalidad='Gestión de Usuarios')
         return Response({"mensaje": "Usuario desactivado correctamente."}, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['patch'], url_path='activar')
@@ -46,7 +49,7 @@ class UsuarioViewSet(viewsets.ModelViewSet):
             return Response({"mensaje": "El usuario ya está activo."}, status=status.HTTP_400_BAD_REQUEST)
         usuario.is_active = True
         usuario.save()
-        RegistroAuditoria.objects.create(usuario=usuario, accion='Activación', funcionalidad='Gestión de Usuarios')
+        registrar_auditoria(RegistroAuditoria, usuario=usuario, accion='Activación', funcionalidad='Gestión de Usuarios')
         return Response({"mensaje": "Usuario activado correctamente."}, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['get'], url_path='ultimo-acceso')
@@ -55,12 +58,13 @@ class UsuarioViewSet(viewsets.ModelViewSet):
         return Response({"nombre_usuario": usuario.nombre_usuario, "ultimo_acceso": usuario.ultimo_acceso})
     def perform_create(self, serializer):
         usuario = serializer.save()
-        RegistroAuditoria.objects.create(usuario=usuario, accion='Crear', funcionalidad='Gestión de Usuarios', entidad_afectada_id=usuario.id)
+        registrar_auditoria(RegistroAuditoria, usuario=usuario, accion='Crear', funcionalidad='Gestión de Usuarios', entidad_afectada_id=usuario.id)
     def perform_update(self, serializer):
         usuario = serializer.save()
-        RegistroAuditoria.objects.create(usuario=usuario, accion='Actualizar', funcionalidad='Gestión de Usuarios', entidad_afectada_id=usuario.id)
+        registrar_auditoria(RegistroAuditoria, usuario=usuario, accion='Actualizar', funcionalidad='Gestión de Usuarios', entidad_afectada_id=usuario.id)
     def perform_destroy(self, instance):
-        RegistroAuditoria.objects.create(usuario=instance, accion='Eliminar', funcionalidad='Gestión de Usuarios', entidad_afectada_id=instance.id)
+        # Síncrono: el usuario se elimina a continuación y el registro debe existir antes (SET_NULL)
+        registrar_auditoria(RegistroAuditoria, sincrono=True, usuario=instance, accion='Eliminar', funcionalidad='Gestión de Usuarios', entidad_afectada_id=instance.id)
         super().perform_destroy(instance)
 
 class LoginView(APIView):
@@ -92,9 +96,11 @@ class LoginView(APIView):
         user_authenticated = authenticate(request, username=username, password=password) # Usar 'username' y 'password' para authenticate
 
         if user_authenticated:
-            usuario.intentos_fallidos = 0
-            usuario.ultimo_acceso = timezone.now()
-            usuario.save()
+            if usuario.intentos_fallidos:
+                usuario.intentos_fallidos = 0
+                usuario.save(update_fields=['intentos_fallidos'])
+            # El último acceso se escribe en lote junto con el de las demás peticiones
+            registro_accesos.registrar(usuario.pk)
             token, _ = Token.objects.get_or_create(user=usuario)
             return Response({
                 "mensaje": "Inicio de sesión exitoso",
@@ -139,15 +145,16 @@ class CambioClaveView(APIView):
 
         usuario.set_password(nueva_clave)
         usuario.save()
-        RegistroAuditoria.objects.create(usuario=usuario, accion='Cambio de Clave', funcionalidad='Seguridad')
+        registrar_auditoria(RegistroAuditoria, usuario=usuario, accion='Cambio de Clave', funcionalidad='Seguridad')
         return Response({"mensaje": "Contraseña actualizada con éxito."}, status=status.HTTP_200_OK)
 
-class RegistroAuditoriaViewSet(viewsets.ReadOnlyModelViewSet):
+class RegistroAuditoriaViewSet(MedicionSerializacionMixin, viewsets.ReadOnlyModelViewSet):
     """
     Endpoint de solo lectura para consultar los registros de auditoría.
     """
     queryset = RegistroAuditoria.objects.all().order_by('-timestamp')
     serializer_class = RegistroAuditoriaSerializer
+    cursor_ordering = '-timestamp'
     permission_classes = [IsAuthenticated] # Proteger en producción
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
     filterset_fields = ['usuario__nombre_usuario', 'accion', 'modulo']
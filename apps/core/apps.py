@@ -1,6 +1,31 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_migrate, post_save
 
 
 class AppsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'apps'
+    name = 'apps.core'
+
+    def ready(self):
+        from django.apps import apps
+        from django.contrib.contenttypes.models import ContentType
+        from apps.core.busqueda import indice_busqueda
+        from apps.core.referencia import datos_referencia
+        from apps.core.tipos_contenido import tipos_contenido
+
+        # El registro de tipos de contenido se vuelve a cargar si cambia la tabla
+        post_migrate.connect(tipos_contenido.invalidar, dispatch_uid='tipos-contenido-migrate')
+        post_save.connect(tipos_contenido.invalidar, sender=ContentType, dispatch_uid='tipos-contenido-save')
+        post_delete.connect(tipos_contenido.invalidar, sender=ContentType, dispatch_uid='tipos-contenido-delete')
+
+        # Cada escritura sobre un modelo de referencia sube la versión de sus conjuntos
+        for etiqueta in datos_referencia.modelos():
+            modelo = apps.get_model(etiqueta)
+            post_save.connect(datos_referencia.al_escribir, sender=modelo, dispatch_uid=f'referencia-save-{etiqueta}')
+            post_delete.connect(datos_referencia.al_escribir, sender=modelo, dispatch_uid=f'referencia-delete-{etiqueta}')
+
+        # El índice de búsqueda se actualiza registro por registro
+        for tipo in indice_busqueda.tipos():
+            modelo = indice_busqueda.modelo(tipo)
+            post_save.connect(indice_busqueda.al_guardar, sender=modelo, dispatch_uid=f'busqueda-save-{tipo}')
+            post_delete.connect(indice_busqueda.al_borrar, sender=modelo, dispatch_uid=f'busqueda-delete-{tipo}')
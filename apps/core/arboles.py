@@ -0,0 +1,167 @@
+"""
+Jerarquías padre/hijos.
+
+- Armado en memoria: los nodos se cargan con una consulta y el JSON anidado se construye con un
+  mapa id -> hijos, sin recursión (la profundidad no importa).
+- Ruta materializada: cada nodo guarda en `ruta` los ids de sus ancestros y el suyo ('3/17/42/'),
+  así que subárboles y ancestros se leen con una consulta por rango sobre una columna indexada.
+"""
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Substr
+
+
+def hijos_por_padre(nodos, campo_padre='padre_id'):
+    """{id del padre: [hijos en el orden recibido]}."""
+    hijos_de = {}
+    for nodo in nodos:
+        hijos_de.setdefault(getattr(nodo, campo_padre), []).append(nodo)
+    return hijos_de
+
+
+def construir_arbol(raices, hijos_de, representar, campo_hijos='hijos'):
+    """
+    Lista con la representación de cada raíz y, en `campo_hijos`, la de sus descendientes.
+    `representar(nodo)` devuelve el dict de un nodo sin sus hijos. Un ciclo en los datos
+    (un nodo que es su propio ancestro) se corta en la segunda visita.
+    """
+    resultado = []
+    pila = [(raiz, resultado, frozenset()) for raiz in reversed(raices)]
+    while pila:
+        nodo, destino, ancestros = pila.pop()
+        if nodo.pk in ancestros:
+            continue
+        datos = representar(nodo)
+        datos[campo_hijos] = []
+        destino.append(datos)
+        ancestros = ancestros | {nodo.pk}
+        for hijo in reversed(hijos_de.get(nodo.pk, [])):
+            pila.append((hijo, datos[campo_hijos], ancestros))
+    return resultado
+
+
+def ids_de_ruta(ruta):
+    """'3/17/42/' -> [3, 17, 42]."""
+    return [int(segmento) for segmento in ruta.split('/') if segmento]
+
+
+def nivel_de(ruta):
+    """0 para las raíces."""
+    return max(ruta.count('/') - 1, 0)
+
+
+def fin_de_rango(ruta):
+    """
+    Límite superior (excluido) de las rutas que empiezan con `ruta`: '/' es el carácter anterior
+    a '0', así que '3/17/' <= ruta de un descendiente < '3/170'.
+    """
+    return ruta[:-1] + '0'
+
+
+def calcular_rutas(filas, conocidas=None):
+    """
+    {id: ruta} a partir de pares (id, padre_id). `conocidas` da la ruta de padres que no están en
+    `filas`. Los nodos que no cuelgan de una raíz ni de un padre conocido (p. ej. los que forman un
+    ciclo) quedan fuera del resultado.
+    """
+    conocidas = conocidas or {}
+    ids = {pk for pk, _ in filas}
+    hijos_de = {}
+    for pk, padre_id in filas:
+        hijos_de.setdefault(padre_id, []).append(pk)
+    pila = [(pk, '') for pk, padre_id in filas if padre_id is None]
+    pila += [(pk, conocidas[padre_id]) for pk, padre_id in filas
+             if padre_id is not None and padre_id not in ids and padre_id in conocidas]
+    rutas = {}
+    while pila:
+        pk, base = pila.pop()
+        rutas[pk] = f'{base}{pk}/'
+        pila.extend((hijo, rutas[pk]) for hijo in hijos_de.get(pk, []))
+    return rutas
+
+
+class RutaMaterializadaManager(models.Manager):
+    """
+    Manager para modelos con una FK `padre` a sí mismos y los campos `ruta` y `nivel`.
+
+    save() del modelo guarda con argumentos_guardado() (un UPDATE no escribe ruta ni nivel, que
+    en memoria pueden estar viejos si se movió un ancestro) y luego llama a actualizar_ruta();
+    bulk_create/bulk_update no lo hacen, así que
+    después de usarlos hay que llamar a reconstruir_rutas() (o al comando reconstruir_rutas).
+    Los métodos que reciben un nodo aceptan la instancia o su id (con un id se lee su ruta antes).
+    """
+
+    def _ruta(self, nodo):
+        if isinstance(nodo, models.Model):
+            return nodo.ruta
+        return self.filter(pk=nodo).values_list('ruta', flat=True).first() or ''
+
+    def descendants(self, nodo, incluir_propio=False):
+        """Subárbol de `nodo` (sin él, salvo incluir_propio) en una consulta por rango."""
+        ruta = self._ruta(nodo)
+        if not ruta:
+            return self.none()
+        return self.filter(**{'ruta__gte' if incluir_propio else 'ruta__gt': ruta, 'ruta__lt': fin_de_rango(ruta)})
+
+    def ancestors(self, nodo, incluir_propio=False):
+        """Ancestros de `nodo` desde la raíz, leídos por clave primaria."""
+        ids = ids_de_ruta(self._ruta(nodo))
+        if not incluir_propio:
+            ids = ids[:-1]
+        return self.filter(pk__in=ids).order_by('nivel')
+
+    def subtree_ids(self, nodo):
+        """Ids de `nodo` y de todos sus descendientes."""
+        return list(self.descendants(nodo, incluir_propio=True).values_list('pk', flat=True))
+
+    def argumentos_guardado(self, nodo, kwargs):
+        """kwargs de save() sin ruta ni nivel en update_fields cuando el nodo ya existe."""
+        if nodo._state.adding or kwargs.get('force_insert'):
+            return kwargs
+        campos = kwargs.get('update_fields')
+        if campos is None:
+            campos = [campo.name for campo in nodo._meta.concrete_fields if not campo.primary_key]
+        return {**kwargs, 'update_fields': [campo for campo in campos if campo not in ('ruta', 'nivel')]}
+
+    def actualizar_ruta(self, nodo):
+        """
+        Recalcula ruta y nivel de `nodo` ya guardado a partir de la ruta guardada (no de la que
+        tiene en memoria). Si se movió, reescribe las rutas de todo su subárbol con un solo UPDATE.
+        """
+        anterior = self.filter(pk=nodo.pk).values_list('ruta', flat=True).get()
+        ids = ids_de_ruta(anterior)
+        if ids[-1:] == [nodo.pk] and ids[-2:-1] == ([nodo.padre_id] if nodo.padre_id else []):
+            nodo.ruta, nodo.nivel = anterior, nivel_de(anterior)
+            return
+        ruta_padre = ''
+        if nodo.padre_id is not None:
+            ruta_padre = self.filter(pk=nodo.padre_id).values_list('ruta', flat=True).get()
+        if anterior and ruta_padre.startswith(anterior):
+            raise ValidationError('Un nodo no puede quedar debajo de sí mismo ni de uno de sus descendientes.')
+        nueva = f'{ruta_padre}{nodo.pk}/'
+        self.filter(pk=nodo.pk).update(ruta=nueva, nivel=nivel_de(nueva))
+        if anterior and anterior != nueva:
+            self.filter(ruta__gt=anterior, ruta__lt=fin_de_rango(anterior)).update(
+                ruta=Concat(Value(nueva), Substr('ruta', len(anterior) + 1), output_field=models.CharField()),
+                nivel=F('nivel') + (nivel_de(nueva) - nivel_de(anterior)),
+            )
+        nodo.ruta, nodo.nivel = nueva, nivel_de(nueva)
+
+    def reconstruir_rutas(self, **filtros):
+        """
+        Recalcula las rutas de los nodos que cumplen `filtros` (todos si no se dan); los filtros
+        deben abarcar subárboles completos (p. ej. una entidad o un catálogo).
+        Devuelve (nodos actualizados, nodos sin ruta por formar un ciclo).
+        """
+        nodos = list(self.filter(**filtros).values_list('pk', 'padre_id', 'ruta'))
+        ids = {pk for pk, _, _ in nodos}
+        externos = {padre_id for _, padre_id, _ in nodos if padre_id is not None and padre_id not in ids}
+        conocidas = dict(self.filter(pk__in=externos).values_list('pk', 'ruta')) if externos else {}
+        rutas = calcular_rutas([(pk, padre_id) for pk, padre_id, _ in nodos], conocidas)
+        cambiados = [
+            self.model(pk=pk, ruta=rutas[pk], nivel=nivel_de(rutas[pk]))
+            for pk, _, ruta in nodos if pk in rutas and rutas[pk] != ruta
+        ]
+        self.bulk_update(cambiados, ['ruta', 'nivel'], batch_size=500)
+        return len(cambiados), len(nodos) - len(rutas)
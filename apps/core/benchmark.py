@@ -0,0 +1,141 @@
+"""
+Escenarios de benchmark de la API y utilidades para medirlos y comparar corridas.
+Los usa el comando benchmark_api; los datos se generan con generar_datos_sinteticos.
+"""
+import datetime
+import math
+import statistics
+import time
+
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from apps.audit.models import AuditEvent
+from apps.authentication.models import Usuario
+from apps.investment_projects.models import ProyectoInversion
+from apps.core.tipos_contenido import tipos_contenido
+
+USUARIO_BENCHMARK = 'benchmark'
+
+
+def _evento_reciente(contexto):
+    return {'content_type': contexto['ct_proyecto'], 'object_id': contexto['proyecto']}
+
+
+# nombre -> función(contexto) que devuelve (url, parámetros)
+ESCENARIOS = {
+    'proyectos-lista': lambda c: (reverse('proyecto-list'), {'page_size': 50}),
+    'proyectos-lista-simplificada': lambda c: (reverse('proyecto-list-simplified'), {}),
+    'proyecto-detalle': lambda c: (reverse('proyecto-detail', args=[c['proyecto']]), {}),
+    'marcos-logicos-lista': lambda c: (reverse('marcoslogicos-list'), {'page_size': 50}),
+    'alineaciones-lista': lambda c: (reverse('alineacion-list'), {'page_size': 50}),
+    'dashboard': lambda c: (reverse('dashboard-stats'), {}),
+    'reporte-actividades-json': lambda c: (reverse('report-tracking-activities'), {'format': 'json'}),
+    'reporte-actividades-csv': lambda c: (reverse('report-tracking-activities'), {'format': 'csv'}),
+    'auditoria-eventos': lambda c: (reverse('auditevent-list'), {'page_size': 100}),
+    'auditoria-eventos-objeto': lambda c: (reverse('auditevent-list'), _evento_reciente(c)),
+    'catalogos-arbol': lambda c: (reverse('catalogo-list'), {}),
+    'unidades-organizacionales-arbol': lambda c: (reverse('unidadorganizacional-list'), {}),
+}
+
+
+def percentil(valores, porcentaje):
+    """Percentil por rango más cercano sobre una lista ya ordenada."""
+    if not valores:
+        return None
+    indice = max(math.ceil(porcentaje / 100 * len(valores)) - 1, 0)
+    return valores[indice]
+
+
+def preparar_contexto():
+    """Usuario con token para las peticiones e identificadores que usan los escenarios."""
+    usuario, creado = Usuario.objects.get_or_create(nombre_usuario=USUARIO_BENCHMARK, defaults={'is_staff': True})
+    if creado:
+        usuario.set_unusable_password()
+        usuario.save()
+    token, _ = Token.objects.get_or_create(user=usuario)
+    proyecto = ProyectoInversion.objects.order_by('-pk').values_list('pk', flat=True).first()
+    if proyecto is None:
+        raise ValueError('No hay proyectos: ejecute primero generar_datos_sinteticos.')
+    return {
+        'token': token.key,
+        'proyecto': proyecto,
+        'ct_proyecto': tipos_contenido.id_de(ProyectoInversion),
+    }
+
+
+def medir_escenario(cliente, url, parametros, iteraciones, calentamiento):
+    tiempos, consultas, bytes_respuesta, errores = [], [], 0, []
+    for vuelta in range(calentamiento + iteraciones):
+        with CaptureQueriesContext(connection) as capturadas:
+            inicio = time.perf_counter()
+            response = cliente.get(url, parametros)
+            contenido = b''.join(response.streaming_content) if response.streaming else response.content
+            transcurrido = (time.perf_counter() - inicio) * 1000
+        if response.status_code != 200:
+            errores.append(response.status_code)
+        if vuelta < calentamiento:
+            continue
+        tiempos.append(transcurrido)
+        consultas.append(len(capturadas))
+        bytes_respuesta = len(contenido)
+    tiempos.sort()
+    return {
+        'url': url,
+        'parametros': parametros,
+        'iteraciones': iteraciones,
+        'p50_ms': round(percentil(tiempos, 50), 2),
+        'p90_ms': round(percentil(tiempos, 90), 2),
+        'p95_ms': round(percentil(tiempos, 95), 2),
+        'p99_ms': round(percentil(tiempos, 99), 2),
+        'max_ms': round(tiempos[-1], 2),
+        'promedio_ms': round(statistics.fmean(tiempos), 2),
+        'consultas': max(consultas),
+        'bytes': bytes_respuesta,
+        'errores': sorted(set(errores)),
+    }
+
+
+def ejecutar(escenarios=None, iteraciones=20, calentamiento=2):
+    contexto = preparar_contexto()
+    cliente = Client(SERVER_NAME='localhost', HTTP_AUTHORIZATION=f"Token {contexto['token']}")
+    resultados = {}
+    for nombre in escenarios or ESCENARIOS:
+        url, parametros = ESCENARIOS[nombre](contexto)
+        resultados[nombre] = medir_escenario(cliente, url, parametros, iteraciones, calentamiento)
+    return {
+        'fecha': datetime.datetime.now().isoformat(timespec='seconds'),
+        'motor_bd': connection.vendor,
+        'volumen': {
+            'proyectos': ProyectoInversion.objects.count(),
+            'eventos_auditoria': AuditEvent.objects.count(),
+        },
+        'escenarios': resultados,
+    }
+
+
+def comparar(base, actual, tolerancia=0.2):
+    """
+    Compara dos corridas escenario por escenario. Es regresión que el p95 crezca más que la
+    tolerancia (fracción) o que aumente el número de consultas.
+    Devuelve una lista de dicts con los valores de ambas corridas y la marca 'regresion'.
+    """
+    filas = []
+    for nombre, medicion in actual['escenarios'].items():
+        anterior = base['escenarios'].get(nombre)
+        if anterior is None:
+            continue
+        variacion = (medicion['p95_ms'] - anterior['p95_ms']) / anterior['p95_ms'] if anterior['p95_ms'] else 0
+        filas.append({
+            'escenario': nombre,
+            'p95_base': anterior['p95_ms'],
+            'p95_actual': medicion['p95_ms'],
+            'variacion': round(variacion, 3),
+            'consultas_base': anterior['consultas'],
+            'consultas_actual': medicion['consultas'],
+            'regresion': variacion > tolerancia or medicion['consultas'] > anterior['consultas'],
+        })
+    return filas
@@ -0,0 +1,245 @@
+"""
+Búsqueda de texto sobre proyectos, planes, objetivos y metas/indicadores PND y ODS.
+
+El índice invertido vive en dos tablas (DocumentoBusqueda y TerminoDocumento), así que funciona
+igual en MySQL y en SQLite y lo comparten todos los workers. Se actualiza al guardar o borrar
+cada registro (ver AppsConfig.ready); las cargas con bulk_create se reindexan con reindexar()
+o con el comando reconstruir_indice_busqueda.
+
+Los textos se normalizan para español: minúsculas, sin tildes, sin palabras vacías y con una
+reducción simple de plurales. El puntaje es BM25 calculado en la base.
+"""
+import hashlib
+import re
+import unicodedata
+from collections import Counter, namedtuple
+from math import log
+
+from django.apps import apps
+from django.db import IntegrityError, transaction
+from django.db.models import Avg, Case, Count, F, FloatField, Q, Sum, Value, When
+
+from .masivo import crear_en_lote
+from .models import DocumentoBusqueda, TerminoDocumento
+
+# Parámetros de BM25
+K1 = 1.2
+B = 0.75
+# Términos distintos que puede expandir la última palabra de la consulta (búsqueda por prefijo)
+MAXIMO_EXPANSION = 50
+
+PALABRAS_VACIAS = frozenset('''
+    a al algo ante antes como con contra cual cuando de del desde donde durante e el ella ellas ellos
+    en entre era es esa ese eso esta este esto estos estas fue ha hacia han hasta la las le les lo los
+    mas me mi muy ni no nos o otra otro para pero poco por porque que se segun ser si sin sobre su sus
+    tambien tiene todo todos tras u un una uno unos unas y ya
+'''.split())
+
+_SEPARADOR = re.compile(r'[^0-9a-z]+')
+
+
+def normalizar(texto):
+    """Minúsculas y sin tildes ni diéresis ('Educación' -> 'educacion')."""
+    descompuesto = unicodedata.normalize('NFKD', texto.lower())
+    return ''.join(caracter for caracter in descompuesto if not unicodedata.combining(caracter))
+
+
+def raiz(palabra):
+    """Reducción de plurales: 'indicadores' e 'indicador' dan 'indicador'; 'metas' y 'meta', 'meta'."""
+    if len(palabra) > 3 and palabra.endswith('s'):
+        palabra = palabra[:-1]
+    if len(palabra) > 3 and palabra.endswith('e') and palabra[-2] not in 'aeiou':
+        palabra = palabra[:-1]
+    return palabra
+
+
+def tokenizar(texto):
+    """Términos de un texto, en orden y con repeticiones."""
+    return [
+        raiz(palabra)[:64] for palabra in _SEPARADOR.split(normalizar(texto or ''))
+        if len(palabra) > 1 and palabra not in PALABRAS_VACIAS
+    ]
+
+
+TipoIndexado = namedtuple('TipoIndexado', ['modelo', 'campos', 'titulo'])
+
+# tipo -> modelo, campos cuyo texto se indexa (el último se muestra como resumen) y título de los resultados
+TIPOS = {
+    'proyecto': TipoIndexado('investment_projects.ProyectoInversion', ('nombre', 'cup'),
+                             lambda objeto: objeto.nombre),
+    'plan_institucional': TipoIndexado('strategic_objectives.PlanInstitucional', ('nombre',),
+                                       lambda objeto: objeto.nombre or f'Plan {objeto.pk}'),
+    'oei': TipoIndexado('strategic_objectives.ObjetivoEstrategicoInstitucional', ('codigo', 'descripcion'),
+                        lambda objeto: f'OEI {objeto.codigo}'),
+    'objetivo_pnd': TipoIndexado('strategic_objectives.ObjetivoPND', ('codigo', 'descripcion'),
+                                 lambda objeto: f'Objetivo PND {objeto.codigo}'),
+    'meta_pnd': TipoIndexado('strategic_objectives.MetaPND', ('codigo', 'descripcion'),
+                             lambda objeto: f'Meta PND {objeto.codigo}'),
+    'indicador_pnd': TipoIndexado('strategic_objectives.IndicadorPND', ('codigo', 'descripcion'),
+                                  lambda objeto: f'Indicador PND {objeto.codigo}'),
+    'meta_ods': TipoIndexado('strategic_objectives.MetaODS', ('codigo', 'descripcion'),
+                             lambda objeto: f'Meta ODS {objeto.codigo}'),
+    'indicador_ods': TipoIndexado('strategic_objectives.IndicadorODS', ('codigo', 'descripcion'),
+                                  lambda objeto: f'Indicador ODS {objeto.codigo}'),
+}
+
+
+class IndiceBusqueda:
+    """Mantenimiento del índice y consultas puntuadas."""
+
+    def tipos(self):
+        return list(TIPOS)
+
+    def modelo(self, tipo):
+        return apps.get_model(TIPOS[tipo].modelo)
+
+    def tipo_de(self, modelo):
+        etiqueta = modelo._meta.label
+        return next((tipo for tipo, definicion in TIPOS.items() if definicion.modelo == etiqueta), None)
+
+    def _documento(self, tipo, objeto):
+        """(DocumentoBusqueda sin guardar, Counter de términos)."""
+        definicion = TIPOS[tipo]
+        texto = ' '.join(str(getattr(objeto, campo) or '') for campo in definicion.campos)
+        terminos = Counter(tokenizar(texto))
+        documento = DocumentoBusqueda(
+            tipo=tipo, objeto_id=objeto.pk, titulo=definicion.titulo(objeto)[:255],
+            resumen=str(getattr(objeto, definicion.campos[-1]) or '')[:300], longitud=sum(terminos.values()),
+            huella=hashlib.sha1(f'{definicion.titulo(objeto)}\x00{texto}'.encode('utf-8')).hexdigest(),
+        )
+        return documento, terminos
+
+    def indexar(self, objeto):
+        """Actualiza el documento de un registro; si su texto no cambió solo cuesta una lectura."""
+        tipo = self.tipo_de(type(objeto))
+        nuevo, terminos = self._documento(tipo, objeto)
+        actual = DocumentoBusqueda.objects.filter(tipo=tipo, objeto_id=objeto.pk).only('huella').first()
+        if actual is not None and actual.huella == nuevo.huella:
+            return
+        try:
+            with transaction.atomic():
+                self._escribir(nuevo, terminos)
+        except IntegrityError:
+            # Otro proceso dio de alta el mismo documento entre la lectura y la escritura
+            with transaction.atomic():
+                self._escribir(nuevo, terminos)
+
+    def _escribir(self, nuevo, terminos):
+        actual = DocumentoBusqueda.objects.select_for_update().filter(
+            tipo=nuevo.tipo, objeto_id=nuevo.objeto_id
+        ).only('pk').first()
+        if actual is not None:
+            nuevo.pk = actual.pk
+            TerminoDocumento.objects.filter(documento=actual).delete()
+        nuevo.save(force_update=actual is not None)
+        TerminoDocumento.objects.bulk_create([
+            TerminoDocumento(termino=termino, documento=nuevo, frecuencia=frecuencia)
+            for termino, frecuencia in terminos.items()
+        ])
+
+    def al_guardar(self, sender, instance, update_fields=None, **kwargs):
+        """Receptor de post_save de los modelos indexados (ver AppsConfig.ready)."""
+        campos = TIPOS[self.tipo_de(sender)].campos
+        if update_fields is not None and not set(update_fields) & set(campos):
+            return
+        self.indexar(instance)
+
+    def al_borrar(self, sender, instance, **kwargs):
+        DocumentoBusqueda.objects.filter(tipo=self.tipo_de(sender), objeto_id=instance.pk).delete()
+
+    def reindexar(self, *tipos):
+        """
+        Sincroniza el índice de los tipos dados (todos si no se indican) con sus tablas: agrega,
+        actualiza o borra solo los documentos cuyo texto cambió. Devuelve {tipo: documentos escritos}.
+        """
+        resultado = {}
+        for tipo in tipos or TIPOS:
+            existentes = {
+                objeto_id: (pk, huella) for pk, objeto_id, huella in
+                DocumentoBusqueda.objects.filter(tipo=tipo).values_list('pk', 'objeto_id', 'huella')
+            }
+            nuevos, modificados, terminos_por_documento, vistos = [], [], [], set()
+            for objeto in self.modelo(tipo).objects.only(*TIPOS[tipo].campos).iterator(chunk_size=2000):
+                vistos.add(objeto.pk)
+                documento, terminos = self._documento(tipo, objeto)
+                pk, huella = existentes.get(objeto.pk, (None, None))
+                if huella == documento.huella:
+                    continue
+                documento.pk = pk
+                (modificados if pk else nuevos).append(documento)
+                terminos_por_documento.append((documento, terminos))
+            with transaction.atomic():
+                sobrantes = [pk for objeto_id, (pk, _) in existentes.items() if objeto_id not in vistos]
+                DocumentoBusqueda.objects.filter(pk__in=sobrantes).delete()
+                TerminoDocumento.objects.filter(documento__in=[documento.pk for documento in modificados]).delete()
+                DocumentoBusqueda.objects.bulk_update(
+                    modificados, ['titulo', 'resumen', 'longitud', 'huella'], batch_size=500
+                )
+                crear_en_lote(DocumentoBusqueda, nuevos, 500, clave=('tipo', 'objeto_id'))
+                TerminoDocumento.objects.bulk_create([
+                    TerminoDocumento(termino=termino, documento_id=documento.pk, frecuencia=frecuencia)
+                    for documento, terminos in terminos_por_documento for termino, frecuencia in terminos.items()
+                ], batch_size=2000)
+            resultado[tipo] = len(terminos_por_documento)
+        return resultado
+
+    def terminos_consulta(self, consulta):
+        """
+        {término: documentos que lo contienen}. La última palabra también se busca como prefijo:
+        los términos de la consulta se conservan siempre y de las expansiones se toman las
+        MAXIMO_EXPANSION más raras (las más frecuentes apenas cambian el puntaje).
+        """
+        terminos = set(tokenizar(consulta))
+        if not terminos:
+            return {}
+        condicion = Q(termino__in=terminos)
+        prefijo = normalizar(consulta).strip().split(' ')[-1]
+        if len(prefijo) >= 3 and prefijo.isalnum() and prefijo not in PALABRAS_VACIAS:
+            # Rango sobre el índice de termino en vez de LIKE: 'salu' <= termino < 'salv'
+            condicion |= Q(termino__gte=prefijo, termino__lt=prefijo[:-1] + chr(ord(prefijo[-1]) + 1))
+        exacto = Case(When(termino__in=terminos, then=Value(0)), default=Value(1))
+        filas = TerminoDocumento.objects.filter(condicion).values('termino') \
+            .annotate(documentos=Count('documento_id'), exacto=exacto) \
+            .order_by('exacto', 'documentos', 'termino')[:len(terminos) + MAXIMO_EXPANSION]
+        return {fila['termino']: fila['documentos'] for fila in filas}
+
+    def buscar(self, consulta, tipos=None):
+        """
+        QuerySet de {'documento_id', 'puntaje'} ordenado por puntaje BM25 descendente; se pagina
+        como cualquier QuerySet y los documentos de la página se leen con documentos().
+        """
+        frecuencias = self.terminos_consulta(consulta)
+        if not frecuencias:
+            return TerminoDocumento.objects.none().values('documento_id')
+        totales = DocumentoBusqueda.objects.aggregate(total=Count('pk'), media=Avg('longitud'))
+        total, media = totales['total'], totales['media'] or 1.0
+        pesos = {termino: _idf(total, documentos) for termino, documentos in frecuencias.items()}
+        idf = Case(*[When(termino=termino, then=Value(peso)) for termino, peso in pesos.items()],
+                   default=Value(0.0), output_field=FloatField())
+        saturacion = (F('frecuencia') * Value(K1 + 1.0)) / (
+            F('frecuencia') + Value(K1 * (1 - B)) + Value(K1 * B / media) * F('documento__longitud')
+        )
+        filas = TerminoDocumento.objects.filter(termino__in=list(pesos))
+        if tipos:
+            filas = filas.filter(documento__tipo__in=tipos)
+        return filas.values('documento_id').annotate(
+            puntaje=Sum(idf * saturacion, output_field=FloatField())
+        ).order_by('-puntaje', 'documento_id')
+
+    def documentos(self, filas):
+        """Resultados de una página de buscar(), en el mismo orden."""
+        documentos = DocumentoBusqueda.objects.in_bulk([fila['documento_id'] for fila in filas])
+        return [
+            {
+                'tipo': documento.tipo, 'id': documento.objeto_id, 'titulo': documento.titulo,
+                'resumen': documento.resumen, 'puntaje': round(fila['puntaje'], 4),
+            }
+            for fila in filas for documento in [documentos.get(fila['documento_id'])] if documento is not None
+        ]
+
+
+def _idf(total, documentos):
+    return log(1 + (total - documentos + 0.5) / (documentos + 0.5))
+
+
+indice_busqueda = IndiceBusqueda()
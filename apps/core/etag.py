@@ -0,0 +1,18 @@
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def respuesta_con_etag(request, etag, obtener_datos):
+    """
+    Responde 304 si el cliente ya tiene la versión `etag` (If-None-Match); si no, responde
+    los datos (obtener_datos se llama solo en ese caso) con la cabecera ETag.
+    """
+    etag = f'"{etag}"'
+    enviados = [valor.strip() for valor in request.headers.get('If-None-Match', '').split(',')]
+    if etag in enviados or '*' in enviados:
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response(obtener_datos())
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
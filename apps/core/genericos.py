@@ -0,0 +1,48 @@
+from collections import defaultdict
+
+from apps.core.tipos_contenido import tipos_contenido
+
+
+def cargar_objetos(pares, relaciones=None):
+    """
+    Carga los objetos de una lista de pares (content_type_id, object_id) con una consulta
+    por tipo de contenido. `relaciones` indica, por modelo, las FK que usa su __str__ para
+    traerlas con select_related. Devuelve {(content_type_id, object_id): objeto}.
+    """
+    relaciones = relaciones or {}
+    ids_por_tipo = defaultdict(set)
+    for content_type_id, object_id in pares:
+        if content_type_id is not None and object_id is not None:
+            ids_por_tipo[content_type_id].add(object_id)
+
+    objetos = {}
+    for content_type_id, ids in ids_por_tipo.items():
+        modelo = tipos_contenido.por_id(content_type_id).model_class()
+        if modelo is None:
+            continue
+        queryset = modelo._default_manager.filter(pk__in=ids)
+        if relaciones.get(modelo):
+            queryset = queryset.select_related(*relaciones[modelo])
+        for objeto in queryset:
+            objetos[(content_type_id, objeto.pk)] = objeto
+    return objetos
+
+
+def resolver_genericos(instancias, campos, relaciones=None):
+    """
+    Precarga los GenericForeignKey `campos` de `instancias` con cargar_objetos() y deja cada
+    objeto en la caché del campo, de modo que leerlo después no genera consultas.
+    """
+    if not instancias:
+        return
+    opciones = instancias[0]._meta
+    gfks = [next(f for f in opciones.private_fields if f.name == campo) for campo in campos]
+
+    def par(instancia, gfk):
+        return (getattr(instancia, opciones.get_field(gfk.ct_field).attname), getattr(instancia, gfk.fk_field))
+
+    objetos = cargar_objetos([par(i, gfk) for i in instancias for gfk in gfks], relaciones)
+    for instancia in instancias:
+        for gfk in gfks:
+            # Si el destino ya no existe se cachea None, igual que lo haría el GFK
+            gfk.set_cached_value(instancia, objetos.get(par(instancia, gfk)))
@@ -0,0 +1,57 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.benchmark import ESCENARIOS, ejecutar, comparar
+
+
+class Command(BaseCommand):
+    help = ('Mide los endpoints pesados de la API (percentiles de latencia y número de consultas) '
+            'sobre la base configurada, guarda el resultado en JSON y opcionalmente lo compara con '
+            'una línea base. Ej.: manage.py benchmark_api --settings=config.settings_benchmark '
+            '--salida benchmarks/actual.json --comparar benchmarks/base.json')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escenario', action='append', choices=sorted(ESCENARIOS),
+                            help='Escenario a medir (repetible). Por defecto, todos.')
+        parser.add_argument('--iteraciones', type=int, default=20)
+        parser.add_argument('--calentamiento', type=int, default=2,
+                            help='Peticiones previas que no se miden (cachés y conexiones).')
+        parser.add_argument('--salida', default=str(Path(settings.BASE_DIR) / 'benchmarks' / 'resultado.json'))
+        parser.add_argument('--comparar', help='JSON de una corrida anterior para usar como línea base.')
+        parser.add_argument('--tolerancia', type=float, default=0.2,
+                            help='Aumento de p95 tolerado antes de marcar regresión (0.2 = 20 %%).')
+        parser.add_argument('--estricto', action='store_true',
+                            help='Termina con error si hay regresiones respecto de la línea base.')
+
+    def handle(self, *args, **options):
+        try:
+            resultado = ejecutar(options['escenario'], options['iteraciones'], options['calentamiento'])
+        except ValueError as error:
+            raise CommandError(str(error))
+
+        self.stdout.write(f"{'Escenario':32} {'p50':>9} {'p95':>9} {'p99':>9} {'consultas':>10} {'bytes':>10}")
+        for nombre, medicion in resultado['escenarios'].items():
+            linea = (f"{nombre:32} {medicion['p50_ms']:>9.1f} {medicion['p95_ms']:>9.1f} {medicion['p99_ms']:>9.1f} "
+                     f"{medicion['consultas']:>10} {medicion['bytes']:>10}")
+            if medicion['errores']:
+                linea += f"  HTTP {medicion['errores']}"
+            self.stdout.write(self.style.ERROR(linea) if medicion['errores'] else linea)
+
+        salida = Path(options['salida'])
+        salida.parent.mkdir(parents=True, exist_ok=True)
+        salida.write_text(json.dumps(resultado, indent=2, ensure_ascii=False), encoding='utf-8')
+        self.stdout.write(self.style.SUCCESS(f'Resultado guardado en {salida}'))
+
+        if options['comparar']:
+            base = json.loads(Path(options['comparar']).read_text(encoding='utf-8'))
+            filas = comparar(base, resultado, options['tolerancia'])
+            regresiones = [fila for fila in filas if fila['regresion']]
+            for fila in filas:
+                linea = (f"{fila['escenario']:32} p95 {fila['p95_base']:.1f} -> {fila['p95_actual']:.1f} ms "
+                         f"({fila['variacion']:+.0%}), consultas {fila['consultas_base']} -> {fila['consultas_actual']}")
+                self.stdout.write(self.style.ERROR(linea) if fila['regresion'] else linea)
+            if regresiones and options['estricto']:
+                raise CommandError(f'{len(regresiones)} escenario(s) con regresión respecto de {options["comparar"]}.')
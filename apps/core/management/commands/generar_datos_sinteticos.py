@@ -0,0 +1,311 @@
+import datetime
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from apps.audit.models import AuditEvent
+from apps.authentication.models import Usuario
+from apps.core.busqueda import indice_busqueda
+from apps.core.masivo import crear_en_lote
+from apps.core.referencia import datos_referencia
+from apps.core.tipos_contenido import tipos_contenido
+from apps.institutional_config.models import (
+    Catalogo, ItemCatalogo, Entidad, UnidadOrganizacional, PeriodoPlanificacion
+)
+from apps.investment_projects.models import (
+    ProyectoInversion, MarcoLogico, Componente, Actividad, CronogramaValorado, ResumenFinancieroProyecto
+)
+from apps.reports.estadisticas import invalidar
+from apps.strategic_objectives.models import (
+    PlanNacionalDesarrollo, ObjetivoPND, PoliticaPND, MetaPND, IndicadorPND, ObjetivoDesarrolloSostenible,
+    PlanInstitucional, ObjetivoEstrategicoInstitucional, ProgramaInstitucional, Alineacion, CierreAlineacion
+)
+from apps.tracking.models import TrackingActivity
+
+# Volúmenes por escala; cada valor se puede sobrescribir con su opción
+ESCALAS = {
+    'pequena': {'entidades': 5, 'proyectos': 50, 'componentes': 3, 'actividades': 3, 'meses': 6,
+                'seguimiento': 4, 'eventos': 10},
+    'mediana': {'entidades': 20, 'proyectos': 500, 'componentes': 3, 'actividades': 4, 'meses': 12,
+                'seguimiento': 5, 'eventos': 20},
+    'grande': {'entidades': 50, 'proyectos': 5000, 'componentes': 4, 'actividades': 5, 'meses': 12,
+               'seguimiento': 8, 'eventos': 40},
+}
+
+CATALOGOS = {
+    'NIVEL_GOBIERNO': ['Central', 'Provincial', 'Municipal'],
+    'TIPO_PROYECTO': ['Inversión', 'Preinversión', 'Estudio'],
+    'TIPOLOGIA_PROYECTO': ['Infraestructura', 'Equipamiento', 'Fortalecimiento institucional', 'Servicios'],
+}
+MACROSECTORES = {
+    'Social': ['Salud', 'Educación', 'Inclusión'],
+    'Producción': ['Agricultura', 'Industria', 'Turismo'],
+    'Infraestructura': ['Vialidad', 'Energía', 'Telecomunicaciones'],
+    'Seguridad': ['Defensa', 'Justicia'],
+}
+ESTADOS_PROYECTO = ['EN_FORMULACION', 'EN_REVISION', 'APROBADO', 'EN_EJECUCION']
+EVENTOS = ['CREACION', 'ACTUALIZACION', 'CAMBIO_ESTADO', 'REVISION']
+
+
+class Command(BaseCommand):
+    help = ('Genera un conjunto de datos sintéticos reproducible (misma semilla, mismos datos) para '
+            'benchmarks: catálogos, entidades, jerarquía del PND, planes, proyectos con marco lógico, '
+            'componentes, actividades y cronograma, alineaciones, actividades de seguimiento y auditoría.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escala', choices=sorted(ESCALAS), default='pequena')
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--prefijo', default='SINT',
+                            help='Prefijo de nombres y códigos; debe ser distinto en cada ejecución sobre la misma base.')
+        for opcion in ESCALAS['pequena']:
+            parser.add_argument(f'--{opcion}', type=int, help=f'Sobrescribe "{opcion}" de la escala elegida.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        self.volumen = {clave: options[clave] if options[clave] is not None else valor
+                        for clave, valor in ESCALAS[options['escala']].items()}
+        self.prefijo = options['prefijo']
+        self.lote = options['batch_size']
+        self.azar = random.Random(options['semilla'])
+        if Entidad.objects.filter(codigo_unico__startswith=f'{self.prefijo}-').exists():
+            raise CommandError(f"Ya hay datos con el prefijo '{self.prefijo}'. Use otro --prefijo.")
+
+        inicio = time.perf_counter()
+        with transaction.atomic():
+            self.usuarios = self.crear_usuarios()
+            items = self.crear_catalogos()
+            periodo = PeriodoPlanificacion.objects.create(
+                nombre=f'{self.prefijo} 2025-2029', fecha_inicio=datetime.date(2025, 1, 1),
+                fecha_fin=datetime.date(2029, 12, 31), es_activo_para_carga=True,
+            )
+            entidades = self.crear_entidades(items)
+            objetivos_pnd = self.crear_pnd(periodo)
+            oeis, programas = self.crear_planes(entidades, periodo)
+            proyectos = self.crear_proyectos(entidades, programas, items)
+            actividades = self.crear_marcos_logicos(proyectos)
+            self.crear_cronograma(actividades)
+            self.crear_alineaciones(oeis, objetivos_pnd)
+            self.crear_seguimiento(proyectos)
+            self.crear_eventos(proyectos)
+
+            # bulk_create no emite señales: se recalculan las tablas derivadas
+            ResumenFinancieroProyecto.objects.recalcular([proyecto.pk for proyecto in proyectos])
+            pares = CierreAlineacion.objects.reconstruir()
+            datos_referencia.incrementar('pnd', 'ods')
+            indice_busqueda.reindexar()
+        for modelo in (ProyectoInversion, Entidad, PlanInstitucional, Alineacion, TrackingActivity):
+            invalidar(modelo)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Datos sintéticos "{self.prefijo}" generados en {time.perf_counter() - inicio:.1f} s: '
+            f'{len(entidades)} entidades, {len(proyectos)} proyectos, {len(actividades)} actividades, '
+            f'{pares} pares en el cierre de alineaciones.'
+        ))
+
+    def crear_usuarios(self):
+        usuarios = [Usuario(nombre_usuario=f'{self.prefijo.lower()}_usuario_{i}') for i in range(10)]
+        for usuario in usuarios:
+            usuario.set_unusable_password()
+        return crear_en_lote(Usuario, usuarios, self.lote, clave=('nombre_usuario',))
+
+    def crear_catalogos(self):
+        """Reutiliza los catálogos por código si ya existen; devuelve código -> lista de ítems."""
+        items = {}
+        for codigo, nombres in CATALOGOS.items():
+            catalogo, _ = Catalogo.objects.get_or_create(codigo=codigo, defaults={'nombre': codigo.replace('_', ' ').title()})
+            items[codigo] = [ItemCatalogo.objects.get_or_create(catalogo=catalogo, nombre=nombre)[0] for nombre in nombres]
+        catalogo, _ = Catalogo.objects.get_or_create(codigo='MACROSECTOR', defaults={'nombre': 'Macrosectores'})
+        items['MACROSECTOR'], items['SECTOR'] = [], []
+        for macro, sectores in MACROSECTORES.items():
+            padre, _ = ItemCatalogo.objects.get_or_create(catalogo=catalogo, nombre=macro)
+            items['MACROSECTOR'].append(padre)
+            for sector in sectores:
+                items['SECTOR'].append(ItemCatalogo.objects.get_or_create(
+                    catalogo=catalogo, nombre=sector, defaults={'padre': padre})[0])
+        return items
+
+    def crear_entidades(self, items):
+        entidades = crear_en_lote(Entidad, [
+            Entidad(nombre=f'{self.prefijo} Entidad {i:04d}', codigo_unico=f'{self.prefijo}-{i:04d}',
+                    nivel_gobierno=self.azar.choice(items['NIVEL_GOBIERNO']),
+                    subsector=self.azar.choice(items['SECTOR']))
+            for i in range(1, self.volumen['entidades'] + 1)
+        ], self.lote, clave=('codigo_unico',))
+        # Tres niveles de unidades por entidad: dirección -> 3 coordinaciones -> 3 unidades cada una
+        nivel = crear_en_lote(UnidadOrganizacional, [
+            UnidadOrganizacional(nombre='Dirección General', entidad=entidad,
+                                 macrosector=self.azar.choice(items['MACROSECTOR']))
+            for entidad in entidades
+        ], self.lote, clave=('entidad', 'nombre'))
+        for _ in range(2):
+            nivel = crear_en_lote(UnidadOrganizacional, [
+                UnidadOrganizacional(nombre=f'{padre.nombre} / {i}', entidad_id=padre.entidad_id, padre=padre,
+                                     macrosector=padre.macrosector)
+                for padre in nivel for i in range(1, 4)
+            ], self.lote, clave=('entidad', 'nombre'))
+        # bulk_create no pasa por save(): las rutas materializadas se calculan al final
+        UnidadOrganizacional.objects.reconstruir_rutas(entidad__in=entidades)
+        return entidades
+
+    def crear_pnd(self, periodo):
+        pnd = PlanNacionalDesarrollo.objects.create(nombre=f'{self.prefijo} PND', periodo=periodo,
+                                                    fecha_publicacion=datetime.date(2025, 1, 15))
+        objetivos = crear_en_lote(ObjetivoPND, [
+            ObjetivoPND(pnd=pnd, codigo=f'O{i}', descripcion=f'Objetivo nacional {i}') for i in range(1, 11)
+        ], self.lote)
+        politicas = crear_en_lote(PoliticaPND, [
+            PoliticaPND(objetivo_pnd=objetivo, codigo=f'{objetivo.codigo}.P{i}', descripcion=f'Política {i} de {objetivo.codigo}')
+            for objetivo in objetivos for i in range(1, 4)
+        ], self.lote)
+        metas = crear_en_lote(MetaPND, [
+            MetaPND(politica_pnd=politica, codigo=f'{politica.codigo}.M{i}', descripcion=f'Meta {i} de {politica.codigo}')
+            for politica in politicas for i in range(1, 3)
+        ], self.lote)
+        crear_en_lote(IndicadorPND, [
+            IndicadorPND(meta_pnd=meta, codigo=f'{meta.codigo}.I1', descripcion=f'Indicador de {meta.codigo}')
+            for meta in metas
+        ], self.lote)
+        if not ObjetivoDesarrolloSostenible.objects.exists():
+            ObjetivoDesarrolloSostenible.objects.bulk_create([
+                ObjetivoDesarrolloSostenible(numero=i, nombre=f'ODS {i}', descripcion=f'Objetivo de desarrollo sostenible {i}')
+                for i in range(1, 18)
+            ])
+        return objetivos
+
+    def crear_planes(self, entidades, periodo):
+        planes = crear_en_lote(PlanInstitucional, [
+            PlanInstitucional(nombre=f'Plan {entidad.nombre}', entidad=entidad, periodo=periodo,
+                              estado=self.azar.choice(['BORRADOR', 'VALIDADO', 'APROBADO']),
+                              creador=self.azar.choice(self.usuarios))
+            for entidad in entidades
+        ], self.lote)
+        oeis = crear_en_lote(ObjetivoEstrategicoInstitucional, [
+            ObjetivoEstrategicoInstitucional(plan_institucional=plan, codigo=f'OEI{i}',
+                                             descripcion=f'Objetivo estratégico {i} de {plan.nombre}')
+            for plan in planes for i in range(1, 6)
+        ], self.lote)
+        programas = crear_en_lote(ProgramaInstitucional, [
+            ProgramaInstitucional(entidad=entidad, nombre=f'{entidad.nombre} - Programa {i}')
+            for entidad in entidades for i in range(1, 4)
+        ], self.lote)
+        oeis_por_entidad = {}
+        for oei, plan in zip(oeis, (plan for plan in planes for _ in range(5))):
+            oeis_por_entidad.setdefault(plan.entidad_id, []).append(oei)
+        Relacion = ProgramaInstitucional.oei_alineados.through
+        Relacion.objects.bulk_create([
+            Relacion(programainstitucional_id=programa.pk, objetivoestrategicoinstitucional_id=oei.pk)
+            for programa in programas
+            for oei in self.azar.sample(oeis_por_entidad[programa.entidad_id], 2)
+        ], batch_size=self.lote)
+        return oeis, programas
+
+    def crear_proyectos(self, entidades, programas, items):
+        programas_por_entidad = {}
+        for programa in programas:
+            programas_por_entidad.setdefault(programa.entidad_id, []).append(programa)
+        proyectos = []
+        for i in range(1, self.volumen['proyectos'] + 1):
+            entidad = self.azar.choice(entidades)
+            estado = self.azar.choice(ESTADOS_PROYECTO)
+            proyectos.append(ProyectoInversion(
+                nombre=f'{self.prefijo} Proyecto {i:06d}', entidad_ejecutora=entidad,
+                cup=f'{self.prefijo}-CUP-{i:06d}' if estado != 'EN_FORMULACION' else None,
+                tipo_proyecto=self.azar.choice(items['TIPO_PROYECTO']),
+                tipologia_proyecto=self.azar.choice(items['TIPOLOGIA_PROYECTO']),
+                sector=self.azar.choice(items['SECTOR']), estado=estado,
+                creador=self.azar.choice(self.usuarios),
+                programa_institucional=self.azar.choice(programas_por_entidad[entidad.pk]),
+                contribucion_programa=Decimal(self.azar.randint(5, 60)),
+            ))
+        return crear_en_lote(ProyectoInversion, proyectos, self.lote)
+
+    def crear_marcos_logicos(self, proyectos):
+        marcos = crear_en_lote(MarcoLogico, [
+            MarcoLogico(proyecto=proyecto, fin=f'Fin de {proyecto.nombre}', proposito=f'Propósito de {proyecto.nombre}')
+            for proyecto in proyectos
+        ], self.lote)
+        ponderacion = (Decimal('100') / self.volumen['componentes']).quantize(Decimal('0.01'))
+        componentes = crear_en_lote(Componente, [
+            Componente(marco_logico=marco, nombre=f'Componente {i}', ponderacion=ponderacion)
+            for marco in marcos for i in range(1, self.volumen['componentes'] + 1)
+        ], self.lote)
+        actividades = []
+        for componente in componentes:
+            for i in range(1, self.volumen['actividades'] + 1):
+                inicio = datetime.date(2025, 1, 1) + datetime.timedelta(days=self.azar.randint(0, 180))
+                actividades.append(Actividad(
+                    componente=componente, descripcion=f'Actividad {i} de {componente.nombre}',
+                    fecha_inicio=inicio, fecha_fin=inicio + datetime.timedelta(days=self.azar.randint(30, 365)),
+                ))
+        return crear_en_lote(Actividad, actividades, self.lote)
+
+    def crear_cronograma(self, actividades):
+        filas = []
+        for actividad in actividades:
+            for mes in range(self.volumen['meses']):
+                anio, mes_del_anio = divmod(mes, 12)
+                filas.append(CronogramaValorado(
+                    actividad=actividad, periodo=f'{2025 + anio}-{mes_del_anio + 1:02d}',
+                    valor_programado=Decimal(self.azar.randint(1000, 500000)) / 100,
+                ))
+                if len(filas) >= self.lote * 10:
+                    CronogramaValorado.objects.bulk_create(filas, batch_size=self.lote)
+                    filas = []
+        CronogramaValorado.objects.bulk_create(filas, batch_size=self.lote)
+
+    def crear_alineaciones(self, oeis, objetivos_pnd):
+        ct_oei = tipos_contenido.tipo(ObjetivoEstrategicoInstitucional)
+        ct_pnd = tipos_contenido.tipo(ObjetivoPND)
+        alineaciones = [
+            Alineacion(instrumento_origen_tipo=ct_oei, instrumento_origen_id=oei.pk,
+                       instrumento_destino_tipo=ct_pnd, instrumento_destino_id=objetivo.pk,
+                       contribucion_porcentaje=Decimal(self.azar.randint(10, 100)),
+                       usuario_creacion=self.azar.choice(self.usuarios))
+            for oei in oeis for objetivo in self.azar.sample(objetivos_pnd, 2)
+        ]
+        crear_en_lote(Alineacion, alineaciones, self.lote)
+        ods = list(ObjetivoDesarrolloSostenible.objects.all())
+        Relacion = Alineacion.ods_vinculados.through
+        Relacion.objects.bulk_create([
+            Relacion(alineacion_id=alineacion.pk, objetivodesarrollosostenible_id=objetivo.pk)
+            for alineacion in alineaciones for objetivo in self.azar.sample(ods, 2)
+        ], batch_size=self.lote)
+
+    def crear_seguimiento(self, proyectos):
+        estados = [estado for estado, _ in TrackingActivity.STATUS_CHOICES]
+        filas = []
+        for proyecto in proyectos:
+            for i in range(1, self.volumen['seguimiento'] + 1):
+                inicio = datetime.date(2025, 1, 1) + datetime.timedelta(days=self.azar.randint(0, 300))
+                fin = inicio + datetime.timedelta(days=self.azar.randint(15, 120))
+                filas.append(TrackingActivity(
+                    project=proyecto, name=f'Seguimiento {i} de {proyecto.nombre}',
+                    responsible=self.azar.choice(self.usuarios), priority=self.azar.randint(1, 5),
+                    planned_start_date=inicio, planned_end_date=fin, planned_duration_days=(fin - inicio).days,
+                    reported_status=self.azar.choice(estados),
+                ))
+        # Un bloque de códigos por proyecto desde su contador (ActivityCodeSequence)
+        TrackingActivity.objects.asignar_codigos(filas)
+        TrackingActivity.objects.bulk_create(filas, batch_size=self.lote)
+
+    def crear_eventos(self, proyectos):
+        ct_proyecto = tipos_contenido.tipo(ProyectoInversion)
+        ahora = timezone.now()
+        filas = []
+        for proyecto in proyectos:
+            for _ in range(self.volumen['eventos']):
+                filas.append(AuditEvent(
+                    user=self.azar.choice(self.usuarios), event_type=self.azar.choice(EVENTOS),
+                    timestamp=ahora - datetime.timedelta(minutes=self.azar.randint(0, 60 * 24 * 300)),
+                    ip_address=f'10.0.{self.azar.randint(0, 255)}.{self.azar.randint(1, 254)}',
+                    details={'proyecto': proyecto.nombre, 'campo': self.azar.choice(['estado', 'nombre', 'sector'])},
+                    content_type=ct_proyecto, object_id=proyecto.pk,
+                ))
+            if len(filas) >= self.lote * 10:
+                AuditEvent.objects.bulk_create(filas, batch_size=self.lote)
+                filas = []
+        AuditEvent.objects.bulk_create(filas, batch_size=self.lote)
@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+from apps.core.busqueda import indice_busqueda
+
+
+class Command(BaseCommand):
+    help = ('Sincroniza el índice de búsqueda de texto con los proyectos, planes, objetivos y '
+            'metas/indicadores PND y ODS (necesario tras cargas con bulk_create).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tipo', action='append', choices=indice_busqueda.tipos(),
+                            help='Reindexar solo este tipo (se puede repetir).')
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        escritos = indice_busqueda.reindexar(*(options['tipo'] or []))
+        for tipo, cantidad in escritos.items():
+            self.stdout.write(f'{tipo}: {cantidad} documentos indexados.')
+        self.stdout.write(self.style.SUCCESS(f'Índice de búsqueda al día en {time.perf_counter() - inicio:.2f} s.'))
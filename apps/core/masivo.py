@@ -0,0 +1,248 @@
+"""
+Carga masiva por API: una lista de filas se valida con el serializer de la vista y se escribe
+en una sola transacción con bulk_create / bulk_update.
+"""
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField
+from rest_framework.response import Response
+
+
+def _clave_unica(modelo, campos):
+    """True si la base garantiza que esos campos (attname) no se repiten entre filas."""
+    opciones = modelo._meta
+    nombres = {opciones.get_field(campo).name for campo in campos}
+    grupos = [{campo.name} for campo in opciones.concrete_fields if campo.unique]
+    grupos += [set(grupo) for grupo in opciones.unique_together]
+    grupos += [set(restriccion.fields) for restriccion in opciones.total_unique_constraints]
+    return any(grupo <= nombres for grupo in grupos)
+
+
+def crear_en_lote(modelo, objetos, tamano_lote=None, clave=None):
+    """
+    bulk_create que deja la clave primaria en cada objeto. MySQL no la devuelve y, con
+    innodb_autoinc_lock_mode=2, los ids de un INSERT de varias filas no tienen por qué ser
+    consecutivos, así que:
+
+    - con `clave` (campos que identifican cada fila del lote, p. ej. ('tipo', 'objeto_id')) cada
+      lote va en un INSERT y los ids se leen después por esos campos. Si la base no garantiza que
+      la clave sea única, antes del INSERT se bloquean con select_for_update las filas con esos
+      valores (en InnoDB también los huecos del índice, así que nadie inserta ahí hasta el commit)
+      y de lo leído después se descartan: las filas nuevas de una misma clave se asignan en orden
+      de id, que es el orden del INSERT. En ese caso debe llamarse dentro de una transacción;
+    - sin ella, cada fila va en su propio INSERT y su id es LAST_INSERT_ID() de la conexión.
+
+    En ningún caso se disparan señales, igual que con bulk_create.
+    """
+    if connection.features.can_return_rows_from_bulk_insert:
+        modelo.objects.bulk_create(objetos, batch_size=tamano_lote)
+        return objetos
+    if clave is None:
+        for objeto in objetos:
+            modelo.objects.bulk_create([objeto])
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT LAST_INSERT_ID()')
+                objeto.pk = cursor.fetchone()[0]
+        return objetos
+    campos = [modelo._meta.get_field(nombre).attname for nombre in clave]
+    unica = _clave_unica(modelo, campos)
+    tamano_lote = tamano_lote or len(objetos) or 1
+    for inicio in range(0, len(objetos), tamano_lote):
+        lote = objetos[inicio:inicio + tamano_lote]
+        filtro = {f'{campo}__in': {getattr(objeto, campo) for objeto in lote} for campo in campos}
+        previos = set() if unica else set(
+            modelo.objects.select_for_update().filter(**filtro).values_list('pk', flat=True)
+        )
+        modelo.objects.bulk_create(lote)
+        ids = {}
+        for pk, *valores in modelo.objects.filter(**filtro).order_by('pk').values_list('pk', *campos):
+            if pk not in previos:
+                ids.setdefault(tuple(valores), []).append(pk)
+        for objeto in lote:
+            objeto.pk = ids[tuple(getattr(objeto, campo) for campo in campos)].pop(0)
+    return objetos
+
+
+def _entero(valor):
+    if isinstance(valor, bool):
+        return None
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def precargar_relaciones(serializer, filas, cache):
+    """
+    Resuelve las claves foráneas de todas las filas con una consulta por campo (in_bulk) y hace que
+    los PrimaryKeyRelatedField del serializer las tomen de ahí en vez de consultar fila por fila.
+    Los valores que no estén precargados siguen el camino normal (y su error de validación).
+    `cache` se comparte entre los serializers de una misma carga.
+    """
+    for nombre, campo in serializer.fields.items():
+        relacion = campo.child_relation if isinstance(campo, ManyRelatedField) else campo
+        if campo.read_only or not isinstance(relacion, PrimaryKeyRelatedField) or relacion.pk_field is not None:
+            continue
+        if nombre not in cache:
+            ids = set()
+            for fila in filas:
+                valor = fila.get(nombre) if isinstance(fila, dict) else None
+                for elemento in valor if isinstance(valor, list) else [valor]:
+                    if _entero(elemento) is not None:
+                        ids.add(_entero(elemento))
+            cache[nombre] = relacion.get_queryset().in_bulk(ids) if ids else {}
+        _usar_precargados(relacion, cache[nombre])
+
+
+def _usar_precargados(relacion, objetos):
+    original = relacion.to_internal_value
+
+    def to_internal_value(data):
+        objeto = objetos.get(_entero(data))
+        return objeto if objeto is not None else original(data)
+
+    relacion.to_internal_value = to_internal_value
+
+
+def guardar_m2m(modelo, objetos, relaciones, reemplazar=False):
+    """Escribe las relaciones muchos a muchos de objetos ya guardados con un bulk_create por campo."""
+    for campo in modelo._meta.many_to_many:
+        pares = [(objeto, valores[campo.name]) for objeto, valores in zip(objetos, relaciones) if campo.name in valores]
+        if not pares:
+            continue
+        intermedia = campo.remote_field.through
+        origen, destino = f'{campo.m2m_field_name()}_id', f'{campo.m2m_reverse_field_name()}_id'
+        if reemplazar:
+            intermedia.objects.filter(**{f'{origen}__in': [objeto.pk for objeto, _ in pares]}).delete()
+        intermedia.objects.bulk_create([
+            intermedia(**{origen: objeto.pk, destino: destino_pk})
+            for objeto, relacionados in pares for destino_pk in dict.fromkeys(r.pk for r in relacionados)
+        ])
+
+
+class CargaMasivaMixin:
+    """
+    Agrega a un ModelViewSet la ruta bulk/: POST crea y PATCH actualiza (parcialmente, cada fila
+    con su clave primaria) una lista de filas en una sola petición.
+
+    Todas las filas se validan con el serializer de la vista antes de escribir; si alguna falla no
+    se escribe nada y se responde 400 con los errores por fila. Si todas son válidas se escriben en
+    una transacción con bulk_create / bulk_update, que no disparan señales: lo derivado (resúmenes,
+    auditoría, caché) se actualiza en despues_de_carga_masiva. La respuesta trae el resultado de cada
+    fila en el orden recibido.
+    """
+
+    def campos_carga_masiva(self, creacion):
+        """Valores que la vista fija en cada fila (p. ej. created_by)."""
+        return {}
+
+    def preparar_carga_masiva(self, objetos, creacion):
+        """Completa los objetos antes de escribirlos; devuelve los campos extra a actualizar."""
+        return ()
+
+    def despues_de_carga_masiva(self, objetos, creacion):
+        """Se llama dentro de la transacción, con los objetos ya guardados."""
+
+    def clave_carga_masiva(self):
+        """
+        Campos que identifican cada fila nueva (ver crear_en_lote). Sin RETURNING (MySQL), con clave
+        los ids se leen por lote; sin ella cuestan dos consultas por fila.
+        """
+        return None
+
+    def resultado_carga_masiva(self, objeto):
+        return {self.get_queryset().model._meta.pk.name: objeto.pk}
+
+    @action(detail=False, methods=['post', 'patch'], url_path='bulk')
+    def bulk(self, request):
+        filas = request.data
+        maximo = getattr(settings, 'CARGA_MASIVA_MAXIMO_FILAS', 2000)
+        if not isinstance(filas, list) or not filas:
+            return Response({'error': 'Envíe una lista de filas.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(filas) > maximo:
+            return Response({'error': f'Se admiten hasta {maximo} filas por petición.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        creacion = request.method == 'POST'
+        clave = self.get_queryset().model._meta.pk.name
+        instancias = {}
+        if not creacion:
+            ids = [_entero(fila.get(clave)) for fila in filas if isinstance(fila, dict)]
+            instancias = self.get_queryset().in_bulk([pk for pk in ids if pk is not None])
+
+        serializers, errores, cache, vistos = [], [], {}, set()
+        for indice, fila in enumerate(filas):
+            if not isinstance(fila, dict):
+                errores.append({'indice': indice, 'errores': {'non_field_errors': ['Se esperaba un objeto.']}})
+                continue
+            instancia = None
+            if not creacion:
+                pk = _entero(fila.get(clave))
+                instancia = instancias.get(pk)
+                if instancia is None or pk in vistos:
+                    motivo = 'Registro repetido en la carga.' if pk in vistos else 'No existe o no se indicó.'
+                    errores.append({'indice': indice, 'errores': {clave: [motivo]}})
+                    continue
+                vistos.add(pk)
+            serializer = self.get_serializer(instancia, data=fila, partial=not creacion)
+            precargar_relaciones(serializer, filas, cache)
+            if serializer.is_valid():
+                serializers.append(serializer)
+            else:
+                errores.append({'indice': indice, 'errores': serializer.errors})
+        if errores:
+            return Response({'errores': errores}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            objetos = self._crear_masivo(serializers) if creacion else self._actualizar_masivo(serializers)
+            self.despues_de_carga_masiva(objetos, creacion)
+        estado = 'creado' if creacion else 'actualizado'
+        return Response({
+            'total': len(objetos),
+            'resultados': [
+                {'indice': indice, 'estado': estado, **self.resultado_carga_masiva(objeto)}
+                for indice, objeto in enumerate(objetos)
+            ],
+        }, status=status.HTTP_201_CREATED if creacion else status.HTTP_200_OK)
+
+    def _separar(self, modelo, serializer):
+        datos = dict(serializer.validated_data)
+        m2m = {campo.name: datos.pop(campo.name) for campo in modelo._meta.many_to_many if campo.name in datos}
+        return datos, m2m
+
+    def _crear_masivo(self, serializers):
+        modelo = self.get_queryset().model
+        objetos, relaciones = [], []
+        for serializer in serializers:
+            datos, m2m = self._separar(modelo, serializer)
+            objetos.append(modelo(**datos, **self.campos_carga_masiva(creacion=True)))
+            relaciones.append(m2m)
+        self.preparar_carga_masiva(objetos, creacion=True)
+        crear_en_lote(modelo, objetos, getattr(settings, 'CARGA_MASIVA_TAMANO_LOTE', 500), self.clave_carga_masiva())
+        guardar_m2m(modelo, objetos, relaciones)
+        return objetos
+
+    def _actualizar_masivo(self, serializers):
+        modelo = self.get_queryset().model
+        objetos, relaciones, campos = [], [], set()
+        ahora = timezone.now()
+        for serializer in serializers:
+            datos, m2m = self._separar(modelo, serializer)
+            datos.update(self.campos_carga_masiva(creacion=False))
+            # bulk_update no aplica auto_now
+            datos.update({campo.name: ahora for campo in modelo._meta.concrete_fields if getattr(campo, 'auto_now', False)})
+            objeto = serializer.instance
+            for campo, valor in datos.items():
+                setattr(objeto, campo, valor)
+            campos.update(datos)
+            objetos.append(objeto)
+            relaciones.append(m2m)
+        campos.update(self.preparar_carga_masiva(objetos, creacion=False))
+        if campos:
+            modelo.objects.bulk_update(objetos, sorted(campos),
+                                       batch_size=getattr(settings, 'CARGA_MASIVA_TAMANO_LOTE', 500))
+        guardar_m2m(modelo, objetos, relaciones, reemplazar=True)
+        return objetos
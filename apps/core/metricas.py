@@ -0,0 +1,183 @@
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+class PresupuestoExcedido(AssertionError):
+    """Una petición superó el presupuesto declarado en PRESUPUESTOS_ENDPOINTS (modo estricto)."""
+
+
+class RegistroMetricas:
+    """
+    Acumula, en memoria del proceso, las mediciones de cada petición agrupadas por endpoint
+    (nombre de la URL del router, p. ej. 'proyectoinversion-list'): número de peticiones,
+    consultas, tiempo en base de datos, tiempo de serialización, bytes de respuesta y tiempo total.
+    """
+    CAMPOS = ('consultas', 'ms_bd', 'ms_serializacion', 'bytes', 'ms_total')
+
+    def __init__(self):
+        self._candado = threading.Lock()
+        self._endpoints = {}
+
+    def registrar(self, clave, vista, accion, medicion, excedido=False):
+        with self._candado:
+            datos = self._endpoints.get(clave)
+            if datos is None:
+                datos = self._endpoints[clave] = {
+                    'vista': vista, 'accion': accion, 'peticiones': 0, 'presupuesto_excedido': 0,
+                    **{f'{campo}_total': 0 for campo in self.CAMPOS},
+                    **{f'{campo}_max': 0 for campo in self.CAMPOS},
+                }
+            datos['peticiones'] += 1
+            datos['presupuesto_excedido'] += int(excedido)
+            for campo in self.CAMPOS:
+                valor = medicion.get(campo) or 0
+                datos[f'{campo}_total'] += valor
+                datos[f'{campo}_max'] = max(datos[f'{campo}_max'], valor)
+
+    def resumen(self):
+        """Copia de las métricas con los promedios por petición, del endpoint con más consultas al de menos."""
+        with self._candado:
+            endpoints = {clave: dict(datos) for clave, datos in self._endpoints.items()}
+        for clave, datos in endpoints.items():
+            for campo in self.CAMPOS:
+                datos[f'{campo}_promedio'] = round(datos[f'{campo}_total'] / datos['peticiones'], 3)
+            datos['presupuesto'] = presupuesto_de(clave)
+        return dict(sorted(endpoints.items(), key=lambda item: item[1]['consultas_total'], reverse=True))
+
+    def prometheus(self):
+        """Formato de texto de Prometheus: contadores acumulados por endpoint."""
+        series = [
+            ('sipeip_peticiones_total', 'counter', 'Peticiones atendidas.', 'peticiones'),
+            ('sipeip_consultas_total', 'counter', 'Consultas SQL ejecutadas.', 'consultas_total'),
+            ('sipeip_bd_segundos_total', 'counter', 'Tiempo en base de datos.', 'ms_bd_total'),
+            ('sipeip_serializacion_segundos_total', 'counter', 'Tiempo de serialización.', 'ms_serializacion_total'),
+            ('sipeip_respuesta_bytes_total', 'counter', 'Bytes de respuesta.', 'bytes_total'),
+            ('sipeip_peticion_segundos_total', 'counter', 'Tiempo total de las peticiones.', 'ms_total_total'),
+            ('sipeip_presupuesto_excedido_total', 'counter', 'Peticiones sobre el presupuesto.', 'presupuesto_excedido'),
+            ('sipeip_consultas_max', 'gauge', 'Máximo de consultas en una petición.', 'consultas_max'),
+        ]
+        endpoints = self.resumen()
+        lineas = []
+        for nombre, tipo, ayuda, campo in series:
+            lineas.append(f'# HELP {nombre} {ayuda}')
+            lineas.append(f'# TYPE {nombre} {tipo}')
+            for clave, datos in endpoints.items():
+                valor = round(datos[campo] / 1000, 6) if campo.startswith('ms_') else datos[campo]
+                etiquetas = f'endpoint="{_etiqueta(clave)}",vista="{_etiqueta(datos["vista"])}",accion="{_etiqueta(datos["accion"])}"'
+                lineas.append(f'{nombre}{{{etiquetas}}} {valor}')
+        return '\n'.join(lineas) + '\n'
+
+    def reiniciar(self):
+        with self._candado:
+            self._endpoints.clear()
+
+
+registro_metricas = RegistroMetricas()
+
+
+def _etiqueta(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def presupuesto_de(clave):
+    """
+    Presupuesto declarado para un endpoint en PRESUPUESTOS_ENDPOINTS. Un entero es el máximo de
+    consultas; un diccionario admite además 'ms_bd' y 'bytes'.
+    """
+    presupuesto = getattr(settings, 'PRESUPUESTOS_ENDPOINTS', {}).get(clave)
+    if isinstance(presupuesto, int):
+        return {'consultas': presupuesto}
+    return presupuesto
+
+
+def excesos(clave, medicion):
+    presupuesto = presupuesto_de(clave) or {}
+    return [
+        f'{campo}={medicion[campo]:g} > {limite}'
+        for campo, limite in presupuesto.items()
+        if medicion.get(campo) is not None and medicion[campo] > limite
+    ]
+
+
+def identificar_endpoint(request):
+    """(clave, vista, acción) de la petición según la URL resuelta por los routers."""
+    coincidencia = getattr(request, 'resolver_match', None)
+    if coincidencia is None:
+        return 'sin-ruta', '', request.method.lower()
+    funcion = coincidencia.func
+    vista = getattr(funcion, 'cls', funcion).__name__
+    acciones = getattr(funcion, 'actions', None) or {}
+    accion = acciones.get(request.method.lower(), request.method.lower())
+    return coincidencia.url_name or f'{vista}.{accion}', vista, accion
+
+
+class MetricasMiddleware:
+    """
+    Mide cada petición: consultas y tiempo en la base (execute_wrapper sobre la conexión),
+    tiempo de serialización (lo suma MedicionSerializacionMixin en las vistas que lo usan),
+    bytes de la respuesta y tiempo total. Agrega por endpoint en registro_metricas y compara
+    con PRESUPUESTOS_ENDPOINTS: avisa en el log o, con METRICAS_PRESUPUESTO_ESTRICTO (pruebas),
+    lanza PresupuestoExcedido. En las respuestas en streaming solo se mide hasta que empieza el envío.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'METRICAS_ACTIVAS', True):
+            return self.get_response(request)
+
+        medicion = {'consultas': 0, 'ms_bd': 0.0, 'ms_serializacion': 0.0}
+        request.metricas = medicion
+
+        def medir_consulta(execute, sql, params, many, context):
+            inicio = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                medicion['consultas'] += 1
+                medicion['ms_bd'] += (time.perf_counter() - inicio) * 1000
+
+        inicio = time.perf_counter()
+        with connection.execute_wrapper(medir_consulta):
+            response = self.get_response(request)
+        medicion['ms_total'] = (time.perf_counter() - inicio) * 1000
+        medicion['bytes'] = None if response.streaming else len(response.content)
+
+        clave, vista, accion = identificar_endpoint(request)
+        problemas = excesos(clave, medicion)
+        registro_metricas.registrar(clave, vista, accion, medicion, excedido=bool(problemas))
+        if problemas:
+            mensaje = f'{request.method} {request.path} ({clave}) superó su presupuesto: {", ".join(problemas)}'
+            if getattr(settings, 'METRICAS_PRESUPUESTO_ESTRICTO', False):
+                raise PresupuestoExcedido(mensaje)
+            logger.warning(mensaje)
+        return response
+
+
+class MedicionSerializacionMixin:
+    """
+    Mixin para vistas genéricas de DRF: suma a la medición de la petición el tiempo que tarda
+    el serializer principal en producir .data (incluye las consultas perezosas que dispare).
+    """
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        medicion = getattr(self.request, 'metricas', None)
+        if medicion is not None:
+            representar = serializer.to_representation
+
+            def to_representation(instancia):
+                inicio = time.perf_counter()
+                try:
+                    return representar(instancia)
+                finally:
+                    medicion['ms_serializacion'] += (time.perf_counter() - inicio) * 1000
+
+            # Solo el serializer raíz: los anidados se llaman desde aquí y ya quedan medidos
+            serializer.to_representation = to_representation
+        return serializer
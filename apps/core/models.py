@@ -1,3 +1,41 @@
 from django.db import models
 
-# Create your models here.
+
+class VersionDatosReferencia(models.Model):
+    """
+    Versión de cada conjunto de datos de referencia (catálogos, ODS, PND, períodos). Crece en
+    uno con cada escritura sobre sus modelos; ver apps/core/referencia.py.
+    """
+    conjunto = models.CharField(max_length=50, primary_key=True)
+    version = models.PositiveBigIntegerField(default=1)
+    modificado = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.conjunto} v{self.version}"
+
+
+class DocumentoBusqueda(models.Model):
+    """Un registro indexado para la búsqueda de texto (apps/core/busqueda.py)."""
+    tipo = models.CharField(max_length=40)
+    objeto_id = models.PositiveBigIntegerField()
+    titulo = models.CharField(max_length=255)
+    resumen = models.CharField(max_length=300, blank=True)
+    # Cantidad de términos del texto (normalización por longitud en el puntaje) y hash del texto indexado
+    longitud = models.PositiveIntegerField(default=0)
+    huella = models.CharField(max_length=40)
+
+    class Meta:
+        unique_together = ('tipo', 'objeto_id')
+
+    def __str__(self):
+        return f"{self.tipo} {self.objeto_id}: {self.titulo}"
+
+
+class TerminoDocumento(models.Model):
+    """Índice invertido: término normalizado -> documentos que lo contienen y cuántas veces."""
+    termino = models.CharField(max_length=64)
+    documento = models.ForeignKey(DocumentoBusqueda, on_delete=models.CASCADE, related_name='terminos')
+    frecuencia = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ('termino', 'documento')
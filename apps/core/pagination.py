@@ -0,0 +1,63 @@
+from rest_framework.pagination import BasePagination, CursorPagination, PageNumberPagination
+
+
+class PaginacionNumerada(PageNumberPagination):
+    """
+    Paginación clásica por número de página: ?page=3&page_size=100
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # Sin un orden estable las páginas pueden repetir o saltar registros
+        if hasattr(queryset, 'ordered') and not queryset.ordered:
+            queryset = queryset.order_by('pk')
+        return super().paginate_queryset(queryset, request, view)
+
+
+class PaginacionCursor(CursorPagination):
+    """
+    Paginación por cursor (keyset): cada página filtra por la última clave vista en
+    lugar de usar OFFSET, por lo que el costo no crece al avanzar en tablas grandes.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = 'pk'
+
+
+class PaginacionOpcional(BasePagination):
+    """
+    Paginación por defecto de todo el proyecto.
+
+    - Sin parámetros se devuelve la lista completa (compatibilidad con el frontend actual).
+    - ?page= o ?page_size= activa la paginación numerada.
+    - ?cursor= (vacío para la primera página) activa la paginación por cursor usando
+      el atributo `cursor_ordering` de la vista (por defecto la clave primaria).
+    """
+    def __init__(self):
+        self.paginador = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if 'cursor' in params:
+            self.paginador = PaginacionCursor()
+            self.paginador.ordering = getattr(view, 'cursor_ordering', None) or PaginacionCursor.ordering
+        elif 'page' in params or 'page_size' in params:
+            self.paginador = PaginacionNumerada()
+        else:
+            self.paginador = None
+            return None
+        return self.paginador.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginador.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return PaginacionNumerada().get_paginated_response_schema(schema)
+
+    def to_html(self):
+        return self.paginador.to_html() if self.paginador else ''
+
+    @property
+    def display_page_controls(self):
+        return bool(self.paginador and getattr(self.paginador, 'display_page_controls', False))
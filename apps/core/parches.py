@@ -0,0 +1,72 @@
+"""
+Diferencias entre documentos JSON como parches al estilo JSON Patch (RFC 6902), con las
+operaciones add, remove y replace. Las usan los historiales de versiones para guardar solo
+lo que cambió entre una versión y la siguiente.
+"""
+import copy
+
+
+def _escapar(clave):
+    return str(clave).replace('~', '~0').replace('/', '~1')
+
+
+def _desescapar(segmento):
+    return segmento.replace('~1', '/').replace('~0', '~')
+
+
+def calcular_parche(anterior, nuevo, ruta=''):
+    """Lista de operaciones que transforman `anterior` en `nuevo`."""
+    if anterior == nuevo:
+        return []
+    if isinstance(anterior, dict) and isinstance(nuevo, dict):
+        operaciones = []
+        for clave in anterior:
+            if clave not in nuevo:
+                operaciones.append({'op': 'remove', 'path': f'{ruta}/{_escapar(clave)}'})
+        for clave, valor in nuevo.items():
+            hija = f'{ruta}/{_escapar(clave)}'
+            if clave not in anterior:
+                operaciones.append({'op': 'add', 'path': hija, 'value': valor})
+            else:
+                operaciones.extend(calcular_parche(anterior[clave], valor, hija))
+        return operaciones
+    if isinstance(anterior, list) and isinstance(nuevo, list):
+        comunes = min(len(anterior), len(nuevo))
+        operaciones = []
+        for indice in range(comunes):
+            operaciones.extend(calcular_parche(anterior[indice], nuevo[indice], f'{ruta}/{indice}'))
+        for indice in range(comunes, len(nuevo)):
+            operaciones.append({'op': 'add', 'path': f'{ruta}/{indice}', 'value': nuevo[indice]})
+        # Se quitan desde el final para que los índices sigan siendo válidos
+        for indice in range(len(anterior) - 1, comunes - 1, -1):
+            operaciones.append({'op': 'remove', 'path': f'{ruta}/{indice}'})
+        return operaciones
+    return [{'op': 'replace', 'path': ruta, 'value': nuevo}]
+
+
+def aplicar_parche(documento, operaciones):
+    """Devuelve una copia de `documento` con las operaciones aplicadas en orden."""
+    documento = copy.deepcopy(documento)
+    for operacion in operaciones:
+        segmentos = [_desescapar(s) for s in operacion['path'].split('/')[1:]]
+        if not segmentos:
+            # La ruta vacía es el documento completo
+            documento = copy.deepcopy(operacion.get('value'))
+            continue
+        padre = documento
+        for segmento in segmentos[:-1]:
+            padre = padre[int(segmento)] if isinstance(padre, list) else padre[segmento]
+        ultimo = segmentos[-1]
+        if isinstance(padre, list):
+            indice = len(padre) if ultimo == '-' else int(ultimo)
+            if operacion['op'] == 'add':
+                padre.insert(indice, copy.deepcopy(operacion['value']))
+            elif operacion['op'] == 'remove':
+                del padre[indice]
+            else:
+                padre[indice] = copy.deepcopy(operacion['value'])
+        elif operacion['op'] == 'remove':
+            del padre[ultimo]
+        else:
+            padre[ultimo] = copy.deepcopy(operacion['value'])
+    return documento
@@ -0,0 +1,31 @@
+"""
+Ejecutor de `manage.py test` (ver TEST_RUNNER en settings).
+
+Algunos ajustes tienen en settings.py su valor de producción y en las pruebas otro, para que los
+resultados se puedan comprobar al terminar la petición. Se aplican aquí a toda la corrida; una
+prueba puede volver al valor de producción con override_settings.
+"""
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+AJUSTES_PRUEBAS = {
+    # La auditoría se escribe en la misma petición, no desde el hilo de fondo
+    'AUDITORIA_ASINCRONA': False,
+    # El último acceso se escribe en el momento (las pruebas de consultas lo cuentan)
+    'ACCESOS_ASINCRONOS': False,
+    # Superar un presupuesto de PRESUPUESTOS_ENDPOINTS hace fallar la petición en vez de solo avisar
+    'METRICAS_PRESUPUESTO_ESTRICTO': True,
+    # Los reportes pesados se generan en la misma petición, sin el pool de procesos
+    'REPORTES_TRABAJOS_ASINCRONOS': False,
+}
+
+
+class EjecutorPruebas(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._ajustes_pruebas = override_settings(**AJUSTES_PRUEBAS)
+        self._ajustes_pruebas.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._ajustes_pruebas.disable()
+        super().teardown_test_environment(**kwargs)
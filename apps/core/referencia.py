@@ -0,0 +1,151 @@
+"""
+Datos de referencia (catálogos, ODS, PND, períodos): casi no cambian y el frontend los pide en
+cada formulario. Cada conjunto tiene una versión que crece con cada escritura sobre sus modelos
+(VersionDatosReferencia); el JSON de la versión vigente se guarda ya serializado y comprimido en
+memoria del proceso, y las peticiones condicionales se responden con 304 sin consultar la base.
+"""
+import gzip
+import threading
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from .models import VersionDatosReferencia
+
+CLAVE_CACHE = 'referencia:versiones'
+
+Serializado = namedtuple('Serializado', ['version', 'modificado', 'cuerpo', 'comprimido'])
+
+
+def _catalogos():
+    from apps.institutional_config.models import Catalogo
+    from apps.institutional_config.serializers import CatalogoSerializer
+    return CatalogoSerializer(Catalogo.objects.prefetch_related('items').order_by('pk'), many=True).data
+
+
+def _ods():
+    from apps.strategic_objectives.models import ObjetivoDesarrolloSostenible
+    from apps.strategic_objectives.serializers import ObjetivoDesarrolloSostenibleSerializer
+    consulta = ObjetivoDesarrolloSostenible.objects.prefetch_related('metas__indicadores').order_by('numero')
+    return ObjetivoDesarrolloSostenibleSerializer(consulta, many=True).data
+
+
+def _pnd():
+    from apps.strategic_objectives.models import PlanNacionalDesarrollo
+    from apps.strategic_objectives.serializers import PlanNacionalDesarrolloSerializer
+    consulta = PlanNacionalDesarrollo.objects.select_related('periodo') \
+        .prefetch_related('objetivos__politicas__metas__indicadores').order_by('pk')
+    return PlanNacionalDesarrolloSerializer(consulta, many=True).data
+
+
+def _periodos():
+    from apps.institutional_config.models import PeriodoPlanificacion
+    from apps.institutional_config.serializers import PeriodoPlanificacionSerializer
+    return PeriodoPlanificacionSerializer(PeriodoPlanificacion.objects.order_by('fecha_inicio', 'pk'), many=True).data
+
+
+# conjunto -> (modelos cuyas escrituras cambian su versión, función que arma los datos)
+CONJUNTOS = {
+    'catalogos': (('institutional_config.Catalogo', 'institutional_config.ItemCatalogo'), _catalogos),
+    'ods': (('strategic_objectives.ObjetivoDesarrolloSostenible', 'strategic_objectives.MetaODS',
+             'strategic_objectives.IndicadorODS'), _ods),
+    'pnd': (('strategic_objectives.PlanNacionalDesarrollo', 'strategic_objectives.ObjetivoPND',
+             'strategic_objectives.PoliticaPND', 'strategic_objectives.MetaPND', 'strategic_objectives.IndicadorPND',
+             'institutional_config.PeriodoPlanificacion'), _pnd),
+    'periodos': (('institutional_config.PeriodoPlanificacion',), _periodos),
+}
+
+
+class DatosReferencia:
+    """
+    Versiones y JSON serializado de los conjuntos de referencia.
+
+    Las versiones se leen de la caché de Django (una consulta para todos los conjuntos cuando
+    expira); las escrituras la borran, así que con un backend compartido el cambio se ve enseguida
+    en todos los workers y con LocMemCache, como mucho tras REFERENCIA_VERSIONES_SEGUNDOS. Los
+    cuerpos (JSON y gzip) se arman una vez por versión y quedan en memoria del proceso.
+
+    bulk_create/bulk_update y QuerySet.update no disparan señales: quien los use sobre estos
+    modelos debe llamar a incrementar() (ver import_ods y generar_datos_sinteticos).
+    """
+    def __init__(self):
+        self._candado = threading.Lock()
+        self._serializados = {}
+
+    def conjuntos(self):
+        return list(CONJUNTOS)
+
+    def conjuntos_de(self, modelo):
+        """Conjuntos que dependen de un modelo."""
+        etiqueta = modelo._meta.label
+        return [nombre for nombre, (modelos, _) in CONJUNTOS.items() if etiqueta in modelos]
+
+    def modelos(self):
+        return sorted({etiqueta for modelos, _ in CONJUNTOS.values() for etiqueta in modelos})
+
+    def versiones(self):
+        """{conjunto: (version, modificado)}."""
+        versiones = cache.get(CLAVE_CACHE)
+        if versiones is None:
+            filas = {fila.conjunto: fila for fila in VersionDatosReferencia.objects.filter(conjunto__in=CONJUNTOS)}
+            faltantes = [nombre for nombre in CONJUNTOS if nombre not in filas]
+            if faltantes:
+                ahora = timezone.now()
+                VersionDatosReferencia.objects.bulk_create(
+                    [VersionDatosReferencia(conjunto=nombre, modificado=ahora) for nombre in faltantes],
+                    ignore_conflicts=True
+                )
+                filas = {fila.conjunto: fila for fila in VersionDatosReferencia.objects.filter(conjunto__in=CONJUNTOS)}
+            versiones = {nombre: (fila.version, fila.modificado) for nombre, fila in filas.items()}
+            cache.set(CLAVE_CACHE, versiones, getattr(settings, 'REFERENCIA_VERSIONES_SEGUNDOS', 60))
+        return versiones
+
+    def version(self, conjunto):
+        return self.versiones()[conjunto]
+
+    def incrementar(self, *conjuntos):
+        """Sube la versión de los conjuntos dados (dentro de la transacción en curso, si la hay)."""
+        ahora = timezone.now()
+        for conjunto in conjuntos:
+            filas = VersionDatosReferencia.objects.filter(conjunto=conjunto)
+            if not filas.update(version=F('version') + 1, modificado=ahora):
+                _, creada = VersionDatosReferencia.objects.get_or_create(conjunto=conjunto, defaults={'modificado': ahora})
+                if not creada:
+                    filas.update(version=F('version') + 1, modificado=ahora)
+        # Se borra ya (este proceso) y al confirmar, por si otra petición la volvió a llenar con la anterior
+        cache.delete(CLAVE_CACHE)
+        transaction.on_commit(lambda: cache.delete(CLAVE_CACHE))
+
+    def al_escribir(self, sender, **kwargs):
+        """Receptor de post_save/post_delete de los modelos de referencia (ver AppsConfig.ready)."""
+        conjuntos = self.conjuntos_de(sender)
+        if conjuntos:
+            self.incrementar(*conjuntos)
+
+    def serializado(self, conjunto):
+        """Serializado de la versión vigente; se arma solo si la versión cambió."""
+        version, modificado = self.version(conjunto)
+        actual = self._serializados.get(conjunto)
+        if actual is not None and actual.version == version:
+            return actual
+        with self._candado:
+            actual = self._serializados.get(conjunto)
+            if actual is None or actual.version != version:
+                # La versión se leyó antes que los datos: a lo sumo se sirven datos más nuevos que ella
+                cuerpo = JSONRenderer().render(CONJUNTOS[conjunto][1]())
+                actual = Serializado(version, modificado, cuerpo, gzip.compress(cuerpo, mtime=0))
+                self._serializados[conjunto] = actual
+            return actual
+
+    def invalidar(self, **kwargs):
+        """Descarta versiones y cuerpos en memoria (no cambia las versiones guardadas)."""
+        cache.delete(CLAVE_CACHE)
+        self._serializados = {}
+
+
+datos_referencia = DatosReferencia()
@@ -0,0 +1,89 @@
+from django.db.models import Prefetch
+from rest_framework.permissions import SAFE_METHODS
+
+
+def campos_solicitados(request):
+    """Campos pedidos con ?fields= en una petición de lectura, o None si se piden todos."""
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    campos = request.query_params.get('fields')
+    if not campos:
+        return None
+    return {campo.strip() for campo in campos.split(',') if campo.strip()}
+
+
+class CamposDinamicosMixin:
+    """
+    Permite pedir solo algunos campos con ?fields=campo1,campo2 (sparse fieldsets).
+
+    Los campos no solicitados se quitan antes de serializar, así que sus
+    SerializerMethodField y relaciones anidadas nunca se evalúan. Solo se recorta el
+    serializer de la vista (get_serializer_class) en peticiones de lectura: si la misma
+    clase aparece anidada en otro serializer, o la usa otra vista con el request en el
+    contexto, conserva todos sus campos. Las escrituras tampoco se recortan.
+
+    relaciones_campos indica, para campos cuyo source no es la relación que leen (p. ej.
+    SerializerMethodField), qué relaciones precargadas necesitan; ConsultaCamposDinamicosMixin
+    lo usa para no precargar las de campos no solicitados.
+    """
+    relaciones_campos = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        view = self.context.get('view')
+        if view is None or type(self) is not view.get_serializer_class():
+            return
+        solicitados = campos_solicitados(self.context.get('request'))
+        if solicitados is None:
+            return
+        for nombre in set(self.fields) - solicitados:
+            self.fields.pop(nombre)
+
+    @classmethod
+    def relaciones_excluidas(cls, solicitados):
+        """Relaciones (primer tramo del source) que solo leen campos no solicitados."""
+        necesarias, excluidas = set(), set()
+        for nombre, campo in cls().fields.items():
+            relaciones = set(campo.source_attrs[:1]) | set(cls.relaciones_campos.get(nombre, ()))
+            (necesarias if nombre in solicitados else excluidas).update(relaciones)
+        return excluidas - necesarias
+
+
+class ConsultaCamposDinamicosMixin:
+    """
+    Mixin para vistas cuyo serializer usa CamposDinamicosMixin: con ?fields= quita del queryset
+    los select_related y prefetch_related de relaciones que solo leen campos no solicitados.
+    Las búsquedas que no corresponden a ningún campo se conservan.
+    """
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        solicitados = campos_solicitados(self.request)
+        if solicitados is None:
+            return queryset
+        excluidas = self.get_serializer_class().relaciones_excluidas(solicitados)
+        if not excluidas:
+            return queryset
+
+        def raiz(busqueda):
+            ruta = busqueda.prefetch_through if isinstance(busqueda, Prefetch) else busqueda
+            return ruta.split('__')[0]
+
+        precargas = queryset._prefetch_related_lookups
+        conservadas = [busqueda for busqueda in precargas if raiz(busqueda) not in excluidas]
+        if len(conservadas) != len(precargas):
+            queryset = queryset.prefetch_related(None).prefetch_related(*conservadas)
+
+        relacionadas = queryset.query.select_related
+        if isinstance(relacionadas, dict) and excluidas & set(relacionadas):
+            rutas = []
+            pendientes = [(nombre, hijos) for nombre, hijos in relacionadas.items() if nombre not in excluidas]
+            while pendientes:
+                ruta, hijos = pendientes.pop()
+                if hijos:
+                    pendientes.extend((f'{ruta}__{nombre}', nietos) for nombre, nietos in hijos.items())
+                else:
+                    rutas.append(ruta)
+            queryset = queryset.select_related(None)
+            if rutas:
+                queryset = queryset.select_related(*rutas)
+        return queryset
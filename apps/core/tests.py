@@ -1,3 +1,362 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import tempfile
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from apps.audit.models import AuditEvent
+from apps.authentication.models import Usuario, RegistroAuditoria
+from apps.core.tipos_contenido import tipos_contenido
+from apps.core.metricas import registro_metricas, PresupuestoExcedido
+from apps.core.benchmark import comparar
+from apps.core.parches import calcular_parche, aplicar_parche
+from apps.core.referencia import datos_referencia
+from apps.core.masivo import crear_en_lote
+from apps.core.busqueda import indice_busqueda
+from apps.core.models import DocumentoBusqueda
+from apps.institutional_config.models import Catalogo, ItemCatalogo, Entidad
+from apps.investment_projects.models import ProyectoInversion, CronogramaValorado, ResumenFinancieroProyecto
+from apps.strategic_objectives.models import ObjetivoDesarrolloSostenible, MetaODS, IndicadorODS
+
+
+class PaginacionOpcionalTests(APITestCase):
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user(nombre_usuario="auditor", password="Clave123!")
+        self.client.force_authenticate(user=self.usuario)
+        ct = ContentType.objects.get_for_model(Usuario)
+        for i in range(7):
+            AuditEvent.objects.create(
+                user=self.usuario, event_type=f'EVENTO_{i}', details={'i': i},
+                content_type=ct, object_id=self.usuario.pk
+            )
+            RegistroAuditoria.objects.create(usuario=self.usuario, accion=f'Accion {i}')
+
+    def test_sin_parametros_devuelve_lista_completa(self):
+        response = self.client.get(reverse('auditevent-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsInstance(response.data, list)
+        self.assertEqual(len(response.data), 7)
+
+    def test_paginacion_numerada(self):
+        response = self.client.get(reverse('auditevent-list'), {'page_size': 3, 'page': 3})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 7)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIsNone(response.data['next'])
+
+    def test_paginacion_por_cursor_recorre_todo_sin_repetir(self):
+        vistos = []
+        url = reverse('registroauditoria-list') + '?cursor=&page_size=3'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            vistos.extend(registro['registro_id'] for registro in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(len(vistos), len(set(vistos)))
+        self.assertCountEqual(vistos, RegistroAuditoria.objects.values_list('registro_id', flat=True))
+
+    def test_campos_dispersos(self):
+        response = self.client.get(reverse('auditevent-list'), {'fields': 'id,event_type'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data[0]), {'id', 'event_type'})
+
+    def test_campos_dispersos_sin_usuario_no_lo_une(self):
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse('auditevent-list'), {'fields': 'id,event_type'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        sql = ' '.join(consulta['sql'] for consulta in consultas)
+        self.assertNotIn(Usuario._meta.db_table, sql)
+        self.assertIn(Usuario._meta.db_table, str(AuditEvent.objects.select_related('user').query))
+
+
+class RegistroTiposContenidoTests(APITestCase):
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user(nombre_usuario="consulta", password="Clave123!")
+        self.client.force_authenticate(user=self.usuario)
+        tipos_contenido.invalidar()
+
+    def test_resuelve_sin_consultas_despues_de_cargar(self):
+        esperado = ContentType.objects.get_for_model(Usuario)
+        tipos_contenido.todos()
+        with self.assertNumQueries(0):
+            self.assertEqual(tipos_contenido.tipo(Usuario), esperado)
+            self.assertEqual(tipos_contenido.id_de(self.usuario), esperado.pk)
+            self.assertEqual(tipos_contenido.por_id(esperado.pk), esperado)
+            self.assertEqual(tipos_contenido.por_nombre(esperado.model), esperado)
+            self.assertEqual(tipos_contenido.por_nombre(f'{esperado.app_label}.{esperado.model}'), esperado)
+            self.assertIsNone(tipos_contenido.por_nombre('noexiste'))
+
+    def test_se_invalida_al_crear_content_type(self):
+        etag = tipos_contenido.etag()
+        nuevo = ContentType.objects.create(app_label='pruebas', model='temporal')
+        self.assertEqual(tipos_contenido.por_id(nuevo.pk), nuevo)
+        self.assertNotEqual(tipos_contenido.etag(), etag)
+
+    def test_content_type_responde_304_con_etag_vigente(self):
+        url = reverse('content-type')
+        response = self.client.get(url, {'model': 'usuario'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['id'], ContentType.objects.get_for_model(Usuario).pk)
+
+        response = self.client.get(url, {'model': 'usuario'}, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_lista_de_content_types_filtrada(self):
+        response = self.client.get(reverse('content-type-list'), {'models': 'usuario,auditevent,noexiste'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual({tipo['model'] for tipo in response.data}, {'usuario', 'auditevent'})
+
+
+class MetricasTests(APITestCase):
+    def setUp(self):
+        registro_metricas.reiniciar()
+        self.usuario = Usuario.objects.create_user(nombre_usuario="operador", password="Clave123!", is_staff=True)
+        self.client.force_authenticate(user=self.usuario)
+
+    def test_agrega_por_endpoint_del_router(self):
+        self.client.get(reverse('auditevent-list'))
+        self.client.get(reverse('auditevent-list'))
+        response = self.client.get(reverse('metricas'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        datos = response.data['auditevent-list']
+        self.assertEqual(datos['peticiones'], 2)
+        self.assertEqual(datos['vista'], 'AuditEventViewSet')
+        self.assertEqual(datos['accion'], 'list')
+        self.assertGreater(datos['consultas_total'], 0)
+        self.assertGreater(datos['bytes_total'], 0)
+        self.assertEqual(datos['presupuesto'], {'consultas': 8})
+
+    def test_formato_prometheus(self):
+        self.client.get(reverse('rol-list'))
+        response = self.client.get(reverse('metricas-prometheus'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertIn('sipeip_peticiones_total{endpoint="rol-list",vista="RolViewSet",accion="list"} 1',
+                      response.content.decode())
+
+    @override_settings(PRESUPUESTOS_ENDPOINTS={'rol-list': 0})
+    def test_presupuesto_excedido_falla_en_modo_estricto(self):
+        with self.assertRaises(PresupuestoExcedido):
+            self.client.get(reverse('rol-list'))
+
+    @override_settings(PRESUPUESTOS_ENDPOINTS={'rol-list': 0}, METRICAS_PRESUPUESTO_ESTRICTO=False)
+    def test_presupuesto_excedido_avisa_en_el_log(self):
+        with self.assertLogs('apps.core.metricas', level='WARNING'):
+            response = self.client.get(reverse('rol-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(registro_metricas.resumen()['rol-list']['presupuesto_excedido'], 1)
+
+    def test_solo_administradores(self):
+        self.client.force_authenticate(user=Usuario.objects.create_user(nombre_usuario="otro", password="Clave123!"))
+        self.assertEqual(self.client.get(reverse('metricas')).status_code, status.HTTP_403_FORBIDDEN)
+
+
+class BenchmarkTests(TestCase):
+    def test_genera_datos_y_mide_escenarios(self):
+        call_command('generar_datos_sinteticos', proyectos=4, entidades=2, meses=2, eventos=2, stdout=io.StringIO())
+        self.assertEqual(ProyectoInversion.objects.count(), 4)
+        self.assertEqual(ResumenFinancieroProyecto.objects.verificar(), [])
+        self.assertTrue(CronogramaValorado.objects.exists())
+
+        with tempfile.TemporaryDirectory() as directorio:
+            salida = Path(directorio) / 'resultado.json'
+            call_command('benchmark_api', iteraciones=1, calentamiento=0, salida=str(salida),
+                         escenario=['proyectos-lista', 'auditoria-eventos'], stdout=io.StringIO())
+            resultado = json.loads(salida.read_text(encoding='utf-8'))
+        self.assertEqual(set(resultado['escenarios']), {'proyectos-lista', 'auditoria-eventos'})
+        for medicion in resultado['escenarios'].values():
+            self.assertEqual(medicion['errores'], [])
+            self.assertGreater(medicion['consultas'], 0)
+
+    def test_comparar_marca_regresiones(self):
+        base = {'escenarios': {'a': {'p95_ms': 100.0, 'consultas': 5}, 'b': {'p95_ms': 100.0, 'consultas': 5}}}
+        actual = {'escenarios': {'a': {'p95_ms': 110.0, 'consultas': 5}, 'b': {'p95_ms': 90.0, 'consultas': 6}}}
+        filas = {fila['escenario']: fila for fila in comparar(base, actual, tolerancia=0.2)}
+        self.assertFalse(filas['a']['regresion'])
+        self.assertTrue(filas['b']['regresion'])
+
+
+class ParchesTests(TestCase):
+    def test_ida_y_vuelta(self):
+        casos = [
+            ({'a': 1, 'b': [1, 2, 3], 'c': {'d': 'x'}}, {'a': 2, 'b': [1, 3], 'c': {'d': 'x', 'e/f': None}, 'g~': []}),
+            ([{'id': 1}, {'id': 2}], [{'id': 1, 'n': 'a'}]),
+            ({'a': [1]}, {'a': {'b': 1}}),
+            ({'a': 1}, ['otro', 'tipo']),
+        ]
+        for anterior, nuevo in casos:
+            with self.subTest(anterior=anterior):
+                self.assertEqual(aplicar_parche(anterior, calcular_parche(anterior, nuevo)), nuevo)
+                self.assertEqual(aplicar_parche(nuevo, calcular_parche(nuevo, anterior)), anterior)
+
+    def test_documentos_iguales_no_generan_operaciones(self):
+        self.assertEqual(calcular_parche({'a': [1, {'b': 2}]}, {'a': [1, {'b': 2}]}), [])
+
+
+class CrearEnLoteTests(TestCase):
+    def test_sin_ids_devueltos_los_lee_por_la_clave(self):
+        Catalogo.objects.create(nombre='Existente', codigo='EXISTENTE')
+        catalogos = [Catalogo(nombre=f'Catálogo {i}', codigo=f'C{i}') for i in range(5)]
+        with mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert',
+                               new_callable=mock.PropertyMock, return_value=False):
+            crear_en_lote(Catalogo, catalogos, 2, clave=('codigo',))
+        self.assertEqual([catalogo.pk for catalogo in catalogos],
+                         [Catalogo.objects.get(codigo=f'C{i}').pk for i in range(5)])
+
+
+class DatosReferenciaTests(APITestCase):
+    def setUp(self):
+        datos_referencia.invalidar()
+        self.addCleanup(datos_referencia.invalidar)
+        self.usuario = Usuario.objects.create_user(nombre_usuario="lector", password="Clave123!")
+        self.client.force_authenticate(user=self.usuario)
+        self.catalogo = Catalogo.objects.create(nombre="Sectores", codigo="SECTORES")
+        padre = ItemCatalogo.objects.create(catalogo=self.catalogo, nombre="Social")
+        ItemCatalogo.objects.create(catalogo=self.catalogo, nombre="Salud", padre=padre)
+        self.url = reverse('datos-referencia', args=['catalogos'])
+
+    def test_responde_el_conjunto_con_etag_y_304_sin_consultas(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        datos = json.loads(response.content)
+        self.assertEqual(datos[0]['items'][0]['hijos'][0]['nombre'], 'Salud')
+        etag = response['ETag']
+        self.assertRegex(etag, r'^"catalogos-v\d+"$')
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        # Mientras la versión no cambie, el cuerpo no se vuelve a serializar
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+
+    def test_una_escritura_sube_la_version(self):
+        etag = self.client.get(self.url)['ETag']
+        ItemCatalogo.objects.create(catalogo=self.catalogo, nombre="Educación")
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(json.loads(response.content)[0]['items']), 2)
+        # Los demás conjuntos no cambian
+        versiones = {fila['conjunto']: fila['version'] for fila in self.client.get(reverse('datos-referencia-indice')).data}
+        self.assertEqual(versiones['ods'], 1)
+
+    def test_cuerpo_comprimido(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertTrue(response['ETag'].endswith('-gzip"'))
+        self.assertEqual(json.loads(gzip.decompress(response.content))[0]['codigo'], 'SECTORES')
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_indice_enlaza_todos_los_conjuntos(self):
+        indice = self.client.get(reverse('datos-referencia-indice')).data
+        self.assertEqual([fila['conjunto'] for fila in indice], ['catalogos', 'ods', 'periodos', 'pnd'])
+        for fila in indice:
+            response = self.client.get(fila['url'])
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response['ETag'], f'"{fila["conjunto"]}-v{fila["version"]}"')
+
+    def test_conjunto_inexistente(self):
+        self.assertEqual(self.client.get(reverse('datos-referencia', args=['otro'])).status_code,
+                         status.HTTP_404_NOT_FOUND)
+
+
+class BusquedaTests(APITestCase):
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user(nombre_usuario="buscador", password="Clave123!")
+        self.client.force_authenticate(user=self.usuario)
+        catalogo = Catalogo.objects.create(nombre="Tipos", codigo="TIPOS")
+        item = ItemCatalogo.objects.create(catalogo=catalogo, nombre="Item")
+        entidad = Entidad.objects.create(nombre="Entidad", codigo_unico="ENT")
+        self.proyecto = lambda nombre: ProyectoInversion.objects.create(
+            nombre=nombre, entidad_ejecutora=entidad, tipo_proyecto=item, tipologia_proyecto=item, sector=item
+        )
+        self.agua = self.proyecto("Agua potable para comunidades rurales")
+        self.proyecto("Construcción de la unidad educativa del milenio")
+        ods = ObjetivoDesarrolloSostenible.objects.create(numero=6, nombre="Agua", descripcion="Agua limpia")
+        meta = MetaODS.objects.create(ods=ods, codigo="6.1", descripcion="Acceso universal al agua potable")
+        self.indicador = IndicadorODS.objects.create(
+            meta_ods=meta, codigo="6.1.1", descripcion="Proporción de la población que utiliza servicios de agua potable"
+        )
+
+    def buscar(self, **parametros):
+        response = self.client.get(reverse('busqueda'), parametros)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return response.data
+
+    def test_sin_tildes_ni_plurales(self):
+        datos = self.buscar(q='EDUCATIVAS construccion')
+        self.assertEqual(datos['count'], 1)
+        self.assertEqual(datos['results'][0]['titulo'], "Construcción de la unidad educativa del milenio")
+
+    def test_resultados_ordenados_y_filtrados_por_tipo(self):
+        datos = self.buscar(q='agua potable rural')
+        self.assertEqual([(r['tipo'], r['id']) for r in datos['results']][0], ('proyecto', self.agua.pk))
+        self.assertEqual(datos['count'], 3)
+        puntajes = [r['puntaje'] for r in datos['results']]
+        self.assertEqual(puntajes, sorted(puntajes, reverse=True))
+
+        datos = self.buscar(q='agua', tipo='indicador_ods', page_size=1)
+        self.assertEqual([r['id'] for r in datos['results']], [self.indicador.pk])
+        self.assertEqual(datos['results'][0]['titulo'], 'Indicador ODS 6.1.1')
+
+    def test_ultima_palabra_como_prefijo(self):
+        self.assertEqual(self.buscar(q='poblac')['results'][0]['id'], self.indicador.pk)
+
+    def test_expansiones_no_desplazan_terminos_exactos(self):
+        self.proyecto("Generador de potencia")
+        with mock.patch('apps.core.busqueda.MAXIMO_EXPANSION', 0):
+            frecuencias = indice_busqueda.terminos_consulta('rurales pot')
+        # 'rural' está en un solo documento y 'potabl' en tres: se conserva el término y la expansión más rara
+        self.assertEqual(frecuencias, {'rural': 1, 'potencia': 1})
+
+    def test_alta_concurrente_del_mismo_documento(self):
+        ProyectoInversion.objects.filter(pk=self.agua.pk).update(nombre="Riego tecnificado")
+        self.agua.refresh_from_db()
+        primero, lecturas = QuerySet.first, []
+
+        def first(consulta):
+            # Las dos primeras lecturas no ven el documento, como si otro proceso lo creara a la vez
+            lecturas.append(consulta)
+            return None if len(lecturas) <= 2 else primero(consulta)
+
+        with mock.patch.object(QuerySet, 'first', first):
+            indice_busqueda.indexar(self.agua)
+        self.assertEqual(DocumentoBusqueda.objects.filter(tipo='proyecto', objeto_id=self.agua.pk).count(), 1)
+        self.assertEqual(self.buscar(q='riego')['count'], 1)
+
+    def test_el_indice_sigue_a_las_escrituras(self):
+        self.agua.nombre = "Alcantarillado sanitario"
+        self.agua.save()
+        self.assertEqual(self.buscar(q='alcantarillado')['count'], 1)
+        self.assertEqual(self.buscar(q='potable', tipo='proyecto')['count'], 0)
+        self.indicador.delete()
+        self.assertEqual(self.buscar(q='poblacion')['count'], 0)
+
+        # bulk_create no emite señales: el comando sincroniza lo que falte
+        IndicadorODS.objects.bulk_create([IndicadorODS(meta_ods=self.indicador.meta_ods, codigo="6.1.2", descripcion="Saneamiento")])
+        call_command('reconstruir_indice_busqueda', tipo=['indicador_ods'], stdout=io.StringIO())
+        self.assertEqual(self.buscar(q='saneamiento')['count'], 1)
+
+    def test_consulta_vacia(self):
+        response = self.client.get(reverse('busqueda'), {'q': 'de la'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(reverse('busqueda'), {'q': 'agua', 'tipo': 'otro'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
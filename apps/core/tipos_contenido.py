@@ -0,0 +1,79 @@
+import hashlib
+import threading
+
+from django.contrib.contenttypes.models import ContentType
+
+
+class RegistroTiposContenido:
+    """
+    Registro en memoria de todos los ContentType del proyecto.
+
+    Se carga con una sola consulta la primera vez que se usa y queda caliente durante la vida
+    del proceso; se invalida al migrar o al guardar/borrar un ContentType (ver AppsConfig.ready).
+    Reemplaza las llamadas sueltas a ContentType.objects.get_for_model/get/filter, de modo que
+    resolver tipos de contenido en una petición no consulta la base.
+    """
+    def __init__(self):
+        self._candado = threading.Lock()
+        self._datos = None
+
+    def _cargar(self):
+        datos = self._datos
+        if datos is not None:
+            return datos
+        with self._candado:
+            if self._datos is None:
+                tipos = sorted(ContentType.objects.all(), key=lambda ct: ct.pk)
+                por_modelo = {}
+                for ct in tipos:
+                    por_modelo.setdefault(ct.model, ct)
+                huella = '|'.join(f'{ct.pk}:{ct.app_label}.{ct.model}' for ct in tipos)
+                self._datos = {
+                    'por_id': {ct.pk: ct for ct in tipos},
+                    'por_clave': {(ct.app_label, ct.model): ct for ct in tipos},
+                    'por_modelo': por_modelo,
+                    'etag': hashlib.sha1(huella.encode('utf-8')).hexdigest(),
+                }
+            return self._datos
+
+    def invalidar(self, **kwargs):
+        self._datos = None
+
+    def tipo(self, modelo):
+        """ContentType de un modelo o instancia (modelo concreto, como get_for_model)."""
+        opciones = modelo._meta.concrete_model._meta
+        ct = self._cargar()['por_clave'].get((opciones.app_label, opciones.model_name))
+        if ct is None:
+            # Modelo sin ContentType aún (p. ej. recién migrado en otro proceso): se crea y se recarga
+            ct = ContentType.objects.get_for_model(modelo)
+            self.invalidar()
+        return ct
+
+    def id_de(self, modelo):
+        return self.tipo(modelo).pk
+
+    def por_id(self, content_type_id):
+        ct = self._cargar()['por_id'].get(int(content_type_id))
+        if ct is None:
+            raise ContentType.DoesNotExist(f'No existe el ContentType {content_type_id}.')
+        return ct
+
+    def por_nombre(self, nombre):
+        """Busca por nombre técnico del modelo ('objetivopnd') o por 'app_label.modelo'."""
+        nombre = nombre.lower()
+        if '.' in nombre:
+            return self._cargar()['por_clave'].get(tuple(nombre.split('.', 1)))
+        return self._cargar()['por_modelo'].get(nombre)
+
+    def todos(self):
+        return list(self._cargar()['por_id'].values())
+
+    def etag(self):
+        return self._cargar()['etag']
+
+
+tipos_contenido = RegistroTiposContenido()
+
+
+def serializar_tipo(ct):
+    return {'id': ct.pk, 'app_label': ct.app_label, 'model': ct.model, 'name': ct.name}
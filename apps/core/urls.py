@@ -0,0 +1,8 @@
+from django.urls import path
+
+from .views import MetricasView, MetricasPrometheusView
+
+urlpatterns = [
+    path('', MetricasView.as_view(), name='metricas'),
+    path('prometheus/', MetricasPrometheusView.as_view(), name='metricas-prometheus'),
+]
@@ -0,0 +1,7 @@
+from django.urls import path
+
+from .views import BusquedaView
+
+urlpatterns = [
+    path('', BusquedaView.as_view(), name='busqueda'),
+]
@@ -0,0 +1,8 @@
+from django.urls import path
+
+from .views import DatosReferenciaIndiceView, DatosReferenciaView
+
+urlpatterns = [
+    path('', DatosReferenciaIndiceView.as_view(), name='datos-referencia-indice'),
+    path('<str:conjunto>/', DatosReferenciaView.as_view(), name='datos-referencia'),
+]
@@ -0,0 +1,123 @@
+"""
+Historiales de versiones con fotos completas periódicas y parches JSON (apps.core.parches)
+entre ellas. Lo usan los historiales de proyectos y de planes institucionales.
+"""
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+
+from .parches import calcular_parche, aplicar_parche
+
+
+def campos_de(parche):
+    """Campos de primer nivel que toca un parche, en orden alfabético."""
+    return sorted({operacion['path'].split('/')[1] for operacion in parche if operacion['path']})
+
+
+class HistorialVersionesManager(models.Manager):
+    """
+    Manager para modelos de versión con los campos numero_version, usuario_responsable,
+    es_completa, datos y parche, y una FK `campo_padre` al objeto versionado.
+
+    Cada `setting_intervalo` versiones se guarda la foto completa (es_completa); las intermedias
+    guardan solo el parche respecto de la versión anterior. Reconstruir una versión cuesta a lo
+    sumo un intervalo de filas, leídas en una sola consulta.
+    """
+    campo_padre = None
+    setting_intervalo = None
+
+    def intervalo(self):
+        return getattr(settings, self.setting_intervalo, 10)
+
+    def del_padre(self, padre_id):
+        return self.filter(**{f'{self.campo_padre}_id': padre_id})
+
+    def registrar(self, padre, numero_version, datos, usuario=None):
+        """Guarda `datos` como versión `numero_version` de `padre` (completa o como parche)."""
+        anteriores = list(
+            self.del_padre(padre.pk).filter(numero_version__lt=numero_version)
+            .order_by('-numero_version')[:self.intervalo()]
+        )
+        completa = next((i for i, version in enumerate(anteriores) if version.es_completa), None)
+        anterior = None if completa is None else self._aplicar(list(reversed(anteriores[:completa + 1])))
+        version = self.model(numero_version=numero_version, usuario_responsable=usuario,
+                             **{self.campo_padre: padre})
+        if anterior is None or completa + 1 >= self.intervalo():
+            version.es_completa, version.datos = True, datos
+        else:
+            parche = calcular_parche(anterior, datos)
+            # Un parche más grande que la foto (p. ej. el objeto cambió casi entero) no ahorra nada
+            if len(json.dumps(parche, cls=DjangoJSONEncoder)) >= len(json.dumps(datos, cls=DjangoJSONEncoder)):
+                version.es_completa, version.datos = True, datos
+            else:
+                version.es_completa, version.parche = False, parche
+        self.antes_de_guardar(version, anterior, datos)
+        version.save()
+        return version
+
+    def antes_de_guardar(self, version, anterior, datos):
+        """Gancho para completar la versión; `anterior` son los datos de la versión previa o None."""
+
+    def reconstruir_varias(self, padre_id, numeros):
+        """{numero_version: datos} de las versiones pedidas que existan, con una sola lectura de la cadena."""
+        numeros = set(numeros)
+        base = self.del_padre(padre_id).filter(numero_version__lte=min(numeros), es_completa=True) \
+            .order_by('-numero_version').values_list('numero_version', flat=True).first()
+        if base is None:
+            return {}
+        cadena = self.del_padre(padre_id).filter(
+            numero_version__gte=base, numero_version__lte=max(numeros)
+        ).order_by('numero_version', 'pk')
+        resultado, datos = {}, None
+        for version in cadena:
+            datos = version.datos if version.es_completa else aplicar_parche(datos, version.parche)
+            if version.numero_version in numeros:
+                resultado[version.numero_version] = datos
+        return resultado
+
+    def reconstruir(self, padre_id, numero_version):
+        """Datos completos de una versión; None si no existe."""
+        return self.reconstruir_varias(padre_id, [numero_version]).get(numero_version)
+
+    def diferencias(self, padre_id, desde, hasta):
+        """Parche entre dos versiones, o None si alguna no existe."""
+        datos = self.reconstruir_varias(padre_id, [desde, hasta])
+        if desde not in datos or hasta not in datos:
+            return None
+        return calcular_parche(datos[desde], datos[hasta])
+
+    def compactar(self, padre_id, intervalo=None):
+        """
+        Reescribe el historial de un objeto con el esquema actual (fotos cada `intervalo`
+        versiones y parches entre ellas). Devuelve (versiones, fotos completas).
+        """
+        intervalo = intervalo or self.intervalo()
+        versiones = list(self.del_padre(padre_id).order_by('numero_version', 'pk'))
+        datos, completas, cambiadas = None, 0, []
+        for posicion, version in enumerate(versiones):
+            anterior = datos
+            actuales = version.datos if version.es_completa else aplicar_parche(datos, version.parche)
+            if posicion % intervalo == 0:
+                version.es_completa, version.datos, version.parche = True, actuales, None
+                completas += 1
+            else:
+                version.es_completa, version.datos, version.parche = False, None, calcular_parche(datos, actuales)
+            self.antes_de_guardar(version, anterior, actuales)
+            cambiadas.append(version)
+            datos = actuales
+        with transaction.atomic():
+            self.bulk_update(cambiadas, self.campos_compactados(), batch_size=200)
+        return len(versiones), completas
+
+    def campos_compactados(self):
+        return ['es_completa', 'datos', 'parche']
+
+    @staticmethod
+    def _aplicar(cadena):
+        """cadena: una versión completa seguida de sus parches en orden."""
+        datos = cadena[0].datos
+        for version in cadena[1:]:
+            datos = aplicar_parche(datos, version.parche)
+        return datos
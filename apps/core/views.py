@@ -1,3 +1,129 @@
-from django.shortcuts import render
+from django.http import Http404, HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework import generics, views, response, status
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.reverse import reverse
 
-# Create your views here.
+from apps.authentication.permissions import IsAdmin
+from .busqueda import indice_busqueda, tokenizar
+from .metricas import registro_metricas
+from .pagination import PaginacionNumerada
+from .referencia import datos_referencia
+
+
+class MetricasView(views.APIView):
+    """
+    Métricas por endpoint acumuladas por MetricasMiddleware en este proceso.
+    GET devuelve el resumen en JSON; DELETE las reinicia.
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser | IsAdmin]
+
+    def get(self, request, *args, **kwargs):
+        return response.Response(registro_metricas.resumen())
+
+    def delete(self, request, *args, **kwargs):
+        registro_metricas.reiniciar()
+        return response.Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class MetricasPrometheusView(views.APIView):
+    """Las mismas métricas en el formato de texto que lee Prometheus."""
+    permission_classes = [IsAuthenticated, IsAdminUser | IsAdmin]
+
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(registro_metricas.prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def _acepta_gzip(request):
+    for parte in request.headers.get('Accept-Encoding', '').split(','):
+        nombre, _, parametros = parte.strip().partition(';')
+        if nombre.strip().lower() in ('gzip', '*'):
+            calidad = parametros.strip().removeprefix('q=')
+            try:
+                return float(calidad or 1) > 0
+            except ValueError:
+                return True
+    return False
+
+
+def _no_modificado(request, etags, modificado):
+    """Si el cliente ya tiene la versión: If-None-Match o, si no lo envía, If-Modified-Since."""
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match:
+        enviados = {valor.strip().removeprefix('W/') for valor in if_none_match.split(',')}
+        return '*' in enviados or bool(enviados & set(etags))
+    desde = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    return desde is not None and int(modificado.timestamp()) <= desde
+
+
+class DatosReferenciaIndiceView(views.APIView):
+    """Conjuntos de datos de referencia con su versión vigente."""
+
+    def get(self, request, *args, **kwargs):
+        return response.Response([
+            {
+                'conjunto': conjunto, 'version': version, 'modificado': modificado,
+                'url': reverse('datos-referencia', args=[conjunto], request=request),
+            }
+            for conjunto, (version, modificado) in sorted(datos_referencia.versiones().items())
+        ])
+
+
+class DatosReferenciaView(views.APIView):
+    """
+    JSON completo de un conjunto de referencia (apps/core/referencia.py), ya serializado y, si el
+    cliente lo acepta, comprimido. El ETag es fuerte y cambia con la versión del conjunto (uno por
+    codificación); con If-None-Match o If-Modified-Since vigentes se responde 304 sin consultar la base.
+    """
+
+    def get(self, request, conjunto, *args, **kwargs):
+        if conjunto not in datos_referencia.conjuntos():
+            raise Http404
+        comprimir = _acepta_gzip(request)
+        version, modificado = datos_referencia.version(conjunto)
+        if _no_modificado(request, self.etags(conjunto, version), modificado):
+            respuesta = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            serializado = datos_referencia.serializado(conjunto)
+            version, modificado = serializado.version, serializado.modificado
+            respuesta = HttpResponse(serializado.comprimido if comprimir else serializado.cuerpo,
+                                     content_type='application/json')
+            if comprimir:
+                respuesta['Content-Encoding'] = 'gzip'
+            respuesta['Content-Length'] = len(respuesta.content)
+        respuesta['ETag'] = self.etags(conjunto, version)[comprimir]
+        respuesta['Last-Modified'] = http_date(modificado.timestamp())
+        respuesta['Cache-Control'] = 'private, no-cache'
+        respuesta['X-Version-Datos'] = version
+        patch_vary_headers(respuesta, ['Accept-Encoding'])
+        return respuesta
+
+    @staticmethod
+    def etags(conjunto, version):
+        """(sin comprimir, gzip): cada codificación es una representación distinta."""
+        return f'"{conjunto}-v{version}"', f'"{conjunto}-v{version}-gzip"'
+
+
+class BusquedaView(generics.GenericAPIView):
+    """
+    Búsqueda de texto en proyectos, planes, OEI y objetivos/metas/indicadores PND y ODS
+    (apps/core/busqueda.py). ?q= el texto (sin distinguir tildes ni mayúsculas), ?tipo= uno o
+    varios tipos separados por comas. Los resultados van del más al menos relevante, paginados
+    con ?page= y ?page_size=.
+    """
+    pagination_class = PaginacionNumerada
+
+    def get(self, request, *args, **kwargs):
+        consulta = request.query_params.get('q', '')
+        if not tokenizar(consulta):
+            return response.Response({'error': 'Indique el texto a buscar en ?q=.'}, status=status.HTTP_400_BAD_REQUEST)
+        tipos = [tipo.strip() for tipo in request.query_params.get('tipo', '').split(',') if tipo.strip()]
+        desconocidos = sorted(set(tipos) - set(indice_busqueda.tipos()))
+        if desconocidos:
+            return response.Response(
+                {'error': f"Tipos desconocidos: {', '.join(desconocidos)}. Válidos: {', '.join(indice_busqueda.tipos())}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        filas = self.paginate_queryset(indice_busqueda.buscar(consulta, tipos))
+        return self.get_paginated_response(indice_busqueda.documentos(filas))
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from apps.institutional_config.models import ItemCatalogo, UnidadOrganizacional
+
+
+class Command(BaseCommand):
+    help = ('Recalcula la ruta materializada (ruta y nivel) de los ítems de catálogo y de las unidades '
+            'organizacionales a partir de sus padres.')
+
+    def handle(self, *args, **options):
+        for modelo in (ItemCatalogo, UnidadOrganizacional):
+            inicio = time.perf_counter()
+            with transaction.atomic():
+                actualizados, sin_ruta = modelo.objects.reconstruir_rutas()
+            self.stdout.write(self.style.SUCCESS(
+                f'{modelo._meta.verbose_name_plural}: {actualizados} rutas actualizadas '
+                f'en {time.perf_counter() - inicio:.2f} s.'
+            ))
+            if sin_ruta:
+                self.stdout.write(self.style.WARNING(
+                    f'{modelo._meta.verbose_name_plural}: {sin_ruta} registros forman un ciclo de padres y quedaron sin ruta.'
+                ))
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:54
+
+from django.db import migrations, models
+
+from apps.core.arboles import calcular_rutas, nivel_de
+
+
+def poblar_rutas(apps, schema_editor):
+    for nombre in ('ItemCatalogo', 'UnidadOrganizacional'):
+        modelo = apps.get_model('institutional_config', nombre)
+        rutas = calcular_rutas(list(modelo.objects.values_list('pk', 'padre_id')))
+        modelo.objects.bulk_update(
+            [modelo(pk=pk, ruta=ruta, nivel=nivel_de(ruta)) for pk, ruta in rutas.items()],
+            ['ruta', 'nivel'], batch_size=500
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('institutional_config', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='itemcatalogo',
+            name='nivel',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, help_text='0 para los nodos raíz'),
+        ),
+        migrations.AddField(
+            model_name='itemcatalogo',
+            name='ruta',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='unidadorganizacional',
+            name='nivel',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, help_text='0 para los nodos raíz'),
+        ),
+        migrations.AddField(
+            model_name='unidadorganizacional',
+            name='ruta',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(poblar_rutas, migrations.RunPython.noop),
+    ]
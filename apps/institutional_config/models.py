@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import models, transaction
+
+from apps.core.arboles import RutaMaterializadaManager
 
 
 class Catalogo(models.Model):
@@ -29,10 +31,20 @@ class ItemCatalogo(models.Model):
         related_name='hijos',
         help_text="Ítem padre para crear jerarquías (ej. un Sector bajo un MacroSector)."
     )
+    # Ruta materializada ('3/17/42/': ids de los ancestros y el propio) para leer subárboles por rango
+    ruta = models.CharField(max_length=255, default='', editable=False, db_index=True)
+    nivel = models.PositiveSmallIntegerField(default=0, editable=False, help_text="0 para los nodos raíz")
+
+    objects = RutaMaterializadaManager()
 
     def __str__(self):
         return f"{self.catalogo.nombre} - {self.nombre}"
 
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **type(self).objects.argumentos_guardado(self, kwargs))
+            type(self).objects.actualizar_ruta(self)
+
     class Meta:
         verbose_name = "Ítem de Catálogo"
         verbose_name_plural = "Ítems de Catálogos"
@@ -80,6 +92,9 @@ class UnidadOrganizacional(models.Model):
         null=True, blank=True,
         related_name='hijos'
     )
+    # Ruta materializada ('3/17/42/': ids de los ancestros y el propio) para leer subárboles por rango
+    ruta = models.CharField(max_length=255, default='', editable=False, db_index=True)
+    nivel = models.PositiveSmallIntegerField(default=0, editable=False, help_text="0 para los nodos raíz")
     macrosector = models.ForeignKey(
         ItemCatalogo,
         on_delete=models.SET_NULL,
@@ -95,11 +110,18 @@ class UnidadOrganizacional(models.Model):
     )
     activo = models.BooleanField(default=True)
 
+    objects = RutaMaterializadaManager()
+
     def __str__(self):
         if self.padre:
             return f"{self.entidad.nombre} | {self.padre.nombre} -> {self.nombre}"
         return f"{self.entidad.nombre} | {self.nombre}"
 
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **type(self).objects.argumentos_guardado(self, kwargs))
+            type(self).objects.actualizar_ruta(self)
+
     class Meta:
         verbose_name = "Unidad Organizacional"
         verbose_name_plural = "Unidades Organizacionales"
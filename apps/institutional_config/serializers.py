@@ -1,19 +1,68 @@
 from rest_framework import serializers
+from apps.core.arboles import construir_arbol, hijos_por_padre
 from .models import Catalogo, ItemCatalogo, Entidad, UnidadOrganizacional, PeriodoPlanificacion
 
-class RecursiveField(serializers.Serializer):
+
+class HijosField(serializers.Field):
+    """Lugar de 'hijos' en la representación; ArbolSerializerMixin lo llena sin recursión."""
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def get_attribute(self, instance):
+        return instance
+
     def to_representation(self, value):
-        serializer = self.parent.parent.__class__(value, context=self.context)
-        return serializer.data
+        return []
+
+
+class ArbolListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        raices = list(data.all() if hasattr(data, 'all') else data)
+        return self.child.representar_arbol(raices)
+
+
+class ArbolSerializerMixin:
+    """
+    Serializa un nodo con todos sus descendientes en 'hijos'. Todos los nodos del árbol
+    (los que comparten `campo_arbol`, p. ej. el catálogo) se cargan con una sola consulta y el
+    anidado se arma en memoria, así que el número de consultas no depende de la profundidad.
+    """
+    campo_arbol = None
+
+    def nodos_arbol(self, raices):
+        grupos = {getattr(raiz, self.campo_arbol) for raiz in raices}
+        return self.Meta.model.objects.filter(**{f'{self.campo_arbol}__in': grupos})
+
+    def representar_arbol(self, raices, nodos=None):
+        """`nodos`: los del árbol ya cargados (p. ej. prefetch); si no se dan, se consultan."""
+        nodos = list(self.nodos_arbol(raices) if nodos is None else nodos)
+        cargados = {nodo.pk: nodo for nodo in nodos}
+        # Las raíces se toman de los nodos cargados, que traen sus relaciones precargadas
+        raices = [cargados.get(raiz.pk, raiz) for raiz in raices]
+        representar = super().to_representation
+        return construir_arbol(raices, hijos_por_padre(nodos), representar)
+
+    def to_representation(self, instance):
+        return self.representar_arbol([instance])[0]
+
+    def validate_padre(self, padre):
+        ruta = getattr(self.instance, 'ruta', '')
+        if padre is not None and ruta and padre.ruta.startswith(ruta):
+            raise serializers.ValidationError('Un nodo no puede quedar debajo de sí mismo ni de uno de sus descendientes.')
+        return padre
+
 
 # ItemCatalogo
 # Este serializer se usará para el CRUD completo de los ítems.
-class ItemCatalogoSerializer(serializers.ModelSerializer):
-    hijos = RecursiveField(many=True, read_only=True)
+class ItemCatalogoSerializer(ArbolSerializerMixin, serializers.ModelSerializer):
+    campo_arbol = 'catalogo_id'
+    hijos = HijosField()
 
     class Meta:
         model = ItemCatalogo
         fields = ['id', 'catalogo', 'nombre', 'codigo', 'activo', 'padre', 'hijos']
+        list_serializer_class = ArbolListSerializer
 
 # Catálogo
 class CatalogoSerializer(serializers.ModelSerializer):
@@ -26,13 +75,12 @@ class CatalogoSerializer(serializers.ModelSerializer):
     def get_items(self, obj):
         """
         Este método se ejecuta para el campo 'items'.
-        Filtra y devuelve solo los ítems que no tienen padre (los Macrosectores).
+        Devuelve solo los ítems que no tienen padre (los Macrosectores), con sus hijos anidados.
         """
-        # Filtramos los items del catálogo para obtener solo los que son raíz
-        root_items = obj.items.filter(padre__isnull=True)
-        # Serializamos únicamente esos ítems raíz (que ya incluyen a sus hijos)
-        serializer = ItemCatalogoSerializer(root_items, many=True, context=self.context)
-        return serializer.data
+        # Se arma el árbol con los ítems ya precargados (prefetch_related('items') en la vista)
+        items = obj.items.all()
+        root_items = [item for item in items if item.padre_id is None]
+        return ItemCatalogoSerializer(context=self.context).representar_arbol(root_items, nodos=items)
 
 # Entidad
 class EntidadSerializer(serializers.ModelSerializer):
@@ -53,11 +101,12 @@ class EntidadSerializer(serializers.ModelSerializer):
         }
 
 # UnidadOrganizacional
-class UnidadOrganizacionalSerializer(serializers.ModelSerializer):
+class UnidadOrganizacionalSerializer(ArbolSerializerMixin, serializers.ModelSerializer):
+    campo_arbol = 'entidad_id'
     entidad_nombre = serializers.CharField(source='entidad.nombre', read_only=True)
     padre_nombre = serializers.CharField(source='padre.nombre', read_only=True, allow_null=True)
     macrosector_nombre = serializers.CharField(source='macrosector.nombre', read_only=True, allow_null=True)
-    hijos = RecursiveField(many=True, read_only=True)
+    hijos = HijosField()
     sectores_nombres = serializers.SerializerMethodField()
 
     class Meta:
@@ -74,6 +123,10 @@ class UnidadOrganizacionalSerializer(serializers.ModelSerializer):
             'macrosector': {'write_only': True, 'required': False, 'allow_null': True},
             'sectores': {'write_only': True, 'required': False},
         }
+        list_serializer_class = ArbolListSerializer
+
+    def nodos_arbol(self, raices):
+        return super().nodos_arbol(raices).select_related('entidad', 'padre', 'macrosector').prefetch_related('sectores')
 
     def get_sectores_nombres(self, obj):
         return [s.nombre for s in obj.sectores.all()]
@@ -1,9 +1,12 @@
+from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
+from apps.authentication.models import Usuario
 from apps.institutional_config.models import Catalogo, ItemCatalogo, Entidad
 
 class EntidadViewSetTests(APITestCase):
     def setUp(self):
+        self.client.force_authenticate(user=Usuario.objects.create_user(nombre_usuario="admin", password="Clave123!"))
         self.catalogo = Catalogo.objects.create(nombre="Niveles de Gobierno", codigo="NIVEL_GOBIERNO")
         self.item = ItemCatalogo.objects.create(catalogo=self.catalogo, nombre="Nacional")
         self.entidad = Entidad.objects.create(
@@ -13,7 +16,7 @@ class EntidadViewSetTests(APITestCase):
         )
 
     def test_listar_entidades(self):
-        response = self.client.get("/entidades/")
+        response = self.client.get(reverse('entidad-list'))
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 1)
 
@@ -23,6 +26,6 @@ class EntidadViewSetTests(APITestCase):
             "codigo_unico": "MEDUCACION",
             "nivel_gobierno": self.item.id
         }
-        response = self.client.post("/entidades/", data)
+        response = self.client.post(reverse('entidad-list'), data)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(response.data["nombre"], "Ministerio de Educación")
\ No newline at end of file
@@ -1,5 +1,9 @@
+import io
+
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
 from django.test import TestCase
-from apps.institutional_config.models import Catalogo
+from apps.institutional_config.models import Catalogo, ItemCatalogo, Entidad, UnidadOrganizacional
 
 class CatalogoModelTests(TestCase):
     def setUp(self):
@@ -18,4 +22,64 @@ class CatalogoModelTests(TestCase):
             Catalogo.objects.create(
                 nombre="Sectores",
                 codigo="SECTORES"
-            )
\ No newline at end of file
+            )
+
+class RutaMaterializadaTests(TestCase):
+    def setUp(self):
+        catalogo = Catalogo.objects.create(nombre="Macrosectores", codigo="MACROSECTOR")
+        self.item = lambda nombre, padre=None: ItemCatalogo.objects.create(catalogo=catalogo, nombre=nombre, padre=padre)
+        self.social = self.item("Social")
+        self.salud = self.item("Salud", self.social)
+        self.hospitales = self.item("Hospitales", self.salud)
+        self.educacion = self.item("Educación", self.social)
+        self.economico = self.item("Económico")
+
+    def test_ruta_y_nivel_al_crear(self):
+        self.assertEqual(self.hospitales.ruta, f'{self.social.pk}/{self.salud.pk}/{self.hospitales.pk}/')
+        self.assertEqual(ItemCatalogo.objects.get(pk=self.hospitales.pk).nivel, 2)
+        self.assertEqual(self.economico.nivel, 0)
+
+    def test_descendientes_y_ancestros_en_una_consulta(self):
+        with self.assertNumQueries(1):
+            nombres = sorted(ItemCatalogo.objects.descendants(self.social).values_list('nombre', flat=True))
+        self.assertEqual(nombres, ['Educación', 'Hospitales', 'Salud'])
+        with self.assertNumQueries(1):
+            ancestros = [item.nombre for item in ItemCatalogo.objects.ancestors(self.hospitales)]
+        self.assertEqual(ancestros, ['Social', 'Salud'])
+        self.assertCountEqual(ItemCatalogo.objects.subtree_ids(self.salud.pk), [self.salud.pk, self.hospitales.pk])
+
+    def test_mover_reescribe_el_subarbol(self):
+        self.salud.padre = self.economico
+        self.salud.save()
+        hospitales = ItemCatalogo.objects.get(pk=self.hospitales.pk)
+        self.assertEqual(hospitales.ruta, f'{self.economico.pk}/{self.salud.pk}/{self.hospitales.pk}/')
+        self.assertCountEqual(ItemCatalogo.objects.subtree_ids(self.social), [self.social.pk, self.educacion.pk])
+
+        self.salud.padre = None
+        self.salud.save()
+        self.assertEqual(ItemCatalogo.objects.get(pk=self.hospitales.pk).nivel, 1)
+
+    def test_guardar_una_instancia_vieja_no_pisa_su_ruta(self):
+        hospitales = ItemCatalogo.objects.get(pk=self.hospitales.pk)
+        self.salud.padre = self.economico
+        self.salud.save()
+        hospitales.codigo = "HOSP"
+        hospitales.save()
+        esperada = f'{self.economico.pk}/{self.salud.pk}/{self.hospitales.pk}/'
+        self.assertEqual(ItemCatalogo.objects.get(pk=self.hospitales.pk).ruta, esperada)
+        self.assertEqual(hospitales.ruta, esperada)
+
+    def test_no_admite_ciclos(self):
+        self.social.padre = self.hospitales
+        with self.assertRaises(ValidationError):
+            self.social.save()
+        self.assertIsNone(ItemCatalogo.objects.get(pk=self.social.pk).padre_id)
+
+    def test_comando_reconstruye_rutas(self):
+        ItemCatalogo.objects.update(ruta='', nivel=0)
+        entidad = Entidad.objects.create(nombre="Entidad", codigo_unico="ENT")
+        raiz = UnidadOrganizacional.objects.create(nombre="Despacho", entidad=entidad)
+        UnidadOrganizacional.objects.bulk_create([UnidadOrganizacional(nombre="Dirección", entidad=entidad, padre=raiz)])
+        call_command('reconstruir_rutas', stdout=io.StringIO())
+        self.assertEqual(ItemCatalogo.objects.get(pk=self.hospitales.pk).ruta, self.hospitales.ruta)
+        self.assertEqual(UnidadOrganizacional.objects.descendants(raiz).get().nombre, "Dirección")
@@ -1,19 +1,76 @@
 # Archivo: tests/test_views.py
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
-from apps.institutional_config.models import Catalogo
+from apps.authentication.models import Usuario
+from apps.institutional_config.models import Catalogo, ItemCatalogo, Entidad, UnidadOrganizacional
 
 class CatalogoViewSetTests(APITestCase):
     def setUp(self):
+        self.client.force_authenticate(user=Usuario.objects.create_user(nombre_usuario="admin", password="Clave123!"))
         Catalogo.objects.create(nombre="Sectores", codigo="SECTORES")
         Catalogo.objects.create(nombre="Tipos de Plan", codigo="TIPOS_PLAN")
 
     def test_listar_catalogos(self):
-        response = self.client.get("/catalogos/")
+        response = self.client.get(reverse('catalogo-list'))
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 2)
 
     def test_filtrar_catalogo_por_codigo(self):
-        response = self.client.get("/catalogos/?codigo=SECTORES")
+        response = self.client.get(reverse('catalogo-list'), {'codigo': 'SECTORES'})
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data[0]["codigo"], "SECTORES")
\ No newline at end of file
+        self.assertEqual(response.data[0]["codigo"], "SECTORES")
+
+class ArbolesJerarquicosTests(APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(user=Usuario.objects.create_user(nombre_usuario="admin", password="Clave123!"))
+        self.catalogo = Catalogo.objects.create(nombre="Macrosectores", codigo="MACROSECTOR")
+        self.entidad = Entidad.objects.create(nombre="Entidad", codigo_unico="ENT")
+        self.sector = ItemCatalogo.objects.create(catalogo=self.catalogo, nombre="Sector base")
+
+    def crear_niveles(self, profundidad, prefijo=""):
+        """Dos hijos por nivel (se sigue por el segundo) con `profundidad` niveles, en el catálogo y en las unidades."""
+        item = unidad = None
+        for nivel in range(profundidad):
+            for rama in ("A", "B"):
+                nombre = f"{prefijo}{rama}{nivel}"
+                nuevo = ItemCatalogo.objects.create(catalogo=self.catalogo, nombre=nombre, padre=item)
+                nueva = UnidadOrganizacional.objects.create(entidad=self.entidad, nombre=nombre, padre=unidad)
+                nueva.sectores.add(self.sector)
+            item, unidad = nuevo, nueva
+
+    def consultas(self, url, parametros):
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(url, parametros)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data, len(consultas)
+
+    def test_consultas_constantes_a_cualquier_profundidad(self):
+        casos = [
+            (reverse('catalogo-list'), {'codigo': 'MACROSECTOR'}),
+            (reverse('itemcatalogo-list'), {'catalogo': self.catalogo.pk}),
+            (reverse('unidadorganizacional-list'), {'entidad': self.entidad.pk}),
+        ]
+        self.crear_niveles(2)
+        pocas = [self.consultas(url, parametros)[1] for url, parametros in casos]
+        self.crear_niveles(6, prefijo="X")
+        muchas = [self.consultas(url, parametros)[1] for url, parametros in casos]
+        self.assertEqual(pocas, muchas)
+
+    def test_estructura_anidada(self):
+        self.crear_niveles(3)
+        data, _ = self.consultas(reverse('catalogo-list'), {'codigo': 'MACROSECTOR'})
+        raices = data[0]['items']
+        self.assertEqual([raiz['nombre'] for raiz in raices], ['A0', 'B0', 'Sector base'])
+        self.assertEqual([hijo['nombre'] for hijo in raices[1]['hijos']], ['A1', 'B1'])
+        self.assertEqual(raices[1]['hijos'][1]['hijos'][0]['nombre'], 'A2')
+        self.assertEqual(raices[1]['hijos'][1]['hijos'][0]['hijos'], [])
+
+        detalle = self.client.get(reverse('itemcatalogo-detail', args=[raices[1]['id']])).data
+        self.assertEqual([hijo['nombre'] for hijo in detalle['hijos']], ['A1', 'B1'])
+
+        data, _ = self.consultas(reverse('unidadorganizacional-list'), {'entidad': self.entidad.pk})
+        hoja = data[1]['hijos'][1]['hijos'][0]
+        self.assertEqual((hoja['nombre'], hoja['padre_nombre'], hoja['sectores_nombres']), ('A2', 'B1', ['Sector base']))
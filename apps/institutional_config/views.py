@@ -5,9 +5,10 @@ from .serializers import (
     PeriodoPlanificacionSerializer
 )
 from apps.audit.utils import log_event
+from apps.core.metricas import MedicionSerializacionMixin
 
 
-class CatalogoViewSet(viewsets.ModelViewSet):
+class CatalogoViewSet(MedicionSerializacionMixin, viewsets.ModelViewSet):
     queryset = Catalogo.objects.all().prefetch_related('items')
     serializer_class = CatalogoSerializer
 
@@ -19,7 +20,7 @@ class CatalogoViewSet(viewsets.ModelViewSet):
         return queryset
         # permission_classes = [permissions.IsAdminUser] # RESTRICCIÓN
 
-class ItemCatalogoViewSet(viewsets.ModelViewSet):
+class ItemCatalogoViewSet(MedicionSerializacionMixin, viewsets.ModelViewSet):
     """
     API endpoint para los Ítems de un Catálogo. Ahora devuelve una estructura jerárquica.
     """
@@ -34,7 +35,7 @@ class ItemCatalogoViewSet(viewsets.ModelViewSet):
         return queryset
     # permission_classes = [permissions.IsAdminUser] # Igualmente, restringir a administradores
 
-class EntidadViewSet(viewsets.ModelViewSet):
+class EntidadViewSet(MedicionSerializacionMixin, viewsets.ModelViewSet):
     """
     API endpoint para la gestión de Entidades del Estado.
     """
@@ -84,7 +85,7 @@ class EntidadViewSet(viewsets.ModelViewSet):
         )
 
 
-class UnidadOrganizacionalViewSet(viewsets.ModelViewSet):
+class UnidadOrganizacionalViewSet(MedicionSerializacionMixin, viewsets.ModelViewSet):
     queryset = UnidadOrganizacional.objects.select_related('entidad', 'padre').all()
     serializer_class = UnidadOrganizacionalSerializer
     """
@@ -98,7 +99,7 @@ class UnidadOrganizacionalViewSet(viewsets.ModelViewSet):
         return queryset
     # permission_classes = [permissions.IsAdminUser]
 
-class PeriodoPlanificacionViewSet(viewsets.ModelViewSet):
+class PeriodoPlanificacionViewSet(MedicionSerializacionMixin, viewsets.ModelViewSet):
     """
     API endpoint para la gestión de los Períodos de Planificación.
     """
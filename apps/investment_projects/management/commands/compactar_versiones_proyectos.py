@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+from apps.investment_projects.models import ProyectoInversionVersion
+
+
+class Command(BaseCommand):
+    help = ('Reescribe el historial de versiones de los proyectos con fotos completas periódicas y '
+            'parches JSON entre ellas. Sirve para compactar el historial existente (todo fotos completas) '
+            'o para aplicar un nuevo intervalo.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--intervalo', type=int, default=None,
+                            help='Versiones por foto completa (por defecto PROYECTOS_VERSIONES_INTERVALO_COMPLETA).')
+        parser.add_argument('--proyecto', type=int, action='append',
+                            help='Compacta solo este proyecto (repetible).')
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        proyectos = options['proyecto'] or (
+            ProyectoInversionVersion.objects.order_by().values_list('proyecto_id', flat=True).distinct()
+        )
+        total_versiones = total_completas = 0
+        for proyecto_id in proyectos:
+            versiones, completas = ProyectoInversionVersion.objects.compactar(proyecto_id, options['intervalo'])
+            total_versiones += versiones
+            total_completas += completas
+        self.stdout.write(self.style.SUCCESS(
+            f'Historial compactado: {total_versiones} versiones, {total_completas} fotos completas y '
+            f'{total_versiones - total_completas} parches ({time.perf_counter() - inicio:.2f} s).'
+        ))
@@ -0,0 +1,17 @@
+import time
+
+from django.core.management.base import BaseCommand
+from apps.investment_projects.models import ResumenFinancieroProyecto
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye desde cero el resumen financiero materializado (totales programados por proyecto y período).'
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('Reconstruyendo el resumen financiero...'))
+        inicio = time.perf_counter()
+        proyectos, periodos = ResumenFinancieroProyecto.objects.reconstruir()
+        self.stdout.write(self.style.SUCCESS(
+            f'Resumen reconstruido: {proyectos} proyectos, {periodos} períodos '
+            f'en {time.perf_counter() - inicio:.2f} s.'
+        ))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.investment_projects.models import ResumenFinancieroProyecto
+
+
+class Command(BaseCommand):
+    help = 'Verifica que el resumen financiero materializado coincida con CronogramaValorado.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--corregir', action='store_true',
+                            help='Recalcula los proyectos con diferencias en lugar de solo reportarlas.')
+
+    def handle(self, *args, **options):
+        diferencias = ResumenFinancieroProyecto.objects.verificar()
+        if not diferencias:
+            self.stdout.write(self.style.SUCCESS('El resumen financiero es consistente.'))
+            return
+
+        for proyecto_id, periodo, guardado, esperado in diferencias:
+            self.stdout.write(self.style.WARNING(
+                f'Proyecto {proyecto_id} ({periodo or "total"}): guardado {guardado}, esperado {esperado}.'
+            ))
+
+        if options['corregir']:
+            ResumenFinancieroProyecto.objects.recalcular({d[0] for d in diferencias})
+            self.stdout.write(self.style.SUCCESS(f'Se corrigieron {len(diferencias)} diferencias.'))
+            return
+        raise CommandError(f'Se encontraron {len(diferencias)} diferencias en el resumen financiero.')
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:09
+
+import django.db.models.deletion
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def poblar_resumen_financiero(apps, schema_editor):
+    CronogramaValorado = apps.get_model('investment_projects', 'CronogramaValorado')
+    ResumenFinancieroProyecto = apps.get_model('investment_projects', 'ResumenFinancieroProyecto')
+    ResumenFinancieroPeriodo = apps.get_model('investment_projects', 'ResumenFinancieroPeriodo')
+    filas = CronogramaValorado.objects.values(
+        'actividad__componente__marco_logico__proyecto_id', 'periodo'
+    ).annotate(total=Sum('valor_programado')).order_by()
+    totales, periodos = {}, []
+    for fila in filas:
+        proyecto_id = fila['actividad__componente__marco_logico__proyecto_id']
+        periodos.append(ResumenFinancieroPeriodo(
+            proyecto_id=proyecto_id, periodo=fila['periodo'], monto_programado=fila['total']
+        ))
+        totales[proyecto_id] = totales.get(proyecto_id, Decimal('0')) + fila['total']
+    ResumenFinancieroProyecto.objects.bulk_create(
+        [ResumenFinancieroProyecto(proyecto_id=pk, monto_total_programado=total) for pk, total in totales.items()],
+        batch_size=1000
+    )
+    ResumenFinancieroPeriodo.objects.bulk_create(periodos, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investment_projects', '0005_alter_proyectoinversion_sector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenFinancieroProyecto',
+            fields=[
+                ('proyecto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='resumen_financiero', serialize=False, to='investment_projects.proyectoinversion')),
+                ('monto_total_programado', models.DecimalField(decimal_places=2, default=0, max_digits=17)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ResumenFinancieroPeriodo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periodo', models.CharField(help_text='Formato AAAA-MM', max_length=7)),
+                ('monto_programado', models.DecimalField(decimal_places=2, default=0, max_digits=17)),
+                ('proyecto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumen_por_periodo', to='investment_projects.proyectoinversion')),
+            ],
+            options={
+                'ordering': ['proyecto', 'periodo'],
+                'unique_together': {('proyecto', 'periodo')},
+            },
+        ),
+        migrations.RunPython(poblar_resumen_financiero, migrations.RunPython.noop),
+    ]
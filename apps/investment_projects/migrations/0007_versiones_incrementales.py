@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investment_projects', '0006_resumen_financiero'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='proyectoinversionversion',
+            name='es_completa',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name='proyectoinversionversion',
+            name='parche',
+            field=models.JSONField(blank=True, help_text='Operaciones JSON Patch desde la versión anterior', null=True),
+        ),
+        migrations.AlterField(
+            model_name='proyectoinversionversion',
+            name='datos',
+            field=models.JSONField(blank=True, help_text='Snapshot de los datos del proyecto en esta versión', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='proyectoinversionversion',
+            index=models.Index(fields=['proyecto', 'numero_version'], name='version_proyecto_numero_idx'),
+        ),
+    ]
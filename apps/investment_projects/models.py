@@ -1,9 +1,15 @@
-from django.db import models
+from decimal import Decimal
+
+from django.db import models, transaction
+from django.db.models import F, Sum
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
 from django.conf import settings
 from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
 from django.contrib.contenttypes.models import ContentType
 from apps.institutional_config.models import Entidad, ItemCatalogo
 from apps.strategic_objectives.models import ProgramaInstitucional
+from apps.core.versiones import HistorialVersionesManager
 
 # --- Modelo Principal del Proyecto de Inversión ---
 class ProyectoInversion(models.Model):
@@ -92,6 +98,15 @@ class ProyectoInversion(models.Model):
         # Finalmente, borrar el propio proyecto
         super().delete(*args, **kwargs)
 
+class VersionProyectoManager(HistorialVersionesManager):
+    """
+    Historial de versiones del proyecto: una foto completa cada
+    PROYECTOS_VERSIONES_INTERVALO_COMPLETA versiones y parches entre ellas.
+    """
+    campo_padre = 'proyecto'
+    setting_intervalo = 'PROYECTOS_VERSIONES_INTERVALO_COMPLETA'
+
+
 class ProyectoInversionVersion(models.Model):
     ESTADO_CHOICES = [
         ('EN_FORMULACION', 'En Formulación'),
@@ -104,10 +119,16 @@ class ProyectoInversionVersion(models.Model):
     numero_version = models.PositiveIntegerField()
     fecha_version = models.DateTimeField(auto_now_add=True)
     usuario_responsable = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True)
-    datos = models.JSONField(help_text="Snapshot de los datos del proyecto en esta versión")
+    # Foto completa (es_completa) o parche respecto de la versión anterior; ver VersionProyectoManager
+    es_completa = models.BooleanField(default=True)
+    datos = models.JSONField(null=True, blank=True, help_text="Snapshot de los datos del proyecto en esta versión")
+    parche = models.JSONField(null=True, blank=True, help_text="Operaciones JSON Patch desde la versión anterior")
+
+    objects = VersionProyectoManager()
 
     class Meta:
         ordering = ['-fecha_version']
+        indexes = [models.Index(fields=['proyecto', 'numero_version'], name='version_proyecto_numero_idx')]
 
 # --- Componentes del Marco Lógico (Criterio de Aceptación: Formulación) ---
 
@@ -216,4 +237,199 @@ class PuntuacionProyecto(models.Model):
         unique_together = ('proyecto', 'criterio') # Un proyecto solo puede tener una puntuación por criterio
 
     def __str__(self):
-        return f"{self.proyecto.nombre} - {self.criterio.nombre}: {self.puntuacion_asignada}"
\ No newline at end of file
+        return f"{self.proyecto.nombre} - {self.criterio.nombre}: {self.puntuacion_asignada}"
+
+
+# --- Resumen financiero materializado (total programado por proyecto y por período) ---
+
+class ResumenFinancieroManager(models.Manager):
+    """
+    Mantiene las tablas de resumen a partir de CronogramaValorado. Las escrituras normales
+    se aplican por señales; las operaciones masivas (bulk_create, QuerySet.update) no
+    disparan señales y deben llamar a recalcular() con los proyectos afectados.
+    """
+
+    @staticmethod
+    def proyecto_de_actividad(actividad_id):
+        return Actividad.objects.filter(pk=actividad_id).values_list(
+            'componente__marco_logico__proyecto_id', flat=True
+        ).first()
+
+    def aplicar_delta(self, proyecto_id, periodo, delta):
+        """Suma (o resta) `delta` al total del proyecto y al de su período con UPDATE atómicos."""
+        if not proyecto_id or not delta:
+            return
+        with transaction.atomic():
+            for modelo, filtros, campo in (
+                (ResumenFinancieroProyecto, {'proyecto_id': proyecto_id}, 'monto_total_programado'),
+                (ResumenFinancieroPeriodo, {'proyecto_id': proyecto_id, 'periodo': periodo}, 'monto_programado'),
+            ):
+                actualizados = modelo.objects.filter(**filtros).update(**{campo: F(campo) + delta})
+                # Un delta negativo sin fila no tiene nada que descontar (p. ej. borrado en cascada)
+                if not actualizados and delta > 0:
+                    modelo.objects.create(**filtros, **{campo: delta})
+
+    def recalcular(self, proyecto_ids):
+        """Recalcula desde CronogramaValorado el resumen de los proyectos indicados."""
+        proyecto_ids = {pk for pk in proyecto_ids if pk}
+        if not proyecto_ids:
+            return
+        existentes = set(ProyectoInversion.objects.filter(pk__in=proyecto_ids).values_list('pk', flat=True))
+        with transaction.atomic():
+            ResumenFinancieroPeriodo.objects.filter(proyecto_id__in=proyecto_ids).delete()
+            ResumenFinancieroProyecto.objects.filter(proyecto_id__in=proyecto_ids).delete()
+            totales, periodos = self.calcular(
+                actividad__componente__marco_logico__proyecto_id__in=existentes
+            )
+            ResumenFinancieroProyecto.objects.bulk_create(totales)
+            ResumenFinancieroPeriodo.objects.bulk_create(periodos)
+
+    def reconstruir(self):
+        """Reconstruye desde cero todas las filas de resumen. Devuelve (proyectos, períodos)."""
+        with transaction.atomic():
+            ResumenFinancieroPeriodo.objects.all().delete()
+            ResumenFinancieroProyecto.objects.all().delete()
+            totales, periodos = self.calcular()
+            ResumenFinancieroProyecto.objects.bulk_create(totales, batch_size=1000)
+            ResumenFinancieroPeriodo.objects.bulk_create(periodos, batch_size=1000)
+        return len(totales), len(periodos)
+
+    def verificar(self):
+        """
+        Compara el resumen materializado con el cálculo directo sobre CronogramaValorado.
+        Devuelve una lista de (proyecto_id, periodo o None, valor_guardado, valor_esperado).
+        """
+        totales, periodos = self.calcular()
+        esperado = {(t.proyecto_id, None): t.monto_total_programado for t in totales}
+        esperado.update({(p.proyecto_id, p.periodo): p.monto_programado for p in periodos})
+        guardado = {
+            (proyecto_id, None): monto
+            for proyecto_id, monto in ResumenFinancieroProyecto.objects.values_list(
+                'proyecto_id', 'monto_total_programado')
+        }
+        guardado.update({
+            (proyecto_id, periodo): monto
+            for proyecto_id, periodo, monto in ResumenFinancieroPeriodo.objects.values_list(
+                'proyecto_id', 'periodo', 'monto_programado')
+        })
+        diferencias = []
+        for clave in sorted(set(esperado) | set(guardado), key=lambda c: (c[0], c[1] or '')):
+            valor_guardado = guardado.get(clave, Decimal('0'))
+            valor_esperado = esperado.get(clave, Decimal('0'))
+            if valor_guardado != valor_esperado:
+                diferencias.append((clave[0], clave[1], valor_guardado, valor_esperado))
+        return diferencias
+
+    @staticmethod
+    def calcular(**filtros):
+        """Calcula (sin guardar) las filas de resumen con una sola consulta agrupada."""
+        filas = CronogramaValorado.objects.filter(**filtros).values(
+            'actividad__componente__marco_logico__proyecto_id', 'periodo'
+        ).annotate(total=Sum('valor_programado')).order_by()
+        totales, periodos = {}, []
+        for fila in filas:
+            proyecto_id = fila['actividad__componente__marco_logico__proyecto_id']
+            periodos.append(ResumenFinancieroPeriodo(
+                proyecto_id=proyecto_id, periodo=fila['periodo'], monto_programado=fila['total']
+            ))
+            totales[proyecto_id] = totales.get(proyecto_id, Decimal('0')) + fila['total']
+        return (
+            [ResumenFinancieroProyecto(proyecto_id=pk, monto_total_programado=total)
+             for pk, total in totales.items()],
+            periodos
+        )
+
+
+class ResumenFinancieroProyecto(models.Model):
+    """Total programado del proyecto (suma de su CronogramaValorado), mantenido por señales."""
+    proyecto = models.OneToOneField(ProyectoInversion, on_delete=models.CASCADE, primary_key=True,
+                                    related_name='resumen_financiero')
+    monto_total_programado = models.DecimalField(max_digits=17, decimal_places=2, default=0)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    objects = ResumenFinancieroManager()
+
+    def __str__(self):
+        return f"{self.proyecto_id}: {self.monto_total_programado}"
+
+
+class ResumenFinancieroPeriodo(models.Model):
+    """Total programado del proyecto en un período AAAA-MM."""
+    proyecto = models.ForeignKey(ProyectoInversion, on_delete=models.CASCADE, related_name='resumen_por_periodo')
+    periodo = models.CharField(max_length=7, help_text="Formato AAAA-MM")
+    monto_programado = models.DecimalField(max_digits=17, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('proyecto', 'periodo')
+        ordering = ['proyecto', 'periodo']
+
+    def __str__(self):
+        return f"{self.proyecto_id} ({self.periodo}): {self.monto_programado}"
+
+
+@receiver(pre_save, sender=CronogramaValorado)
+def guardar_cronograma_anterior(sender, instance, **kwargs):
+    instance._valores_anteriores = None
+    if instance.pk:
+        instance._valores_anteriores = CronogramaValorado.objects.filter(pk=instance.pk).values(
+            'actividad_id', 'periodo', 'valor_programado'
+        ).first()
+
+
+@receiver(post_save, sender=CronogramaValorado)
+def actualizar_resumen_por_cronograma(sender, instance, **kwargs):
+    anterior = getattr(instance, '_valores_anteriores', None)
+    proyecto_id = ResumenFinancieroProyecto.objects.proyecto_de_actividad(instance.actividad_id)
+    valor = Decimal(str(instance.valor_programado))
+    if anterior and anterior['actividad_id'] == instance.actividad_id and anterior['periodo'] == instance.periodo:
+        ResumenFinancieroProyecto.objects.aplicar_delta(proyecto_id, instance.periodo, valor - anterior['valor_programado'])
+        return
+    if anterior:
+        proyecto_anterior = ResumenFinancieroProyecto.objects.proyecto_de_actividad(anterior['actividad_id'])
+        ResumenFinancieroProyecto.objects.aplicar_delta(
+            proyecto_anterior, anterior['periodo'], -anterior['valor_programado']
+        )
+    ResumenFinancieroProyecto.objects.aplicar_delta(proyecto_id, instance.periodo, valor)
+
+
+@receiver(pre_delete, sender=CronogramaValorado)
+def guardar_proyecto_de_cronograma(sender, instance, **kwargs):
+    # Antes del borrado la cadena actividad -> componente -> marco lógico todavía existe
+    instance._proyecto_id = ResumenFinancieroProyecto.objects.proyecto_de_actividad(instance.actividad_id)
+
+
+@receiver(post_delete, sender=CronogramaValorado)
+def descontar_resumen_por_cronograma(sender, instance, **kwargs):
+    ResumenFinancieroProyecto.objects.aplicar_delta(
+        getattr(instance, '_proyecto_id', None), instance.periodo, -Decimal(str(instance.valor_programado))
+    )
+
+
+@receiver(pre_save, sender=Actividad)
+@receiver(pre_save, sender=Componente)
+def guardar_padre_anterior(sender, instance, **kwargs):
+    campo = 'componente_id' if sender is Actividad else 'marco_logico_id'
+    instance._padre_anterior = None
+    if instance.pk:
+        instance._padre_anterior = sender.objects.filter(pk=instance.pk).values_list(campo, flat=True).first()
+
+
+@receiver(post_save, sender=Actividad)
+@receiver(post_save, sender=Componente)
+def recalcular_resumen_por_movimiento(sender, instance, created, **kwargs):
+    # Mover una actividad o componente a otro padre puede cambiar de proyecto sus montos
+    anterior = getattr(instance, '_padre_anterior', None)
+    if created or anterior is None:
+        return
+    if sender is Actividad:
+        if anterior == instance.componente_id:
+            return
+        padres = Componente.objects.filter(pk__in=[anterior, instance.componente_id])
+        proyectos = padres.values_list('marco_logico__proyecto_id', flat=True)
+    else:
+        if anterior == instance.marco_logico_id:
+            return
+        proyectos = MarcoLogico.objects.filter(
+            pk__in=[anterior, instance.marco_logico_id]
+        ).values_list('proyecto_id', flat=True)
+    ResumenFinancieroProyecto.objects.recalcular(proyectos)
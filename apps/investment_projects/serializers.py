@@ -1,18 +1,34 @@
 from django.db.models import Sum
+from django.db.models.manager import BaseManager
 from rest_framework import serializers
-from django.contrib.contenttypes.models import ContentType
+from apps.core.tipos_contenido import tipos_contenido
 from .models import (
     ProyectoInversion, MarcoLogico, Componente, Actividad,
     Indicador, Meta, ArrastreInversion, CronogramaValorado,
-    DictamenPrioridad, CriterioPriorizacion, PuntuacionProyecto
+    DictamenPrioridad, CriterioPriorizacion, PuntuacionProyecto, ProyectoInversionVersion
 )
 from apps.strategic_objectives.serializers import GenericRelatedObjectSerializer
+from apps.core.serializers import CamposDinamicosMixin
 
 # --- NUEVO: Serializer simplificado para listas ---
-class ProyectoInversionListSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = ProyectoInversion
-        fields = ['proyecto_id', 'nombre']
+class ProyectoInversionListSerializer(serializers.Serializer):
+    """
+    Fila del listado resumido de proyectos. Lee los dicts que arma ProyectoInversionListView con
+    .values() (todas las columnas vienen calculadas en la consulta), no instancias del modelo.
+    """
+    proyecto_id = serializers.IntegerField(read_only=True)
+    cup = serializers.CharField(read_only=True, allow_null=True)
+    nombre = serializers.CharField(read_only=True)
+    estado = serializers.CharField(read_only=True)
+    entidad_ejecutora = serializers.IntegerField(read_only=True)
+    entidad_nombre = serializers.CharField(read_only=True)
+    sector = serializers.IntegerField(read_only=True, allow_null=True)
+    sector_nombre = serializers.CharField(read_only=True, allow_null=True)
+    monto_total_programado = serializers.DecimalField(max_digits=17, decimal_places=2, coerce_to_string=False,
+                                                      read_only=True)
+    puntaje_priorizacion_total = serializers.DecimalField(max_digits=9, decimal_places=2, coerce_to_string=False,
+                                                          read_only=True)
+    estado_ultimo_dictamen = serializers.CharField(read_only=True, allow_null=True)
 
 # --- Marco Lógico ---
 class MetaSerializer(serializers.ModelSerializer):
@@ -54,7 +70,7 @@ class IndicadorSerializer(serializers.ModelSerializer):
         unidad_medida_indicador = validated_data.pop('unidad_medida')
         tipo_indicador = validated_data.pop('tipo_indicador', None)
 
-        tipo_de_contenido = ContentType.objects.get(id=content_type_id)
+        tipo_de_contenido = tipos_contenido.por_id(content_type_id)
 
         # Prefijo automático para Fin/Propósito
         if tipo_indicador == 'Fin' and not descripcion_indicador.lower().startswith('fin:'):
@@ -105,7 +121,7 @@ class IndicadorSerializer(serializers.ModelSerializer):
                 setattr(instance, attr, value)
 
         if content_type_id:
-            instance.content_type = ContentType.objects.get(id=content_type_id)
+            instance.content_type = tipos_contenido.por_id(content_type_id)
         if object_id:
             instance.object_id = object_id
 
@@ -141,10 +157,13 @@ class ComponenteSerializer(serializers.ModelSerializer):
         fields = ['componente_id', 'marco_logico', 'nombre', 'descripcion', 'ponderacion', 'actividades', 'indicadores', 'content_type_id']
 
     def get_content_type_id(self, obj):
-        return ContentType.objects.get_for_model(obj).id
+        return tipos_contenido.id_de(obj)
 
     def get_indicadores(self, obj):
-        ct = ContentType.objects.get_for_model(obj)
+        ct = tipos_contenido.tipo(obj)
+        precargados = self.context.get('indicadores_precargados')
+        if precargados is not None:
+            return IndicadorSerializer(precargados.get((ct.id, obj.pk), []), many=True).data
         indicadores_del_componente = Indicador.objects.filter(
             content_type=ct,
             object_id=obj.pk
@@ -161,17 +180,60 @@ class MarcoLogicoSerializer(serializers.ModelSerializer):
         fields = ['marco_logico_id', 'proyecto', 'fin', 'proposito', 'componentes', 'indicadores', 'content_type_id']
 
     def get_content_type_id(self, obj):
-        return ContentType.objects.get_for_model(obj).id
+        return tipos_contenido.id_de(obj)
 
     def get_indicadores(self, obj):
         # Obtener indicadores asociados mediante GenericForeignKey
-        ct = ContentType.objects.get_for_model(obj)
+        ct = tipos_contenido.tipo(obj)
+        precargados = self.context.get('indicadores_precargados')
+        if precargados is not None:
+            return IndicadorSerializer(precargados.get((ct.id, obj.pk), []), many=True).data
         indicadores = Indicador.objects.filter(
             content_type=ct,
             object_id=obj.pk
         )
         return IndicadorSerializer(indicadores, many=True).data
 
+def precargar_indicadores(proyectos):
+    """
+    Carga en bloque los indicadores (con su meta) de los marcos lógicos y componentes
+    de los proyectos recibidos: una consulta por tipo de contenido en lugar de una por objeto.
+    Devuelve un diccionario {(content_type_id, object_id): [indicadores]}.
+    """
+    objetos_por_tipo = {}
+    for proyecto in proyectos:
+        marco = getattr(proyecto, 'marco_logico', None)
+        if marco is None:
+            continue
+        objetos_por_tipo.setdefault(MarcoLogico, {})[marco.pk] = marco
+        for componente in marco.componentes.all():
+            objetos_por_tipo.setdefault(Componente, {})[componente.pk] = componente
+
+    precargados = {}
+    for modelo, objetos in objetos_por_tipo.items():
+        ct = tipos_contenido.tipo(modelo)
+        indicadores = Indicador.objects.filter(
+            content_type=ct,
+            object_id__in=list(objetos)
+        ).select_related('meta').order_by('indicador_id')
+        for indicador in indicadores:
+            # Reutilizamos el objeto ya cargado para evitar resolver el GenericForeignKey otra vez
+            indicador.objeto_asociado = objetos[indicador.object_id]
+            precargados.setdefault((ct.id, indicador.object_id), []).append(indicador)
+    return precargados
+
+class ProyectoInversionEnLoteSerializer(serializers.ListSerializer):
+    """
+    Serializa listas de proyectos precargando los indicadores genéricos de todo el lote,
+    de modo que el número de consultas no crezca con el número de proyectos.
+    """
+    def to_representation(self, data):
+        proyectos = list(data.all() if isinstance(data, BaseManager) else data)
+        # Con ?fields= el marco lógico puede no haberse solicitado
+        if 'marco_logico' in self.child.fields:
+            self.context['indicadores_precargados'] = precargar_indicadores(proyectos)
+        return super().to_representation(proyectos)
+
 # --- Serializer Principal del Proyecto de Inversión ---
 class ArrastreInversionSerializer(serializers.ModelSerializer):
     class Meta:
@@ -184,7 +246,7 @@ class DictamenPrioridadSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ('estado', 'fecha_solicitud')
 
-class ProyectoInversionSerializer(serializers.ModelSerializer):
+class ProyectoInversionSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     tipo_proyecto_nombre = serializers.CharField(source='tipo_proyecto.nombre', read_only=True)
     tipologia_proyecto_nombre = serializers.CharField(source='tipologia_proyecto.nombre', read_only=True)
     sector_nombre = serializers.CharField(source='sector.nombre', read_only=True)
@@ -199,6 +261,7 @@ class ProyectoInversionSerializer(serializers.ModelSerializer):
     arrastres = ArrastreInversionSerializer(many=True, read_only=True)
     dictamenes = DictamenPrioridadSerializer(many=True, read_only=True)
     puntaje_priorizacion_total = serializers.SerializerMethodField()
+    relaciones_campos = {'puntaje_priorizacion_total': ('puntuaciones',)}
 
     class Meta:
         model = ProyectoInversion
@@ -211,8 +274,13 @@ class ProyectoInversionSerializer(serializers.ModelSerializer):
             'programa_institucional', 'contribucion_programa', 'programa_institucional_nombre',
             'monto_total_programado', 'ultimas_observaciones', 'puntaje_priorizacion_total'
         ]
+        list_serializer_class = ProyectoInversionEnLoteSerializer
 
     def get_monto_total_programado(self, obj):
+        # Valor anotado por ProyectoInversionViewSet.get_queryset (sin consultas adicionales)
+        if hasattr(obj, 'total_programado_anotado'):
+            total = obj.total_programado_anotado
+            return total if total is not None else 0.00
         if not hasattr(obj, 'marco_logico') or obj.marco_logico is None:
             return 0.00
         total = obj.marco_logico.componentes.all() \
@@ -220,7 +288,10 @@ class ProyectoInversionSerializer(serializers.ModelSerializer):
         return total if total is not None else 0.00
 
     def get_puntaje_priorizacion_total(self, obj):
-        puntuaciones = obj.puntuaciones.filter(criterio__activo=True)
+        # Si el queryset ya precargó las puntuaciones activas, no se consulta de nuevo
+        puntuaciones = getattr(obj, 'puntuaciones_activas', None)
+        if puntuaciones is None:
+            puntuaciones = obj.puntuaciones.filter(criterio__activo=True).select_related('criterio')
         total_ponderado = 0
         for p in puntuaciones:
             total_ponderado += (p.puntuacion_asignada * (p.criterio.ponderacion / 100))
@@ -237,3 +308,11 @@ class PuntuacionProyectoSerializer(serializers.ModelSerializer):
     class Meta:
         model = PuntuacionProyecto
         fields = '__all__'
+
+class ProyectoInversionVersionSerializer(serializers.ModelSerializer):
+    """Entrada del historial; los datos de cada versión se piden aparte (se reconstruyen)."""
+    usuario_responsable = serializers.CharField(source='usuario_responsable.nombre_usuario', read_only=True, default=None)
+
+    class Meta:
+        model = ProyectoInversionVersion
+        fields = ('version_id', 'numero_version', 'fecha_version', 'usuario_responsable', 'es_completa')
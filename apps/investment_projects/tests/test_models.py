@@ -1,6 +1,16 @@
 # Archivo: tests/test_models.py
-from django.test import TestCase
-from apps.investment_projects.models import ProyectoInversion, Entidad, ItemCatalogo
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from apps.institutional_config.models import Catalogo
+from apps.investment_projects.models import (
+    ProyectoInversion, Entidad, ItemCatalogo, MarcoLogico, Componente, Actividad, CronogramaValorado,
+    ResumenFinancieroProyecto, ResumenFinancieroPeriodo, ProyectoInversionVersion
+)
 
 class ProyectoInversionModelTests(TestCase):
     def setUp(self):
@@ -19,4 +29,132 @@ class ProyectoInversionModelTests(TestCase):
 
     def test_proyecto_creacion(self):
         self.assertEqual(self.proyecto.nombre, "Proyecto Test")
-        self.assertEqual(self.proyecto.estado, "EN_FORMULACION")
\ No newline at end of file
+        self.assertEqual(self.proyecto.estado, "EN_FORMULACION")
+
+
+class ResumenFinancieroTests(TestCase):
+    def setUp(self):
+        catalogo = Catalogo.objects.create(nombre="Tipos", codigo="TIPOS")
+        self.entidad = Entidad.objects.create(nombre="Entidad Test", codigo_unico="ENT_TEST")
+        self.item = ItemCatalogo.objects.create(catalogo=catalogo, nombre="Item Test")
+        self.proyecto, self.actividad = self.crear_proyecto("Proyecto A")
+        self.otro_proyecto, self.otra_actividad = self.crear_proyecto("Proyecto B")
+
+    def crear_proyecto(self, nombre):
+        proyecto = ProyectoInversion.objects.create(
+            nombre=nombre, entidad_ejecutora=self.entidad,
+            tipo_proyecto=self.item, tipologia_proyecto=self.item, sector=self.item
+        )
+        marco = MarcoLogico.objects.create(proyecto=proyecto, fin="Fin", proposito="Propósito")
+        componente = Componente.objects.create(marco_logico=marco, nombre="Componente")
+        actividad = Actividad.objects.create(
+            componente=componente, descripcion="Actividad",
+            fecha_inicio=date(2025, 1, 1), fecha_fin=date(2025, 12, 31)
+        )
+        return proyecto, actividad
+
+    def total(self, proyecto):
+        resumen = ResumenFinancieroProyecto.objects.filter(proyecto=proyecto).first()
+        return resumen.monto_total_programado if resumen else Decimal('0')
+
+    def periodo(self, proyecto, periodo):
+        fila = ResumenFinancieroPeriodo.objects.filter(proyecto=proyecto, periodo=periodo).first()
+        return fila.monto_programado if fila else Decimal('0')
+
+    def test_alta_modificacion_y_baja_de_cronograma(self):
+        enero = CronogramaValorado.objects.create(actividad=self.actividad, periodo='2025-01', valor_programado=Decimal('100.50'))
+        CronogramaValorado.objects.create(actividad=self.actividad, periodo='2025-02', valor_programado=Decimal('50.00'))
+        self.assertEqual(self.total(self.proyecto), Decimal('150.50'))
+
+        enero.valor_programado = Decimal('10.00')
+        enero.save()
+        self.assertEqual(self.total(self.proyecto), Decimal('60.00'))
+        self.assertEqual(self.periodo(self.proyecto, '2025-01'), Decimal('10.00'))
+
+        enero.periodo = '2025-03'
+        enero.save()
+        self.assertEqual(self.periodo(self.proyecto, '2025-01'), Decimal('0'))
+        self.assertEqual(self.periodo(self.proyecto, '2025-03'), Decimal('10.00'))
+
+        enero.delete()
+        self.assertEqual(self.total(self.proyecto), Decimal('50.00'))
+        self.assertEqual(ResumenFinancieroProyecto.objects.verificar(), [])
+
+    def test_mover_componente_y_borrar_actividad(self):
+        CronogramaValorado.objects.create(actividad=self.actividad, periodo='2025-01', valor_programado=Decimal('80.00'))
+        componente = self.actividad.componente
+        componente.marco_logico = self.otro_proyecto.marco_logico
+        componente.save()
+        self.assertEqual(self.total(self.proyecto), Decimal('0'))
+        self.assertEqual(self.total(self.otro_proyecto), Decimal('80.00'))
+
+        self.actividad.delete()
+        self.assertEqual(self.total(self.otro_proyecto), Decimal('0'))
+        self.assertEqual(ResumenFinancieroProyecto.objects.verificar(), [])
+
+    def test_borrar_proyecto_con_cronograma(self):
+        CronogramaValorado.objects.create(actividad=self.actividad, periodo='2025-01', valor_programado=Decimal('80.00'))
+        self.proyecto.delete()
+        self.assertFalse(ResumenFinancieroProyecto.objects.filter(proyecto_id=self.proyecto.pk).exists())
+
+    def test_verificar_y_reconstruir_por_comando(self):
+        CronogramaValorado.objects.create(actividad=self.actividad, periodo='2025-01', valor_programado=Decimal('80.00'))
+        # Una escritura masiva no dispara señales y deja el resumen desactualizado
+        CronogramaValorado.objects.update(valor_programado=Decimal('99.00'))
+        with self.assertRaises(CommandError):
+            call_command('verificar_resumen_financiero', stdout=StringIO())
+
+        call_command('reconstruir_resumen_financiero', stdout=StringIO())
+        self.assertEqual(self.total(self.proyecto), Decimal('99.00'))
+        call_command('verificar_resumen_financiero', stdout=StringIO())
+
+
+@override_settings(PROYECTOS_VERSIONES_INTERVALO_COMPLETA=3)
+class VersionesProyectoTests(TestCase):
+    def setUp(self):
+        catalogo = Catalogo.objects.create(nombre="Tipos", codigo="TIPOS")
+        item = ItemCatalogo.objects.create(catalogo=catalogo, nombre="Item Test")
+        entidad = Entidad.objects.create(nombre="Entidad Test", codigo_unico="ENT_TEST")
+        self.proyecto = ProyectoInversion.objects.create(
+            nombre="Proyecto", entidad_ejecutora=entidad, tipo_proyecto=item, tipologia_proyecto=item, sector=item
+        )
+        self.historial = []
+        componentes = []
+        for numero in range(1, 8):
+            componentes.append({'nombre': f'Componente {numero}', 'ponderacion': numero * 1.5})
+            datos = {'nombre': f'Proyecto v{numero}', 'estado': 'EN_FORMULACION',
+                     'marco_logico': {'fin': 'Fin', 'componentes': list(componentes)}}
+            if numero == 4:
+                del datos['estado']
+            self.historial.append(datos)
+            ProyectoInversionVersion.objects.registrar(self.proyecto, numero, datos)
+
+    def test_fotos_completas_periodicas_y_parches(self):
+        completas = list(ProyectoInversionVersion.objects.filter(proyecto=self.proyecto, es_completa=True)
+                         .order_by('numero_version').values_list('numero_version', flat=True))
+        self.assertEqual(completas, [1, 4, 7])
+        parche = ProyectoInversionVersion.objects.get(proyecto=self.proyecto, numero_version=2)
+        self.assertIsNone(parche.datos)
+        self.assertEqual(parche.parche[0], {'op': 'replace', 'path': '/nombre', 'value': 'Proyecto v2'})
+
+    def test_reconstruye_cualquier_version(self):
+        for numero, datos in enumerate(self.historial, start=1):
+            self.assertEqual(ProyectoInversionVersion.objects.reconstruir(self.proyecto.pk, numero), datos)
+        self.assertIsNone(ProyectoInversionVersion.objects.reconstruir(self.proyecto.pk, 99))
+
+    def test_diferencias_entre_versiones(self):
+        parche = ProyectoInversionVersion.objects.diferencias(self.proyecto.pk, 2, 4)
+        self.assertIn({'op': 'remove', 'path': '/estado'}, parche)
+        self.assertIn({'op': 'add', 'path': '/marco_logico/componentes/2',
+                       'value': {'nombre': 'Componente 3', 'ponderacion': 4.5}}, parche)
+
+    def test_compactar_historial_de_fotos_completas(self):
+        ProyectoInversionVersion.objects.filter(proyecto=self.proyecto).delete()
+        for numero, datos in enumerate(self.historial, start=1):
+            ProyectoInversionVersion.objects.create(proyecto=self.proyecto, numero_version=numero, datos=datos)
+
+        salida = StringIO()
+        call_command('compactar_versiones_proyectos', intervalo=5, stdout=salida)
+        self.assertIn('7 versiones, 2 fotos completas y 5 parches', salida.getvalue())
+        for numero, datos in enumerate(self.historial, start=1):
+            self.assertEqual(ProyectoInversionVersion.objects.reconstruir(self.proyecto.pk, numero), datos)
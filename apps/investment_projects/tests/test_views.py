@@ -1,7 +1,24 @@
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APITestCase
 from rest_framework import status
-from apps.investment_projects.models import ProyectoInversion, Entidad, ItemCatalogo
+from apps.audit.models import AuditEvent
+from apps.authentication.models import Usuario
+from apps.institutional_config.models import Catalogo
+from apps.investment_projects.models import (
+    ProyectoInversion, Entidad, ItemCatalogo, MarcoLogico, Componente, Actividad,
+    CronogramaValorado, Indicador, Meta, CriterioPriorizacion, PuntuacionProyecto, ResumenFinancieroProyecto,
+    DictamenPrioridad
+)
+from apps.investment_projects.serializers import ProyectoInversionSerializer
 
 class ProyectoInversionViewSetTests(APITestCase):
     def setUp(self):
@@ -26,4 +43,279 @@ class ProyectoInversionViewSetTests(APITestCase):
     def test_postular_proyecto(self):
         response = self.client.post(f"/proyectos/{self.proyecto.proyecto_id}/postular/")
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
-        self.assertIn("error", response.data)
\ No newline at end of file
+        self.assertIn("error", response.data)
+
+class ProyectoInversionListQueriesTests(APITestCase):
+    """
+    Regresión de consultas del listado de proyectos: el número de consultas no debe
+    depender de la cantidad de proyectos y el JSON debe ser idéntico al serializado uno a uno.
+    """
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user(nombre_usuario="planificador", password="Clave123!")
+        self.client.force_authenticate(user=self.usuario)
+
+        catalogo = Catalogo.objects.create(nombre="Tipos", codigo="TIPOS")
+        self.entidad = Entidad.objects.create(nombre="Entidad Test", codigo_unico="ENT_TEST")
+        self.tipo = ItemCatalogo.objects.create(catalogo=catalogo, nombre="Tipo Test")
+        self.tipologia = ItemCatalogo.objects.create(catalogo=catalogo, nombre="Tipología Test")
+        self.sector = ItemCatalogo.objects.create(catalogo=catalogo, nombre="Sector Test")
+        criterio_activo = CriterioPriorizacion.objects.create(nombre="Impacto", ponderacion=Decimal('30.00'))
+        criterio_inactivo = CriterioPriorizacion.objects.create(
+            nombre="Obsoleto", ponderacion=Decimal('70.00'), activo=False
+        )
+        self.criterios = (criterio_activo, criterio_inactivo)
+        self.ct_marco = ContentType.objects.get_for_model(MarcoLogico)
+        self.ct_componente = ContentType.objects.get_for_model(Componente)
+
+    def crear_proyectos(self, cantidad):
+        inicio = ProyectoInversion.objects.count()
+        for i in range(inicio, inicio + cantidad):
+            proyecto = ProyectoInversion.objects.create(
+                nombre=f"Proyecto {i}",
+                entidad_ejecutora=self.entidad,
+                tipo_proyecto=self.tipo,
+                tipologia_proyecto=self.tipologia,
+                sector=self.sector
+            )
+            for criterio in self.criterios:
+                PuntuacionProyecto.objects.create(
+                    proyecto=proyecto, criterio=criterio, puntuacion_asignada=Decimal('85.50')
+                )
+            if i % 3 == 0:
+                continue  # proyecto sin marco lógico
+            marco = MarcoLogico.objects.create(proyecto=proyecto, fin="Fin", proposito="Propósito")
+            indicador = Indicador.objects.create(
+                content_type=self.ct_marco, object_id=marco.pk,
+                descripcion="Fin: Cobertura", unidad_medida="%"
+            )
+            Meta.objects.create(indicador=indicador, linea_base=10, valor_meta=50, periodo_anualizado="2025")
+            for c in range(2):
+                componente = Componente.objects.create(marco_logico=marco, nombre=f"Componente {c}")
+                indicador = Indicador.objects.create(
+                    content_type=self.ct_componente, object_id=componente.pk,
+                    descripcion="Obras", unidad_medida="u"
+                )
+                Meta.objects.create(indicador=indicador, linea_base=0, valor_meta=5, periodo_anualizado="2026")
+                actividad = Actividad.objects.create(
+                    componente=componente, descripcion="Actividad",
+                    fecha_inicio=date(2025, 1, 1), fecha_fin=date(2025, 12, 31)
+                )
+                for mes in ('2025-01', '2025-02'):
+                    CronogramaValorado.objects.create(
+                        actividad=actividad, periodo=mes, valor_programado=Decimal('1250.25')
+                    )
+
+    def listar(self):
+        response = self.client.get(reverse('proyecto-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def test_numero_de_consultas_constante(self):
+
+        self.crear_proyectos(2)
+        with CaptureQueriesContext(connection) as pocos:
+            self.listar()
+        self.crear_proyectos(7)
+        with CaptureQueriesContext(connection) as muchos:
+            self.listar()
+        self.assertEqual(len(pocos), len(muchos))
+
+    def test_json_identico_al_serializado_individual(self):
+
+        self.crear_proyectos(4)
+        esperado = JSONRenderer().render([
+            ProyectoInversionSerializer(proyecto).data
+            for proyecto in ProyectoInversion.objects.order_by('proyecto_id')
+        ])
+        self.assertEqual(self.listar().content, esperado)
+
+    def test_campos_dispersos_no_precargan_relaciones_no_solicitadas(self):
+
+        self.crear_proyectos(3)
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse('proyecto-list'), {'fields': 'proyecto_id,nombre,sector_nombre'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data[0]), {'proyecto_id', 'nombre', 'sector_nombre'})
+        sql = ' '.join(consulta['sql'] for consulta in consultas)
+        for modelo in (MarcoLogico, DictamenPrioridad, PuntuacionProyecto):
+            self.assertNotIn(modelo._meta.db_table, sql)
+        # El sector sigue llegando por JOIN: una sola consulta para los proyectos
+        self.assertEqual(
+            sum(ProyectoInversion._meta.db_table in consulta['sql'] for consulta in consultas), 1
+        )
+
+
+class VersionesProyectoViewTests(APITestCase):
+    def setUp(self):
+        catalogo = Catalogo.objects.create(nombre="Tipos", codigo="TIPOS")
+        item = ItemCatalogo.objects.create(catalogo=catalogo, nombre="Item Test")
+        entidad = Entidad.objects.create(nombre="Entidad Test", codigo_unico="ENT_TEST")
+        self.proyecto = ProyectoInversion.objects.create(
+            nombre="Original", entidad_ejecutora=entidad, tipo_proyecto=item, tipologia_proyecto=item, sector=item
+        )
+        self.client.force_authenticate(user=Usuario.objects.create_user(nombre_usuario="editor", password="Clave123!"))
+        url = reverse('proyecto-detail', args=[self.proyecto.pk])
+        for nombre in ("Segundo", "Tercero"):
+            response = self.client.patch(url, {'nombre': nombre}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_historial_y_version_reconstruida(self):
+        response = self.client.get(reverse('proyecto-versiones', args=[self.proyecto.pk]))
+        self.assertEqual([v['numero_version'] for v in response.data], [2, 1])
+        self.assertEqual([v['es_completa'] for v in response.data], [False, True])
+
+        response = self.client.get(reverse('proyecto-version', args=[self.proyecto.pk, 2]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['datos']['nombre'], "Segundo")
+        response = self.client.get(reverse('proyecto-version', args=[self.proyecto.pk, 9]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_diff_entre_versiones_y_con_el_estado_actual(self):
+        url = reverse('proyecto-versiones-diff', args=[self.proyecto.pk])
+        response = self.client.get(url, {'desde': 1, 'hasta': 2})
+        self.assertIn({'op': 'replace', 'path': '/nombre', 'value': 'Segundo'}, response.data['parche'])
+        response = self.client.get(url, {'desde': 1})
+        self.assertEqual(response.data['hasta'], 'actual')
+        self.assertIn({'op': 'replace', 'path': '/nombre', 'value': 'Tercero'}, response.data['parche'])
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CargaMasivaCronogramaTests(APITestCase):
+    def setUp(self):
+        catalogo = Catalogo.objects.create(nombre="Tipos", codigo="TIPOS")
+        item = ItemCatalogo.objects.create(catalogo=catalogo, nombre="Item Test")
+        entidad = Entidad.objects.create(nombre="Entidad Test", codigo_unico="ENT_TEST")
+        self.actividades = []
+        for nombre in ("Proyecto A", "Proyecto B"):
+            proyecto = ProyectoInversion.objects.create(
+                nombre=nombre, entidad_ejecutora=entidad, tipo_proyecto=item, tipologia_proyecto=item, sector=item
+            )
+            marco = MarcoLogico.objects.create(proyecto=proyecto, fin="Fin", proposito="Propósito")
+            componente = Componente.objects.create(marco_logico=marco, nombre="Componente")
+            self.actividades.append(Actividad.objects.create(
+                componente=componente, descripcion="Actividad",
+                fecha_inicio=date(2025, 1, 1), fecha_fin=date(2025, 12, 31)
+            ))
+        self.client.force_authenticate(user=Usuario.objects.create_user(nombre_usuario="editor", password="Clave123!"))
+        self.url = reverse('cronogramas-bulk')
+
+    def total(self, actividad):
+        return ResumenFinancieroProyecto.objects.get(proyecto=actividad.componente.marco_logico.proyecto).monto_total_programado
+
+    def test_carga_del_cronograma_completo_y_resumen(self):
+        filas = [
+            {'actividad': self.actividades[0].pk, 'periodo': f'2025-{mes:02d}', 'valor_programado': '100.00'}
+            for mes in range(1, 13)
+        ]
+        filas.append({'actividad': self.actividades[1].pk, 'periodo': '2025-01', 'valor_programado': '50.00'})
+        response = self.client.post(self.url, filas, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertEqual(response.data['total'], 13)
+        self.assertEqual(CronogramaValorado.objects.count(), 13)
+        self.assertEqual(self.total(self.actividades[0]), Decimal('1200.00'))
+        self.assertEqual(self.total(self.actividades[1]), Decimal('50.00'))
+        self.assertEqual(AuditEvent.objects.filter(event_type='CRONOGRAMA_BULK_CREATED').count(), 2)
+
+        # Mover un valor al otro proyecto actualiza el resumen de ambos
+        primero = response.data['resultados'][0]['cronograma_id']
+        response = self.client.patch(self.url, [
+            {'cronograma_id': primero, 'actividad': self.actividades[1].pk, 'valor_programado': '10.00'}
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual(self.total(self.actividades[0]), Decimal('1100.00'))
+        self.assertEqual(self.total(self.actividades[1]), Decimal('60.00'))
+
+    def test_sin_returning_lee_los_ids_por_lote(self):
+        actividad = self.actividades[0]
+        previo = CronogramaValorado.objects.create(actividad=actividad, periodo='2025-01', valor_programado=1)
+
+        def cargar(cantidad):
+            # Periodos repetidos, también con la fila que ya existía
+            filas = [{'actividad': actividad.pk, 'periodo': f'2025-{i % 2 + 1:02d}', 'valor_programado': f'{i + 10}.00'}
+                     for i in range(cantidad)]
+            with CaptureQueriesContext(connection) as consultas:
+                response = self.client.post(self.url, filas, format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+            for fila, resultado in zip(filas, response.data['resultados']):
+                cronograma = CronogramaValorado.objects.get(pk=resultado['cronograma_id'])
+                self.assertEqual((cronograma.periodo, cronograma.valor_programado),
+                                 (fila['periodo'], Decimal(fila['valor_programado'])))
+            return len(consultas)
+
+        with mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert',
+                               new_callable=mock.PropertyMock, return_value=False):
+            self.assertEqual(cargar(2), cargar(12))
+        self.assertEqual(CronogramaValorado.objects.get(pk=previo.pk).valor_programado, 1)
+
+    def test_filas_invalidas(self):
+        response = self.client.post(self.url, [{'actividad': 999, 'periodo': '2025-01'}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(response.data['errores'][0]['errores']), {'actividad', 'valor_programado'})
+        self.assertEqual(self.client.post(self.url, {'actividad': 1}, format='json').status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(CronogramaValorado.objects.exists())
+
+
+class ProyectoInversionResumenListTests(APITestCase):
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user(nombre_usuario="lector", password="Clave123!")
+        self.client.force_authenticate(user=self.usuario)
+        catalogo = Catalogo.objects.create(nombre="Tipos", codigo="TIPOS")
+        self.entidad = Entidad.objects.create(nombre="Ministerio", codigo_unico="MIN")
+        self.sector = ItemCatalogo.objects.create(catalogo=catalogo, nombre="Salud")
+        self.criterios = [
+            CriterioPriorizacion.objects.create(nombre="Impacto", ponderacion=Decimal('30.00')),
+            CriterioPriorizacion.objects.create(nombre="Obsoleto", ponderacion=Decimal('70.00'), activo=False),
+        ]
+        self.url = reverse('proyecto-list-simplified')
+
+    def crear_proyectos(self, cantidad, **extra):
+        proyectos = []
+        for i in range(cantidad):
+            proyecto = ProyectoInversion.objects.create(
+                nombre=f"Proyecto {ProyectoInversion.objects.count()}", entidad_ejecutora=self.entidad,
+                tipo_proyecto=self.sector, tipologia_proyecto=self.sector, sector=self.sector, **extra
+            )
+            for criterio in self.criterios:
+                PuntuacionProyecto.objects.create(proyecto=proyecto, criterio=criterio, puntuacion_asignada=Decimal('85.50'))
+            DictamenPrioridad.objects.create(proyecto=proyecto, estado='RECHAZADO')
+            DictamenPrioridad.objects.create(proyecto=proyecto, estado='APROBADO')
+            ResumenFinancieroProyecto.objects.update_or_create(
+                proyecto=proyecto, defaults={'monto_total_programado': Decimal('1000.50') * (i + 1)}
+            )
+            proyectos.append(proyecto)
+        return proyectos
+
+    def test_columnas_calculadas_en_una_consulta(self):
+        proyecto = self.crear_proyectos(2)[0]
+        with CaptureQueriesContext(connection) as pocos:
+            self.client.get(self.url)
+        self.crear_proyectos(5)
+        with CaptureQueriesContext(connection) as muchos:
+            response = self.client.get(self.url)
+        self.assertEqual(len(pocos), 1)
+        self.assertEqual(len(muchos), 1)
+        self.assertEqual(len(response.data), 7)
+        fila = response.data[0]
+        self.assertEqual(fila['proyecto_id'], proyecto.pk)
+        self.assertEqual((fila['entidad_nombre'], fila['sector_nombre']), ("Ministerio", "Salud"))
+        self.assertEqual(fila['monto_total_programado'], Decimal('1000.50'))
+        # Solo cuentan los criterios activos: 85.50 * 30%
+        self.assertEqual(fila['puntaje_priorizacion_total'], Decimal('25.65'))
+        self.assertEqual(fila['estado_ultimo_dictamen'], 'APROBADO')
+
+    def test_filtros_orden_y_cursor(self):
+        self.crear_proyectos(3)
+        self.crear_proyectos(1, estado='POSTULADO')
+        response = self.client.get(self.url, {'estado': 'POSTULADO'})
+        self.assertEqual([fila['estado'] for fila in response.data], ['POSTULADO'])
+
+        response = self.client.get(self.url, {'ordering': '-monto_total_programado'})
+        montos = [fila['monto_total_programado'] for fila in response.data]
+        self.assertEqual(montos, sorted(montos, reverse=True))
+
+        primera = self.client.get(self.url, {'cursor': '', 'page_size': 3}).data
+        self.assertEqual(len(primera['results']), 3)
+        segunda = self.client.get(primera['next']).data
+        ids = [fila['proyecto_id'] for fila in primera['results'] + segunda['results']]
+        self.assertEqual(ids, sorted(ProyectoInversion.objects.values_list('proyecto_id', flat=True)))
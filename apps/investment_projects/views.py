@@ -1,6 +1,10 @@
 import decimal
 
+from django.db.models import DecimalField, F, OuterRef, Prefetch, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import viewsets, status
+from rest_framework.filters import OrderingFilter
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
@@ -9,16 +13,24 @@ from apps.authentication.permissions import IsAdmin, IsEditor, IsAuditor
 from .models import (
     ProyectoInversion, MarcoLogico, Componente, Actividad, Indicador, Meta,
     ArrastreInversion, CronogramaValorado, DictamenPrioridad, ProyectoInversionVersion, CriterioPriorizacion,
-    PuntuacionProyecto
+    PuntuacionProyecto, ResumenFinancieroProyecto
 )
 from .serializers import (
     ProyectoInversionSerializer, ProyectoInversionListSerializer, # Importar el nuevo serializador
     ArrastreInversionSerializer, CronogramaValoradoSerializer, DictamenPrioridadSerializer, MarcoLogicoSerializer,
     ComponenteSerializer, ActividadSerializer, IndicadorSerializer, MetaSerializer, CriterioPriorizacionSerializer,
-    PuntuacionProyectoSerializer
+    PuntuacionProyectoSerializer, ProyectoInversionVersionSerializer
 )
 from ..institutional_config.models import Catalogo
 from ..institutional_config.serializers import CatalogoSerializer
+from apps.audit.models import AuditEvent
+from apps.audit.pipeline import registrar_auditoria
+from apps.core.masivo import CargaMasivaMixin
+from apps.core.metricas import MedicionSerializacionMixin
+from apps.core.serializers import ConsultaCamposDinamicosMixin
+from apps.core.parches import calcular_parche
+from apps.core.tipos_contenido import tipos_contenido
+from apps.reports import estadisticas
 
 def convert_decimals(obj):
     if isinstance(obj, list):
@@ -30,23 +42,65 @@ def convert_decimals(obj):
     return obj
 
 # NUEVO: Vista simplificada para listar proyectos
-class ProyectoInversionListView(ListAPIView):
-    queryset = ProyectoInversion.objects.all()
+class ProyectoInversionListView(MedicionSerializacionMixin, ListAPIView):
+    """
+    Listado resumido de proyectos para tablas y dashboards. Cada fila sale de una sola consulta con
+    .values(): nombres de entidad y sector por JOIN, total programado del resumen materializado,
+    puntaje de priorización y estado del último dictamen como subconsultas.
+
+    Filtros: ?estado=, ?entidad_ejecutora=, ?sector=, ?tipo_proyecto=, ?programa_institucional=.
+    Orden: ?ordering= (p. ej. -monto_total_programado). Paginación opcional como en el resto de
+    la API; ?cursor= pagina por keyset según el orden pedido.
+    """
     serializer_class = ProyectoInversionListSerializer
     permission_classes = [IsAuthenticated] # O el permiso que consideres adecuado para listar proyectos
+    filter_backends = [DjangoFilterBackend, OrderingFilter]
+    filterset_fields = ['estado', 'entidad_ejecutora', 'sector', 'tipo_proyecto', 'programa_institucional']
+    ordering_fields = ['proyecto_id', 'nombre', 'cup', 'estado', 'entidad_nombre', 'sector_nombre',
+                       'monto_total_programado', 'puntaje_priorizacion_total']
+    ordering = ['proyecto_id']
+    cursor_ordering = 'proyecto_id'
+
+    def get_queryset(self):
+        puntaje = PuntuacionProyecto.objects.filter(proyecto=OuterRef('pk'), criterio__activo=True) \
+            .values('proyecto').annotate(
+                total=Sum(F('puntuacion_asignada') * F('criterio__ponderacion') / 100)
+            ).values('total')
+        ultimo_dictamen = DictamenPrioridad.objects.filter(proyecto=OuterRef('pk')) \
+            .order_by('-fecha_solicitud', '-dictamen_id').values('estado')[:1]
+        monto = DecimalField(max_digits=17, decimal_places=2)
+        return ProyectoInversion.objects.annotate(
+            entidad_nombre=F('entidad_ejecutora__nombre'),
+            sector_nombre=F('sector__nombre'),
+            monto_total_programado=Coalesce(F('resumen_financiero__monto_total_programado'), Value(0), output_field=monto),
+            puntaje_priorizacion_total=Coalesce(Subquery(puntaje, output_field=monto), Value(0), output_field=monto),
+            estado_ultimo_dictamen=Subquery(ultimo_dictamen),
+        ).values(
+            'proyecto_id', 'cup', 'nombre', 'estado', 'entidad_ejecutora', 'entidad_nombre', 'sector',
+            'sector_nombre', 'monto_total_programado', 'puntaje_priorizacion_total', 'estado_ultimo_dictamen',
+        )
 
-class ProyectoInversionViewSet(viewsets.ModelViewSet):
+class ProyectoInversionViewSet(ConsultaCamposDinamicosMixin, MedicionSerializacionMixin, viewsets.ModelViewSet):
     """
     ViewSet para los Proyectos de Inversión.
     """
     serializer_class = ProyectoInversionSerializer
+    cursor_ordering = 'proyecto_id'
     # permission_classes = [IsAuthenticated, (IsAdmin | IsEditor | IsAuditor)]
     queryset = ProyectoInversion.objects.select_related(
-        'programa_institucional'
+        'programa_institucional', 'tipo_proyecto', 'tipologia_proyecto', 'sector'
     ).prefetch_related(
         'marco_logico__componentes__actividades__cronograma',
         'arrastres',
-        'dictamenes'
+        'dictamenes',
+        Prefetch(
+            'puntuaciones',
+            queryset=PuntuacionProyecto.objects.filter(criterio__activo=True).select_related('criterio'),
+            to_attr='puntuaciones_activas'
+        )
+    ).annotate(
+        # Total programado leído del resumen materializado (ResumenFinancieroProyecto)
+        total_programado_anotado=F('resumen_financiero__monto_total_programado')
     )
 
     def get_queryset(self):
@@ -91,16 +145,53 @@ class ProyectoInversionViewSet(viewsets.ModelViewSet):
         instance = self.get_object()
         data = self.get_serializer(instance).data
         data = convert_decimals(data)  # <-- Conversión aquí
-        ProyectoInversionVersion.objects.create(
-            proyecto=instance,
-            numero_version=instance.version_actual,
-            usuario_responsable=request.user if request.user.is_authenticated else None,
-            datos=data
+        # Se guarda como foto completa o como parche respecto de la versión anterior
+        ProyectoInversionVersion.objects.registrar(
+            instance, instance.version_actual, data,
+            usuario=request.user if request.user.is_authenticated else None,
         )
         instance.version_actual += 1
         instance.save(update_fields=['version_actual'])
         return super().update(request, *args, **kwargs)
 
+    @action(detail=True, methods=['get'], url_path='versiones')
+    def versiones(self, request, pk=None):
+        """Historial de versiones del proyecto (sin los datos)."""
+        proyecto = self.get_object()
+        versiones = ProyectoInversionVersion.objects.filter(proyecto=proyecto).select_related(
+            'usuario_responsable').defer('datos', 'parche').order_by('-numero_version')
+        return Response(ProyectoInversionVersionSerializer(versiones, many=True).data)
+
+    @action(detail=True, methods=['get'], url_path=r'versiones/(?P<numero>\d+)')
+    def version(self, request, pk=None, numero=None):
+        """Datos completos de una versión, reconstruidos desde la última foto y sus parches."""
+        proyecto = self.get_object()
+        datos = ProyectoInversionVersion.objects.reconstruir(proyecto.pk, int(numero))
+        if datos is None:
+            return Response({'error': f'El proyecto no tiene la versión {numero}.'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'numero_version': int(numero), 'datos': datos})
+
+    @action(detail=True, methods=['get'], url_path='versiones-diff')
+    def versiones_diff(self, request, pk=None):
+        """
+        Diferencias entre dos versiones como JSON Patch: ?desde=2&hasta=5.
+        hasta=actual (o sin hasta) compara con el estado actual del proyecto.
+        """
+        proyecto = self.get_object()
+        desde, hasta = request.query_params.get('desde'), request.query_params.get('hasta', 'actual')
+        if not desde or not desde.isdigit() or not (hasta == 'actual' or hasta.isdigit()):
+            return Response({'error': "Indique ?desde=<número> y ?hasta=<número>|actual."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if hasta == 'actual':
+            anterior = ProyectoInversionVersion.objects.reconstruir(proyecto.pk, int(desde))
+            parche = None if anterior is None else calcular_parche(
+                anterior, convert_decimals(self.get_serializer(proyecto).data))
+        else:
+            parche = ProyectoInversionVersion.objects.diferencias(proyecto.pk, int(desde), int(hasta))
+        if parche is None:
+            return Response({'error': 'Alguna de las versiones indicadas no existe.'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'desde': int(desde), 'hasta': hasta if hasta == 'actual' else int(hasta), 'parche': parche})
+
     # Acción personalizada para generar el CUP
     @action(detail=True, methods=['post'], url_path='generar-cup')
     def generar_cup(self, request):
@@ -161,7 +252,7 @@ class ProyectoInversionViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(proyecto)
         return Response(serializer.data)
 
-class MarcoLogicoViewSet(viewsets.ModelViewSet):
+class MarcoLogicoViewSet(MedicionSerializacionMixin, viewsets.ModelViewSet):
     """
     ViewSet para el Marco Lógico.
     """
@@ -181,31 +272,70 @@ class MarcoLogicoViewSet(viewsets.ModelViewSet):
 
         return queryset
 
-class ComponenteViewSet(viewsets.ModelViewSet):
+class ComponenteViewSet(MedicionSerializacionMixin, viewsets.ModelViewSet):
     queryset = Componente.objects.all()
     serializer_class = ComponenteSerializer
 
-class ActividadViewSet(viewsets.ModelViewSet):
+class ActividadViewSet(MedicionSerializacionMixin, viewsets.ModelViewSet):
     queryset = Actividad.objects.all()
     serializer_class = ActividadSerializer
 
-class IndicadorViewSet(viewsets.ModelViewSet):
+class IndicadorViewSet(MedicionSerializacionMixin, viewsets.ModelViewSet):
     queryset = Indicador.objects.all()
     serializer_class = IndicadorSerializer
 
-class MetaViewSet(viewsets.ModelViewSet):
+class MetaViewSet(MedicionSerializacionMixin, viewsets.ModelViewSet):
     queryset = Meta.objects.all()
     serializer_class = MetaSerializer
 
-class ArrastreInversionViewSet(viewsets.ModelViewSet):
+class ArrastreInversionViewSet(MedicionSerializacionMixin, viewsets.ModelViewSet):
     queryset = ArrastreInversion.objects.all()
     serializer_class = ArrastreInversionSerializer
 
-class CronogramaValoradoViewSet(viewsets.ModelViewSet):
+class CronogramaValoradoViewSet(CargaMasivaMixin, MedicionSerializacionMixin, viewsets.ModelViewSet):
     queryset = CronogramaValorado.objects.all()
     serializer_class = CronogramaValoradoSerializer
 
-class DictamenPrioridadViewSet(viewsets.ModelViewSet):
+    # Carga masiva del cronograma (POST/PATCH cronogramas/bulk/, ver CargaMasivaMixin)
+    def preparar_carga_masiva(self, objetos, creacion):
+        # Al actualizar, una fila puede cambiar de actividad (y de proyecto): se guardan las anteriores
+        self._actividades_anteriores = set() if creacion else set(
+            CronogramaValorado.objects.filter(pk__in=[o.pk for o in objetos]).values_list('actividad_id', flat=True)
+        )
+        return ()
+
+    def clave_carga_masiva(self):
+        # No es única: crear_en_lote bloquea esas actividades y toma solo las filas nuevas
+        return ('actividad', 'periodo')
+
+    def despues_de_carga_masiva(self, objetos, creacion):
+        actividades = {o.actividad_id for o in objetos} | self._actividades_anteriores
+        proyecto_de = dict(Actividad.objects.filter(pk__in=actividades).values_list(
+            'actividad_id', 'componente__marco_logico__proyecto_id'))
+        # bulk_create/bulk_update no disparan las señales que mantienen el resumen financiero
+        ResumenFinancieroProyecto.objects.recalcular(proyecto_de.values())
+        estadisticas.invalidar(CronogramaValorado)
+
+        por_proyecto = {}
+        for cronograma in objetos:
+            por_proyecto.setdefault(proyecto_de.get(cronograma.actividad_id), []).append(cronograma)
+        accion = 'creados' if creacion else 'actualizados'
+        for proyecto_id, filas in por_proyecto.items():
+            if proyecto_id is None:
+                continue
+            registrar_auditoria(
+                AuditEvent,
+                user=self.request.user,
+                event_type='CRONOGRAMA_BULK_CREATED' if creacion else 'CRONOGRAMA_BULK_UPDATED',
+                details={
+                    "message": f"{len(filas)} valores del cronograma {accion} en carga masiva.",
+                    "cronograma_ids": [c.pk for c in filas],
+                },
+                content_type=tipos_contenido.tipo(ProyectoInversion),
+                object_id=proyecto_id
+            )
+
+class DictamenPrioridadViewSet(MedicionSerializacionMixin, viewsets.ModelViewSet):
     queryset = DictamenPrioridad.objects.all()
     serializer_class = DictamenPrioridadSerializer
 
@@ -225,7 +355,7 @@ class DictamenPrioridadViewSet(viewsets.ModelViewSet):
         dictamen.save()
         return Response({'status': 'Dictamen rechazado'})
 
-class CatalogoViewSet(viewsets.ModelViewSet):
+class CatalogoViewSet(MedicionSerializacionMixin, viewsets.ModelViewSet):
     queryset = Catalogo.objects.all()
     serializer_class = CatalogoSerializer
 
@@ -238,11 +368,11 @@ class CatalogoViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(catalogos, many=True)
         return Response(serializer.data)
 
-class CriterioPriorizacionViewSet(viewsets.ModelViewSet):
+class CriterioPriorizacionViewSet(MedicionSerializacionMixin, viewsets.ModelViewSet):
     queryset = CriterioPriorizacion.objects.all()
     serializer_class = CriterioPriorizacionSerializer
 
-class PuntuacionProyectoViewSet(viewsets.ModelViewSet):
+class PuntuacionProyectoViewSet(MedicionSerializacionMixin, viewsets.ModelViewSet):
     queryset = PuntuacionProyecto.objects.all()
     serializer_class = PuntuacionProyectoSerializer
     filterset_fields = ['proyecto', 'criterio']
\ No newline at end of file
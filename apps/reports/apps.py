@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ReportsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.reports'
+
+    def ready(self):
+        # Conecta la invalidación de la caché del dashboard a las escrituras de los modelos
+        from . import estadisticas  # noqa: F401
@@ -0,0 +1,105 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, Sum
+from django.db.models.signals import post_delete, post_save
+
+from apps.investment_projects.models import (
+    ProyectoInversion, Componente, Actividad, CronogramaValorado, DictamenPrioridad, ResumenFinancieroPeriodo
+)
+from apps.institutional_config.models import Entidad, ItemCatalogo
+from apps.tracking.models import TrackingActivity
+
+PREFIJO_CACHE = 'dashboard:'
+
+
+def proyectos_por_estado():
+    return list(ProyectoInversion.objects.values('estado').annotate(total=Count('pk')).order_by('estado'))
+
+
+def proyectos_por_sector():
+    return list(
+        ProyectoInversion.objects.values('sector_id', sector_nombre=F('sector__nombre'))
+        .annotate(total=Count('pk')).order_by('-total', 'sector_id')
+    )
+
+
+def proyectos_por_entidad():
+    return list(
+        ProyectoInversion.objects.values('entidad_ejecutora_id', entidad_nombre=F('entidad_ejecutora__nombre'))
+        .annotate(total=Count('pk')).order_by('-total', 'entidad_ejecutora_id')
+    )
+
+
+def programado_por_periodo():
+    # Se apoya en el resumen materializado por periodo en lugar de sumar CronogramaValorado
+    return list(
+        ResumenFinancieroPeriodo.objects.values('periodo')
+        .annotate(total=Sum('monto_programado')).order_by('periodo')
+    )
+
+
+def actividades_por_estado():
+    estados = dict(TrackingActivity.STATUS_CHOICES)
+    filas = (TrackingActivity.objects.filter(is_active=True)
+             .values('reported_status').annotate(total=Count('pk')).order_by('reported_status'))
+    return [
+        {'estado': fila['reported_status'], 'nombre': estados.get(fila['reported_status']), 'total': fila['total']}
+        for fila in filas
+    ]
+
+
+def dictamenes():
+    conteos = dict(DictamenPrioridad.objects.values_list('estado').annotate(total=Count('pk')).order_by())
+    aprobados, rechazados = conteos.get('APROBADO', 0), conteos.get('RECHAZADO', 0)
+    resueltos = aprobados + rechazados
+    return {
+        'por_estado': {estado: conteos.get(estado, 0) for estado, _ in DictamenPrioridad.ESTADO_CHOICES},
+        'tasa_aprobacion': round(aprobados * 100 / resueltos, 2) if resueltos else None,
+    }
+
+
+# sección -> (función que la calcula, modelos cuyas escrituras la invalidan)
+SECCIONES = {
+    'proyectos_por_estado': (proyectos_por_estado, [ProyectoInversion]),
+    'proyectos_por_sector': (proyectos_por_sector, [ProyectoInversion, ItemCatalogo]),
+    'proyectos_por_entidad': (proyectos_por_entidad, [ProyectoInversion, Entidad]),
+    'programado_por_periodo': (programado_por_periodo,
+                               [ProyectoInversion, Componente, Actividad, CronogramaValorado]),
+    'actividades_por_estado': (actividades_por_estado, [TrackingActivity]),
+    'dictamenes': (dictamenes, [DictamenPrioridad, ProyectoInversion]),
+}
+
+
+def clave_cache(seccion):
+    return f'{PREFIJO_CACHE}{seccion}'
+
+
+def obtener_estadisticas():
+    """Devuelve todas las secciones; solo se recalculan (con un GROUP BY cada una) las que no están en caché."""
+    guardadas = cache.get_many([clave_cache(seccion) for seccion in SECCIONES])
+    resultado, nuevas = {}, {}
+    for seccion, (calcular, _) in SECCIONES.items():
+        clave = clave_cache(seccion)
+        if clave in guardadas:
+            resultado[seccion] = guardadas[clave]
+        else:
+            resultado[seccion] = nuevas[clave] = calcular()
+    if nuevas:
+        cache.set_many(nuevas, timeout=getattr(settings, 'DASHBOARD_CACHE_SEGUNDOS', 300))
+    return resultado
+
+
+def invalidar(modelo):
+    claves = [clave_cache(seccion) for seccion, (_, modelos) in SECCIONES.items() if modelo in modelos]
+    if claves:
+        cache.delete_many(claves)
+
+
+def invalidar_estadisticas(sender, **kwargs):
+    invalidar(sender)
+
+
+# Solo se escuchan los modelos de los que depende alguna sección
+for _modelo in {modelo for _, modelos in SECCIONES.values() for modelo in modelos}:
+    post_save.connect(invalidar_estadisticas, sender=_modelo, dispatch_uid=f'dashboard-{_modelo._meta.label}-save')
+    post_delete.connect(invalidar_estadisticas, sender=_modelo, dispatch_uid=f'dashboard-{_modelo._meta.label}-delete')
@@ -0,0 +1,151 @@
+import csv
+import datetime
+import json
+import tempfile
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.html import escape
+from openpyxl import Workbook
+
+from apps.core.genericos import cargar_objetos
+from apps.core.tipos_contenido import tipos_contenido
+from apps.tracking.models import TrackingActivity
+
+# (encabezado, campo de .values()) en el orden en que se exportan
+COLUMNAS_ACTIVIDADES = [
+    ('Código', 'activity_code'),
+    ('Nombre', 'name'),
+    ('Proyecto', 'project__nombre'),
+    ('Estado', 'reported_status'),
+    ('Prioridad', 'priority'),
+    ('Responsable', 'responsible__nombre_usuario'),
+    ('Fecha Inicio Plan.', 'planned_start_date'),
+    ('Fecha Fin Plan.', 'planned_end_date'),
+]
+ENCABEZADOS_ACTIVIDADES = [encabezado for encabezado, _ in COLUMNAS_ACTIVIDADES]
+ESTADOS = dict(TrackingActivity.STATUS_CHOICES)
+
+
+def iterar_por_bloques(queryset, campos, tamano_bloque=2000):
+    """
+    Recorre el queryset con .values() en bloques por clave primaria (WHERE id > último visto).
+    A diferencia de .iterator(), no depende de cursores del lado del servidor, que MySQL no
+    ofrece: cada bloque es una consulta corta y la memoria se mantiene constante.
+    """
+    ultimo = None
+    while True:
+        bloque = queryset.order_by('pk')
+        if ultimo is not None:
+            bloque = bloque.filter(pk__gt=ultimo)
+        filas = list(bloque.values('pk', *campos)[:tamano_bloque])
+        if not filas:
+            return
+        yield from filas
+        ultimo = filas[-1]['pk']
+
+
+def filas_actividades(queryset, tamano_bloque=2000):
+    """Devuelve cada actividad como lista de valores en el orden de ENCABEZADOS_ACTIVIDADES."""
+    campos = [campo for _, campo in COLUMNAS_ACTIVIDADES]
+    for fila in iterar_por_bloques(queryset, campos, tamano_bloque):
+        fila['reported_status'] = ESTADOS.get(fila['reported_status'], fila['reported_status'])
+        fila['responsible__nombre_usuario'] = fila['responsible__nombre_usuario'] or 'N/A'
+        yield [fila[campo] for campo in campos]
+
+
+ENCABEZADOS_ALINEACIONES = [
+    'ID', 'Tipo Origen', 'Origen', 'Tipo Destino', 'Destino', 'Contribución (%)', 'Fecha Creación', 'Usuario',
+]
+CAMPOS_ALINEACIONES = [
+    'instrumento_origen_tipo_id', 'instrumento_origen_id', 'instrumento_destino_tipo_id', 'instrumento_destino_id',
+    'contribucion_porcentaje', 'fecha_creacion', 'usuario_creacion__nombre_usuario',
+]
+
+
+def filas_alineaciones(queryset, tamano_bloque=2000, relaciones=None):
+    """
+    Devuelve cada alineación como lista de valores en el orden de ENCABEZADOS_ALINEACIONES.
+    Origen y destino (genéricos) se resuelven por bloque con cargar_objetos: una consulta por
+    tipo de contenido y bloque, no por fila.
+    """
+    filas = iterar_por_bloques(queryset, CAMPOS_ALINEACIONES, tamano_bloque)
+    while True:
+        bloque = list(islice(filas, tamano_bloque))
+        if not bloque:
+            return
+        objetos = cargar_objetos(
+            [(fila[f'instrumento_{extremo}_tipo_id'], fila[f'instrumento_{extremo}_id'])
+             for fila in bloque for extremo in ('origen', 'destino')],
+            relaciones,
+        )
+        for fila in bloque:
+            valores = [fila['pk']]
+            for extremo in ('origen', 'destino'):
+                par = (fila[f'instrumento_{extremo}_tipo_id'], fila[f'instrumento_{extremo}_id'])
+                objeto = objetos.get(par)
+                valores += [tipos_contenido.por_id(par[0]).model, str(objeto) if objeto is not None else 'N/A']
+            # openpyxl no admite fechas con zona horaria
+            fecha = timezone.localtime(fila['fecha_creacion']).replace(tzinfo=None)
+            yield valores + [fila['contribucion_porcentaje'], fecha, fila['usuario_creacion__nombre_usuario'] or 'N/A']
+
+
+class _Eco:
+    """Pseudo-archivo para csv.writer: devuelve la línea en lugar de guardarla."""
+    def write(self, valor):
+        return valor
+
+
+def generar_csv(encabezados, filas):
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow(encabezados)
+    for fila in filas:
+        yield escritor.writerow(fila)
+
+
+def generar_ndjson(encabezados, filas):
+    for fila in filas:
+        yield json.dumps(dict(zip(encabezados, fila)), cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def escribir_xlsx(encabezados, filas):
+    """
+    Escribe el libro en modo write_only de openpyxl (las filas van a disco, no se guardan en
+    memoria) y devuelve un archivo temporal posicionado al inicio, listo para FileResponse.
+    """
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet('Reporte')
+    hoja.append(encabezados)
+    for fila in filas:
+        hoja.append(fila)
+    archivo = tempfile.TemporaryFile()
+    libro.save(archivo)
+    archivo.seek(0)
+    return archivo
+
+
+def tabla_html(encabezados, filas):
+    partes = ['<table><thead><tr>']
+    partes.extend(f'<th>{escape(encabezado)}</th>' for encabezado in encabezados)
+    partes.append('</tr></thead><tbody>')
+    for fila in filas:
+        partes.append('<tr>')
+        partes.extend(f'<td>{escape("" if valor is None else valor)}</td>' for valor in fila)
+        partes.append('</tr>')
+    partes.append('</tbody></table>')
+    return ''.join(partes)
+
+
+def html_reporte(titulo, encabezados, filas):
+    hoy = datetime.date.today()
+    return f"""
+            <html>
+                <head><style>@page {{ size: A4 landscape; }} body {{ font-family: sans-serif; }} h1 {{ text-align: center; }} table {{ width: 100%; border-collapse: collapse; }} th, td {{ border: 1px solid #ddd; padding: 8px; font-size: 10px; }} th {{ background-color: #f2f2f2; }}</style></head>
+                <body><h1>{escape(titulo)}</h1><p>Generado el: {hoy.strftime('%d/%m/%Y')}</p>{tabla_html(encabezados, filas)}</body>
+            </html>
+            """
+
+
+def html_reporte_actividades(filas):
+    return html_reporte('Reporte de Actividades de Seguimiento', ENCABEZADOS_ACTIVIDADES, filas)
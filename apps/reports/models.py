@@ -1,3 +1,37 @@
+import uuid
+
+from django.conf import settings
 from django.db import models
 
-# Create your models here.
+
+class TrabajoReporte(models.Model):
+    """
+    Solicitud de un reporte pesado (PDF/Excel) que se genera fuera de la petición.
+    La clave combina tipo, formato, parámetros y la versión de los datos: dos solicitudes
+    iguales sobre los mismos datos comparten trabajo y archivo en caché.
+    """
+    ESTADOS = (
+        ('PENDIENTE', 'Pendiente'),
+        ('EN_PROCESO', 'En Proceso'),
+        ('COMPLETADO', 'Completado'),
+        ('ERROR', 'Error'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    clave = models.CharField(max_length=64, unique=True)
+    tipo = models.CharField(max_length=50)
+    formato = models.CharField(max_length=10)
+    parametros = models.JSONField(default=dict, blank=True)
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='PENDIENTE')
+    archivo = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+    solicitado_por = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Trabajo de Reporte"
+        verbose_name_plural = "Trabajos de Reporte"
+
+    def __str__(self):
+        return f'{self.tipo}.{self.formato} ({self.get_estado_display()})'
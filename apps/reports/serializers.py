@@ -0,0 +1,56 @@
+from django.urls import reverse
+from rest_framework import serializers
+from apps.tracking.models import TrackingActivity
+from .models import TrabajoReporte
+from .trabajos import REPORTES, EXTENSIONES
+
+
+class ParametrosActividadesSerializer(serializers.Serializer):
+    proyecto = serializers.IntegerField(required=False)
+    estado = serializers.ChoiceField(choices=TrackingActivity.STATUS_CHOICES, required=False)
+
+
+class SinParametrosSerializer(serializers.Serializer):
+    """Reportes que no admiten filtros."""
+
+
+# tipo de reporte -> serializer de sus parámetros (los filtros que aplica al generarse)
+PARAMETROS = {
+    'actividades': ParametrosActividadesSerializer,
+    'alineaciones': SinParametrosSerializer,
+}
+
+
+class SolicitudReporteSerializer(serializers.Serializer):
+    tipo = serializers.ChoiceField(choices=list(REPORTES))
+    formato = serializers.ChoiceField(choices=list(EXTENSIONES))
+    parametros = serializers.DictField(required=False, default=dict)
+
+    def validate(self, attrs):
+        # Solo los parámetros que el reporte aplica: otros cambiarían la clave sin cambiar el archivo
+        parametros = PARAMETROS[attrs['tipo']](data=attrs['parametros'])
+        desconocidos = set(attrs['parametros']) - set(parametros.fields)
+        if desconocidos:
+            raise serializers.ValidationError({'parametros': f"Parámetros no admitidos: {', '.join(sorted(desconocidos))}."})
+        if not parametros.is_valid():
+            raise serializers.ValidationError({'parametros': parametros.errors})
+        attrs['parametros'] = dict(parametros.validated_data)
+        return attrs
+
+
+class TrabajoReporteSerializer(serializers.ModelSerializer):
+    url_estado = serializers.SerializerMethodField()
+    url_descarga = serializers.SerializerMethodField()
+
+    class Meta:
+        model = TrabajoReporte
+        fields = ['id', 'tipo', 'formato', 'parametros', 'estado', 'error',
+                  'fecha_creacion', 'fecha_actualizacion', 'url_estado', 'url_descarga']
+
+    def get_url_estado(self, obj):
+        return reverse('report-job-status', args=[obj.pk])
+
+    def get_url_descarga(self, obj):
+        if obj.estado != 'COMPLETADO':
+            return None
+        return reverse('report-job-download', args=[obj.pk])
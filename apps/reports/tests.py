@@ -1,3 +1,292 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import tempfile
+import time
+from datetime import date
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from openpyxl import load_workbook
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from apps.authentication.models import Usuario
+from apps.institutional_config.models import Catalogo, PeriodoPlanificacion
+from apps.strategic_objectives.models import (
+    Alineacion, ObjetivoEstrategicoInstitucional, ObjetivoPND, PlanInstitucional, PlanNacionalDesarrollo
+)
+from apps.investment_projects.models import ProyectoInversion, Entidad, ItemCatalogo, DictamenPrioridad
+from apps.tracking.models import TrackingActivity
+from .exportadores import ENCABEZADOS_ACTIVIDADES, ENCABEZADOS_ALINEACIONES
+from .views import TrackingActivityReportView, ExportReportView
+from .models import TrabajoReporte
+from .trabajos import REPORTES, desalojar_cache, directorio_cache
+from .estadisticas import obtener_estadisticas
+
+
+class ReporteActividadesBase(APITestCase):
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user(nombre_usuario="analista", password="Clave123!")
+        self.client.force_authenticate(user=self.usuario)
+        catalogo = Catalogo.objects.create(nombre="Tipos", codigo="TIPOS")
+        item = ItemCatalogo.objects.create(catalogo=catalogo, nombre="Item")
+        proyecto = ProyectoInversion.objects.create(
+            nombre="Proyecto Reporte", entidad_ejecutora=Entidad.objects.create(nombre="Entidad", codigo_unico="ENT"),
+            tipo_proyecto=item, tipologia_proyecto=item, sector=item
+        )
+        TrackingActivity.objects.bulk_create([
+            TrackingActivity(
+                project=proyecto, activity_code=f'ACT{i:03d}', name=f'Actividad {i}',
+                responsible=self.usuario if i % 2 else None, reported_status='EN_PROGRESO',
+                planned_start_date=date(2025, 1, 1), planned_end_date=date(2025, 3, 1),
+                planned_duration_days=59, is_active=i != 4
+            ) for i in range(1, 6)
+        ])
+        self.proyecto = proyecto
+        self.url = reverse('report-tracking-activities')
+
+    def usar_cache_temporal(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ajustes = override_settings(REPORTES_DIR_CACHE=directorio.name)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def exportar(self, formato):
+        """Como en producción: la petición solo encola; el trabajo se ejecuta después, fuera de ella."""
+        with override_settings(REPORTES_TRABAJOS_ASINCRONOS=True), \
+                mock.patch('apps.reports.trabajos.obtener_pool') as pool:
+            response = self.client.get(self.url, {'format': formato})
+        for llamada in pool.return_value.submit.call_args_list:
+            llamada.args[0](*llamada.args[1:])
+        return response
+
+    def descargar_xlsx(self, trabajo):
+        descarga = self.client.get(trabajo['url_descarga'])
+        self.assertEqual(descarga.status_code, status.HTTP_200_OK)
+        return list(load_workbook(io.BytesIO(b''.join(descarga.streaming_content))).active.values)
+
+
+class TrackingActivityReportTests(ReporteActividadesBase):
+    def test_json(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 4)
+        self.assertEqual(response.data[0]['Estado'], 'En Progreso')
+        self.assertEqual(response.data[0]['Responsable'], 'analista')
+        self.assertEqual(response.data[1]['Responsable'], 'N/A')
+
+    def test_csv_en_streaming(self):
+        vista = self.client.get(self.url).data
+        response = self.client.get(self.url, {'format': 'csv'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        filas = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode('utf-8'))))
+        self.assertEqual(filas[0], ENCABEZADOS_ACTIVIDADES)
+        self.assertEqual([fila[0] for fila in filas[1:]], [fila['Código'] for fila in vista])
+
+    def test_ndjson_en_streaming(self):
+        # Bloques de 2 filas: el recorrido por clave primaria no debe repetir ni saltar actividades
+        with mock.patch.object(TrackingActivityReportView, 'tamano_bloque', 2):
+            response = self.client.get(self.url, {'format': 'ndjson'})
+            self.assertTrue(response.streaming)
+            lineas = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        self.assertEqual([json.loads(linea)['Código'] for linea in lineas], ['ACT001', 'ACT002', 'ACT003', 'ACT005'])
+
+    def test_excel_como_trabajo(self):
+        self.usar_cache_temporal()
+        response = self.exportar('excel')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual((response.data['tipo'], response.data['url_descarga']), ('actividades', None))
+        filas = self.descargar_xlsx(self.client.get(response.data['url_estado']).data)
+        self.assertEqual(list(filas[0]), ENCABEZADOS_ACTIVIDADES)
+        self.assertEqual(len(filas), 5)
+
+
+class ExportReportTests(ReporteActividadesBase):
+    def setUp(self):
+        super().setUp()
+        entidad = Entidad.objects.get(codigo_unico="ENT")
+        periodo = PeriodoPlanificacion.objects.create(
+            nombre="2025-2029", fecha_inicio=date(2025, 1, 1), fecha_fin=date(2029, 12, 31)
+        )
+        plan = PlanInstitucional.objects.create(nombre="Plan", entidad=entidad, periodo=periodo)
+        pnd = PlanNacionalDesarrollo.objects.create(nombre="PND", periodo=periodo, fecha_publicacion=date(2025, 1, 1))
+        ct_oei = ContentType.objects.get_for_model(ObjetivoEstrategicoInstitucional)
+        ct_pnd = ContentType.objects.get_for_model(ObjetivoPND)
+        for i in range(3):
+            oei = ObjetivoEstrategicoInstitucional.objects.create(plan_institucional=plan, codigo=f"OEI-{i}", descripcion="Objetivo")
+            objetivo = ObjetivoPND.objects.create(pnd=pnd, codigo=f"PND-{i}", descripcion="Objetivo")
+            Alineacion.objects.create(
+                instrumento_origen_tipo=ct_oei, instrumento_origen_id=oei.pk,
+                instrumento_destino_tipo=ct_pnd, instrumento_destino_id=objetivo.pk,
+                contribucion_porcentaje=50, usuario_creacion=self.usuario if i else None,
+            )
+        self.url = reverse('export-report')
+        self.usar_cache_temporal()
+
+    def test_json(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual(response.data[0]['Destino'], "PND-0 - PND")
+        self.assertEqual(response.data[0]['Usuario'], 'N/A')
+        self.assertEqual(response.data[1]['Usuario'], 'analista')
+
+    def test_csv_por_bloques(self):
+        with mock.patch.object(ExportReportView, 'tamano_bloque', 2):
+            response = self.client.get(self.url, {'format': 'csv'})
+            self.assertTrue(response.streaming)
+            filas = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode('utf-8'))))
+        self.assertEqual(filas[0], ENCABEZADOS_ALINEACIONES)
+        self.assertEqual([fila[4] for fila in filas[1:]], ["PND-0 - PND", "PND-1 - PND", "PND-2 - PND"])
+
+    def test_excel_como_trabajo(self):
+        response = self.exportar('excel')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual((response.data['tipo'], response.data['url_descarga']), ('alineaciones', None))
+        estado = self.client.get(response.data['url_estado'])
+        self.assertEqual(estado.data['estado'], 'COMPLETADO')
+        filas = self.descargar_xlsx(estado.data)
+        self.assertEqual(filas[0], tuple(ENCABEZADOS_ALINEACIONES))
+        self.assertEqual([fila[4] for fila in filas[1:]], ["PND-0 - PND", "PND-1 - PND", "PND-2 - PND"])
+        # Ya generado: la misma solicitud responde 200 con el enlace de descarga
+        response = self.exportar('excel')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['url_descarga'], estado.data['url_descarga'])
+
+    def test_pdf_no_se_genera_en_la_peticion(self):
+        generar = mock.Mock()
+        with mock.patch.dict(REPORTES, {'alineaciones': (REPORTES['alineaciones'][0], generar)}), \
+                override_settings(REPORTES_TRABAJOS_ASINCRONOS=True), \
+                mock.patch('apps.reports.trabajos.obtener_pool') as pool:
+            response = self.client.get(self.url, {'format': 'pdf'})
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['estado'], 'PENDIENTE')
+        generar.assert_not_called()
+        pool.return_value.submit.assert_called_once()
+
+    def test_editar_una_alineacion_genera_otro_trabajo(self):
+        primero = self.exportar('excel').data['id']
+        self.assertEqual(self.exportar('excel').data['id'], primero)
+        alineacion = Alineacion.objects.order_by('pk').first()
+        alineacion.contribucion_porcentaje = 80
+        alineacion.save()
+        self.assertNotEqual(self.exportar('excel').data['id'], primero)
+
+
+class TrabajoReporteTests(ReporteActividadesBase):
+    def setUp(self):
+        super().setUp()
+        self.usar_cache_temporal()
+
+    def solicitar(self, formato='excel', **parametros):
+        return self.client.post(reverse('report-job'), {'tipo': 'actividades', 'formato': formato,
+                                                        'parametros': parametros}, format='json')
+
+    def test_solicitar_consultar_y_descargar(self):
+        response = self.solicitar()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['estado'], 'COMPLETADO')
+
+        estado = self.client.get(reverse('report-job-status', args=[response.data['id']]))
+        self.assertEqual(estado.data['url_descarga'], reverse('report-job-download', args=[response.data['id']]))
+
+        descarga = self.client.get(estado.data['url_descarga'])
+        self.assertEqual(descarga.status_code, status.HTTP_200_OK)
+        hoja = load_workbook(io.BytesIO(b''.join(descarga.streaming_content))).active
+        self.assertEqual(len(list(hoja.values)), 5)
+
+    def test_solicitudes_iguales_comparten_trabajo(self):
+        primero = self.solicitar().data['id']
+        with mock.patch('apps.reports.trabajos.generar_actividades') as generar:
+            self.assertEqual(self.solicitar().data['id'], primero)
+        generar.assert_not_called()
+        self.assertNotEqual(self.solicitar('pdf').data['id'], primero)
+
+    def test_cambio_en_los_datos_genera_otro_trabajo(self):
+        primero = self.solicitar().data['id']
+        actividad = TrackingActivity.objects.get(activity_code='ACT001')
+        TrackingActivity.objects.filter(pk=actividad.pk).update(is_active=False)
+        self.assertNotEqual(self.solicitar().data['id'], primero)
+        self.assertEqual(TrabajoReporte.objects.count(), 2)
+
+    def test_cambio_en_un_responsable_genera_otro_trabajo(self):
+        primero = self.solicitar().data['id']
+        self.usuario.nombre_usuario = "analista_senior"
+        self.usuario.save()
+        self.assertNotEqual(self.solicitar().data['id'], primero)
+
+    def test_parametros_filtran_el_reporte(self):
+        response = self.solicitar(proyecto=self.proyecto.pk + 1)
+        descarga = self.client.get(response.data['url_descarga'])
+        hoja = load_workbook(io.BytesIO(b''.join(descarga.streaming_content))).active
+        self.assertEqual(len(list(hoja.values)), 1)
+
+        response = self.solicitar(responsable=1)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(TrabajoReporte.objects.count(), 1)
+
+    def test_archivo_desalojado_se_regenera(self):
+        trabajo = self.solicitar().data
+        for ruta in directorio_cache().glob('*'):
+            ruta.unlink()
+        descarga = self.client.get(reverse('report-job-download', args=[trabajo['id']]))
+        self.assertEqual(descarga.status_code, status.HTTP_410_GONE)
+        nuevo = self.solicitar().data
+        self.assertEqual((nuevo['id'], nuevo['estado']), (trabajo['id'], 'COMPLETADO'))
+
+    def test_desalojo_lru(self):
+        directorio = directorio_cache()
+        ahora = time.time()
+        for i, nombre in enumerate(['a.pdf', 'b.pdf', 'c.pdf']):
+            ruta = directorio / nombre
+            ruta.write_bytes(b'x' * 100)
+            os.utime(ruta, (ahora + i, ahora + i))
+        # 'a' se usó recién: el menos usado pasa a ser 'b'
+        os.utime(directorio / 'a.pdf', (ahora + 10, ahora + 10))
+        # Un .tmp en escritura no se desaloja; uno abandonado, sí
+        (directorio / 'd.pdf.tmp').write_bytes(b'x' * 100)
+        (directorio / 'e.pdf.tmp').write_bytes(b'x' * 100)
+        os.utime(directorio / 'e.pdf.tmp', (ahora - 3600, ahora - 3600))
+        self.assertEqual(desalojar_cache(limite_bytes=200), ['b.pdf'])
+        self.assertEqual(sorted(r.name for r in directorio.glob('*')), ['a.pdf', 'c.pdf', 'd.pdf.tmp'])
+
+
+class DashboardStatsTests(ReporteActividadesBase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        super().setUp()
+
+    def test_estadisticas(self):
+        DictamenPrioridad.objects.create(proyecto=self.proyecto, estado='APROBADO')
+        DictamenPrioridad.objects.create(proyecto=self.proyecto, estado='RECHAZADO')
+        DictamenPrioridad.objects.create(proyecto=self.proyecto)
+        response = self.client.get(reverse('dashboard-stats'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['proyectos_por_estado'], [{'estado': 'EN_FORMULACION', 'total': 1}])
+        self.assertEqual(response.data['proyectos_por_entidad'][0]['entidad_nombre'], 'Entidad')
+        self.assertEqual(response.data['actividades_por_estado'],
+                         [{'estado': 'EN_PROGRESO', 'nombre': 'En Progreso', 'total': 4}])
+        self.assertEqual(response.data['dictamenes'], {
+            'por_estado': {'SOLICITUD': 1, 'APROBADO': 1, 'RECHAZADO': 1}, 'tasa_aprobacion': 50.0
+        })
+
+    def test_segunda_carga_sale_de_cache(self):
+        obtener_estadisticas()
+        with self.assertNumQueries(0):
+            obtener_estadisticas()
+
+    def test_escritura_invalida_solo_las_secciones_afectadas(self):
+        obtener_estadisticas()
+        DictamenPrioridad.objects.create(proyecto=self.proyecto, estado='APROBADO')
+        # dictamenes se recalcula; el resto sigue en caché
+        with self.assertNumQueries(1):
+            estadisticas = obtener_estadisticas()
+        self.assertEqual(estadisticas['dictamenes']['tasa_aprobacion'], 100.0)
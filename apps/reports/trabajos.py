@@ -0,0 +1,232 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+from apps.investment_projects.models import ProyectoInversion
+from apps.strategic_objectives.models import Alineacion
+from apps.strategic_objectives.serializers import RELACIONES_DESCRIPCION
+from apps.tracking.models import TrackingActivity
+from .exportadores import (
+    ENCABEZADOS_ACTIVIDADES, ENCABEZADOS_ALINEACIONES, filas_actividades, filas_alineaciones, escribir_xlsx,
+    html_reporte, html_reporte_actividades
+)
+from .models import TrabajoReporte
+
+EXTENSIONES = {'pdf': 'pdf', 'excel': 'xlsx'}
+TIPOS_CONTENIDO = {
+    'pdf': 'application/pdf',
+    'excel': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+def version_actividades():
+    """
+    Sello de los datos del reporte de actividades: cambia con cualquier alta, baja o edición de
+    una actividad y con los cambios en los proyectos y responsables que muestra.
+    """
+    actividades = TrackingActivity.objects.aggregate(
+        total=Count('id'), activas=Count('id', filter=Q(is_active=True)), ultima=Max('updated_at'),
+        # El borrado de un responsable pone responsible en NULL sin tocar updated_at
+        con_responsable=Count('responsible'), responsables=Max('responsible__fecha_actualizacion'),
+    )
+    proyectos = ProyectoInversion.objects.aggregate(ultima=Max('fecha_ultima_actualizacion'))
+    return '-'.join(str(valor) for valor in (
+        actividades['total'], actividades['activas'], actividades['ultima'], actividades['con_responsable'],
+        actividades['responsables'], proyectos['ultima'],
+    ))
+
+
+# parámetro del reporte de actividades -> filtro sobre TrackingActivity
+FILTROS_ACTIVIDADES = {'proyecto': 'project_id', 'estado': 'reported_status'}
+
+
+def generar_actividades(formato, parametros, ruta):
+    filtros = {FILTROS_ACTIVIDADES[nombre]: valor for nombre, valor in parametros.items()}
+    filas = filas_actividades(TrackingActivity.objects.filter(is_active=True, **filtros))
+    if formato == 'pdf':
+        from weasyprint import HTML
+        HTML(string=html_reporte_actividades(filas)).write_pdf(str(ruta))
+    else:
+        with escribir_xlsx(ENCABEZADOS_ACTIVIDADES, filas) as origen, open(ruta, 'wb') as destino:
+            shutil.copyfileobj(origen, destino)
+
+
+def version_alineaciones():
+    """
+    Sello de los datos del reporte de alineaciones: cambia con cualquier alta, baja o edición de
+    una alineación y con los cambios en los usuarios que la crearon. Renombrar un instrumento
+    alineado no lo cambia.
+    """
+    alineaciones = Alineacion.objects.aggregate(
+        total=Count('pk'), mayor=Max('pk'), ultima=Max('fecha_actualizacion'),
+        con_usuario=Count('usuario_creacion'), usuarios=Max('usuario_creacion__fecha_actualizacion'),
+    )
+    return '-'.join(str(valor) for valor in (
+        alineaciones['total'], alineaciones['mayor'], alineaciones['ultima'], alineaciones['con_usuario'],
+        alineaciones['usuarios'],
+    ))
+
+
+def generar_alineaciones(formato, parametros, ruta):
+    filas = filas_alineaciones(Alineacion.objects.all(), relaciones=RELACIONES_DESCRIPCION)
+    if formato == 'pdf':
+        from weasyprint import HTML
+        HTML(string=html_reporte('Reporte de Alineaciones', ENCABEZADOS_ALINEACIONES, filas)).write_pdf(str(ruta))
+    else:
+        with escribir_xlsx(ENCABEZADOS_ALINEACIONES, filas) as origen, open(ruta, 'wb') as destino:
+            shutil.copyfileobj(origen, destino)
+
+
+# tipo -> (función de versión de datos, función que genera el archivo)
+REPORTES = {
+    'actividades': (version_actividades, generar_actividades),
+    'alineaciones': (version_alineaciones, generar_alineaciones),
+}
+
+
+def directorio_cache():
+    return Path(getattr(settings, 'REPORTES_DIR_CACHE', settings.BASE_DIR / 'cache_reportes'))
+
+
+def calcular_clave(tipo, formato, parametros):
+    version = REPORTES[tipo][0]()
+    contenido = json.dumps([tipo, formato, parametros, version], sort_keys=True, default=str)
+    return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+
+def ruta_archivo(trabajo):
+    return directorio_cache() / trabajo.archivo if trabajo.archivo else None
+
+
+def marcar_uso(ruta):
+    """Actualiza la fecha de modificación: la caché se desaloja por uso menos reciente (LRU)."""
+    os.utime(ruta)
+
+
+def desalojar_cache(limite_bytes=None):
+    """
+    Borra los archivos usados hace más tiempo hasta que la caché quede bajo el límite. Los .tmp
+    que un trabajador está escribiendo no se tocan; los que quedaron de un trabajo que no terminó
+    (más antiguos que REPORTES_MINUTOS_MAXIMOS) se borran siempre.
+    """
+    if limite_bytes is None:
+        limite_bytes = getattr(settings, 'REPORTES_CACHE_MAX_MB', 512) * 1024 * 1024
+    vencido = time.time() - getattr(settings, 'REPORTES_MINUTOS_MAXIMOS', 30) * 60
+    archivos = []
+    for ruta in directorio_cache().glob('*'):
+        if not ruta.is_file():
+            continue
+        try:
+            estado = ruta.stat()
+        except FileNotFoundError:
+            continue  # lo renombró o borró otro proceso
+        if ruta.suffix != '.tmp':
+            archivos.append((estado, ruta))
+        elif estado.st_mtime < vencido:
+            ruta.unlink(missing_ok=True)
+    total = sum(estado.st_size for estado, _ in archivos)
+    borrados = []
+    for estado, ruta in sorted(archivos, key=lambda par: par[0].st_mtime):
+        if total <= limite_bytes:
+            break
+        ruta.unlink(missing_ok=True)
+        total -= estado.st_size
+        borrados.append(ruta.name)
+    return borrados
+
+
+def ejecutar_trabajo(trabajo_id):
+    """Genera el archivo de un trabajo. Corre en un proceso del pool (o en línea en modo síncrono)."""
+    trabajo = TrabajoReporte.objects.get(pk=trabajo_id)
+    trabajo.estado = 'EN_PROCESO'
+    trabajo.save(update_fields=['estado', 'fecha_actualizacion'])
+    directorio = directorio_cache()
+    directorio.mkdir(parents=True, exist_ok=True)
+    nombre = f'{trabajo.clave}.{EXTENSIONES[trabajo.formato]}'
+    temporal = directorio / (nombre + '.tmp')
+    try:
+        REPORTES[trabajo.tipo][1](trabajo.formato, trabajo.parametros, temporal)
+        os.replace(temporal, directorio / nombre)
+    except Exception as exc:
+        temporal.unlink(missing_ok=True)
+        trabajo.estado, trabajo.error = 'ERROR', str(exc)
+        trabajo.save(update_fields=['estado', 'error', 'fecha_actualizacion'])
+        return
+    trabajo.estado, trabajo.archivo, trabajo.error = 'COMPLETADO', nombre, ''
+    trabajo.save(update_fields=['estado', 'archivo', 'error', 'fecha_actualizacion'])
+    desalojar_cache()
+
+
+def _inicializar_proceso():
+    import django
+    django.setup()
+
+
+_pool = None
+_candado = threading.Lock()
+
+
+def obtener_pool():
+    # spawn: los procesos hijos no heredan las conexiones a la base del proceso web
+    global _pool
+    with _candado:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=getattr(settings, 'REPORTES_TRABAJADORES', 2),
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_inicializar_proceso,
+            )
+        return _pool
+
+
+def encolar(trabajo):
+    if getattr(settings, 'REPORTES_TRABAJOS_ASINCRONOS', True):
+        obtener_pool().submit(ejecutar_trabajo, str(trabajo.pk))
+    else:
+        ejecutar_trabajo(trabajo.pk)
+        trabajo.refresh_from_db()
+
+
+def solicitar_reporte(tipo, formato, parametros=None, usuario=None):
+    """
+    Devuelve el trabajo para estos parámetros y datos, creándolo y encolándolo si hace falta.
+    Reutiliza un trabajo igual en curso o terminado; vuelve a encolar si falló, si su archivo
+    fue desalojado de la caché o si quedó colgado (p. ej. el proceso se reinició).
+    """
+    parametros = parametros or {}
+    clave = calcular_clave(tipo, formato, parametros)
+    try:
+        trabajo, creado = TrabajoReporte.objects.get_or_create(
+            clave=clave,
+            defaults={'tipo': tipo, 'formato': formato, 'parametros': parametros, 'solicitado_por': usuario},
+        )
+    except IntegrityError:
+        trabajo, creado = TrabajoReporte.objects.get(clave=clave), False
+
+    if not creado:
+        vencido = timezone.now() - timedelta(minutes=getattr(settings, 'REPORTES_MINUTOS_MAXIMOS', 30))
+        ruta = ruta_archivo(trabajo)
+        reintentar = (
+            trabajo.estado == 'ERROR'
+            or (trabajo.estado == 'COMPLETADO' and not (ruta and ruta.exists()))
+            or (trabajo.estado in ('PENDIENTE', 'EN_PROCESO') and trabajo.fecha_actualizacion < vencido)
+        )
+        if not reintentar:
+            return trabajo
+        trabajo.estado, trabajo.archivo, trabajo.error = 'PENDIENTE', '', ''
+        trabajo.save(update_fields=['estado', 'archivo', 'error', 'fecha_actualizacion'])
+
+    encolar(trabajo)
+    return trabajo
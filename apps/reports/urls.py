@@ -1,8 +1,14 @@
 from django.urls import path
-from .views import ExportReportView, DashboardStatsView, TrackingActivityReportView
+from .views import (
+    ExportReportView, DashboardStatsView, TrackingActivityReportView,
+    ReportJobView, ReportJobStatusView, ReportJobDownloadView
+)
 
 urlpatterns = [
     path('export/', ExportReportView.as_view(), name='export-report'),
     path('dashboard-stats/', DashboardStatsView.as_view(), name='dashboard-stats'),
     path('tracking-activities/', TrackingActivityReportView.as_view(), name='report-tracking-activities'),
+    path('jobs/', ReportJobView.as_view(), name='report-job'),
+    path('jobs/<uuid:pk>/', ReportJobStatusView.as_view(), name='report-job-status'),
+    path('jobs/<uuid:pk>/download/', ReportJobDownloadView.as_view(), name='report-job-download'),
 ]
@@ -1,71 +1,143 @@
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse, FileResponse
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-import pandas as pd
-from weasyprint import HTML
+from rest_framework import status
+from django.shortcuts import get_object_or_404
 import datetime
 
 from apps.tracking.models import TrackingActivity
 from apps.investment_projects.models import ProyectoInversion
 from apps.strategic_objectives.models import Alineacion
+from apps.strategic_objectives.serializers import RELACIONES_DESCRIPCION
+from .models import TrabajoReporte
+from .estadisticas import obtener_estadisticas
+from .serializers import SolicitudReporteSerializer, TrabajoReporteSerializer
+from .trabajos import solicitar_reporte, ruta_archivo, marcar_uso, TIPOS_CONTENIDO, EXTENSIONES
+from .exportadores import (
+    ENCABEZADOS_ACTIVIDADES, ENCABEZADOS_ALINEACIONES, filas_actividades, filas_alineaciones, generar_csv,
+    generar_ndjson
+)
 
 # Funcionalidad de reportes dentro de la aplicación
-class TrackingActivityReportView(APIView):
+class ReporteTabularView(APIView):
+    """
+    Base de los reportes tabulares: ?format=json (por defecto) | ndjson | csv | excel | pdf.
+    csv y ndjson se envían en streaming, sin acumular el reporte en memoria. excel y pdf no se
+    generan en la petición: se solicita el trabajo tipo_reporte (trabajos.REPORTES) y se responde
+    con él (ver ReportJobView). Las subclases indican nombre de archivo, encabezados y filas().
+    """
     permission_classes = [IsAuthenticated]
+    tamano_bloque = 2000
+    tipo_reporte = ''
+    nombre_archivo = ''
+    encabezados = []
+
+    def filas(self):
+        raise NotImplementedError
+
+    def perform_content_negotiation(self, request, force=False):
+        # ?format= lo interpreta esta vista; DRF respondería 404 al no tener renderer para csv/pdf
+        return super().perform_content_negotiation(request, force=True)
 
     def get(self, request, *args, **kwargs):
         report_format = request.query_params.get('format', 'json').lower()
-        queryset = TrackingActivity.objects.filter(is_active=True).select_related('project', 'responsible')
-
-        data = []
-        for activity in queryset:
-            data.append({
-                'Código': activity.activity_code,
-                'Nombre': activity.name,
-                'Proyecto': activity.project.nombre,
-                'Estado': activity.get_reported_status_display(),
-                'Prioridad': activity.priority,
-                'Responsable': activity.responsible.get_full_name() if activity.responsible else 'N/A',
-                'Fecha Inicio Plan.': activity.planned_start_date,
-                'Fecha Fin Plan.': activity.planned_end_date,
-                'Avance Real (%)': activity.real_progress,
-            })
-        
-        df = pd.DataFrame(data)
-
-        if report_format == 'pdf':
-            response = HttpResponse(content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="reporte_actividades_{datetime.date.today()}.pdf"'
-            html_string = f"""
-            <html>
-                <head><style>@page {{ size: A4 landscape; }} body {{ font-family: sans-serif; }} h1 {{ text-align: center; }} table {{ width: 100%; border-collapse: collapse; }} th, td {{ border: 1px solid #ddd; padding: 8px; font-size: 10px; }} th {{ background-color: #f2f2f2; }}</style></head>
-                <body><h1>Reporte de Actividades de Seguimiento</h1><p>Generado el: {datetime.date.today().strftime('%d/%m/%Y')}</p>{df.to_html(index=False)}</body>
-            </html>
-            """
-            HTML(string=html_string).write_pdf(response)
-            return response
+        nombre = f'{self.nombre_archivo}_{datetime.date.today()}'
+
+        if report_format in EXTENSIONES:  # pdf, excel
+            return respuesta_trabajo(solicitar_reporte(self.tipo_reporte, report_format, usuario=request.user))
 
         elif report_format == 'csv':
-            response = HttpResponse(content_type='text/csv; charset=utf-8')
-            response['Content-Disposition'] = f'attachment; filename="reporte_actividades_{datetime.date.today()}.csv"'
-            df.to_csv(response, index=False, encoding='utf-8')
+            response = StreamingHttpResponse(generar_csv(self.encabezados, self.filas()),
+                                             content_type='text/csv; charset=utf-8')
+            response['Content-Disposition'] = f'attachment; filename="{nombre}.csv"'
             return response
 
-        elif report_format == 'excel':
-            response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-            response['Content-Disposition'] = f'attachment; filename="reporte_actividades_{datetime.date.today()}.xlsx"'
-            df.to_excel(response, index=False)
+        elif report_format == 'ndjson':
+            response = StreamingHttpResponse(generar_ndjson(self.encabezados, self.filas()),
+                                             content_type='application/x-ndjson; charset=utf-8')
+            response['Content-Disposition'] = f'attachment; filename="{nombre}.ndjson"'
             return response
 
         else: # JSON
-            return Response(df.to_dict(orient='records'))
+            return Response([dict(zip(self.encabezados, fila)) for fila in self.filas()])
+
+
+class TrackingActivityReportView(ReporteTabularView):
+    """Reporte de actividades de seguimiento activas."""
+    tipo_reporte = 'actividades'
+    nombre_archivo = 'reporte_actividades'
+    encabezados = ENCABEZADOS_ACTIVIDADES
+
+    def filas(self):
+        return filas_actividades(TrackingActivity.objects.filter(is_active=True), self.tamano_bloque)
 
-# ... (Las otras vistas de reporte permanecen igual)
-class ExportReportView(APIView):
-    # ...
-    pass
+
+class ExportReportView(ReporteTabularView):
+    """
+    Exportación de las alineaciones (origen, destino y contribución) que descarga la página de
+    reportes. Origen y destino se resuelven por bloque, sin una consulta por fila.
+    """
+    tipo_reporte = 'alineaciones'
+    nombre_archivo = 'reporte_alineaciones'
+    encabezados = ENCABEZADOS_ALINEACIONES
+
+    def filas(self):
+        return filas_alineaciones(Alineacion.objects.all(), self.tamano_bloque, RELACIONES_DESCRIPCION)
+
+
+def respuesta_trabajo(trabajo):
+    """202 con el trabajo mientras se genera; 200 si ya estaba listo."""
+    codigo = status.HTTP_200_OK if trabajo.estado == 'COMPLETADO' else status.HTTP_202_ACCEPTED
+    return Response(TrabajoReporteSerializer(trabajo).data, status=codigo)
+
+class ReportJobView(APIView):
+    """
+    Solicita un reporte pesado (PDF/Excel) que se genera en segundo plano.
+    POST {"tipo": "actividades", "formato": "pdf"} -> 202 con el id del trabajo.
+    "parametros" opcionales filtran el reporte (actividades: "proyecto", "estado").
+    Solicitudes iguales sobre los mismos datos devuelven el mismo trabajo.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        serializer = SolicitudReporteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return respuesta_trabajo(solicitar_reporte(usuario=request.user, **serializer.validated_data))
+
+
+class ReportJobStatusView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk, *args, **kwargs):
+        trabajo = get_object_or_404(TrabajoReporte, pk=pk)
+        return Response(TrabajoReporteSerializer(trabajo).data)
+
+
+class ReportJobDownloadView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk, *args, **kwargs):
+        trabajo = get_object_or_404(TrabajoReporte, pk=pk)
+        if trabajo.estado != 'COMPLETADO':
+            return Response({'error': f'El reporte está en estado {trabajo.get_estado_display()}.'},
+                            status=status.HTTP_409_CONFLICT)
+        ruta = ruta_archivo(trabajo)
+        if not ruta.exists():
+            return Response({'error': 'El archivo expiró de la caché; vuelva a solicitar el reporte.'},
+                            status=status.HTTP_410_GONE)
+        marcar_uso(ruta)
+        nombre = f'reporte_{trabajo.tipo}_{trabajo.fecha_actualizacion:%Y-%m-%d}.{EXTENSIONES[trabajo.formato]}'
+        return FileResponse(open(ruta, 'rb'), as_attachment=True, filename=nombre,
+                            content_type=TIPOS_CONTENIDO[trabajo.formato])
 
 class DashboardStatsView(APIView):
-    # ...
-    pass
+    """
+    Indicadores agregados para el dashboard: proyectos por estado, sector y entidad ejecutora,
+    montos programados por periodo, estado de las actividades de seguimiento y dictámenes.
+    Cada sección se guarda en caché y se invalida al escribir en los modelos de los que depende.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        return Response(obtener_estadisticas())
@@ -0,0 +1,56 @@
+"""
+Cálculo del cierre transitivo del grafo de alineaciones.
+
+Los nodos son pares (content_type_id, object_id). Una arista origen -> destino aporta al
+destino la fracción `factor` (contribucion_porcentaje / 100). Para cada par alcanzable se
+guarda el número de rutas y la suma, sobre todas las rutas, del producto de sus factores.
+Funciones puras: las usan el manager de CierreAlineacion y la migración que lo puebla.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+CIEN = Decimal('100')
+PRECISION = Decimal('0.00000001')
+
+
+def factor_arista(porcentaje):
+    """Fracción con la que una alineación aporta a su destino; sin porcentaje cuenta como 100 %."""
+    if porcentaje is None:
+        return Decimal('1')
+    return (Decimal(porcentaje) / CIEN).quantize(PRECISION)
+
+
+def calcular_cierre(aristas):
+    """
+    aristas: iterable de (origen, destino, factor).
+    Devuelve {(origen, destino): (caminos, factor)} con todos los pares alcanzables.
+    Las aristas que cerrarían un ciclo se ignoran.
+    """
+    salientes = defaultdict(list)
+    for origen, destino, factor in aristas:
+        salientes[origen].append((destino, factor))
+
+    alcanzables = {}
+
+    def visitar(nodo, en_curso):
+        if nodo in alcanzables:
+            return alcanzables[nodo]
+        en_curso.add(nodo)
+        resultado = {}
+        for destino, factor in salientes.get(nodo, ()):
+            if destino in en_curso:
+                continue
+            caminos, suma = resultado.get(destino, (0, Decimal('0')))
+            resultado[destino] = (caminos + 1, suma + factor)
+            for lejano, (caminos_lejano, factor_lejano) in visitar(destino, en_curso).items():
+                caminos, suma = resultado.get(lejano, (0, Decimal('0')))
+                resultado[lejano] = (caminos + caminos_lejano, suma + factor * factor_lejano)
+        en_curso.discard(nodo)
+        alcanzables[nodo] = resultado
+        return resultado
+
+    cierre = {}
+    for origen in list(salientes):
+        for destino, (caminos, factor) in visitar(origen, set()).items():
+            cierre[(origen, destino)] = (caminos, factor.quantize(PRECISION))
+    return cierre
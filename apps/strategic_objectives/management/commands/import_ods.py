@@ -1,83 +1,186 @@
 import json
+import time
 
 from django.core.management.base import BaseCommand
 from django.conf import settings
+from django.db import transaction
+from apps.core.busqueda import indice_busqueda
+from apps.core.referencia import datos_referencia
 from apps.strategic_objectives.models import ObjetivoDesarrolloSostenible, MetaODS, IndicadorODS
 
+
+def iterar_json(ruta, tamano_bloque=64 * 1024):
+    """
+    Recorre un archivo con un arreglo JSON de objetos devolviendo un elemento a la vez,
+    leyendo por bloques para no cargar el archivo completo en memoria.
+    """
+    decodificador = json.JSONDecoder()
+    with open(ruta, mode='r', encoding='utf-8') as file:
+        buffer = ''
+        dentro_del_arreglo = False
+        fin_de_archivo = False
+        while True:
+            buffer = buffer.lstrip()
+            if not dentro_del_arreglo:
+                if buffer:
+                    if buffer[0] != '[':
+                        raise ValueError(f'{ruta} no contiene un arreglo JSON.')
+                    buffer = buffer[1:]
+                    dentro_del_arreglo = True
+                    continue
+            else:
+                buffer = buffer.lstrip(',').lstrip()
+                if buffer.startswith(']'):
+                    return
+                if buffer:
+                    try:
+                        elemento, fin = decodificador.raw_decode(buffer)
+                    except json.JSONDecodeError:
+                        if fin_de_archivo:
+                            raise
+                    else:
+                        yield elemento
+                        buffer = buffer[fin:]
+                        continue
+            if fin_de_archivo:
+                raise ValueError(f'{ruta} terminó antes de cerrar el arreglo JSON.')
+            bloque = file.read(tamano_bloque)
+            fin_de_archivo = not bloque
+            buffer += bloque
+
+
 class Command(BaseCommand):
-    help = 'Importa los Objetivos de Desarrollo Sostenible (ODS), metas e indicadores desde archivos CSV.'
+    help = 'Importa los Objetivos de Desarrollo Sostenible (ODS), metas e indicadores desde archivos JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reemplazar', action='store_true',
+                            help='Elimina todos los ODS antes de importar (borra también sus vínculos en alineaciones).')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Tamaño de lote para bulk_create/bulk_update.')
 
     def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS('Iniciando la importación de ODS...'))
-
-        # Limpiar datos existentes para evitar duplicados en cada ejecución
-        IndicadorODS.objects.all().delete()
-        MetaODS.objects.all().delete()
-        ObjetivoDesarrolloSostenible.objects.all().delete()
-        self.stdout.write(self.style.WARNING('Datos de ODS existentes eliminados.'))
+        self.batch_size = options['batch_size']
+        inicio = time.perf_counter()
 
         # Ruta base a los archivos de datos
         data_path = settings.BASE_DIR / 'apps' / 'strategic_objectives' / 'data'
+        archivos = {
+            'goals': data_path / 'goals-final-es.json',
+            'targets': data_path / 'targets-final.json',
+            'indicators': data_path / 'indicators-final.json',
+        }
+        for ruta in archivos.values():
+            if not ruta.exists():
+                self.stdout.write(self.style.ERROR(f'No se encontró el archivo: {ruta}'))
+                return
 
-        # 1. Importar Objetivos (Goals)
-        goals_file = data_path / 'goals-final-es.json'
-        try:
-            with open(goals_file, mode='r', encoding='utf-8') as file:
-                goals_data = json.load(file)
-                for row in goals_data:
-                    goal_num = int(row['goal'])
-                    ObjetivoDesarrolloSostenible.objects.create(
-                        numero=goal_num,
-                        nombre=row['short'],
-                        descripcion=row['title'],
-                    )
-            self.stdout.write(self.style.SUCCESS(f'Se importaron {ObjetivoDesarrolloSostenible.objects.count()} ODS.'))
-        except FileNotFoundError:
-            self.stdout.write(self.style.ERROR(f'No se encontró el archivo: {goals_file}'))
-            return
-
-        # 2. Importar Metas (Targets)
-        targets_file = data_path / 'targets-final.json'
-        try:
-            with open(targets_file, mode='r', encoding='utf-8') as file:
-                targets_data = json.load(file)
-                for row in targets_data:
-                    try:
-                        goal_num = int(row['goal'])
-                        ods_instance = ObjetivoDesarrolloSostenible.objects.get(numero=goal_num)
-                        MetaODS.objects.create(
-                            ods=ods_instance,
-                            codigo=row['id'],
-                            descripcion=row['title']
-                        )
-                    except ObjetivoDesarrolloSostenible.DoesNotExist:
-                        self.stdout.write(self.style.WARNING(
-                            f"ODS con número {goal_num} no encontrado para la meta {row['target']}."))
-            self.stdout.write(self.style.SUCCESS(f'Se importaron {MetaODS.objects.count()} metas de ODS.'))
-        except FileNotFoundError:
-            self.stdout.write(self.style.ERROR(f'No se encontró el archivo: {targets_file}'))
-            return
-
-        # 3. Importar Indicadores (Indicators)
-        indicators_file = data_path / 'indicators-final.json'
-        try:
-            with open(indicators_file, mode='r', encoding='utf-8') as file:
-                indicators_data = json.load(file)
-                for row in indicators_data:
-                    try:
-                        target_code = row['target_id']
-                        meta_instance = MetaODS.objects.get(codigo=target_code)
-                        IndicadorODS.objects.create(
-                            meta_ods=meta_instance,
-                            codigo=row['indicator_id'],
-                            descripcion=row['indicator']
-                        )
-                    except MetaODS.DoesNotExist:
-                        self.stdout.write(self.style.WARNING(
-                            f"Meta con código {target_code} no encontrada para el indicador {row['indicator_id']}."))
-            self.stdout.write(self.style.SUCCESS(f'Se importaron {IndicadorODS.objects.count()} indicadores de ODS.'))
-        except FileNotFoundError:
-            self.stdout.write(self.style.ERROR(f'No se encontró el archivo: {indicators_file}'))
-            return
-
-        self.stdout.write(self.style.SUCCESS('Importación de ODS completada.'))
\ No newline at end of file
+        # Una sola transacción: o se aplica la importación completa o nada
+        with transaction.atomic():
+            if options['reemplazar']:
+                IndicadorODS.objects.all().delete()
+                MetaODS.objects.all().delete()
+                ObjetivoDesarrolloSostenible.objects.all().delete()
+                self.stdout.write(self.style.WARNING('Datos de ODS existentes eliminados.'))
+
+            ods_por_numero = self.importar_objetivos(archivos['goals'])
+            metas_por_codigo = self.importar_metas(archivos['targets'], ods_por_numero)
+            self.importar_indicadores(archivos['indicators'], metas_por_codigo)
+            # bulk_create/bulk_update no emiten señales
+            datos_referencia.incrementar('ods')
+            indice_busqueda.reindexar('meta_ods', 'indicador_ods')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Importación de ODS completada en {time.perf_counter() - inicio:.2f} s.'
+        ))
+
+    # 1. Importar Objetivos (Goals)
+    def importar_objetivos(self, ruta):
+        inicio = time.perf_counter()
+        existentes = {ods.numero: ods for ods in ObjetivoDesarrolloSostenible.objects.all()}
+        filas = (
+            (int(row['goal']), {'nombre': row['short'], 'descripcion': row['title']})
+            for row in iterar_json(ruta)
+        )
+        return self.sincronizar(
+            'ODS', ObjetivoDesarrolloSostenible, 'numero', existentes, filas, inicio
+        )
+
+    # 2. Importar Metas (Targets)
+    def importar_metas(self, ruta, ods_por_numero):
+        inicio = time.perf_counter()
+        existentes = {meta.codigo: meta for meta in MetaODS.objects.all()}
+
+        def filas():
+            for row in iterar_json(ruta):
+                goal_num = int(row['goal'])
+                ods = ods_por_numero.get(goal_num)
+                if ods is None:
+                    self.stdout.write(self.style.WARNING(
+                        f"ODS con número {goal_num} no encontrado para la meta {row['id']}."))
+                    continue
+                yield str(row['id']), {'ods_id': ods.pk, 'descripcion': row['title']}
+
+        return self.sincronizar('metas de ODS', MetaODS, 'codigo', existentes, filas(), inicio)
+
+    # 3. Importar Indicadores (Indicators)
+    def importar_indicadores(self, ruta, metas_por_codigo):
+        inicio = time.perf_counter()
+        existentes = {}
+        for indicador in IndicadorODS.objects.all():
+            existentes.setdefault(indicador.codigo, indicador)
+
+        def filas():
+            for row in iterar_json(ruta):
+                target_code = str(row['target_id'])
+                meta = metas_por_codigo.get(target_code)
+                if meta is None:
+                    self.stdout.write(self.style.WARNING(
+                        f"Meta con código {target_code} no encontrada para el indicador {row['indicator_id']}."))
+                    continue
+                # Algunos códigos vienen como número en el JSON (p. ej. 3.6); en la base se guardan como texto
+                yield str(row['indicator_id']), {'meta_ods_id': meta.pk, 'descripcion': row['indicator']}
+
+        return self.sincronizar('indicadores de ODS', IndicadorODS, 'codigo', existentes, filas(), inicio)
+
+    def sincronizar(self, etiqueta, modelo, campo_clave, existentes, filas, inicio):
+        """
+        Compara cada fila del archivo con el registro existente de la misma clave:
+        crea los nuevos, actualiza solo los que cambiaron y no toca los iguales.
+        Devuelve un diccionario clave -> instancia con todos los registros importados.
+        """
+        nuevos, modificados, resultado = [], [], {}
+        campos_modificados = set()
+        sin_cambios = 0
+        for clave, valores in filas:
+            if clave in resultado:
+                continue
+            instancia = existentes.get(clave)
+            if instancia is None:
+                instancia = modelo(**{campo_clave: clave}, **valores)
+                nuevos.append(instancia)
+            else:
+                cambios = [campo for campo, valor in valores.items() if getattr(instancia, campo) != valor]
+                if cambios:
+                    for campo in cambios:
+                        setattr(instancia, campo, valores[campo])
+                    campos_modificados.update(cambios)
+                    modificados.append(instancia)
+                else:
+                    sin_cambios += 1
+            resultado[clave] = instancia
+
+        modelo.objects.bulk_create(nuevos, batch_size=self.batch_size)
+        if nuevos and nuevos[0].pk is None:
+            # MySQL no devuelve las claves primarias en bulk_create; se releen por su clave natural
+            claves_nuevas = [getattr(instancia, campo_clave) for instancia in nuevos]
+            for instancia in modelo.objects.filter(**{f'{campo_clave}__in': claves_nuevas}):
+                resultado[getattr(instancia, campo_clave)] = instancia
+        if modificados:
+            modelo.objects.bulk_update(modificados, sorted(campos_modificados), batch_size=self.batch_size)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{etiqueta}: {len(nuevos)} insertados, {len(modificados)} actualizados, '
+            f'{sin_cambios} sin cambios ({time.perf_counter() - inicio:.2f} s).'
+        ))
+        return resultado
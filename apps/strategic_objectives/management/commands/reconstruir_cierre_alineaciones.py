@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from apps.strategic_objectives.models import CierreAlineacion
+
+
+class Command(BaseCommand):
+    help = 'Recalcula desde cero el cierre transitivo de las alineaciones (tras cargas masivas o para corregir desfases).'
+
+    def handle(self, *args, **options):
+        pares = CierreAlineacion.objects.reconstruir()
+        self.stdout.write(self.style.SUCCESS(f'Cierre de alineaciones reconstruido: {pares} pares.'))
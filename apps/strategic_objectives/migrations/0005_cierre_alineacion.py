@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:21
+
+import django.db.models.deletion
+from decimal import Decimal
+
+from django.db import migrations, models
+
+from apps.strategic_objectives.cierre import calcular_cierre, factor_arista
+
+
+def poblar_cierre_alineacion(apps, schema_editor):
+    Alineacion = apps.get_model('strategic_objectives', 'Alineacion')
+    ProgramaInstitucional = apps.get_model('strategic_objectives', 'ProgramaInstitucional')
+    CierreAlineacion = apps.get_model('strategic_objectives', 'CierreAlineacion')
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+
+    aristas = [
+        ((origen_tipo, origen_id), (destino_tipo, destino_id), factor_arista(porcentaje))
+        for origen_tipo, origen_id, destino_tipo, destino_id, porcentaje in Alineacion.objects.values_list(
+            'instrumento_origen_tipo_id', 'instrumento_origen_id',
+            'instrumento_destino_tipo_id', 'instrumento_destino_id', 'contribucion_porcentaje')
+    ]
+    enlaces = list(ProgramaInstitucional.oei_alineados.through.objects.values_list(
+        'programainstitucional_id', 'objetivoestrategicoinstitucional_id'))
+    if enlaces:
+        programa, _ = ContentType.objects.get_or_create(
+            app_label='strategic_objectives', model='programainstitucional')
+        oei, _ = ContentType.objects.get_or_create(
+            app_label='strategic_objectives', model='objetivoestrategicoinstitucional')
+        aristas += [((programa.pk, p), (oei.pk, o), Decimal('1')) for p, o in enlaces]
+
+    CierreAlineacion.objects.bulk_create([
+        CierreAlineacion(origen_tipo_id=origen[0], origen_id=origen[1],
+                         destino_tipo_id=destino[0], destino_id=destino[1], caminos=caminos, factor=factor)
+        for (origen, destino), (caminos, factor) in calcular_cierre(aristas).items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('strategic_objectives', '0004_alter_plansectorial_periodo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CierreAlineacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('origen_id', models.PositiveIntegerField()),
+                ('destino_id', models.PositiveIntegerField()),
+                ('caminos', models.PositiveIntegerField(default=1)),
+                ('factor', models.DecimalField(decimal_places=8, max_digits=17)),
+                ('destino_tipo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='contenttypes.contenttype')),
+                ('origen_tipo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='contenttypes.contenttype')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['destino_tipo', 'destino_id'], name='cierre_destino_idx')],
+                'unique_together': {('origen_tipo', 'origen_id', 'destino_tipo', 'destino_id')},
+            },
+        ),
+        migrations.RunPython(poblar_cierre_alineacion, migrations.RunPython.noop),
+    ]
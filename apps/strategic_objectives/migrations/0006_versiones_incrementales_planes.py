@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('strategic_objectives', '0005_cierre_alineacion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='planinstitucionalversion',
+            name='campos_modificados',
+            field=models.JSONField(blank=True, default=list, help_text='Campos del plan que cambiaron respecto de la versión anterior'),
+        ),
+        migrations.AddField(
+            model_name='planinstitucionalversion',
+            name='es_completa',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name='planinstitucionalversion',
+            name='parche',
+            field=models.JSONField(blank=True, help_text='Operaciones JSON Patch desde la versión anterior', null=True),
+        ),
+        migrations.AlterField(
+            model_name='planinstitucionalversion',
+            name='datos',
+            field=models.JSONField(blank=True, help_text='Snapshot de los datos del plan en esta versión', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='planinstitucionalversion',
+            index=models.Index(fields=['plan_institucional', 'numero_version'], name='version_plan_numero_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('strategic_objectives', '0006_versiones_incrementales_planes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alineacion',
+            name='fecha_actualizacion',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
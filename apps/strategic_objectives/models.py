@@ -1,8 +1,18 @@
-from django.db import models
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
 from django.conf import settings
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from apps.institutional_config.models import Entidad, PeriodoPlanificacion
+from apps.core.tipos_contenido import tipos_contenido
+from apps.core.parches import calcular_parche
+from apps.core.versiones import HistorialVersionesManager, campos_de
+from .cierre import calcular_cierre, factor_arista, PRECISION
 
 # --- Plan Nacional de Desarrollo (PND) ---
 class PlanNacionalDesarrollo(models.Model):
@@ -107,17 +117,40 @@ class PlanInstitucional(models.Model):
 
 
 # HISTÓRICO DE VERSIONES
+class VersionPlanManager(HistorialVersionesManager):
+    """
+    Historial de versiones del plan (con sus OEI): una foto completa cada
+    PLANES_VERSIONES_INTERVALO_COMPLETA versiones y parches entre ellas. Cada versión
+    guarda además los campos que cambiaron respecto de la anterior.
+    """
+    campo_padre = 'plan_institucional'
+    setting_intervalo = 'PLANES_VERSIONES_INTERVALO_COMPLETA'
+
+    def antes_de_guardar(self, version, anterior, datos):
+        version.campos_modificados = [] if anterior is None else campos_de(calcular_parche(anterior, datos))
+
+    def campos_compactados(self):
+        return super().campos_compactados() + ['campos_modificados']
+
+
 class PlanInstitucionalVersion(models.Model):
     version_id = models.AutoField(primary_key=True)
     plan_institucional = models.ForeignKey(PlanInstitucional, on_delete=models.CASCADE, related_name='versiones')
     numero_version = models.PositiveIntegerField()
     fecha_version = models.DateTimeField(auto_now_add=True)
     usuario_responsable = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True)
-    # Usamos JSONField para guardar una "foto" flexible de los datos del plan.
-    datos = models.JSONField(help_text="Snapshot de los datos del plan en esta versión")
+    # Foto completa (es_completa) o parche respecto de la versión anterior; ver VersionPlanManager
+    es_completa = models.BooleanField(default=True)
+    datos = models.JSONField(null=True, blank=True, help_text="Snapshot de los datos del plan en esta versión")
+    parche = models.JSONField(null=True, blank=True, help_text="Operaciones JSON Patch desde la versión anterior")
+    campos_modificados = models.JSONField(default=list, blank=True,
+                                          help_text="Campos del plan que cambiaron respecto de la versión anterior")
+
+    objects = VersionPlanManager()
 
     class Meta:
         ordering = ['-fecha_version']
+        indexes = [models.Index(fields=['plan_institucional', 'numero_version'], name='version_plan_numero_idx')]
 
     def __str__(self):
         return f"Versión {self.numero_version} de {self.plan_institucional.plan_institucional_id}"
@@ -168,6 +201,8 @@ class Alineacion(models.Model):
 
     contribucion_porcentaje = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
     fecha_creacion = models.DateTimeField(auto_now_add=True)
+    # Sello del reporte de alineaciones (reports.trabajos.version_alineaciones)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
     usuario_creacion = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True)
 
     ods_vinculados = models.ManyToManyField(
@@ -183,6 +218,19 @@ class Alineacion(models.Model):
     def __str__(self):
         return f"{self.instrumento_origen} -> {self.instrumento_destino}"
 
+    def clean(self):
+        super().clean()
+        if self.instrumento_origen_tipo_id and self.instrumento_destino_tipo_id:
+            CierreAlineacion.objects.validar_arista(
+                (self.instrumento_origen_tipo_id, self.instrumento_origen_id),
+                (self.instrumento_destino_tipo_id, self.instrumento_destino_id),
+            )
+
+    def save(self, *args, **kwargs):
+        # El cierre se actualiza en post_save y rechaza los ciclos: la fila no debe quedar sin él
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
 
 class ProgramaInstitucional(models.Model):
     programa_id = models.AutoField(primary_key=True)
@@ -215,4 +263,229 @@ class ObjetivoSectorial(models.Model):
     descripcion = models.TextField()
 
     def __str__(self):
-        return f"Sectorial {self.codigo}: {self.descripcion[:50]}"
\ No newline at end of file
+        return f"Sectorial {self.codigo}: {self.descripcion[:50]}"
+
+
+# --- Cierre transitivo de alineaciones ---
+
+class CierreAlineacionManager(models.Manager):
+    """
+    Mantiene CierreAlineacion a partir de las aristas del grafo: cada Alineacion y cada
+    OEI de ProgramaInstitucional.oei_alineados (factor 100 %). Las altas y bajas de aristas
+    se aplican por señales; tras operaciones masivas se debe llamar a reconstruir().
+
+    El grafo debe ser acíclico: una arista que cerraría un ciclo se rechaza con ValidationError
+    (y se revierte su alta), así que toda arista existente está contada en el cierre.
+    """
+
+    @staticmethod
+    def aristas():
+        """Todas las aristas actuales como (origen, destino, factor), con nodos (content_type_id, id)."""
+        for origen_tipo, origen_id, destino_tipo, destino_id, porcentaje in Alineacion.objects.values_list(
+                'instrumento_origen_tipo_id', 'instrumento_origen_id',
+                'instrumento_destino_tipo_id', 'instrumento_destino_id', 'contribucion_porcentaje'):
+            yield (origen_tipo, origen_id), (destino_tipo, destino_id), factor_arista(porcentaje)
+        programa = tipos_contenido.id_de(ProgramaInstitucional)
+        oei = tipos_contenido.id_de(ObjetivoEstrategicoInstitucional)
+        for programa_id, oei_id in ProgramaInstitucional.oei_alineados.through.objects.values_list(
+                'programainstitucional_id', 'objetivoestrategicoinstitucional_id'):
+            yield (programa, programa_id), (oei, oei_id), Decimal('1')
+
+    def alcanza(self, desde, hasta):
+        if desde == hasta:
+            return True
+        return self.filter(origen_tipo_id=desde[0], origen_id=desde[1],
+                           destino_tipo_id=hasta[0], destino_id=hasta[1]).exists()
+
+    def validar_arista(self, origen, destino):
+        if self.alcanza(destino, origen):
+            raise ValidationError('La alineación crearía un ciclo: el destino ya contribuye al origen.')
+
+    def agregar_arista(self, origen, destino, factor):
+        self.validar_arista(origen, destino)
+        self._aplicar_arista(origen, destino, factor, 1)
+
+    def quitar_arista(self, origen, destino, factor):
+        self._aplicar_arista(origen, destino, factor, -1)
+
+    def _aplicar_arista(self, origen, destino, factor, signo):
+        """
+        Toda ruta nueva (o eliminada) x -> y que usa la arista origen -> destino se descompone
+        en x -> origen, la arista y destino -> y, así que basta combinar los ancestros de
+        `origen` con los descendientes de `destino`.
+        """
+        ancestros = [(origen, 1, Decimal('1'))] + [
+            ((fila.origen_tipo_id, fila.origen_id), fila.caminos, fila.factor)
+            for fila in self.filter(destino_tipo_id=origen[0], destino_id=origen[1])
+        ]
+        descendientes = [(destino, 1, Decimal('1'))] + [
+            ((fila.destino_tipo_id, fila.destino_id), fila.caminos, fila.factor)
+            for fila in self.filter(origen_tipo_id=destino[0], origen_id=destino[1])
+        ]
+        filtro_origen = Q()
+        for nodo, _, _ in ancestros:
+            filtro_origen |= Q(origen_tipo_id=nodo[0], origen_id=nodo[1])
+        nodos_destino = {nodo for nodo, _, _ in descendientes}
+
+        with transaction.atomic():
+            existentes = {
+                (fila.origen, fila.destino): fila
+                for fila in self.select_for_update().filter(filtro_origen)
+                if fila.destino in nodos_destino
+            }
+            nuevos, modificados, vacios = [], [], []
+            for x, caminos_x, factor_x in ancestros:
+                for y, caminos_y, factor_y in descendientes:
+                    caminos = signo * caminos_x * caminos_y
+                    aporte = signo * (factor_x * factor * factor_y).quantize(PRECISION)
+                    fila = existentes.get((x, y))
+                    if fila is None:
+                        if signo > 0:
+                            nuevos.append(CierreAlineacion(
+                                origen_tipo_id=x[0], origen_id=x[1], destino_tipo_id=y[0], destino_id=y[1],
+                                caminos=caminos, factor=aporte
+                            ))
+                        continue
+                    fila.caminos += caminos
+                    fila.factor += aporte
+                    (modificados if fila.caminos > 0 else vacios).append(fila)
+            self.bulk_create(nuevos)
+            self.bulk_update(modificados, ['caminos', 'factor'])
+            self.filter(pk__in=[fila.pk for fila in vacios]).delete()
+
+    def reconstruir(self):
+        """Recalcula todo el cierre desde las aristas. Devuelve el número de pares."""
+        cierre = calcular_cierre(self.aristas())
+        with transaction.atomic():
+            self.all().delete()
+            self.bulk_create([
+                CierreAlineacion(origen_tipo_id=origen[0], origen_id=origen[1],
+                                 destino_tipo_id=destino[0], destino_id=destino[1],
+                                 caminos=caminos, factor=factor)
+                for (origen, destino), (caminos, factor) in cierre.items()
+            ], batch_size=1000)
+        return len(cierre)
+
+    def descendientes(self, nodo):
+        """Todo aquello a lo que `nodo` contribuye, directa o indirectamente."""
+        return self.filter(origen_tipo_id=nodo[0], origen_id=nodo[1])
+
+    def ancestros(self, nodo):
+        """Todo lo que contribuye a `nodo`, directa o indirectamente."""
+        return self.filter(destino_tipo_id=nodo[0], destino_id=nodo[1])
+
+
+class CierreAlineacion(models.Model):
+    """
+    Cierre transitivo del grafo de alineación: una fila por cada par (origen, destino) conectado
+    por al menos una ruta. `factor` es la contribución efectiva (suma sobre las rutas del
+    producto de contribucion_porcentaje / 100), de modo que "¿a qué objetivos PND contribuye
+    este programa y en qué porcentaje?" es una sola consulta indexada.
+    """
+    origen_tipo = models.ForeignKey(ContentType, on_delete=models.CASCADE, related_name='+')
+    origen_id = models.PositiveIntegerField()
+    destino_tipo = models.ForeignKey(ContentType, on_delete=models.CASCADE, related_name='+')
+    destino_id = models.PositiveIntegerField()
+    caminos = models.PositiveIntegerField(default=1)
+    factor = models.DecimalField(max_digits=17, decimal_places=8)
+
+    objects = CierreAlineacionManager()
+
+    class Meta:
+        unique_together = ('origen_tipo', 'origen_id', 'destino_tipo', 'destino_id')
+        indexes = [
+            models.Index(fields=['destino_tipo', 'destino_id'], name='cierre_destino_idx'),
+        ]
+
+    @property
+    def origen(self):
+        return (self.origen_tipo_id, self.origen_id)
+
+    @property
+    def destino(self):
+        return (self.destino_tipo_id, self.destino_id)
+
+    @property
+    def contribucion_porcentaje(self):
+        return (self.factor * 100).quantize(Decimal('0.0001'))
+
+    def __str__(self):
+        return f"{self.origen} -> {self.destino} ({self.contribucion_porcentaje} %)"
+
+
+def arista_de_alineacion(valores):
+    return (
+        (valores['instrumento_origen_tipo_id'], valores['instrumento_origen_id']),
+        (valores['instrumento_destino_tipo_id'], valores['instrumento_destino_id']),
+        factor_arista(valores['contribucion_porcentaje']),
+    )
+
+
+CAMPOS_ARISTA = ('instrumento_origen_tipo_id', 'instrumento_origen_id', 'instrumento_destino_tipo_id',
+                 'instrumento_destino_id', 'contribucion_porcentaje')
+
+
+@receiver(pre_save, sender=Alineacion)
+def guardar_alineacion_anterior(sender, instance, **kwargs):
+    instance._arista_anterior = None
+    if instance.pk:
+        valores = Alineacion.objects.filter(pk=instance.pk).values(*CAMPOS_ARISTA).first()
+        instance._arista_anterior = arista_de_alineacion(valores) if valores else None
+
+
+@receiver(post_save, sender=Alineacion)
+def actualizar_cierre_alineacion(sender, instance, **kwargs):
+    arista = arista_de_alineacion({campo: getattr(instance, campo) for campo in CAMPOS_ARISTA})
+    anterior = getattr(instance, '_arista_anterior', None)
+    if anterior == arista:
+        return
+    if anterior:
+        CierreAlineacion.objects.quitar_arista(*anterior)
+    CierreAlineacion.objects.agregar_arista(*arista)
+
+
+@receiver(post_delete, sender=Alineacion)
+def quitar_cierre_alineacion(sender, instance, **kwargs):
+    CierreAlineacion.objects.quitar_arista(
+        *arista_de_alineacion({campo: getattr(instance, campo) for campo in CAMPOS_ARISTA})
+    )
+
+
+def aristas_programa_oei(programa_ids, oei_ids):
+    programa = tipos_contenido.id_de(ProgramaInstitucional)
+    oei = tipos_contenido.id_de(ObjetivoEstrategicoInstitucional)
+    return [((programa, programa_id), (oei, oei_id), Decimal('1'))
+            for programa_id in programa_ids for oei_id in oei_ids]
+
+
+@receiver(m2m_changed, sender=ProgramaInstitucional.oei_alineados.through)
+def actualizar_cierre_programa(sender, instance, action, reverse, pk_set, **kwargs):
+    relacionados = instance.programas_alineados if reverse else instance.oei_alineados
+    if action in ('pre_clear', 'pre_remove'):
+        # Se guarda lo que realmente se va a quitar: después ya no se puede consultar
+        existentes = relacionados.all() if action == 'pre_clear' else relacionados.filter(pk__in=pk_set)
+        instance._relacionados_a_quitar = list(existentes.values_list('pk', flat=True))
+        return
+    if action in ('post_clear', 'post_remove'):
+        pk_set, action = instance.__dict__.pop('_relacionados_a_quitar', []), 'post_remove'
+    if action not in ('post_add', 'post_remove') or not pk_set:
+        return
+    aristas = aristas_programa_oei(pk_set, [instance.pk]) if reverse else aristas_programa_oei([instance.pk], pk_set)
+    for arista in aristas:
+        if action == 'post_add':
+            CierreAlineacion.objects.agregar_arista(*arista)
+        else:
+            CierreAlineacion.objects.quitar_arista(*arista)
+
+
+@receiver(pre_delete, sender=ProgramaInstitucional)
+@receiver(pre_delete, sender=ObjetivoEstrategicoInstitucional)
+def quitar_cierre_programa(sender, instance, **kwargs):
+    # El borrado en cascada de la tabla intermedia no envía m2m_changed
+    if sender is ProgramaInstitucional:
+        aristas = aristas_programa_oei([instance.pk], instance.oei_alineados.values_list('pk', flat=True))
+    else:
+        aristas = aristas_programa_oei(instance.programas_alineados.values_list('pk', flat=True), [instance.pk])
+    for arista in aristas:
+        CierreAlineacion.objects.quitar_arista(*arista)
+
@@ -4,9 +4,12 @@ from .models import (
     PlanNacionalDesarrollo, ObjetivoPND, PoliticaPND, MetaPND, IndicadorPND,
     ObjetivoDesarrolloSostenible, MetaODS, IndicadorODS,
     PlanInstitucional, ObjetivoEstrategicoInstitucional, PlanSectorial, ObjetivoSectorial, Alineacion,
+    CierreAlineacion,
     PlanInstitucionalVersion, ProgramaInstitucional,
 )
 from apps.institutional_config.models import PeriodoPlanificacion, Entidad
+from apps.core.serializers import CamposDinamicosMixin
+from apps.core.genericos import resolver_genericos
 
 # --- Plan Nacional de Desarrollo (PND) ---
 class IndicadorPNDSerializer(serializers.ModelSerializer):
@@ -60,7 +63,7 @@ class PlanNacionalDesarrolloSerializer(serializers.ModelSerializer):
         fields = ['pnd_id', 'nombre', 'periodo', 'periodo_id', 'fecha_publicacion', 'objetivos']
 
 # --- Objetivos de Desarrollo Sostenible (ODS) ---
-class IndicadorODSSerializer(serializers.ModelSerializer):
+class IndicadorODSSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     id = serializers.IntegerField(source='indicador_ods_id')
 
     class Meta:
@@ -116,6 +119,15 @@ class PlanSectorialSerializer(serializers.ModelSerializer):
         ]
 
 # Representar un objeto genérico de forma legible
+# FK que usa el __str__ de cada instrumento alineable; se traen con select_related al resolverlos en bloque
+RELACIONES_DESCRIPCION = {
+    PlanNacionalDesarrollo: ['periodo'],
+    ObjetivoPND: ['pnd'],
+    PlanInstitucional: ['entidad', 'periodo'],
+    PlanInstitucionalVersion: ['plan_institucional'],
+    PlanSectorial: ['periodo'],
+}
+
 class GenericRelatedObjectSerializer(serializers.Field):
     def to_representation(self, value):
         return {
@@ -124,7 +136,16 @@ class GenericRelatedObjectSerializer(serializers.Field):
             'description': str(value)
         }
 
-class AlineacionSerializer(serializers.ModelSerializer):
+class AlineacionEnLoteSerializer(serializers.ListSerializer):
+    """Resuelve en bloque origen y destino de todas las alineaciones antes de serializarlas."""
+    def to_representation(self, data):
+        alineaciones = list(data.all() if hasattr(data, 'all') else data)
+        campos = [campo for campo in ('instrumento_origen', 'instrumento_destino') if campo in self.child.fields]
+        if campos:
+            resolver_genericos(alineaciones, campos, RELACIONES_DESCRIPCION)
+        return super().to_representation(alineaciones)
+
+class AlineacionSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     instrumento_origen = GenericRelatedObjectSerializer(read_only=True)
     instrumento_destino = GenericRelatedObjectSerializer(read_only=True)
     instrumento_origen_tipo = serializers.PrimaryKeyRelatedField(
@@ -137,6 +158,7 @@ class AlineacionSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Alineacion
+        list_serializer_class = AlineacionEnLoteSerializer
         fields = [
             'alineacion_id',
             'instrumento_origen',
@@ -151,12 +173,29 @@ class AlineacionSerializer(serializers.ModelSerializer):
             'ods_vinculados',
         ]
 
+    def validate(self, attrs):
+        # El grafo de alineación debe ser acíclico para que el cierre transitivo sea válido
+        def valor(campo):
+            return attrs.get(campo, getattr(self.instance, campo, None))
+        origen_tipo, destino_tipo = valor('instrumento_origen_tipo'), valor('instrumento_destino_tipo')
+        if origen_tipo is not None and destino_tipo is not None:
+            origen = (origen_tipo.pk, valor('instrumento_origen_id'))
+            destino = (destino_tipo.pk, valor('instrumento_destino_id'))
+            if CierreAlineacion.objects.alcanza(destino, origen):
+                raise serializers.ValidationError(
+                    "La alineación crearía un ciclo: el destino ya contribuye al origen."
+                )
+        return attrs
+
 class PlanInstitucionalVersionSerializer(serializers.ModelSerializer):
+    """Entrada del historial; los datos y las diferencias se piden aparte (se reconstruyen)."""
+    usuario_responsable = serializers.CharField(source='usuario_responsable.nombre_usuario', read_only=True, default=None)
+
     class Meta:
         model = PlanInstitucionalVersion
         fields = [
-            'version_id', 'plan_institucional', 'numero_version', 'fecha_version', 'usuario_version',
-            'cambios_realizados'
+            'version_id', 'plan_institucional', 'numero_version', 'fecha_version', 'usuario_responsable',
+            'es_completa', 'campos_modificados'
         ]
 
 class ObjetivoSectorialSerializer(serializers.ModelSerializer):
@@ -0,0 +1,58 @@
+import json
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.test import TestCase
+from apps.strategic_objectives.management.commands.import_ods import iterar_json
+from apps.strategic_objectives.models import ObjetivoDesarrolloSostenible, MetaODS, IndicadorODS, Alineacion
+
+DATA_PATH = settings.BASE_DIR / 'apps' / 'strategic_objectives' / 'data'
+
+
+class ImportODSTests(TestCase):
+    def importar(self):
+        salida = StringIO()
+        call_command('import_ods', stdout=salida)
+        return salida.getvalue()
+
+    def test_lectura_por_bloques_equivale_a_json_load(self):
+        ruta = DATA_PATH / 'targets-final.json'
+        with open(ruta, encoding='utf-8') as file:
+            esperado = json.load(file)
+        self.assertEqual(list(iterar_json(ruta, tamano_bloque=97)), esperado)
+
+    def test_reimportar_es_idempotente_y_conserva_alineaciones(self):
+        self.importar()
+        totales = (ObjetivoDesarrolloSostenible.objects.count(), MetaODS.objects.count(), IndicadorODS.objects.count())
+        self.assertEqual(totales[0], 17)
+        self.assertTrue(all(totales))
+
+        ods = ObjetivoDesarrolloSostenible.objects.get(numero=1)
+        ct = ContentType.objects.get_for_model(MetaODS)
+        alineacion = Alineacion.objects.create(
+            instrumento_origen_tipo=ct, instrumento_origen_id=1,
+            instrumento_destino_tipo=ct, instrumento_destino_id=2
+        )
+        alineacion.ods_vinculados.add(ods)
+
+        salida = self.importar()
+        self.assertIn('ODS: 0 insertados, 0 actualizados, 17 sin cambios', salida)
+        self.assertIn(f'indicadores de ODS: 0 insertados, 0 actualizados, {totales[2]} sin cambios', salida)
+        self.assertEqual(
+            (ObjetivoDesarrolloSostenible.objects.count(), MetaODS.objects.count(), IndicadorODS.objects.count()),
+            totales
+        )
+        self.assertEqual(list(alineacion.ods_vinculados.all()), [ods])
+
+    def test_solo_actualiza_registros_modificados(self):
+        self.importar()
+        MetaODS.objects.filter(codigo='1.1').update(descripcion='Descripción editada')
+        IndicadorODS.objects.filter(codigo='1.1.1').delete()
+
+        salida = self.importar()
+        self.assertIn('metas de ODS: 0 insertados, 1 actualizados', salida)
+        self.assertIn('indicadores de ODS: 1 insertados, 0 actualizados', salida)
+        self.assertNotEqual(MetaODS.objects.get(codigo='1.1').descripcion, 'Descripción editada')
+        self.assertEqual(IndicadorODS.objects.get(codigo='1.1.1').meta_ods.codigo, '1.1')
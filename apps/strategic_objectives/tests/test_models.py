@@ -1,5 +1,16 @@
-from django.test import TestCase
-from apps.strategic_objectives.models import PlanInstitucional, ObjetivoEstrategicoInstitucional
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from apps.strategic_objectives.models import (
+    PlanInstitucional, ObjetivoEstrategicoInstitucional, ProgramaInstitucional, ObjetivoPND, ObjetivoSectorial,
+    Alineacion, CierreAlineacion, PlanInstitucionalVersion
+)
+from apps.strategic_objectives.serializers import AlineacionSerializer
 from apps.institutional_config.models import Entidad, PeriodoPlanificacion
 
 class ObjetivoEstrategicoInstitucionalModelTests(TestCase):
@@ -19,4 +30,143 @@ class ObjetivoEstrategicoInstitucionalModelTests(TestCase):
 
     def test_objetivo_creacion(self):
         self.assertEqual(self.objetivo_estrategico.codigo, "OEI-001")
-        self.assertEqual(self.objetivo_estrategico.plan_institucional.nombre, "Plan Institucional Test")
\ No newline at end of file
+        self.assertEqual(self.objetivo_estrategico.plan_institucional.nombre, "Plan Institucional Test")
+
+
+class CierreAlineacionTests(TestCase):
+    """
+    Grafo de prueba: Programa -> OEI (oei_alineados), OEI -50%-> PND 1, OEI -40%-> Sectorial 7,
+    Sectorial 7 -50%-> PND 1. El programa llega a PND 1 por dos rutas: 50 % + 40 % x 50 % = 70 %.
+    """
+    def setUp(self):
+        entidad = Entidad.objects.create(nombre="Entidad Test", codigo_unico="ENT_TEST")
+        periodo = PeriodoPlanificacion.objects.create(
+            nombre="2025-2029", fecha_inicio=date(2025, 1, 1), fecha_fin=date(2029, 12, 31)
+        )
+        plan = PlanInstitucional.objects.create(nombre="Plan", entidad=entidad, periodo=periodo)
+        self.oei = ObjetivoEstrategicoInstitucional.objects.create(
+            plan_institucional=plan, codigo="OEI-001", descripcion="Objetivo"
+        )
+        self.programa = ProgramaInstitucional.objects.create(entidad=entidad, nombre="Programa")
+        self.ct_oei = ContentType.objects.get_for_model(ObjetivoEstrategicoInstitucional)
+        self.ct_pnd = ContentType.objects.get_for_model(ObjetivoPND)
+        self.ct_sectorial = ContentType.objects.get_for_model(ObjetivoSectorial)
+        self.ct_programa = ContentType.objects.get_for_model(ProgramaInstitucional)
+
+        self.programa.oei_alineados.add(self.oei)
+        self.alinear(self.ct_oei, self.oei.pk, self.ct_pnd, 1, '50.00')
+        self.alinear(self.ct_oei, self.oei.pk, self.ct_sectorial, 7, '40.00')
+        self.sectorial_pnd = self.alinear(self.ct_sectorial, 7, self.ct_pnd, 1, '50.00')
+
+    @staticmethod
+    def alinear(origen_tipo, origen_id, destino_tipo, destino_id, porcentaje):
+        return Alineacion.objects.create(
+            instrumento_origen_tipo=origen_tipo, instrumento_origen_id=origen_id,
+            instrumento_destino_tipo=destino_tipo, instrumento_destino_id=destino_id,
+            contribucion_porcentaje=Decimal(porcentaje)
+        )
+
+    def cierre(self):
+        return {
+            (fila.origen, fila.destino): (fila.caminos, fila.contribucion_porcentaje)
+            for fila in CierreAlineacion.objects.all()
+        }
+
+    def assertCierreConsistente(self):
+        incremental = self.cierre()
+        CierreAlineacion.objects.reconstruir()
+        self.assertEqual(incremental, self.cierre())
+
+    def test_contribucion_efectiva_por_varias_rutas(self):
+        programa = (self.ct_programa.pk, self.programa.pk)
+        pnd = CierreAlineacion.objects.descendientes(programa).get(destino_tipo=self.ct_pnd, destino_id=1)
+        self.assertEqual(pnd.caminos, 2)
+        self.assertEqual(pnd.contribucion_porcentaje, Decimal('70.0000'))
+        ancestros = {fila.origen for fila in CierreAlineacion.objects.ancestros((self.ct_pnd.pk, 1))}
+        self.assertEqual(ancestros, {programa, (self.ct_oei.pk, self.oei.pk), (self.ct_sectorial.pk, 7)})
+        self.assertCierreConsistente()
+
+    def test_borrar_y_modificar_aristas(self):
+        self.sectorial_pnd.delete()
+        self.assertCierreConsistente()
+        fila = CierreAlineacion.objects.get(origen_tipo=self.ct_programa, destino_tipo=self.ct_pnd)
+        self.assertEqual((fila.caminos, fila.contribucion_porcentaje), (1, Decimal('50.0000')))
+
+        alineacion = Alineacion.objects.get(instrumento_destino_tipo=self.ct_pnd)
+        alineacion.contribucion_porcentaje = Decimal('25.00')
+        alineacion.save()
+        self.assertCierreConsistente()
+
+        self.programa.oei_alineados.clear()
+        self.assertFalse(CierreAlineacion.objects.descendientes((self.ct_programa.pk, self.programa.pk)).exists())
+        self.assertCierreConsistente()
+
+    def test_borrar_programa_limpia_sus_rutas(self):
+        self.programa.delete()
+        self.assertFalse(CierreAlineacion.objects.filter(origen_tipo=self.ct_programa).exists())
+        self.assertCierreConsistente()
+
+    def test_rechaza_ciclos(self):
+        serializer = AlineacionSerializer(data={
+            'instrumento_origen_tipo': self.ct_pnd.pk, 'instrumento_origen_id': 1,
+            'instrumento_destino_tipo': self.ct_oei.pk, 'instrumento_destino_id': self.oei.pk,
+        })
+        self.assertFalse(serializer.is_valid())
+
+    def test_ciclo_fuera_del_serializer_se_rechaza_y_no_altera_el_cierre(self):
+        antes = self.cierre()
+        with self.assertRaises(ValidationError):
+            self.alinear(self.ct_pnd, 1, self.ct_oei, self.oei.pk, '10.00')
+        self.assertFalse(Alineacion.objects.filter(instrumento_origen_tipo=self.ct_pnd).exists())
+        self.assertEqual(self.cierre(), antes)
+
+        # El ciclo también puede cerrarse con la arista programa -> OEI de oei_alineados
+        with self.assertRaises(ValidationError):
+            self.alinear(self.ct_oei, self.oei.pk, self.ct_programa, self.programa.pk, '10.00')
+        self.assertCierreConsistente()
+
+
+@override_settings(PLANES_VERSIONES_INTERVALO_COMPLETA=3)
+class VersionesPlanTests(TestCase):
+    def setUp(self):
+        entidad = Entidad.objects.create(nombre="Entidad Test", codigo_unico="ENT_TEST")
+        periodo = PeriodoPlanificacion.objects.create(
+            nombre="2025-2029", fecha_inicio=date(2025, 1, 1), fecha_fin=date(2029, 12, 31)
+        )
+        self.plan = PlanInstitucional.objects.create(nombre="Plan", entidad=entidad, periodo=periodo)
+        self.historial = []
+        objetivos = []
+        for numero in range(1, 6):
+            objetivos.append({'codigo': f'OEI-{numero}', 'descripcion': 'Objetivo', 'activo': True})
+            datos = {'nombre': 'Plan', 'estado': 'BORRADOR' if numero < 3 else 'APROBADO',
+                     'objetivos_estrategicos': [dict(objetivo) for objetivo in objetivos]}
+            self.historial.append(datos)
+            PlanInstitucionalVersion.objects.registrar(self.plan, numero, datos)
+
+    def test_parches_y_campos_modificados(self):
+        versiones = PlanInstitucionalVersion.objects.filter(plan_institucional=self.plan).order_by('numero_version')
+        self.assertEqual([v.es_completa for v in versiones], [True, False, False, True, False])
+        self.assertEqual(versiones[0].campos_modificados, [])
+        self.assertEqual(versiones[1].campos_modificados, ['objetivos_estrategicos'])
+        self.assertEqual(versiones[2].campos_modificados, ['estado', 'objetivos_estrategicos'])
+
+    def test_reconstruye_y_compara_versiones(self):
+        for numero, datos in enumerate(self.historial, start=1):
+            self.assertEqual(PlanInstitucionalVersion.objects.reconstruir(self.plan.pk, numero), datos)
+        parche = PlanInstitucionalVersion.objects.diferencias(self.plan.pk, 5, 2)
+        self.assertIn({'op': 'replace', 'path': '/estado', 'value': 'BORRADOR'}, parche)
+        self.assertIn({'op': 'remove', 'path': '/objetivos_estrategicos/4'}, parche)
+        self.assertIsNone(PlanInstitucionalVersion.objects.diferencias(self.plan.pk, 1, 9))
+
+    def test_compactar_historial_de_fotos_completas(self):
+        PlanInstitucionalVersion.objects.filter(plan_institucional=self.plan).delete()
+        for numero, datos in enumerate(self.historial, start=1):
+            PlanInstitucionalVersion.objects.create(plan_institucional=self.plan, numero_version=numero, datos=datos)
+
+        salida = StringIO()
+        call_command('compactar_versiones_planes', intervalo=4, stdout=salida)
+        self.assertIn('5 versiones, 2 fotos completas y 3 parches', salida.getvalue())
+        version = PlanInstitucionalVersion.objects.get(plan_institucional=self.plan, numero_version=3)
+        self.assertEqual(version.campos_modificados, ['estado', 'objetivos_estrategicos'])
+        for numero, datos in enumerate(self.historial, start=1):
+            self.assertEqual(PlanInstitucionalVersion.objects.reconstruir(self.plan.pk, numero), datos)
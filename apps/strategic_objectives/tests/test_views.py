@@ -1,6 +1,16 @@
+from datetime import date
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
-from apps.strategic_objectives.models import PlanInstitucional, ObjetivoEstrategicoInstitucional
+from apps.authentication.models import Usuario
+from apps.strategic_objectives.models import (
+    PlanInstitucional, ObjetivoEstrategicoInstitucional, PlanNacionalDesarrollo, ObjetivoPND,
+    ObjetivoDesarrolloSostenible, MetaODS, IndicadorODS, Alineacion, PlanInstitucionalVersion
+)
 from apps.institutional_config.models import Entidad, PeriodoPlanificacion
 
 class ObjetivoEstrategicoInstitucionalViewSetTests(APITestCase):
@@ -31,4 +41,116 @@ class ObjetivoEstrategicoInstitucionalViewSetTests(APITestCase):
         }
         response = self.client.post("/oei/", data)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
-        self.assertEqual(response.data["codigo"], "OEI-002")
\ No newline at end of file
+        self.assertEqual(response.data["codigo"], "OEI-002")
+
+
+class AlineacionListQueriesTests(APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(user=Usuario.objects.create_user(nombre_usuario="planificador", password="Clave123!"))
+        entidad = Entidad.objects.create(nombre="Entidad Test", codigo_unico="ENT_TEST")
+        self.periodo = PeriodoPlanificacion.objects.create(
+            nombre="2025-2029", fecha_inicio=date(2025, 1, 1), fecha_fin=date(2029, 12, 31)
+        )
+        self.plan = PlanInstitucional.objects.create(nombre="Plan", entidad=entidad, periodo=self.periodo)
+        self.pnd = PlanNacionalDesarrollo.objects.create(nombre="PND", periodo=self.periodo, fecha_publicacion=date(2025, 1, 1))
+        self.ods = ObjetivoDesarrolloSostenible.objects.create(numero=1, nombre="Fin de la pobreza", descripcion="...")
+        meta = MetaODS.objects.create(ods=self.ods, codigo="1.1", descripcion="...")
+        IndicadorODS.objects.create(meta_ods=meta, codigo="1.1.1", descripcion="...")
+        self.ct_oei = ContentType.objects.get_for_model(ObjetivoEstrategicoInstitucional)
+        self.ct_pnd = ContentType.objects.get_for_model(ObjetivoPND)
+
+    def crear_alineaciones(self, cantidad):
+        inicio = Alineacion.objects.count()
+        for i in range(inicio, inicio + cantidad):
+            oei = ObjetivoEstrategicoInstitucional.objects.create(
+                plan_institucional=self.plan, codigo=f"OEI-{i}", descripcion="Objetivo"
+            )
+            objetivo_pnd = ObjetivoPND.objects.create(pnd=self.pnd, codigo=f"PND-{i}", descripcion="Objetivo")
+            alineacion = Alineacion.objects.create(
+                instrumento_origen_tipo=self.ct_oei, instrumento_origen_id=oei.pk,
+                instrumento_destino_tipo=self.ct_pnd, instrumento_destino_id=objetivo_pnd.pk,
+                contribucion_porcentaje=50
+            )
+            alineacion.ods_vinculados.add(self.ods)
+
+    def listar(self):
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse('alineacion-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data, len(consultas)
+
+    def test_numero_de_consultas_constante(self):
+        self.crear_alineaciones(2)
+        _, pocas = self.listar()
+        self.crear_alineaciones(8)
+        data, muchas = self.listar()
+        self.assertEqual(len(data), 10)
+        self.assertEqual(pocas, muchas)
+        self.assertEqual(data[0]['instrumento_destino']['description'], "PND-0 - PND")
+        self.assertEqual(data[0]['ods_vinculados'][0]['metas'][0]['indicadores'][0]['codigo'], "1.1.1")
+
+    def test_cierre_con_tipo_no_numerico(self):
+        response = self.client.get(reverse('alineacion-descendientes'),
+                                   {'tipo': self.ct_oei.pk, 'id': 1, 'destino_tipo': 'pnd'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_destino_inexistente(self):
+        self.crear_alineaciones(1)
+        ObjetivoPND.objects.all().delete()
+        data, _ = self.listar()
+        self.assertIsNone(data[0]['instrumento_destino'])
+
+
+class VersionesPlanViewTests(APITestCase):
+    def setUp(self):
+        entidad = Entidad.objects.create(nombre="Entidad Test", codigo_unico="ENT_TEST")
+        periodo = PeriodoPlanificacion.objects.create(
+            nombre="2025-2029", fecha_inicio=date(2025, 1, 1), fecha_fin=date(2029, 12, 31)
+        )
+        self.plan = PlanInstitucional.objects.create(nombre="Original", entidad=entidad, periodo=periodo)
+        ObjetivoEstrategicoInstitucional.objects.create(plan_institucional=self.plan, codigo="OEI-1", descripcion="Uno")
+        self.client.force_authenticate(user=Usuario.objects.create_user(nombre_usuario="editor", password="Clave123!"))
+        url = reverse('plan-institucional-detail', args=[self.plan.pk])
+        for nombre in ("Segundo", "Tercero"):
+            response = self.client.patch(url, {'nombre': nombre}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.versiones = {
+            v.numero_version: v.pk for v in PlanInstitucionalVersion.objects.filter(plan_institucional=self.plan)
+        }
+
+    def test_historial_sin_datos(self):
+        response = self.client.get(reverse('plan-institucional-version-list'), {'plan_institucional': self.plan.pk})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(sorted(v['numero_version'] for v in response.data), [1, 2])
+        self.assertNotIn('datos', response.data[0])
+        self.assertEqual(response.data[0]['usuario_responsable'], "editor")
+
+        response = self.client.get(reverse('plan-institucional-version-datos', args=[self.versiones[2]]))
+        self.assertEqual(response.data['datos']['nombre'], "Segundo")
+
+    def test_diff_con_la_version_anterior_otra_version_y_el_estado_actual(self):
+        url = reverse('plan-institucional-version-diff', args=[self.versiones[2]])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['contra'], 1)
+        self.assertIn({'op': 'replace', 'path': '/nombre', 'value': 'Segundo'}, response.data['results'])
+        self.assertIn('nombre', response.data['campos_modificados'])
+
+        response = self.client.get(url, {'against': self.versiones[2]})
+        self.assertEqual(response.data['results'], [])
+        response = self.client.get(url, {'against': 'actual'})
+        self.assertIn({'op': 'replace', 'path': '/nombre', 'value': 'Segundo'}, response.data['results'])
+
+        self.assertEqual(self.client.get(url, {'against': 'x'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(url, {'against': 999}).status_code, status.HTTP_404_NOT_FOUND)
+        primera = reverse('plan-institucional-version-diff', args=[self.versiones[1]])
+        self.assertEqual(self.client.get(primera).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_diff_paginado(self):
+        url = reverse('plan-institucional-version-diff', args=[self.versiones[2]])
+        completas = self.client.get(url).data
+        response = self.client.get(url, {'page_size': 1})
+        self.assertEqual(response.data['count'], completas['count'])
+        self.assertEqual(response.data['results'], completas['results'][:1])
+        self.assertEqual(response.data['campos_modificados'], completas['campos_modificados'])
+        self.assertEqual(self.client.get(url, {'cursor': ''}).status_code, status.HTTP_400_BAD_REQUEST)
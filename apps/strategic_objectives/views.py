@@ -1,13 +1,17 @@
-from rest_framework import viewsets
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.contrib.contenttypes.models import ContentType
+from apps.core.tipos_contenido import tipos_contenido
+from apps.core.etag import respuesta_con_etag
+from apps.core.parches import calcular_parche
+from apps.core.versiones import campos_de
 from .models import (
     PlanNacionalDesarrollo, ObjetivoPND, PoliticaPND, MetaPND, IndicadorPND,
     ObjetivoDesarrolloSostenible, MetaODS, IndicadorODS,
     PlanInstitucional, ObjetivoEstrategicoInstitucional, PlanSectorial, ObjetivoSectorial, Alineacion,
-    PlanInstitucionalVersion, ProgramaInstitucional
+    PlanInstitucionalVersion, ProgramaInstitucional, CierreAlineacion
 )
 from .serializers import (
     PlanNacionalDesarrolloSerializer, ObjetivoPNDSerializer, PoliticaPNDSerializer,
@@ -15,42 +19,45 @@ from .serializers import (
     IndicadorODSSerializer, PlanInstitucionalSerializer,
     ObjetivoEstrategicoInstitucionalSerializer, PlanSectorialSerializer, ObjetivoSectorialSerializer,
     AlineacionSerializer,
-    PlanInstitucionalVersionSerializer, ProgramaInstitucionalSerializer
+    PlanInstitucionalVersionSerializer, ProgramaInstitucionalSerializer, RELACIONES_DESCRIPCION
 )
+from apps.core.genericos import cargar_objetos
+from apps.core.metricas import MedicionSerializacionMixin
+from apps.core.serializers import ConsultaCamposDinamicosMixin
 
 # --- PND ---
-class PlanNacionalDesarrolloViewSet(viewsets.ModelViewSet):
+class PlanNacionalDesarrolloViewSet(MedicionSerializacionMixin, viewsets.ModelViewSet):
     queryset = PlanNacionalDesarrollo.objects.all().prefetch_related('objetivos__politicas__metas__indicadores')
     serializer_class = PlanNacionalDesarrolloSerializer
 
-class ObjetivoPNDViewSet(viewsets.ModelViewSet):
+class ObjetivoPNDViewSet(MedicionSerializacionMixin, viewsets.ModelViewSet):
     queryset = ObjetivoPND.objects.all().prefetch_related('politicas__metas__indicadores')
     serializer_class = ObjetivoPNDSerializer
 
-class PoliticaPNDViewSet(viewsets.ModelViewSet):
+class PoliticaPNDViewSet(MedicionSerializacionMixin, viewsets.ModelViewSet):
     queryset = PoliticaPND.objects.all().prefetch_related('metas__indicadores')
     serializer_class = PoliticaPNDSerializer
 
-class MetaPNDViewSet(viewsets.ModelViewSet):
+class MetaPNDViewSet(MedicionSerializacionMixin, viewsets.ModelViewSet):
     queryset = MetaPND.objects.all().prefetch_related('indicadores')
     serializer_class = MetaPNDSerializer
 
-class IndicadorPNDViewSet(viewsets.ModelViewSet):
+class IndicadorPNDViewSet(MedicionSerializacionMixin, viewsets.ModelViewSet):
     queryset = IndicadorPND.objects.all()
     serializer_class = IndicadorPNDSerializer
 
 # --- ODS ---
-class ObjetivoDesarrolloSostenibleViewSet(viewsets.ModelViewSet):
+class ObjetivoDesarrolloSostenibleViewSet(MedicionSerializacionMixin, viewsets.ModelViewSet):
     queryset = ObjetivoDesarrolloSostenible.objects.all().prefetch_related('metas__indicadores')
     serializer_class = ObjetivoDesarrolloSostenibleSerializer
     http_method_names = ['get', 'head', 'options']  # Hacerlo de solo lectura
 
-class MetaODSViewSet(viewsets.ModelViewSet):
+class MetaODSViewSet(MedicionSerializacionMixin, viewsets.ModelViewSet):
     queryset = MetaODS.objects.all().prefetch_related('indicadores')
     serializer_class = MetaODSSerializer
     http_method_names = ['get', 'head', 'options']  # Hacerlo de solo lectura
 
-class IndicadorODSViewSet(viewsets.ModelViewSet):
+class IndicadorODSViewSet(MedicionSerializacionMixin, viewsets.ModelViewSet):
     queryset = IndicadorODS.objects.all()
     serializer_class = IndicadorODSSerializer
     http_method_names = ['get', 'head', 'options']  # Hacerlo de solo lectura
@@ -72,35 +79,85 @@ class IndicadorODSViewSet(viewsets.ModelViewSet):
                 return queryset.none()
         return queryset
 # --- PLANES Y ALINEACIÓN ---
-class PlanInstitucionalViewSet(viewsets.ModelViewSet):
+class PlanInstitucionalViewSet(MedicionSerializacionMixin, viewsets.ModelViewSet):
     queryset = PlanInstitucional.objects.all().prefetch_related('objetivos_estrategicos')
     serializer_class = PlanInstitucionalSerializer
 
     def update(self, request, *args, **kwargs):
         instance = self.get_object()
-        current_data_serializer = self.get_serializer(instance)
-
-        PlanInstitucionalVersion.objects.create(
-            plan_institucional=instance,
-            numero_version=instance.version_actual,
-            usuario_responsable=request.user if request.user.is_authenticated else None,
-            datos=current_data_serializer.data
+        # Se guarda como foto completa o como parche respecto de la versión anterior
+        PlanInstitucionalVersion.objects.registrar(
+            instance, instance.version_actual, self.get_serializer(instance).data,
+            usuario=request.user if request.user.is_authenticated else None,
         )
-
         instance.version_actual += 1
         instance.save(update_fields=['version_actual'])
         return super().update(request, *args, **kwargs)
 
-class PlanInstitucionalVersionViewSet(viewsets.ReadOnlyModelViewSet):
+class PlanInstitucionalVersionViewSet(MedicionSerializacionMixin, viewsets.ReadOnlyModelViewSet):
     """
     Endpoint para consultar el historial de versiones de los Planes Institucionales.
     No se puede crear, editar o borrar desde aquí.
     """
-    queryset = PlanInstitucionalVersion.objects.all()
+    queryset = PlanInstitucionalVersion.objects.select_related('usuario_responsable').defer('datos', 'parche')
     serializer_class = PlanInstitucionalVersionSerializer
     filterset_fields = ['plan_institucional']
 
-class ObjetivoEstrategicoInstitucionalViewSet(viewsets.ModelViewSet):
+    @action(detail=True, methods=['get'])
+    def datos(self, request, pk=None):
+        """Datos completos de la versión, reconstruidos desde la última foto y sus parches."""
+        version = self.get_object()
+        datos = PlanInstitucionalVersion.objects.reconstruir(version.plan_institucional_id, version.numero_version)
+        return Response({'version_id': version.pk, 'numero_version': version.numero_version, 'datos': datos})
+
+    @action(detail=True, methods=['get'])
+    def diff(self, request, pk=None):
+        """
+        Operaciones JSON Patch que llevan de la versión `against` a esta, calculadas en el
+        servidor a partir de los parches guardados: ?against=<version_id> de otra versión del
+        mismo plan, o against=actual para comparar con el estado actual. Sin against se compara
+        con la versión anterior. Las operaciones se paginan como cualquier lista (?page=&page_size=);
+        no hay paginación por cursor porque no son filas de una tabla.
+        """
+        if 'cursor' in request.query_params:
+            return Response({'error': "Las operaciones se paginan con ?page=&page_size=, no con ?cursor=."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        version = self.get_object()
+        plan_id = version.plan_institucional_id
+        contra = request.query_params.get('against')
+        if contra == 'actual':
+            plan = PlanInstitucional.objects.prefetch_related('objetivos_estrategicos').get(pk=plan_id)
+            datos = PlanInstitucionalVersion.objects.reconstruir(plan_id, version.numero_version)
+            operaciones = calcular_parche(PlanInstitucionalSerializer(plan).data, datos)
+            numero_contra = 'actual'
+        else:
+            if contra is None:
+                numero_contra = version.numero_version - 1
+            elif contra.isdigit():
+                numero_contra = PlanInstitucionalVersion.objects.filter(
+                    pk=contra, plan_institucional_id=plan_id).values_list('numero_version', flat=True).first()
+            else:
+                return Response({'error': "Indique ?against=<version_id>|actual."}, status=status.HTTP_400_BAD_REQUEST)
+            operaciones = None if numero_contra is None else PlanInstitucionalVersion.objects.diferencias(
+                plan_id, numero_contra, version.numero_version)
+            if operaciones is None:
+                return Response({'error': 'La versión a comparar no existe en el historial de este plan.'},
+                                status=status.HTTP_404_NOT_FOUND)
+
+        extra = {
+            'version_id': version.pk,
+            'numero_version': version.numero_version,
+            'contra': numero_contra,
+            'campos_modificados': campos_de(operaciones),
+        }
+        pagina = self.paginate_queryset(operaciones)
+        if pagina is not None:
+            response = self.get_paginated_response(pagina)
+            response.data.update(extra)
+            return response
+        return Response({**extra, 'count': len(operaciones), 'results': operaciones})
+
+class ObjetivoEstrategicoInstitucionalViewSet(MedicionSerializacionMixin, viewsets.ModelViewSet):
     """
     - Los Editores pueden crear y modificar OEI.
     - Los Auditores pueden verlos.
@@ -110,13 +167,13 @@ class ObjetivoEstrategicoInstitucionalViewSet(viewsets.ModelViewSet):
     serializer_class = ObjetivoEstrategicoInstitucionalSerializer
     # permission_classes = [IsAuthenticated, (IsAdmin | IsEditor | IsAuditor)]
 
-class PlanSectorialViewSet(viewsets.ModelViewSet):
+class PlanSectorialViewSet(MedicionSerializacionMixin, viewsets.ModelViewSet):
     queryset = PlanSectorial.objects.all().prefetch_related('objetivos')
     serializer_class = PlanSectorialSerializer
     # permission_classes = [IsAuthenticated, ...]
 
-class AlineacionViewSet(viewsets.ModelViewSet):
-    queryset = Alineacion.objects.all().select_related('instrumento_origen_tipo', 'instrumento_destino_tipo')
+class AlineacionViewSet(ConsultaCamposDinamicosMixin, MedicionSerializacionMixin, viewsets.ModelViewSet):
+    queryset = Alineacion.objects.all().prefetch_related('ods_vinculados__metas__indicadores')
     serializer_class = AlineacionSerializer
 
     def perform_create(self, serializer):
@@ -131,7 +188,55 @@ class AlineacionViewSet(viewsets.ModelViewSet):
         if ods_ids is not None:
             instance.ods_vinculados.set(ods_ids)
 
-class ObjetivoSectorialViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['get'])
+    def descendientes(self, request):
+        """
+        Instrumentos a los que contribuye un nodo, directa o indirectamente, con su porcentaje efectivo.
+        Ej: /alineaciones/descendientes/?tipo=12&id=3&destino_tipo=15
+        """
+        return self.respuesta_cierre(request, CierreAlineacion.objects.descendientes, 'destino')
+
+    @action(detail=False, methods=['get'])
+    def ancestros(self, request):
+        """Instrumentos que contribuyen a un nodo, directa o indirectamente. Mismos parámetros que descendientes."""
+        return self.respuesta_cierre(request, CierreAlineacion.objects.ancestros, 'origen')
+
+    @staticmethod
+    def respuesta_cierre(request, consulta, extremo):
+        try:
+            nodo = (int(request.query_params['tipo']), int(request.query_params['id']))
+        except (KeyError, ValueError):
+            return Response({"error": "Los parámetros 'tipo' e 'id' son requeridos."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        filas = consulta(nodo).select_related(f'{extremo}_tipo')
+        filtro_tipo = request.query_params.get(f'{extremo}_tipo')
+        if filtro_tipo:
+            if not filtro_tipo.isdigit():
+                return Response({"error": f"El parámetro '{extremo}_tipo' debe ser un número."},
+                                status=status.HTTP_400_BAD_REQUEST)
+            filas = filas.filter(**{f'{extremo}_tipo_id': int(filtro_tipo)})
+
+        filas = list(filas)
+        objetos = cargar_objetos(
+            [(getattr(fila, f'{extremo}_tipo_id'), getattr(fila, f'{extremo}_id')) for fila in filas],
+            RELACIONES_DESCRIPCION
+        )
+
+        data = []
+        for fila in filas:
+            tipo, objeto_id = getattr(fila, f'{extremo}_tipo'), getattr(fila, f'{extremo}_id')
+            objeto = objetos.get((tipo.pk, objeto_id))
+            data.append({
+                'tipo': tipo.pk,
+                'type': tipo.model,
+                'id': objeto_id,
+                'description': str(objeto) if objeto is not None else None,
+                'caminos': fila.caminos,
+                'contribucion_porcentaje': fila.contribucion_porcentaje,
+            })
+        return Response(data)
+
+class ObjetivoSectorialViewSet(MedicionSerializacionMixin, viewsets.ModelViewSet):
     queryset = ObjetivoSectorial.objects.all()
     serializer_class = ObjetivoSectorialSerializer
     # permission_classes = [IsAuthenticated, ...] # Añadir permisos según sea necesario
@@ -151,18 +256,20 @@ class AlignableContentTypesListView(APIView):
             'objetivosectorial', 'Objetivo Sectorial',
             'politicapnd', 'metapnd', 'metaods', 'plansectorial'
         ]
-        content_types = ContentType.objects.filter(model__in=models)
-        data = [
-            {
-                'id': ct.id,
-                'name': ct.name,  # Nombre legible (ej. "objetivo pnd")
-                'model': ct.model  # Nombre técnico (ej. "objetivopnd")
-            }
-            for ct in content_types
-        ]
-        return Response(data)
+        def datos():
+            tipos = (tipos_contenido.por_nombre(nombre) for nombre in models)
+            return [
+                {
+                    'id': ct.id,
+                    'name': ct.name,  # Nombre legible (ej. "objetivo pnd")
+                    'model': ct.model  # Nombre técnico (ej. "objetivopnd")
+                }
+                for ct in sorted((ct for ct in tipos if ct is not None), key=lambda ct: ct.id)
+            ]
+
+        return respuesta_con_etag(request, tipos_contenido.etag(), datos)
 
-class ProgramaInstitucionalViewSet(viewsets.ModelViewSet):
+class ProgramaInstitucionalViewSet(MedicionSerializacionMixin, viewsets.ModelViewSet):
     """
     API endpoint para gestionar los Programas Institucionales.
     """
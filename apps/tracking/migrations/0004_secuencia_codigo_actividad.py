@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investment_projects', '0007_versiones_incrementales'),
+        ('tracking', '0003_objective_strategic_objective_alter_objective_name_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityCodeSequence',
+            fields=[
+                ('project', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='activity_code_sequence', serialize=False, to='investment_projects.proyectoinversion')),
+                ('last_value', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -1,4 +1,8 @@
-from django.db import models
+import re
+from itertools import groupby
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
 from django.conf import settings
 from apps.investment_projects.models import ProyectoInversion
 from apps.strategic_objectives.models import ObjetivoEstrategicoInstitucional
@@ -21,6 +25,65 @@ class Objective(models.Model):
     def __str__(self):
         return f"{self.name} (Tracking para OEI: {self.strategic_objective.codigo if self.strategic_objective else 'N/A'})"
 
+def codigo_actividad(numero):
+    return f'ACT{numero:03d}'
+
+
+class ActivityCodeSequenceManager(models.Manager):
+    def reservar(self, proyecto_id, cantidad=1):
+        """
+        Reserva `cantidad` números consecutivos de activity_code para el proyecto y devuelve el
+        range reservado. El UPDATE con F() bloquea la fila del contador hasta el fin de la
+        transacción, así que dos creaciones concurrentes nunca reciben el mismo número.
+        """
+        with transaction.atomic():
+            if not self.filter(project_id=proyecto_id).update(last_value=F('last_value') + cantidad):
+                try:
+                    with transaction.atomic():
+                        self.create(project_id=proyecto_id, last_value=self._ultimo_existente(proyecto_id) + cantidad)
+                except IntegrityError:
+                    # Otro proceso creó el contador entre el UPDATE y el INSERT
+                    self.filter(project_id=proyecto_id).update(last_value=F('last_value') + cantidad)
+            ultimo = self.filter(project_id=proyecto_id).values_list('last_value', flat=True).get()
+        return range(ultimo - cantidad + 1, ultimo + 1)
+
+    @staticmethod
+    def _ultimo_existente(proyecto_id):
+        """Mayor número ACTnnn ya usado en el proyecto (actividades previas al contador)."""
+        numeros = [0]
+        for codigo in TrackingActivity.objects.filter(project_id=proyecto_id).values_list('activity_code', flat=True):
+            coincidencia = re.fullmatch(r'ACT(\d+)', codigo or '')
+            if coincidencia:
+                numeros.append(int(coincidencia.group(1)))
+        return max(numeros)
+
+
+# Último número de activity_code asignado en cada proyecto
+class ActivityCodeSequence(models.Model):
+    project = models.OneToOneField(ProyectoInversion, on_delete=models.CASCADE, primary_key=True,
+                                   related_name='activity_code_sequence')
+    last_value = models.PositiveIntegerField(default=0)
+
+    objects = ActivityCodeSequenceManager()
+
+    def __str__(self):
+        return f"{self.project_id}: {codigo_actividad(self.last_value)}"
+
+
+class TrackingActivityManager(models.Manager):
+    def asignar_codigos(self, actividades):
+        """
+        Asigna activity_code a las actividades (sin guardar) que no lo tengan, reservando un bloque
+        por proyecto: dos consultas por proyecto sin importar cuántas actividades se creen.
+        """
+        pendientes = sorted((a for a in actividades if not a.activity_code), key=lambda a: a.project_id)
+        for proyecto_id, grupo in groupby(pendientes, key=lambda a: a.project_id):
+            grupo = list(grupo)
+            for actividad, numero in zip(grupo, ActivityCodeSequence.objects.reservar(proyecto_id, len(grupo))):
+                actividad.activity_code = codigo_actividad(numero)
+        return actividades
+
+
 # Permite Registrar los datos solicitados
 class TrackingActivity(models.Model):
     STATUS_CHOICES = (('PLANIFICADA', 'Planificada'), ('EN_PROGRESO', 'En Progreso'), ('COMPLETADA', 'Completada'), ('EN_RIESGO', 'En Riesgo'))
@@ -55,25 +118,26 @@ class TrackingActivity(models.Model):
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='created_tracking_activities', on_delete=models.SET_NULL, null=True, blank=True)
     updated_by = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='updated_tracking_activities', on_delete=models.SET_NULL, null=True, blank=True)
 
+    objects = TrackingActivityManager()
+
     class Meta:
         unique_together = ('project', 'activity_code')
 
     def save(self, *args, **kwargs):
-        # Generar código de actividad si no existe
+        # Generar código de actividad si no existe (contador por proyecto, sin carreras)
         if not self.activity_code:
-            last_activity = TrackingActivity.objects.filter(project=self.project).order_by('id').last()
-            if last_activity and last_activity.activity_code:
-                try:
-                    last_code = int(last_activity.activity_code.replace('ACT', ''))
-                    self.activity_code = f'ACT{last_code + 1:03d}'
-                except (ValueError, TypeError):
-                    self.activity_code = 'ACT001' # Fallback
-            else:
-                self.activity_code = 'ACT001'
-        
+            self.activity_code = codigo_actividad(ActivityCodeSequence.objects.reservar(self.project_id)[0])
+
         self.planned_duration_days = (self.planned_end_date - self.planned_start_date).days
         self.update_reported_status()
         super().save(*args, **kwargs)
 
+    def update_reported_status(self):
+        # Las fechas reales mandan sobre el estado planificado; EN_RIESGO se marca a mano
+        if self.real_end_date:
+            self.reported_status = 'COMPLETADA'
+        elif self.real_start_date and self.reported_status == 'PLANIFICADA':
+            self.reported_status = 'EN_PROGRESO'
+
     def __str__(self):
         return f"{self.activity_code} - {self.name}"
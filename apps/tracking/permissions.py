@@ -1,10 +1,13 @@
 from rest_framework.permissions import BasePermission, SAFE_METHODS
 
-def is_in_group(user, group_name):
+from apps.authentication.roles import en_grupo
+
+def is_in_group(user, *group_names):
     """
-    Verifica si un usuario pertenece a un grupo específico.
+    Verifica si un usuario pertenece a alguno de los grupos indicados.
+    Usa los grupos cargados una vez por petición (apps.authentication.roles).
     """
-    return user.groups.filter(name=group_name).exists()
+    return en_grupo(user, *group_names)
 
 class IsPlanificador(BasePermission):
     """
@@ -26,7 +29,7 @@ class IsAuditorOrPlanning(BasePermission):
     """
     def has_permission(self, request, view):
         if request.method in SAFE_METHODS:
-            return is_in_group(request.user, 'Auditoría') or is_in_group(request.user, 'Planificación Institucional')
+            return is_in_group(request.user, 'Auditoría', 'Planificación Institucional')
         return False
 
 # Permisos por rol
@@ -53,6 +56,10 @@ class TrackingActivityPermission(BasePermission):
         # Los métodos 'update' y 'partial_update' se mapean a PUT y PATCH
         elif view.action in ['update', 'partial_update']:
             return is_in_group(request.user, 'Aprobador')
+
+        # Carga masiva: POST crea (como 'create') y PATCH actualiza (como 'partial_update')
+        elif view.action == 'bulk':
+            return is_in_group(request.user, 'Planificador' if request.method == 'POST' else 'Aprobador')
         
         # Para 'list' y 'retrieve' (GET), cualquier usuario autenticado tiene permiso.
         elif view.action in ['list', 'retrieve', 'download_csv_report']:
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Objective, TrackingActivity
+from apps.core.serializers import CamposDinamicosMixin
 
 class ObjectiveSerializer(serializers.ModelSerializer):
     # Campo de solo lectura para mostrar el código del OEI en las respuestas GET
@@ -18,7 +19,7 @@ class ObjectiveSerializer(serializers.ModelSerializer):
         read_only_fields = ('status',) # El status se debe manejar internamente, no por el usuario
 
 # Reglas de Negocio
-class TrackingActivitySerializer(serializers.ModelSerializer):
+class TrackingActivitySerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     project_name = serializers.CharField(source='project.nombre', read_only=True)
     responsible_name = serializers.CharField(source='responsible.get_full_name', read_only=True)
 
@@ -1,3 +1,151 @@
+from datetime import date
+from unittest import mock
+
+from django.contrib.auth.models import Group
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from apps.audit.models import AuditEvent
+from apps.authentication.models import Usuario
+from apps.institutional_config.models import Catalogo
+from apps.investment_projects.models import ProyectoInversion, Entidad, ItemCatalogo
+from .models import ActivityCodeSequence, Objective, TrackingActivity
+
+
+class CodigoActividadTests(TestCase):
+    def setUp(self):
+        catalogo = Catalogo.objects.create(nombre="Tipos", codigo="TIPOS")
+        item = ItemCatalogo.objects.create(catalogo=catalogo, nombre="Item")
+        entidad = Entidad.objects.create(nombre="Entidad", codigo_unico="ENT")
+        self.proyectos = [
+            ProyectoInversion.objects.create(
+                nombre=f"Proyecto {i}", entidad_ejecutora=entidad, tipo_proyecto=item, tipologia_proyecto=item,
+                sector=item
+            ) for i in range(2)
+        ]
+
+    def actividad(self, proyecto, **extra):
+        return TrackingActivity(project=proyecto, name="Actividad", planned_start_date=date(2025, 1, 1),
+                                planned_end_date=date(2025, 3, 1), planned_duration_days=59, **extra)
+
+    def test_save_asigna_codigos_consecutivos_por_proyecto(self):
+        codigos = []
+        for proyecto in (self.proyectos[0], self.proyectos[0], self.proyectos[1]):
+            actividad = self.actividad(proyecto, real_start_date=date(2025, 1, 5))
+            actividad.save()
+            codigos.append(actividad.activity_code)
+        self.assertEqual(codigos, ['ACT001', 'ACT002', 'ACT001'])
+        self.assertEqual(actividad.reported_status, 'EN_PROGRESO')
+
+    def test_continua_desde_los_codigos_existentes(self):
+        TrackingActivity.objects.bulk_create([
+            self.actividad(self.proyectos[0], activity_code=codigo) for codigo in ('ACT007', 'ACT012', 'OTRO')
+        ])
+        actividad = self.actividad(self.proyectos[0])
+        actividad.save()
+        self.assertEqual(actividad.activity_code, 'ACT013')
+        self.assertEqual(ActivityCodeSequence.objects.get(project=self.proyectos[0]).last_value, 13)
+
+    def test_bloque_de_codigos_sin_consultas_por_fila(self):
+        ActivityCodeSequence.objects.reservar(self.proyectos[0].pk, 3)
+        actividades = [self.actividad(self.proyectos[i % 2]) for i in range(40)]
+        with CaptureQueriesContext(connection) as consultas:
+            TrackingActivity.objects.asignar_codigos(actividades)
+        sql = [q['sql'] for q in consultas.captured_queries if 'SAVEPOINT' not in q['sql']]
+        # Reserva y lectura del contador por proyecto (más la creación del contador nuevo)
+        self.assertEqual(len(sql), 6)
+        TrackingActivity.objects.bulk_create(actividades)
+
+        codigos = sorted(TrackingActivity.objects.filter(project=self.proyectos[0]).values_list('activity_code', flat=True))
+        self.assertEqual(codigos[0], 'ACT004')
+        self.assertEqual(codigos[-1], 'ACT023')
+        self.assertEqual(ActivityCodeSequence.objects.reservar(self.proyectos[1].pk), range(21, 22))
+
+
+class CargaMasivaActividadesTests(APITestCase):
+    def setUp(self):
+        catalogo = Catalogo.objects.create(nombre="Tipos", codigo="TIPOS")
+        item = ItemCatalogo.objects.create(catalogo=catalogo, nombre="Item")
+        self.proyecto = ProyectoInversion.objects.create(
+            nombre="Proyecto", entidad_ejecutora=Entidad.objects.create(nombre="Entidad", codigo_unico="ENT"),
+            tipo_proyecto=item, tipologia_proyecto=item, sector=item
+        )
+        self.objetivo = Objective.objects.create(name="Objetivo")
+        self.usuario = Usuario.objects.create_user(nombre_usuario="planificador", password="Clave123!")
+        self.usuario.groups.add(Group.objects.create(name='Planificador'), Group.objects.create(name='Aprobador'))
+        self.client.force_authenticate(user=self.usuario)
+        self.url = reverse('trackingactivity-bulk')
+
+    def filas(self, cantidad):
+        return [{
+            'project': self.proyecto.pk, 'objectives': [self.objetivo.pk], 'name': f'Actividad {i}',
+            'responsible': self.usuario.pk, 'planned_start_date': '2025-01-01', 'planned_end_date': '2025-02-01',
+        } for i in range(cantidad)]
+
+    def crear(self, cantidad):
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.post(self.url, self.filas(cantidad), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        return response, len(consultas)
+
+    def test_crea_todas_las_filas_con_consultas_constantes(self):
+        # La primera carga crea el contador de códigos del proyecto
+        self.crear(1)
+        _, pocas = self.crear(2)
+        response, muchas = self.crear(30)
+        self.assertEqual(pocas, muchas)
+        self.assertEqual(response.data['total'], 30)
+        self.assertEqual(response.data['resultados'][0]['activity_code'], 'ACT004')
+        self.assertEqual([r['indice'] for r in response.data['resultados']], list(range(30)))
+
+        actividad = TrackingActivity.objects.get(pk=response.data['resultados'][-1]['id'])
+        self.assertEqual(actividad.planned_duration_days, 31)
+        self.assertEqual(actividad.created_by, self.usuario)
+        self.assertEqual(list(actividad.objectives.all()), [self.objetivo])
+        # Un evento de auditoría por carga y proyecto
+        self.assertEqual(AuditEvent.objects.filter(event_type='TRACKING_ACTIVITIES_BULK_CREATED').count(), 3)
+
+    def test_sin_returning_lee_los_ids_por_lote(self):
+        with mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert',
+                               new_callable=mock.PropertyMock, return_value=False):
+            self.crear(1)
+            _, pocas = self.crear(2)
+            response, muchas = self.crear(30)
+        self.assertEqual(pocas, muchas)
+        for resultado in response.data['resultados']:
+            self.assertEqual(TrackingActivity.objects.get(pk=resultado['id']).activity_code, resultado['activity_code'])
+
+    def test_una_fila_invalida_no_escribe_nada(self):
+        filas = self.filas(3)
+        filas[1]['planned_end_date'] = '2024-01-01'
+        filas[2]['project'] = 999
+        response = self.client.post(self.url, filas, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([e['indice'] for e in response.data['errores']], [1, 2])
+        self.assertIn('project', response.data['errores'][1]['errores'])
+        self.assertFalse(TrackingActivity.objects.exists())
+
+    def test_actualizacion_masiva(self):
+        response, _ = self.crear(2)
+        ids = [r['id'] for r in response.data['resultados']]
+        response = self.client.patch(self.url, [
+            {'id': ids[0], 'real_start_date': '2025-01-03'},
+            {'id': ids[1], 'name': 'Renombrada', 'planned_end_date': '2025-01-11'},
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        primera, segunda = TrackingActivity.objects.filter(pk__in=ids).order_by('pk')
+        self.assertEqual(primera.reported_status, 'EN_PROGRESO')
+        self.assertEqual((segunda.name, segunda.planned_duration_days), ('Renombrada', 10))
+        self.assertEqual(segunda.updated_by, self.usuario)
+
+        response = self.client.patch(self.url, [{'id': ids[0]}, {'id': ids[0]}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
-# Create your tests here.
+    def test_requiere_grupo_planificador(self):
+        self.usuario.groups.clear()
+        response = self.client.post(self.url, self.filas(1), format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -1,35 +1,42 @@
 from rest_framework import viewsets
 from rest_framework.permissions import IsAuthenticated
-from django.contrib.contenttypes.models import ContentType
 
 from .models import Objective, TrackingActivity
 from .serializers import ObjectiveSerializer, TrackingActivitySerializer
 from .permissions import TrackingActivityPermission
 from apps.audit.models import AuditEvent
+from apps.audit.pipeline import registrar_auditoria
+from apps.core.tipos_contenido import tipos_contenido
+from apps.core.masivo import CargaMasivaMixin
+from apps.core.metricas import MedicionSerializacionMixin
+from apps.core.serializers import ConsultaCamposDinamicosMixin
+from apps.investment_projects.models import ProyectoInversion
+from apps.reports import estadisticas
 
 def create_audit_event(user, instance, event_type, details):
     """Función auxiliar para crear eventos de auditoría."""
-    AuditEvent.objects.create(
+    registrar_auditoria(
+        AuditEvent,
         user=user,
         event_type=event_type,
         details=details,
-        content_type=ContentType.objects.get_for_model(instance),
+        content_type=tipos_contenido.tipo(instance),
         object_id=instance.pk
     )
 
-class ObjectiveViewSet(viewsets.ModelViewSet):
+class ObjectiveViewSet(MedicionSerializacionMixin, viewsets.ModelViewSet):
     queryset = Objective.objects.all()
     serializer_class = ObjectiveSerializer
     permission_classes = [IsAuthenticated]
 
 # Integrar la auditoria con el módulo audit
-class TrackingActivityViewSet(viewsets.ModelViewSet):
+class TrackingActivityViewSet(CargaMasivaMixin, ConsultaCamposDinamicosMixin, MedicionSerializacionMixin, viewsets.ModelViewSet):
     queryset = TrackingActivity.objects.all()  # Añadido para que el router pueda inferir basename
     serializer_class = TrackingActivitySerializer
     permission_classes = [IsAuthenticated, TrackingActivityPermission]
 
     def get_queryset(self):
-        return TrackingActivity.objects.filter(is_active=True)
+        return TrackingActivity.objects.filter(is_active=True).select_related('project', 'responsible')
 
     def perform_create(self, serializer):
         activity = serializer.save(created_by=self.request.user)
@@ -46,3 +53,43 @@ class TrackingActivityViewSet(viewsets.ModelViewSet):
         instance.save()
         details = {"message": f"Actividad de seguimiento '{instance.name}' eliminada lógicamente."}
         create_audit_event(self.request.user, instance, 'TRACKING_ACTIVITY_DELETED', details)
+
+    # Carga masiva (POST/PATCH activities/bulk/, ver CargaMasivaMixin)
+    def campos_carga_masiva(self, creacion):
+        return {'created_by': self.request.user} if creacion else {'updated_by': self.request.user}
+
+    def preparar_carga_masiva(self, objetos, creacion):
+        if creacion:
+            TrackingActivity.objects.asignar_codigos(objetos)
+        for activity in objetos:
+            activity.planned_duration_days = (activity.planned_end_date - activity.planned_start_date).days
+            activity.update_reported_status()
+        return ('planned_duration_days', 'reported_status')
+
+    def despues_de_carga_masiva(self, objetos, creacion):
+        # Un solo evento de auditoría por proyecto en lugar de uno por actividad
+        event_type = 'TRACKING_ACTIVITIES_BULK_CREATED' if creacion else 'TRACKING_ACTIVITIES_BULK_UPDATED'
+        accion = 'creadas' if creacion else 'actualizadas'
+        por_proyecto = {}
+        for activity in objetos:
+            por_proyecto.setdefault(activity.project_id, []).append(activity)
+        for project_id, activities in por_proyecto.items():
+            registrar_auditoria(
+                AuditEvent,
+                user=self.request.user,
+                event_type=event_type,
+                details={
+                    "message": f"{len(activities)} actividades de seguimiento {accion} en carga masiva.",
+                    "activities": [{"id": a.pk, "activity_code": a.activity_code} for a in activities],
+                },
+                content_type=tipos_contenido.tipo(ProyectoInversion),
+                object_id=project_id
+            )
+        # bulk_create/bulk_update no disparan las señales que invalidan el dashboard
+        estadisticas.invalidar(TrackingActivity)
+
+    def clave_carga_masiva(self):
+        return ('project', 'activity_code')
+
+    def resultado_carga_masiva(self, objeto):
+        return {'id': objeto.pk, 'activity_code': objeto.activity_code}
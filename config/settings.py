@@ -61,6 +61,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'apps.core.metricas.MetricasMiddleware',  # consultas/tiempos por endpoint: /api/v1/metrics/
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -149,17 +150,105 @@ REST_FRAMEWORK = {
         'django_filters.rest_framework.DjangoFilterBackend'
     ],
 
+    # TokenAuthentication con el token -> usuario en caché del proceso (apps/authentication/autenticacion.py)
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'apps.authentication.autenticacion.AutenticacionTokenCache',
     ],
 
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
-    ]
+    ],
+
+    # Paginación opcional: ?page=/?page_size= (numerada) o ?cursor= (keyset). Sin parámetros devuelve la lista completa.
+    'DEFAULT_PAGINATION_CLASS': 'apps.core.pagination.PaginacionOpcional',
+    'PAGE_SIZE': 50,
 }
 
 AUTH_USER_MODEL = 'authentication.Usuario'
 
+# manage.py test aplica los ajustes de AJUSTES_PRUEBAS sobre los de este archivo
+TEST_RUNNER = 'apps.core.pruebas.EjecutorPruebas'
+
+# Auditoría: los eventos se encolan y un hilo de fondo los escribe en lote (apps/audit/pipeline.py).
+# Durante las pruebas se escriben de forma síncrona (ver apps/core/pruebas.py).
+AUDITORIA_ASINCRONA = True
+AUDITORIA_TAMANO_LOTE = 200
+AUDITORIA_INTERVALO_SEGUNDOS = 2.0
+# Retención: los meses más antiguos se mueven a JSONL comprimido (comando archivar_auditoria)
+AUDITORIA_MESES_RETENCION = 12
+AUDITORIA_DIR_ARCHIVO = BASE_DIR / 'archivo_auditoria'
+
+# Caché en memoria del proceso. En producción con varios workers conviene un backend compartido
+# (Redis/Memcached) para que la invalidación del dashboard llegue a todos; el timeout acota el desfase.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+DASHBOARD_CACHE_SEGUNDOS = 300
+# Datos de referencia (/api/v1/reference-data/): las versiones de cada conjunto se leen de la caché;
+# una escritura la borra en este proceso y los demás workers la releen tras estos segundos.
+REFERENCIA_VERSIONES_SEGUNDOS = 60
+# Roles y grupos del usuario para los permisos: se cargan una vez por petición y se comparten
+# entre peticiones durante estos segundos (0 desactiva la caché compartida).
+PERMISOS_CACHE_SEGUNDOS = 60
+# Token -> usuario en memoria de cada proceso (LRU). Se invalida al cerrar sesión o guardar el usuario
+# mediante una versión por usuario en CACHES: con un backend compartido (Redis, Memcached) los demás
+# workers lo ven en la siguiente petición; con LocMemCache, como mucho tras estos segundos.
+TOKEN_CACHE_SEGUNDOS = 300
+TOKEN_CACHE_MAXIMO = 10000
+# Último acceso: se acumula por usuario y se escribe en lote cada ACCESOS_INTERVALO_SEGUNDOS
+# (en las pruebas, en el momento; ver apps/core/pruebas.py)
+ACCESOS_ASINCRONOS = True
+ACCESOS_INTERVALO_SEGUNDOS = 30.0
+
+# Métricas por endpoint (apps/core/metricas.py), expuestas en /api/v1/metrics/ y /api/v1/metrics/prometheus/
+METRICAS_ACTIVAS = True
+# Superar un presupuesto solo registra un aviso; en las pruebas hace fallar la petición (apps/core/pruebas.py)
+METRICAS_PRESUPUESTO_ESTRICTO = False
+# Máximo de consultas por petición (o {'consultas': n, 'ms_bd': ms, 'bytes': b}) por nombre de URL.
+# Incluyen la autenticación y, en pruebas, las escrituras síncronas de auditoría y último acceso.
+PRESUPUESTOS_ENDPOINTS = {
+    'proyecto-list': 14,
+    'alineacion-list': 8,
+    'auditevent-list': 8,
+    'registroauditoria-list': 4,
+    'rol-list': 4,
+    'dashboard-stats': 8,
+    # pdf/excel: sello de versión de los datos y alta del trabajo (get_or_create)
+    'report-tracking-activities': 6,
+    # Una consulta por bloque y, por bloque, una por tipo de origen/destino
+    'export-report': 8,
+    'content-type': 2,
+    'content-type-list': 2,
+    'plan-institucional-version-diff': 5,
+    # Cargas masivas: crecen por proyecto (contador, auditoría), no por fila
+    'trackingactivity-bulk': 24,
+    'cronogramas-bulk': 20,
+    'catalogo-list': 2,
+    'itemcatalogo-list': 2,
+    'unidadorganizacional-list': 3,
+    'datos-referencia': 8,
+    'busqueda': 5,
+    'proyecto-list-simplified': 2,
+}
+
+# Reportes pesados (PDF/Excel): se generan en un pool de procesos y se guardan en caché en disco
+REPORTES_TRABAJOS_ASINCRONOS = True
+REPORTES_TRABAJADORES = 2
+REPORTES_DIR_CACHE = BASE_DIR / 'cache_reportes'
+REPORTES_CACHE_MAX_MB = 512
+REPORTES_MINUTOS_MAXIMOS = 30
+
+# Historial de versiones de proyectos: una foto completa cada N versiones y parches JSON entre ellas
+PROYECTOS_VERSIONES_INTERVALO_COMPLETA = 10
+# Igual para los planes institucionales
+PLANES_VERSIONES_INTERVALO_COMPLETA = 10
+
+# Carga masiva (rutas bulk/ de actividades de seguimiento y cronograma): filas por petición y por INSERT
+CARGA_MASIVA_MAXIMO_FILAS = 2000
+CARGA_MASIVA_TAMANO_LOTE = 500
+
 ALLOWED_HOSTS = ['kubernetes.docker.internal', 'localhost', '127.0.0.1']
 
 # Solo para el desarrollo dejaré abierto el puerto para facilitar la comunicación con el frontEnd
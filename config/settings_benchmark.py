@@ -0,0 +1,21 @@
+"""
+Configuración para benchmarks locales sobre SQLite, sin necesidad de MySQL:
+    python manage.py migrate --settings=config.settings_benchmark
+    python manage.py generar_datos_sinteticos --escala mediana --settings=config.settings_benchmark
+    python manage.py benchmark_api --settings=config.settings_benchmark --salida benchmarks/base.json
+"""
+import os
+
+# settings.py exige las credenciales de MySQL aunque aquí no se usen
+for _variable in ('DB_NAME', 'DB_USER', 'DB_PASSWORD'):
+    os.environ.setdefault(_variable, 'benchmark')
+
+from .settings import *  # noqa: E402,F401,F403
+
+DEBUG = False
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'benchmark.sqlite3',
+    }
+}
@@ -27,4 +27,7 @@ urlpatterns = [
     path('api/v1/reports/', include('apps.reports.urls')),
     path('api/v1/audit/', include('apps.audit.urls')),
     path('api/v1/tracking/', include('apps.tracking.urls')),
+    path('api/v1/metrics/', include('apps.core.urls')),
+    path('api/v1/reference-data/', include('apps.core.urls_referencia')),
+    path('api/v1/search/', include('apps.core.urls_busqueda')),
 ]
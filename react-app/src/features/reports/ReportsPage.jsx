@@ -2,6 +2,8 @@ import React, {useEffect, useState} from 'react';
 import {FileText, BarChart3, Bell, History, FileJson, FileSpreadsheet, FileType, PieChart, TrendingUp} from 'lucide-react';
 import { api } from '../../shared/api/api.js';
 
+const API_ORIGIN = 'http://127.0.0.1:8000';
+
 // Pequeño componente para las tarjetas de capacidad de exportación
 const ExportCard = ({icon: Icon, title, format, onExport}) => (
     <button
@@ -41,13 +43,13 @@ const ProgressBar = ({ label, value, color = "bg-blue-600", subValue }) => (
 );
 
 // Componente de Barra Horizontal para Inversión (Simulando gráfico)
-const SectorBar = ({ label, amount, maxAmount }) => {
-    const percentage = (amount / maxAmount) * 100;
+const SectorBar = ({ label, amount, maxAmount, formatValue = (value) => `$${value.toLocaleString()}` }) => {
+    const percentage = maxAmount ? (amount / maxAmount) * 100 : 0;
     return (
         <div className="mb-3 group">
             <div className="flex justify-between text-xs mb-1">
                 <span className="font-semibold text-gray-700 dark:text-gray-300 truncate w-1/2">{label}</span>
-                <span className="text-gray-600 dark:text-gray-400">${amount.toLocaleString()}</span>
+                <span className="text-gray-600 dark:text-gray-400">{formatValue(amount)}</span>
             </div>
             <div className="w-full bg-gray-100 rounded-sm h-4 dark:bg-gray-700 relative overflow-hidden">
                 <div
@@ -59,11 +61,34 @@ const SectorBar = ({ label, amount, maxAmount }) => {
     );
 };
 
+// Lista de barras a partir de una sección del dashboard (una fila con 'total' por barra)
+const BarList = ({ rows, getLabel, formatValue }) => {
+    if (!rows.length) {
+        return <p className="text-sm text-gray-500 dark:text-gray-400">Sin datos registrados.</p>;
+    }
+    const maxAmount = Math.max(...rows.map((row) => Number(row.total)));
+    return rows.map((row, index) => (
+        <SectorBar
+            key={index}
+            label={getLabel(row)}
+            amount={Number(row.total)}
+            maxAmount={maxAmount}
+            formatValue={formatValue}
+        />
+    ));
+};
+
+const formatCount = (value) => `${value} proyecto${value === 1 ? '' : 's'}`;
+
 export default function ReportsPage() {
+    // Secciones que devuelve /reports/dashboard-stats/ (apps/reports/estadisticas.py)
     const [stats, setStats] = useState({
-        inversion_sector: [],
-        avance_entidad: [],
-        alineacion_ods: []
+        proyectos_por_estado: [],
+        proyectos_por_sector: [],
+        proyectos_por_entidad: [],
+        programado_por_periodo: [],
+        actividades_por_estado: [],
+        dictamenes: { por_estado: {}, tasa_aprobacion: null }
     });
     const [loadingStats, setLoadingStats] = useState(true);
 
@@ -73,68 +98,74 @@ export default function ReportsPage() {
 
     const loadDashboardStats = async () => {
         try {
-            // Usamos datos simulados si falla la API o mientras se desarrolla el backend real
-            // En producción, descomentar la llamada real:
             const response = await api.get('/reports/dashboard-stats/');
             setStats(response);
         } catch (error) {
-            console.error("Error cargando estadísticas, usando datos mock:", error);
-            // Datos Mock para visualización inmediata si no hay backend listo
-            setStats({
-                inversion_sector: [
-                    { sector: 'Infraestructura Vial', total: 125000000 },
-                    { sector: 'Salud Pública', total: 89000000 },
-                    { sector: 'Educación', total: 65000000 },
-                    { sector: 'Tecnología', total: 45000000 },
-                ],
-                avance_entidad: [
-                    { entidad_responsable: 'Ministerio de Obras', promedio_fisico: 78, promedio_financiero: 65 },
-                    { entidad_responsable: 'Ministerio de Salud', promedio_fisico: 45, promedio_financiero: 50 },
-                    { entidad_responsable: 'Secretaría de Educación', promedio_fisico: 92, promedio_financiero: 90 },
-                ],
-                alineacion_ods: []
-            });
+            console.error("Error cargando estadísticas:", error);
         } finally {
             setLoadingStats(false);
         }
     };
 
-    // Función especializada para manejar la descarga de archivos desde la API
-    const handleExport = async (format) => {
+    const totalActividades = stats.actividades_por_estado.reduce((suma, fila) => suma + fila.total, 0);
+    const dictamenesResueltos = (stats.dictamenes.por_estado.APROBADO ?? 0) + (stats.dictamenes.por_estado.RECHAZADO ?? 0);
+
+    // Descarga un archivo de la API como blob, con el token de sesión
+    const downloadFile = async (url, filename) => {
         const token = localStorage.getItem('authToken'); // Obtener token como en api.js
         if (!token) {
             console.error('Token no encontrado en localStorage');
         }
-        const url = `http://127.0.0.1:8000/api/v1/reports/export/?format=${format}`;
+        const response = await fetch(url, {
+            headers: {
+                'Authorization': `Token ${token}`,
+            },
+        });
 
-        try {
-            const response = await fetch(url, {
-                headers: {
-                    'Authorization': `Token ${token}`,
-                },
-            });
-
-            if (!response.ok) {
-                throw new Error('Error en la respuesta de la red');
-            }
+        if (!response.ok) {
+            throw new Error('Error en la respuesta de la red');
+        }
 
-            // Convertimos la respuesta en un blob (un objeto tipo archivo)
-            const blob = await response.blob();
+        // Convertimos la respuesta en un blob (un objeto tipo archivo)
+        const blob = await response.blob();
 
-            // Creamos una URL temporal para el blob
-            const downloadUrl = window.URL.createObjectURL(blob);
+        // Creamos una URL temporal para el blob
+        const downloadUrl = window.URL.createObjectURL(blob);
 
-            // Creamos un enlace 'a' invisible para iniciar la descarga
-            const link = document.createElement('a');
-            link.href = downloadUrl;
-            link.setAttribute('download', `reporte_alineaciones.${format}`); // Nombre del archivo
-            document.body.appendChild(link);
-            link.click();
+        // Creamos un enlace 'a' invisible para iniciar la descarga
+        const link = document.createElement('a');
+        link.href = downloadUrl;
+        link.setAttribute('download', filename); // Nombre del archivo
+        document.body.appendChild(link);
+        link.click();
+
+        // Limpiamos el enlace y la URL del blob
+        link.parentNode.removeChild(link);
+        window.URL.revokeObjectURL(downloadUrl);
+    };
 
-            // Limpiamos el enlace y la URL del blob
-            link.parentNode.removeChild(link);
-            window.URL.revokeObjectURL(downloadUrl);
+    // PDF y Excel se generan en segundo plano: la API devuelve un trabajo y se consulta hasta que termine
+    const waitForJob = async (job) => {
+        while (job.estado !== 'COMPLETADO') {
+            if (job.estado === 'ERROR') {
+                throw new Error(job.error || 'No se pudo generar el reporte');
+            }
+            await new Promise((resolve) => setTimeout(resolve, 1500));
+            job = await api.get(job.url_estado.replace('/api/v1', ''));
+        }
+        return job;
+    };
 
+    // Función especializada para manejar la descarga de archivos desde la API
+    const handleExport = async (format) => {
+        const extension = format === 'excel' ? 'xlsx' : format;
+        try {
+            if (format === 'pdf' || format === 'excel') {
+                const job = await waitForJob(await api.get(`/reports/export/?format=${format}`));
+                await downloadFile(`${API_ORIGIN}${job.url_descarga}`, `reporte_alineaciones.${extension}`);
+            } else {
+                await downloadFile(`${API_ORIGIN}/api/v1/reports/export/?format=${format}`, `reporte_alineaciones.${extension}`);
+            }
         } catch (error) {
             console.error('Hubo un error al exportar el reporte:', error);
             // Aquí podrías mostrar una notificación de error al usuario
@@ -173,42 +204,73 @@ export default function ReportsPage() {
 
             {/* Paneles de Visualización (Dashboards) */}
             <div className="grid grid-cols-1 lg:grid-cols-3 gap-6">
-                {/* Gráfico de Inversión por Sector */}
+                {/* Gráfico de Montos Programados por Periodo */}
                 <div className="lg:col-span-2 bg-white dark:bg-slate-800 p-6 rounded-lg shadow transition-colors">
                     <div className="flex items-center mb-6">
                         <BarChart3 className="w-5 h-5 text-emerald-500 mr-2"/>
-                        <h2 className="text-xl font-semibold text-gray-700 dark:text-gray-300">Inversión Total por Sector</h2>
+                        <h2 className="text-xl font-semibold text-gray-700 dark:text-gray-300">Monto Programado por Periodo</h2>
                     </div>
-                    
+
                     <div className="space-y-4">
                         {loadingStats ? <p>Cargando datos...</p> : (
-                            stats.inversion_sector.map((item, index) => (
-                                <SectorBar 
-                                    key={index} 
-                                    label={item.sector || 'Sin Sector'} 
-                                    amount={item.total} 
-                                    maxAmount={Math.max(...stats.inversion_sector.map(s => s.total))} 
-                                />
-                            ))
+                            <BarList rows={stats.programado_por_periodo} getLabel={(item) => item.periodo} />
                         )}
                     </div>
                 </div>
 
-                {/* Gráfico de Avance por Entidad */}
+                {/* Avance de Actividades de Seguimiento y Dictámenes */}
                 <div className="bg-white dark:bg-slate-800 p-6 rounded-lg shadow transition-colors">
                     <div className="flex items-center mb-6">
                         <TrendingUp className="w-5 h-5 text-blue-500 mr-2"/>
                         <h2 className="text-xl font-semibold text-gray-700 dark:text-gray-300">Avance Global</h2>
                     </div>
-                    {loadingStats ? <p>Cargando...</p> : stats.avance_entidad.map((entidad, idx) => (
-                        <div key={idx} className="mb-6 border-b border-gray-100 dark:border-gray-700 pb-4 last:border-0 last:pb-0">
-                            <p className="font-semibold text-sm mb-2 text-gray-800 dark:text-gray-200">{entidad.entidad_responsable}</p>
-                            <ProgressBar label="Físico" value={entidad.promedio_fisico} color="bg-blue-500" />
-                            <ProgressBar label="Financiero" value={entidad.promedio_financiero} color="bg-green-500" />
-                        </div>
-                    ))}
+                    {loadingStats ? <p>Cargando...</p> : (
+                        <>
+                            <div className="mb-6 border-b border-gray-100 dark:border-gray-700 pb-4">
+                                <p className="font-semibold text-sm mb-2 text-gray-800 dark:text-gray-200">Actividades de seguimiento</p>
+                                {stats.actividades_por_estado.map((fila) => (
+                                    <ProgressBar
+                                        key={fila.estado}
+                                        label={fila.nombre || fila.estado}
+                                        value={Math.round(fila.total * 100 / totalActividades)}
+                                        subValue={fila.total}
+                                    />
+                                ))}
+                            </div>
+                            <p className="font-semibold text-sm mb-2 text-gray-800 dark:text-gray-200">Dictámenes de prioridad</p>
+                            {stats.dictamenes.tasa_aprobacion === null ? (
+                                <p className="text-sm text-gray-500 dark:text-gray-400">Sin dictámenes resueltos.</p>
+                            ) : (
+                                <ProgressBar
+                                    label="Aprobados"
+                                    value={stats.dictamenes.tasa_aprobacion}
+                                    color="bg-green-500"
+                                    subValue={`${stats.dictamenes.por_estado.APROBADO ?? 0} de ${dictamenesResueltos}`}
+                                />
+                            )}
+                        </>
+                    )}
                 </div>
             </div>
+
+            {/* Distribución de Proyectos */}
+            <div className="grid grid-cols-1 lg:grid-cols-3 gap-6">
+                {[
+                    { title: 'Proyectos por Estado', rows: stats.proyectos_por_estado, getLabel: (item) => item.estado },
+                    { title: 'Proyectos por Sector', rows: stats.proyectos_por_sector, getLabel: (item) => item.sector_nombre || 'Sin Sector' },
+                    { title: 'Proyectos por Entidad', rows: stats.proyectos_por_entidad, getLabel: (item) => item.entidad_nombre || 'Sin Entidad' },
+                ].map(({ title, rows, getLabel }) => (
+                    <div key={title} className="bg-white dark:bg-slate-800 p-6 rounded-lg shadow transition-colors">
+                        <div className="flex items-center mb-6">
+                            <PieChart className="w-5 h-5 text-blue-500 mr-2"/>
+                            <h2 className="text-xl font-semibold text-gray-700 dark:text-gray-300">{title}</h2>
+                        </div>
+                        {loadingStats ? <p>Cargando...</p> : (
+                            <BarList rows={rows} getLabel={getLabel} formatValue={formatCount} />
+                        )}
+                    </div>
+                ))}
+            </div>
         </div>
     );
 }
\ No newline at end of file